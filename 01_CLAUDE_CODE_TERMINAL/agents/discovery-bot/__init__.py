@@ -6,13 +6,32 @@ from .discovery_bot_main import DiscoveryBot
 from .document_classifier import DocumentClassifier
 from .entity_extractor import EntityExtractor
 from .privilege_detector import PrivilegeDetector
+from .privilege_triage import PrivilegeTriage
+from .term_matcher import TermMatcher
 from .timeline_builder import TimelineBuilder
+from .timeline_index import TimelineIndex
 from .keyword_analyzer import KeywordAnalyzer
+from .keyword_engine import KeywordEngine
 from .embedding_generator import EmbeddingGenerator
+from .embedding_backends import EmbeddingBackend, SentenceTransformerBackend, ONNXBackend
+from .chunk_embedder import ChunkEmbedder
+from .text_chunker import TextChunker
+from .vector_index import VectorIndex
+from .bm25_index import BM25Index
+from .hybrid_retriever import HybridRetriever
+from .fused_analyzer import FusedAnalyzer
 from .source_tracker import SourceTracker
 from .batch_processor import BatchProcessor
 from .validation import Validator
 from .cost_calculator import CostCalculator
+from .result_cache import ResultCache
+from .deduplicator import Deduplicator
+from .email_threading import EmailThreader
+from .rate_limiter import AdaptiveRateLimiter
+from .retry_policy import RetryPolicy, DeadLetterQueue
+from .run_journal import RunJournal
+from .output_writer import BatchOutputWriter, ResultReader
+from .parquet_exporter import ParquetExporter
 
 __version__ = "1.0.0"
 __author__ = "Discovery Bot Team"
@@ -22,11 +41,34 @@ __all__ = [
     "DocumentClassifier",
     "EntityExtractor",
     "PrivilegeDetector",
+    "PrivilegeTriage",
+    "TermMatcher",
     "TimelineBuilder",
+    "TimelineIndex",
     "KeywordAnalyzer",
+    "KeywordEngine",
     "EmbeddingGenerator",
+    "EmbeddingBackend",
+    "SentenceTransformerBackend",
+    "ONNXBackend",
+    "ChunkEmbedder",
+    "TextChunker",
+    "VectorIndex",
+    "BM25Index",
+    "HybridRetriever",
+    "FusedAnalyzer",
     "SourceTracker",
     "BatchProcessor",
     "Validator",
-    "CostCalculator"
+    "CostCalculator",
+    "ResultCache",
+    "Deduplicator",
+    "EmailThreader",
+    "AdaptiveRateLimiter",
+    "RetryPolicy",
+    "DeadLetterQueue",
+    "RunJournal",
+    "BatchOutputWriter",
+    "ResultReader",
+    "ParquetExporter"
 ]
@@ -0,0 +1,340 @@
+"""
+Batch API Processor - Run discovery stages through the Anthropic Message Batches API
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchAPIProcessor:
+    """
+    Submit stage prompts for many documents as Message Batches
+
+    Stages keep their real dependencies, so a staged run is three batch
+    rounds: classification; then entities and keywords; then privilege and
+    the semantic summary. A fused run (analysis_mode='fused') is one round
+    of combined prompts. Results are parsed by each analyzer's own
+    parse_response and stitched into the normal per-document schema.
+    """
+
+    # Anthropic limit on requests per Message Batch
+    MAX_REQUESTS_PER_BATCH = 100_000
+
+    def __init__(self, discovery_bot):
+        """
+        Initialize batch API processor
+
+        Args:
+            discovery_bot: Reference to main DiscoveryBot instance
+        """
+        self.bot = discovery_bot
+
+    async def process(
+        self,
+        documents: List[Dict[str, Any]],
+        completed: Optional[Dict[str, Dict[str, Any]]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process documents via the Message Batches API
+
+        Args:
+            documents: List of documents to process
+            completed: Results of a previous attempt at this run, keyed by
+                document ID; those documents are not submitted again
+            on_result: Called with each new result once it is finalized
+
+        Returns:
+            List of processing results in input order
+        """
+        bot = self.bot
+        start_time = time.time()
+
+        # Only one representative per duplicate cluster is submitted
+        all_documents, assignments = documents, None
+        if bot.config['deduplicate']:
+            documents, assignments = bot.batch_processor.deduplicate(documents)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+        pending = []
+
+        # Resolve IDs, cache hits and invalid documents before submitting anything
+        for i, doc in enumerate(documents):
+            doc_id = doc.get('document_id') or bot._generate_doc_id(doc)
+            text = doc.get('text', '')
+            metadata = doc.get('metadata', {})
+
+            if completed and doc_id in completed:
+                bot._record_restored(completed[doc_id])
+                results[i] = completed[doc_id]
+                continue
+
+            if bot.config['cache_results']:
+                cached = bot._get_cached_result(doc_id)
+                if cached:
+                    logger.info(f"Using cached result for {doc_id}")
+                    bot.stats['total_processed'] += 1
+                    results[i] = cached
+                    if on_result is not None:
+                        on_result(cached)
+                    continue
+
+            if not text or len(text.strip()) < 10:
+                bot.stats['total_processed'] += 1
+                results[i] = bot._failed_result(
+                    doc_id, doc, ValueError(f"Document {doc_id} has insufficient text")
+                )
+                continue
+
+            pending.append({
+                'index': i,
+                'document_id': doc_id,
+                'text': text,
+                'metadata': metadata,
+                'text_hash': bot._hash_text(text),
+                'source': bot.source_tracker.track(doc_id, metadata),
+                'outputs': {},
+                'batch_ids': {}
+            })
+
+        logger.info(f"Submitting {len(pending)} documents to the Message Batches API")
+
+        if bot.config['analysis_mode'] == 'fused':
+            await self._run_fused(pending)
+        else:
+            await self._run_staged(pending)
+
+        for doc in pending:
+            try:
+                results[doc['index']] = bot._finalize_result(
+                    doc['document_id'],
+                    doc['source'],
+                    doc['outputs'],
+                    processing_mode='batch_api',
+                    extra={
+                        'analysis_mode': bot.config['analysis_mode'],
+                        'batch_api': {'batch_ids': doc['batch_ids']}
+                    }
+                )
+            except Exception as e:
+                results[doc['index']] = bot._failed_result(doc['document_id'], documents[doc['index']], e)
+            finally:
+                bot.stats['total_processed'] += 1
+
+            if on_result is not None:
+                on_result(results[doc['index']])
+
+        if assignments is not None:
+            results = bot.batch_processor.expand_duplicates(all_documents, assignments, results)
+
+        duration = time.time() - start_time
+        logger.info(f"Batch API processing complete: {len(all_documents)} documents in {duration:.2f}s")
+
+        return results
+
+    async def _run_fused(self, pending: List[Dict[str, Any]]) -> None:
+        """Single round: one combined prompt per document"""
+        bot = self.bot
+
+        await self._run_round(pending, {
+            'fused': lambda doc: bot.fused_analyzer.build_request(doc['text'], doc['metadata'])
+        })
+
+        for doc in pending:
+            doc['outputs'] = doc['outputs'].pop('fused')
+
+    async def _run_staged(self, pending: List[Dict[str, Any]]) -> None:
+        """Three rounds that respect the stage dependencies"""
+        bot = self.bot
+
+        # Round 1: classification
+        await self._run_round(pending, {
+            'classification': lambda doc: bot.classifier.build_request(doc['text'], doc['metadata'])
+        })
+
+        # Round 2: entities and keywords (both need only the classification)
+        await self._run_round(pending, {
+            'entities': lambda doc: bot.entity_extractor.build_request(
+                doc['text'], doc['outputs']['classification']
+            ),
+            'keywords': lambda doc: bot.keyword_analyzer.build_request(
+                doc['text'], doc['outputs']['classification']
+            )
+        })
+
+        # Conclusive privilege heuristics and triage bypasses never reach the API
+        for doc in pending:
+            heuristic, determination = bot.privilege_detector.screen(
+                doc['text'], doc['metadata'], doc['outputs']['entities']
+            )
+            doc['privilege_heuristic'] = heuristic
+            if determination is not None:
+                doc['outputs']['privilege'] = determination
+
+        # Round 3: privilege and semantic summary (both need entities)
+        await self._run_round(pending, {
+            'privilege': lambda doc: bot.privilege_detector.build_request(
+                doc['text'], doc['metadata'], doc['outputs']['entities']
+            ),
+            'embeddings': lambda doc: bot.embedding_generator.build_request(
+                doc['text'], doc['outputs']['entities']
+            )
+        })
+
+    async def _run_round(
+        self,
+        docs: List[Dict[str, Any]],
+        stage_builders: Dict[str, Any]
+    ) -> None:
+        """
+        Submit one request per (document, stage), then parse results into doc['outputs']
+
+        Stages already present in a document's outputs, or found in the
+        stage cache, are skipped.
+        """
+        bot = self.bot
+        cacheable = [stage for stage in stage_builders if stage in bot.stage_prompt_hashes]
+
+        requests = {}
+        for i, doc in enumerate(docs):
+            for stage, build in stage_builders.items():
+                if stage in doc['outputs']:
+                    continue
+                if stage in cacheable:
+                    cached = bot._get_cached_stage(stage, doc['text_hash'])
+                    if cached is not None:
+                        doc['outputs'][stage] = cached
+                        continue
+                requests[f"{stage}-{i}"] = build(doc)
+
+        if not requests:
+            return
+
+        messages, batch_ids = await self._submit_and_collect(requests)
+
+        for i, doc in enumerate(docs):
+            for stage in stage_builders:
+                custom_id = f"{stage}-{i}"
+                if custom_id not in requests:
+                    continue
+
+                doc['batch_ids'][stage] = batch_ids.get(custom_id)
+                doc['outputs'][stage] = self._parse_stage(stage, doc, messages.get(custom_id))
+                if stage in cacheable:
+                    bot._cache_stage(stage, doc['text_hash'], doc['outputs'][stage])
+
+    def _parse_stage(
+        self,
+        stage: str,
+        doc: Dict[str, Any],
+        message: Optional[Any]
+    ) -> Dict[str, Any]:
+        """Parse a stage's batch result, falling back to heuristics on errors"""
+        bot = self.bot
+        text, metadata = doc['text'], doc['metadata']
+
+        try:
+            if message is None:
+                raise RuntimeError('No successful batch result')
+
+            if stage == 'classification':
+                return bot.classifier.parse_response(message)
+            if stage == 'entities':
+                return bot.entity_extractor.parse_response(message, text)
+            if stage == 'keywords':
+                return bot.keyword_analyzer.parse_response(message, text)
+            if stage == 'privilege':
+                return bot.privilege_detector.parse_response(message, doc['privilege_heuristic'])
+            if stage == 'embeddings':
+                return bot.embedding_generator.parse_response(message, text)
+            if stage == 'fused':
+                return bot.fused_analyzer.parse_response(message, text, metadata)
+
+            raise ValueError(f"Unknown stage: {stage}")
+
+        except Exception as e:
+            logger.error(f"Batch {stage} failed for {doc['document_id']}: {e}")
+
+            if stage == 'classification':
+                return bot.classifier._fallback_classification(text, metadata)
+            if stage == 'entities':
+                return bot.entity_extractor._fallback_extraction(text)
+            if stage == 'keywords':
+                return bot.keyword_analyzer._fallback_keyword_analysis(text)
+            if stage == 'privilege':
+                return bot.privilege_detector._conservative_privilege_response(text, metadata)
+            if stage == 'fused':
+                return bot.fused_analyzer.fallback(text, metadata)
+            return bot.embedding_generator._fallback_embedding(text)
+
+    async def _submit_and_collect(
+        self,
+        requests: Dict[str, Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Submit requests as one or more Message Batches and wait for results
+
+        Returns:
+            Tuple of (succeeded Message by custom_id, batch ID by custom_id)
+        """
+        client = self.bot.client
+        custom_ids = list(requests)
+        messages: Dict[str, Any] = {}
+        batch_ids: Dict[str, str] = {}
+
+        for offset in range(0, len(custom_ids), self.MAX_REQUESTS_PER_BATCH):
+            chunk = custom_ids[offset:offset + self.MAX_REQUESTS_PER_BATCH]
+
+            batch = await client.messages.batches.create(
+                requests=[
+                    {'custom_id': custom_id, 'params': requests[custom_id]}
+                    for custom_id in chunk
+                ]
+            )
+            logger.info(f"Submitted message batch {batch.id} ({len(chunk)} requests)")
+
+            for custom_id in chunk:
+                batch_ids[custom_id] = batch.id
+
+            if not await self._wait_for_batch(batch.id):
+                continue
+
+            errored = 0
+            async for entry in await client.messages.batches.results(batch.id):
+                if entry.result.type == 'succeeded':
+                    messages[entry.custom_id] = entry.result.message
+                else:
+                    errored += 1
+
+            if errored:
+                logger.warning(f"Message batch {batch.id}: {errored} requests did not succeed")
+
+        return messages, batch_ids
+
+    async def _wait_for_batch(self, batch_id: str) -> bool:
+        """Poll until the batch ends; cancel it if it exceeds batch_max_wait"""
+        client = self.bot.client
+        poll_interval = self.bot.config['batch_poll_interval']
+        deadline = time.time() + self.bot.config['batch_max_wait']
+
+        while True:
+            batch = await client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == 'ended':
+                counts = batch.request_counts
+                logger.info(
+                    f"Message batch {batch_id} ended: "
+                    f"{counts.succeeded} succeeded, {counts.errored} errored, "
+                    f"{counts.canceled} canceled, {counts.expired} expired"
+                )
+                return True
+
+            if time.time() >= deadline:
+                logger.error(f"Message batch {batch_id} exceeded batch_max_wait; canceling")
+                await client.messages.batches.cancel(batch_id)
+                return False
+
+            await asyncio.sleep(poll_interval)
@@ -3,18 +3,23 @@ Batch Processor - Process thousands of documents efficiently
 """
 
 import asyncio
+import copy
 import logging
-from typing import Dict, Any, List, Callable
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, AsyncIterable, AsyncIterator, Iterable, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 import time
 
+from deduplicator import Deduplicator
+
 logger = logging.getLogger(__name__)
 
 
 class BatchProcessor:
     """Efficient batch processing of large document sets"""
 
+    # Term groups whose appearance in a near-duplicate's own text sends it to review
+    PRIVILEGE_TERM_GROUPS = ('markers', 'attorney_titles', 'legal_advice', 'confidentiality')
+
     def __init__(self, discovery_bot):
         """
         Initialize batch processor
@@ -23,6 +28,10 @@ class BatchProcessor:
             discovery_bot: Reference to main DiscoveryBot instance
         """
         self.bot = discovery_bot
+        self.deduplicator = Deduplicator(
+            discovery_bot.embedding_generator._hash_text,
+            threshold=discovery_bot.config['near_duplicate_threshold']
+        )
 
     async def process(
         self,
@@ -30,7 +39,8 @@ class BatchProcessor:
         batch_size: int = 100,
         parallel_workers: int = 10,
         show_progress: bool = True,
-        rate_limit_delay: float = 0.0
+        completed: Optional[Dict[str, Dict[str, Any]]] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Process documents in parallel batches
@@ -40,12 +50,31 @@ class BatchProcessor:
             batch_size: Documents per batch
             parallel_workers: Number of parallel workers
             show_progress: Show progress updates
-            rate_limit_delay: Delay between requests (seconds)
+            completed: Results of a previous attempt at this run, keyed by
+                document ID; those documents are not processed again
+            on_result: Called with each new result as soon as it finishes
 
         Returns:
             List of processing results
         """
-        total_docs = len(documents)
+        # Only one representative per duplicate cluster reaches the LLM stages
+        all_documents, assignments = documents, None
+        if self.bot.config['deduplicate']:
+            documents, assignments = self.deduplicate(documents)
+
+        # Skip documents a previous attempt already completed
+        restored = {}
+        if completed:
+            for i, doc in enumerate(documents):
+                doc_id = doc.get('document_id') or self.bot._generate_doc_id(doc)
+                if doc_id in completed:
+                    restored[i] = completed[doc_id]
+                    self.bot._record_restored(completed[doc_id])
+            logger.info(f"Skipping {len(restored)} documents completed by a previous attempt")
+
+        pending = [doc for i, doc in enumerate(documents) if i not in restored]
+
+        total_docs = len(pending)
         logger.info(f"Starting batch processing of {total_docs} documents")
         logger.info(f"Batch size: {batch_size}, Parallel workers: {parallel_workers}")
 
@@ -54,7 +83,7 @@ class BatchProcessor:
 
         # Split into batches
         batches = [
-            documents[i:i + batch_size]
+            pending[i:i + batch_size]
             for i in range(0, total_docs, batch_size)
         ]
 
@@ -72,7 +101,7 @@ class BatchProcessor:
             batch_results = await self._process_batch_parallel(
                 batch,
                 parallel_workers,
-                rate_limit_delay
+                on_result
             )
 
             results.extend(batch_results)
@@ -92,7 +121,8 @@ class BatchProcessor:
                     f"{docs_per_second:.2f} docs/sec, "
                     f"Progress: {progress_pct:.1f}% "
                     f"({processed}/{total_docs}), "
-                    f"Success: {successful}, Failed: {failed}"
+                    f"Success: {successful}, Failed: {failed}, "
+                    f"{self._limiter_status()}"
                 )
 
         total_duration = time.time() - start_time
@@ -104,24 +134,152 @@ class BatchProcessor:
             f"({overall_rate:.2f} docs/sec)"
         )
 
+        if restored:
+            new_results = iter(results)
+            results = [
+                restored[i] if i in restored else next(new_results)
+                for i in range(len(documents))
+            ]
+
+        if assignments is not None:
+            results = self.expand_duplicates(all_documents, assignments, results)
+
+        return results
+
+    def deduplicate(
+        self,
+        documents: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Optional[Dict[str, Any]]]]:
+        """
+        Drop exact and near-duplicate documents ahead of processing
+
+        Args:
+            documents: Documents to process
+
+        Returns:
+            Tuple of (cluster representatives in input order, per-document
+            assignments from Deduplicator.cluster)
+        """
+        assignments = self.deduplicator.cluster([doc.get('text', '') for doc in documents])
+        representatives = [doc for doc, assignment in zip(documents, assignments) if assignment is None]
+        return representatives, assignments
+
+    def expand_duplicates(
+        self,
+        documents: List[Dict[str, Any]],
+        assignments: List[Optional[Dict[str, Any]]],
+        representative_results: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fan representative results out to their duplicates
+
+        Each duplicate gets a copy of its representative's result under its
+        own document ID and source record, with a duplicate_of pointer and
+        zero cost. Only exact duplicates inherit the privilege determination
+        as is: near-duplicates differ from the document that was actually
+        reviewed, so privileged ones are flagged for attorney review, and
+        the rest are re-screened with the privilege term matcher and flagged
+        when their own text has privilege indicators the representative's
+        lacks.
+
+        Args:
+            documents: All documents, in input order
+            assignments: Output of deduplicate()
+            representative_results: Results for the representatives, in order
+
+        Returns:
+            One result per input document, in input order
+        """
+        bot = self.bot
+        representative_iter = iter(representative_results)
+        results: List[Dict[str, Any]] = []
+
+        for doc, assignment in zip(documents, assignments):
+            if assignment is None:
+                results.append(next(representative_iter))
+                continue
+
+            original = results[assignment['representative']]
+            doc_id = doc.get('document_id') or bot._generate_doc_id(doc)
+
+            result = copy.deepcopy(original)
+            result['document_id'] = doc_id
+            result['duplicate_of'] = original.get('document_id')
+            result['duplicate_type'] = assignment['duplicate_type']
+            result['duplicate_similarity'] = assignment['similarity']
+
+            bot.stats['total_processed'] += 1
+            bot.stats['duplicates_suppressed'] += 1
+
+            if 'error' in result:
+                bot.stats['failed'] += 1
+                results.append(result)
+                continue
+
+            result['source'] = bot.source_tracker.track(doc_id, doc.get('metadata', {}))
+            result['cost'] = bot.cost_calculator.calculate({'model_used': result.get('model_used')})
+
+            privilege = result.get('privilege', {})
+            if assignment['duplicate_type'] == 'near':
+                new_terms = self._new_privilege_terms(
+                    doc.get('text', ''), documents[assignment['representative']].get('text', '')
+                )
+                if privilege.get('is_privileged'):
+                    privilege['needs_attorney_review'] = True
+                    privilege['review_reason'] = (
+                        f"Privilege inherited from near-duplicate {result['duplicate_of']}"
+                    )
+                elif new_terms:
+                    privilege['needs_attorney_review'] = True
+                    privilege['review_reason'] = (
+                        f"Privilege indicators not in near-duplicate {result['duplicate_of']}: "
+                        f"{', '.join(new_terms)}"
+                    )
+
+            if privilege.get('is_privileged'):
+                bot.stats['privileged'] += 1
+            bot.stats['successful'] += 1
+            results.append(result)
+
         return results
 
+    def _new_privilege_terms(self, text: str, representative_text: str) -> List[str]:
+        """Privilege terms found in a near-duplicate's text but not its representative's"""
+        matcher = self.bot.privilege_detector.term_matcher
+        found, reviewed = matcher.find(text), matcher.find(representative_text)
+        return [
+            term
+            for group in self.PRIVILEGE_TERM_GROUPS
+            for term in found[group]
+            if term not in reviewed[group]
+        ]
+
     async def _process_batch_parallel(
         self,
         batch: List[Dict[str, Any]],
         parallel_workers: int,
-        rate_limit_delay: float
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> List[Dict[str, Any]]:
-        """Process a batch with parallel workers"""
+        """
+        Process a batch with parallel workers
+
+        API pacing is left to the bot's AdaptiveRateLimiter, which every
+        analyzer call goes through.
+        """
 
         # Create semaphore to limit concurrent requests
         semaphore = asyncio.Semaphore(parallel_workers)
 
         async def process_with_semaphore(doc, doc_id):
             async with semaphore:
-                result = await self.bot.process_document(doc, doc_id)
-                if rate_limit_delay > 0:
-                    await asyncio.sleep(rate_limit_delay)
+                result = await self._process_with_retry(doc, doc_id)
+                if on_result is not None:
+                    # A failing output callback must not turn an analyzed
+                    # document into a failed one
+                    try:
+                        on_result(result)
+                    except Exception as e:
+                        logger.error(f"Result callback failed for document {doc_id}: {e}", exc_info=e)
                 return result
 
         # Generate document IDs
@@ -142,114 +300,214 @@ class BatchProcessor:
         processed_results = []
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                logger.error(f"Error processing document {doc_ids[i]}: {result}")
-                processed_results.append({
-                    'document_id': doc_ids[i],
-                    'error': str(result),
-                    'status': 'failed',
-                    'processed_at': datetime.utcnow().isoformat()
-                })
+                processed_results.append(self.bot._failed_result(doc_ids[i], batch[i], result))
             else:
                 processed_results.append(result)
 
         return processed_results
 
+    async def process_stream(
+        self,
+        documents: Union[AsyncIterable[Dict[str, Any]], Iterable[Dict[str, Any]]],
+        parallel_workers: int = 10,
+        queue_size: Optional[int] = None,
+        show_progress: bool = True,
+        progress_interval: int = 100
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a document stream with a sliding window of workers
+
+        Unlike process(), there are no lock-step batches: a new document
+        starts as soon as any worker frees up, and results are yielded in
+        completion order. Both the input and output queues are bounded, so
+        memory stays flat regardless of production size and a slow consumer
+        applies backpressure to the reader.
+
+        Args:
+            documents: Async or sync iterable of documents
+            parallel_workers: Number of documents kept in flight
+            queue_size: Input/output queue bound (default: 2 x parallel_workers)
+            show_progress: Log progress every progress_interval results
+            progress_interval: Results between progress updates
+
+        Yields:
+            Processing results as each document finishes
+        """
+        queue_size = queue_size or parallel_workers * 2
+        pending: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        finished: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        done_marker = object()
+
+        logger.info(f"Starting stream processing with {parallel_workers} workers (queue size {queue_size})")
+
+        async def feed():
+            try:
+                async for doc in self._iterate(documents):
+                    await pending.put(doc)
+            finally:
+                for _ in range(parallel_workers):
+                    await pending.put(done_marker)
+
+        async def work():
+            cancelled = False
+            try:
+                while True:
+                    doc = await pending.get()
+                    if doc is done_marker:
+                        break
+
+                    # A document the pipeline cannot even identify (e.g. metadata
+                    # that is not JSON-serializable) fails on its own; it must not
+                    # take the worker, and with it the consumer, down
+                    doc_id = None
+                    try:
+                        doc_id = doc.get('document_id') or self.bot._generate_doc_id(doc)
+                        result = await self._process_with_retry(doc, doc_id)
+                    except Exception as e:
+                        self.bot.stats['total_processed'] += 1
+                        result = self.bot._failed_result(doc_id, doc, e)
+
+                    await finished.put(result)
+            except asyncio.CancelledError:
+                # Cancelled by the consumer, which no longer reads the queue
+                cancelled = True
+                raise
+            finally:
+                if not cancelled:
+                    await finished.put(done_marker)
+
+        feeder = asyncio.create_task(feed())
+        workers = [asyncio.create_task(work()) for _ in range(parallel_workers)]
+
+        start_time = time.time()
+        processed = 0
+        failed = 0
+        active_workers = parallel_workers
+
+        try:
+            while active_workers:
+                result = await finished.get()
+                if result is done_marker:
+                    active_workers -= 1
+                    continue
+
+                processed += 1
+                if 'error' in result:
+                    failed += 1
+
+                if show_progress and processed % progress_interval == 0:
+                    elapsed = time.time() - start_time
+                    logger.info(
+                        f"Stream progress: {processed} processed, "
+                        f"Success: {processed - failed}, Failed: {failed}, "
+                        f"{processed / elapsed if elapsed > 0 else 0:.2f} docs/sec, "
+                        f"{self._limiter_status()}"
+                    )
+
+                yield result
+
+            # Surface errors raised by the document source itself
+            await feeder
+
+        finally:
+            for task in [feeder, *workers]:
+                task.cancel()
+            await asyncio.gather(feeder, *workers, return_exceptions=True)
+
+        total_duration = time.time() - start_time
+        logger.info(
+            f"Stream processing complete: "
+            f"{processed} documents in {total_duration:.2f}s "
+            f"({processed / total_duration if total_duration > 0 else 0:.2f} docs/sec)"
+        )
+
+    def _limiter_status(self) -> str:
+        """One-line rate limiter state for progress messages"""
+        metrics = self.bot.rate_limiter.metrics()
+        return (
+            f"Concurrency limit: {metrics['concurrency_limit']}, "
+            f"Queued calls: {metrics['queue_depth']}, "
+            f"Rate limited: {metrics['rate_limited']}"
+        )
+
+    async def _iterate(
+        self,
+        documents: Union[AsyncIterable[Dict[str, Any]], Iterable[Dict[str, Any]]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Iterate sync and async document sources uniformly"""
+        if hasattr(documents, '__aiter__'):
+            async for doc in documents:
+                yield doc
+        else:
+            for doc in documents:
+                yield doc
+
+    async def _process_with_retry(self, doc: Dict[str, Any], doc_id: str) -> Dict[str, Any]:
+        """
+        Process one document, retrying retryable failures in place
+
+        Only this worker waits out the backoff; the other workers keep
+        taking documents. Documents that fail every attempt (or fail
+        fatally) are dead-lettered.
+        """
+        bot = self.bot
+        attempts = 0
+
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            return await bot.analyze_document(doc, doc_id)
+
+        try:
+            return await bot.retry_policy.run('document', attempt)
+        except Exception as e:
+            return bot._failed_result(doc_id, doc, e, attempts)
+        finally:
+            bot.stats['total_processed'] += 1
+
     async def process_with_retry(
         self,
         documents: List[Dict[str, Any]],
-        max_retries: int = 3,
-        retry_delay: float = 1.0,
         **kwargs
     ) -> Dict[str, Any]:
         """
-        Process documents with retry logic for failures
+        Process documents and report retry statistics
+
+        Retries happen per document inside the workers (and per stage inside
+        the analyzers) as part of process(), so failures are retried while
+        the rest of the set keeps flowing. Attempt limits and backoff come
+        from the bot's retry configuration.
 
         Args:
             documents: Documents to process
-            max_retries: Maximum retry attempts per document
-            retry_delay: Delay between retries (seconds)
             **kwargs: Additional arguments for process()
 
         Returns:
             Processing results with retry statistics
         """
-        retry_stats = {
-            'total_attempts': 0,
-            'retries_by_document': {},
-            'final_failures': []
-        }
-
-        # First attempt
         results = await self.process(documents, **kwargs)
 
-        # Extract failures
-        failed_docs = []
-        failed_indices = []
-
-        for i, result in enumerate(results):
-            if 'error' in result:
-                failed_docs.append(documents[i])
-                failed_indices.append(i)
-                doc_id = result.get('document_id', f'doc_{i}')
-                retry_stats['retries_by_document'][doc_id] = 0
-
-        # Retry failed documents
-        retry_attempt = 0
-        while failed_docs and retry_attempt < max_retries:
-            retry_attempt += 1
-            retry_stats['total_attempts'] += 1
-
-            logger.info(
-                f"Retry attempt {retry_attempt}/{max_retries} "
-                f"for {len(failed_docs)} failed documents"
-            )
-
-            await asyncio.sleep(retry_delay * retry_attempt)  # Exponential backoff
-
-            # Retry
-            retry_results = await self.process(
-                failed_docs,
-                show_progress=False,
-                **kwargs
-            )
-
-            # Update results
-            new_failed_docs = []
-            new_failed_indices = []
-
-            for i, (retry_result, orig_idx) in enumerate(zip(retry_results, failed_indices)):
-                if 'error' not in retry_result:
-                    # Success! Update the result
-                    results[orig_idx] = retry_result
-                    doc_id = retry_result.get('document_id', f'doc_{orig_idx}')
-                    retry_stats['retries_by_document'][doc_id] = retry_attempt
-                    logger.info(f"Document {doc_id} succeeded on retry {retry_attempt}")
-                else:
-                    # Still failing
-                    new_failed_docs.append(failed_docs[i])
-                    new_failed_indices.append(orig_idx)
-
-            failed_docs = new_failed_docs
-            failed_indices = new_failed_indices
-
-        # Record final failures
-        if failed_docs:
-            for doc, idx in zip(failed_docs, failed_indices):
-                doc_id = results[idx].get('document_id', f'doc_{idx}')
-                retry_stats['final_failures'].append({
-                    'document_id': doc_id,
-                    'attempts': max_retries + 1,
-                    'error': results[idx].get('error', 'Unknown error')
-                })
+        final_failures = [
+            {
+                'document_id': r.get('document_id'),
+                'attempts': r.get('attempts', 1),
+                'error_class': r.get('error_class'),
+                'error': r.get('error', 'Unknown error')
+            }
+            for r in results if 'error' in r
+        ]
 
         return {
             'results': results,
-            'retry_statistics': retry_stats,
+            'retry_statistics': {
+                'stages': self.bot.retry_policy.statistics(),
+                'final_failures': final_failures,
+                'dead_letter_path': str(self.bot.dead_letters.path)
+            },
             'summary': {
                 'total_documents': len(documents),
-                'successful': len(documents) - len(failed_docs),
-                'failed': len(failed_docs),
-                'retry_attempts': retry_stats['total_attempts']
+                'successful': len(results) - len(final_failures),
+                'failed': len(final_failures)
             }
         }
 
@@ -0,0 +1,135 @@
+"""
+Discovery Bot Benchmark
+Measures documents/second against a local mock of the Anthropic API
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from typing import Dict, List
+
+from discovery_bot_main import DiscoveryBot
+from mock_anthropic_server import start_mock_server
+
+
+BENCHMARK_TEXT = (
+    "From: Jane Doe <jane@example.com>\n"
+    "To: Operations Team <ops@example.com>\n"
+    "Subject: Quarterly shipment schedule\n\n"
+    "Please find the updated shipment schedule attached. "
+    "Deliveries will resume on the first business day of the month.\n"
+)
+
+
+async def run_benchmark(
+    base_url: str,
+    num_documents: int,
+    workers: int,
+    mode: str = 'realtime',
+    analysis_mode: str = 'staged'
+) -> Dict[str, float]:
+    """Process num_documents with the given worker count and measure throughput"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        bot = DiscoveryBot('stub-key', config={
+            'parallel_workers': workers,
+            'api_base_url': base_url,
+            'processing_mode': mode,
+            'analysis_mode': analysis_mode,
+            'batch_poll_interval': 0.2,
+            'cache_results': False,
+            # Benchmark documents differ only by reference number; measure every call
+            'deduplicate': False,
+            'retry_base_delay': 0.05,
+            'save_intermediate': False,
+            'cache_dir': f"{work_dir}/cache",
+            'output_dir': f"{work_dir}/output"
+        })
+
+        documents = [
+            {'text': f"{BENCHMARK_TEXT}\nReference #{i}", 'metadata': {'filename': f"bench_{i}.eml"}}
+            for i in range(num_documents)
+        ]
+
+        start = time.perf_counter()
+        if mode == 'batch_api':
+            results = await bot.batch_api_processor.process(documents)
+        else:
+            results = await bot.batch_processor.process(
+                documents,
+                batch_size=num_documents,
+                parallel_workers=workers,
+                show_progress=False
+            )
+        duration = time.perf_counter() - start
+
+        limiter = bot.rate_limiter.metrics()
+        retries = sum(stage['retries'] for stage in bot.retry_policy.statistics().values())
+        await bot.close()
+
+    return {
+        'workers': workers,
+        'documents': len(results),
+        'failed': sum(1 for r in results if 'error' in r),
+        # Stages fall back to heuristics on parse and fatal errors; count them so a broken run can't look fast
+        'fallbacks': sum(1 for r in results if r.get('degraded_stages')),
+        'seconds': duration,
+        'docs_per_second': len(results) / duration if duration > 0 else 0,
+        'total_cost': sum(r['cost']['total_cost'] for r in results if 'error' not in r),
+        'rate_limited': limiter['rate_limited'],
+        'concurrency_limit': limiter['concurrency_limit'],
+        'retries': retries
+    }
+
+
+async def main(args: argparse.Namespace) -> List[Dict[str, float]]:
+    server = start_mock_server(args.latency, args.batch_latency, rpm=args.rpm, error_rate=args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("=" * 80)
+    print(
+        f"DISCOVERY BOT THROUGHPUT BENCHMARK "
+        f"(mode {args.mode}/{args.analysis_mode}, mock latency {args.latency * 1000:.0f}ms/request)"
+    )
+    print("=" * 80)
+
+    # Batch API throughput does not depend on local workers
+    worker_counts = args.workers if args.mode == 'realtime' else args.workers[:1]
+
+    runs = []
+    try:
+        for workers in worker_counts:
+            run = await run_benchmark(base_url, args.documents, workers, args.mode, args.analysis_mode)
+            runs.append(run)
+
+            speedup = run['docs_per_second'] / runs[0]['docs_per_second'] if runs[0]['docs_per_second'] else 0
+            print(
+                f"  workers={run['workers']:>3}  "
+                f"{run['documents']} docs in {run['seconds']:.2f}s  "
+                f"{run['docs_per_second']:.2f} docs/sec  "
+                f"speedup x{speedup:.1f}  "
+                f"cost ${run['total_cost']:.4f}  "
+                f"failed={run['failed']} fallbacks={run['fallbacks']} "
+                f"429s={run['rate_limited']} concurrency={run['concurrency_limit']} "
+                f"retries={run['retries']}"
+            )
+    finally:
+        server.shutdown()
+
+    return runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=50, help='Documents per run')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock Messages API latency in seconds')
+    parser.add_argument('--batch-latency', type=float, default=1.0, help='Seconds before a mock batch ends')
+    parser.add_argument('--rpm', type=int, default=None, help='Mock requests/minute before 429s')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of mock requests answered with a 500')
+    parser.add_argument('--mode', choices=['realtime', 'batch_api'], default='realtime')
+    parser.add_argument('--analysis-mode', choices=['staged', 'fused'], default='staged')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 5, 10], help='Worker counts to compare')
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,91 @@
+"""
+Term Matcher Benchmark
+Measures privilege heuristic and multi-term matching throughput on a synthetic corpus
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Dict, List
+
+from privilege_detector import PrivilegeDetector
+from term_matcher import TermMatcher, ahocorasick
+
+
+FILLER = (
+    "quarterly shipment pricing schedule meeting notes vendor invoice delivery "
+    "warehouse forecast budget review follow up regarding attached the and of"
+).split()
+
+
+def build_corpus(num_documents: int, words: int, seed: int = 0) -> List[str]:
+    """Synthetic documents; every tenth carries privilege language"""
+    rng = random.Random(seed)
+    marked = (
+        " PRIVILEGED AND CONFIDENTIAL - attorney-client privilege. "
+        "Per our general counsel, my recommendation is to settle. cc: sales"
+    )
+    return [
+        " ".join(rng.choice(FILLER) for _ in range(words)) + (marked if i % 10 == 0 else "")
+        for i in range(num_documents)
+    ]
+
+
+def time_matcher(matcher: TermMatcher, corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for text in corpus:
+        matcher.find(text)
+    return time.perf_counter() - start
+
+
+def main(args: argparse.Namespace) -> Dict[str, float]:
+    corpus = build_corpus(args.documents, args.words)
+    megabytes = sum(len(text) for text in corpus) / 1e6
+
+    print("=" * 80)
+    print(f"TERM MATCHER BENCHMARK ({args.documents} documents, {megabytes:.1f} MB)")
+    print("=" * 80)
+
+    detector = PrivilegeDetector(None)
+    start = time.perf_counter()
+    privileged = sum(
+        detector._heuristic_privilege_check(text, None, None)['is_privileged'] for text in corpus
+    )
+    seconds = time.perf_counter() - start
+    print(
+        f"  privilege heuristic ({detector.term_matcher.backend}): "
+        f"{seconds:.2f}s  {args.documents / seconds:,.0f} docs/sec  privileged={privileged}"
+    )
+
+    # Privilege terms alone, then with a review team's search-term list added
+    rng = random.Random(1)
+    extra = [f"{rng.choice(FILLER)}{i} term{i}" for i in range(args.extra_terms)]
+    groups = dict(detector.term_matcher.groups)
+
+    timings = {'heuristic': seconds}
+    for label, term_groups in [('privilege terms', groups), (f"+{args.extra_terms} terms", {**groups, 'extra': extra})]:
+        backends = [False] + ([True] if ahocorasick is not None else [])
+        for use_automaton in backends:
+            matcher = TermMatcher(term_groups, use_automaton=use_automaton)
+            seconds = time_matcher(matcher, corpus)
+            timings[f"{label}/{matcher.backend}"] = seconds
+            print(
+                f"  {label:<16} {matcher.backend:<9} {len(matcher):>5} terms  "
+                f"{seconds:.2f}s  {megabytes / seconds:,.1f} MB/s"
+            )
+
+    if ahocorasick is None:
+        print("  (pip install pyahocorasick to compare the automaton backend)")
+
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=10_000, help='Documents in the corpus')
+    parser.add_argument('--words', type=int, default=800, help='Words per document')
+    parser.add_argument('--extra-terms', type=int, default=500, help='Search terms added for the large-list run')
+
+    logging.disable(logging.CRITICAL)
+    main(parser.parse_args())
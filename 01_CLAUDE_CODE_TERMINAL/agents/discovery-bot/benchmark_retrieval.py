@@ -0,0 +1,150 @@
+"""
+Hybrid Retrieval Benchmark
+Measures BM25, vector and fused (RRF) query latency on a synthetic 100k-chunk case
+"""
+
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from hybrid_retriever import HybridRetriever
+from vector_index import VectorIndex
+
+
+def build_case(chunks: int, words: int, topics: int, dimensions: int, seed: int = 0) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+    """
+    Synthetic chunks: Zipf-distributed background words mixed with the
+    words of one topic, and vectors clustered around that topic's centroid
+
+    Returns:
+        (rows, vectors, topic centroids)
+    """
+    rng = np.random.default_rng(seed)
+    background = np.array([f"word{i}" for i in range(20_000)])
+    topic_words = np.array([[f"topic{t}term{j}" for j in range(40)] for t in range(topics)])
+
+    topic = rng.integers(0, topics, chunks)
+    ranks = np.minimum(rng.zipf(1.2, (chunks, words)), len(background)) - 1
+    text = background[ranks].astype(topic_words.dtype)
+    specific = rng.random((chunks, words)) < 0.1
+    text[specific] = topic_words[np.repeat(topic, words).reshape(chunks, words)[specific], rng.integers(0, 40, specific.sum())]
+
+    rows = [
+        {
+            'document_id': f"DOC-{i // 20:06d}",
+            'chunk_index': i % 20,
+            'content': " ".join(text[i]),
+            'metadata': {'is_privileged': i % 9 == 0, 'date': f"2023-{i % 12 + 1:02d}-15"}
+        }
+        for i in range(chunks)
+    ]
+
+    centroids = rng.standard_normal((topics, dimensions)).astype(np.float32)
+    vectors = centroids[topic] + 0.8 * rng.standard_normal((chunks, dimensions)).astype(np.float32)
+    return rows, vectors, centroids
+
+
+def legacy_rank(texts: List[str], query: str) -> List[int]:
+    """The previous ContextInjector ranking: count query terms found in each text"""
+    query_terms = query.lower().split()
+    scores = [sum(1 for term in query_terms if term in text.lower()) for text in texts]
+    return sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)[:10]
+
+
+def percentiles(seconds: List[float]) -> str:
+    milliseconds = np.array(seconds) * 1000
+    return f"p50 {np.percentile(milliseconds, 50):7.2f} ms  p95 {np.percentile(milliseconds, 95):7.2f} ms"
+
+
+def main(args: argparse.Namespace) -> Dict[str, float]:
+    rows, vectors, centroids = build_case(args.chunks, args.words, args.topics, args.dimensions)
+    directory = tempfile.mkdtemp(prefix='retrieval-benchmark-')
+
+    print("=" * 80)
+    print(f"HYBRID RETRIEVAL BENCHMARK ({args.chunks:,} chunks, {args.dimensions} dimensions)")
+    print("=" * 80)
+
+    timings: Dict[str, float] = {}
+    try:
+        index = VectorIndex(directory, dimensions=args.dimensions)
+        start = time.perf_counter()
+        for i in range(0, len(rows), 1024):
+            index.add(rows[i:i + 1024], vectors[i:i + 1024])
+        index.flush()
+        timings['vector_build'] = time.perf_counter() - start
+        print(f"  vector index build:  {timings['vector_build']:.2f}s  ({index.statistics()['ivf_lists']} IVF lists)")
+
+        retriever = HybridRetriever(index, candidates=args.candidates)
+        start = time.perf_counter()
+        retriever.refresh()
+        timings['bm25_build'] = time.perf_counter() - start
+        print(f"  BM25 index build:    {timings['bm25_build']:.2f}s  ({len(retriever.bm25.vocabulary):,} terms)")
+
+        start = time.perf_counter()
+        HybridRetriever(index).bm25.scores('warm')
+        timings['bm25_load'] = time.perf_counter() - start
+        print(f"  BM25 index load:     {timings['bm25_load']:.2f}s")
+
+        rng = np.random.default_rng(1)
+        queries = []
+        for _ in range(args.queries):
+            topic = int(rng.integers(0, args.topics))
+            terms = [f"topic{topic}term{j}" for j in rng.choice(40, 2, replace=False)] + [f"word{rng.integers(0, 50)}"]
+            vector = centroids[topic] + 0.8 * rng.standard_normal(args.dimensions).astype(np.float32)
+            queries.append((" ".join(terms), vector))
+
+        print(f"\n  Query latency over {args.queries} queries (k={args.k}, {args.candidates} candidates per source):")
+        runs = [
+            ('bm25', lambda q, v: retriever.bm25.top(q, args.k, index.filter_mask())),
+            ('vector', lambda q, v: index.nearest(v, args.k)),
+            ('hybrid', lambda q, v: retriever.search(q, args.k, query_vector=v)),
+            ('hybrid, filtered', lambda q, v: retriever.search(
+                q, args.k, query_vector=v, is_privileged=False, start='2023-03-01', end='2023-08-31'
+            ))
+        ]
+        for label, run in runs:
+            seconds = []
+            for query, vector in queries:
+                start = time.perf_counter()
+                run(query, vector)
+                seconds.append(time.perf_counter() - start)
+            timings[label] = float(np.median(seconds))
+            print(f"    {label:<18} {percentiles(seconds)}")
+
+        hit = retriever.search(queries[0][0], 1, query_vector=queries[0][1])[0]
+        print(f"\n  Top hit for '{queries[0][0]}': scores={hit['scores']} ranks={hit['ranks']}")
+
+        texts = [row['content'] for row in rows]
+        seconds = []
+        for query, _ in queries[:args.legacy_queries]:
+            start = time.perf_counter()
+            legacy_rank(texts, query)
+            seconds.append(time.perf_counter() - start)
+        timings['legacy'] = float(np.median(seconds))
+        print(f"\n  previous term-count scan over every chunk ({len(seconds)} queries): {percentiles(seconds)}")
+
+        index.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=100_000, help='Chunks in the case')
+    parser.add_argument('--words', type=int, default=150, help='Words per chunk')
+    parser.add_argument('--topics', type=int, default=500, help='Topics (clusters) in the case')
+    parser.add_argument('--dimensions', type=int, default=384, help='Vector width')
+    parser.add_argument('--queries', type=int, default=200, help='Queries timed per mode')
+    parser.add_argument('--legacy-queries', type=int, default=5, help='Queries timed with the previous ranking')
+    parser.add_argument('--candidates', type=int, default=100, help='Rows taken from each source before fusion')
+    parser.add_argument('-k', type=int, default=10, help='Hits per query')
+
+    logging.disable(logging.CRITICAL)
+    main(parser.parse_args())
@@ -0,0 +1,239 @@
+"""
+BM25 Index - Inverted index with Okapi BM25 scoring over chunk texts
+"""
+
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from keyword_engine import TOKEN_PATTERN, STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a growing list of texts
+
+    Texts are tokenized like KeywordEngine (lowercased, longer than two
+    characters, stopwords removed) and stored as postings: for every term,
+    the rows containing it and their term frequencies, in CSR layout sorted
+    by term and then row. A query touches only the postings of its own
+    terms, so its cost depends on how common those terms are rather than on
+    the length of the texts, and rare terms weigh more than common ones
+    through IDF.
+
+    Rows added since the last query are buffered and merged into the
+    postings by one stable sort the next time the index is queried.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            k1: Term frequency saturation
+            b: Length normalization (0 = none, 1 = full)
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self.rows = 0
+
+        # Per-row token counts and per-term document frequencies and
+        # stopword flags, grown by doubling
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._document_frequency = np.zeros(0, dtype=np.int64)
+        self._ignored = np.zeros(0, dtype=bool)
+
+        # Postings sorted by (term, row); indptr[t]:indptr[t + 1] is term t
+        self._terms = np.zeros(0, dtype=np.int32)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._counts = np.zeros(0, dtype=np.int32)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Lowercased tokens longer than two characters, stopwords removed"""
+        return [
+            word for word in TOKEN_PATTERN.findall(text.lower())
+            if len(word) > 2 and word not in STOPWORDS
+        ]
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], **kwargs) -> 'BM25Index':
+        index = cls(**kwargs)
+        index.add(texts)
+        return index
+
+    def add(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Append texts as new rows
+
+        Returns:
+            Row numbers of the texts, in order
+        """
+        counts: List[int] = []
+        flat: List[str] = []
+        for text in texts:
+            tokens = TOKEN_PATTERN.findall(text.lower()) if text else []
+            counts.append(len(tokens))
+            flat.extend(tokens)
+
+        with self._lock:
+            start = self.rows
+            n = len(counts)
+            if not n:
+                return np.zeros(0, dtype=np.int64)
+
+            # Every distinct token gets an ID; stopwords and short tokens are
+            # dropped by ID below rather than token by token
+            vocabulary = self.vocabulary
+            new_words = [word for word in dict.fromkeys(flat) if word not in vocabulary]
+            if new_words:
+                vocabulary.update(zip(new_words, range(len(vocabulary), len(vocabulary) + len(new_words))))
+            n_terms = max(len(vocabulary), 1)
+            self._grow(start + n, n_terms)
+            if new_words:
+                self._ignored[n_terms - len(new_words):n_terms] = [
+                    len(word) <= 2 or word in STOPWORDS for word in new_words
+                ]
+
+            word_ids = np.fromiter(map(vocabulary.__getitem__, flat), dtype=np.int64, count=len(flat))
+            word_rows = np.repeat(np.arange(start, start + n), counts)
+            kept = ~self._ignored[word_ids]
+            word_ids, word_rows = word_ids[kept], word_rows[kept]
+
+            # Unique (row, term) pairs with their counts, in row-major order
+            pairs, pair_counts = np.unique(word_rows * n_terms + word_ids, return_counts=True)
+            rows = (pairs // n_terms).astype(np.int32)
+            terms = (pairs % n_terms).astype(np.int32)
+
+            self._lengths[start:start + n] = np.bincount(word_rows - start, minlength=n)
+            self._document_frequency[:n_terms] += np.bincount(terms, minlength=n_terms)
+            self._pending.append((terms, rows, pair_counts.astype(np.int32)))
+            self.rows += n
+            return np.arange(start, self.rows)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every row for query (0 for rows sharing no term)
+
+        Returns:
+            float32 array of length len(self)
+        """
+        with self._lock:
+            self._merge()
+            scores = np.zeros(self.rows, dtype=np.float32)
+            if not self.rows:
+                return scores
+
+            average_length = max(float(self._lengths[:self.rows].mean()), 1e-9)
+            for word, query_count in Counter(self.tokenize(query)).items():
+                term = self.vocabulary.get(word)
+                if term is None:
+                    continue
+                low, high = self._indptr[term], self._indptr[term + 1]
+                rows = self._postings[low:high]
+                frequency = self._counts[low:high].astype(np.float32)
+                df = float(self._document_frequency[term])
+                idf = np.log1p((self.rows - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[rows] / average_length)
+                scores[rows] += np.float32(query_count * idf) * frequency * (self.k1 + 1) / (frequency + norm)
+            return scores
+
+    def top(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best k rows for query with a positive score, best first
+
+        Args:
+            query: Query text
+            k: Maximum rows
+            mask: Boolean array over rows; rows beyond its length or False
+                in it are excluded
+
+        Returns:
+            (rows, scores)
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if mask is not None:
+            candidates = candidates[candidates < len(mask)]
+            candidates = candidates[mask[candidates]]
+        if not len(candidates) or k < 1:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        values = scores[candidates]
+        top = np.argpartition(-values, k - 1)[:k] if len(values) > k else np.arange(len(values))
+        top = top[np.argsort(-values[top], kind='stable')]
+        return candidates[top].astype(np.int64), values[top]
+
+    def save(self, path: str) -> None:
+        """Write the index to an .npz file"""
+        with self._lock:
+            self._merge()
+            np.savez(
+                path,
+                parameters=np.array([self.k1, self.b]),
+                # Term IDs are assigned in insertion order
+                vocabulary=np.array(list(self.vocabulary), dtype=str),
+                lengths=self._lengths[:self.rows],
+                document_frequency=self._document_frequency[:len(self.vocabulary)],
+                terms=self._terms,
+                postings=self._postings,
+                counts=self._counts
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        """Read an index written by save()"""
+        with np.load(path) as saved:
+            k1, b = saved['parameters'].tolist()
+            index = cls(k1=k1, b=b)
+            index.vocabulary = {word: term for term, word in enumerate(saved['vocabulary'].tolist())}
+            index.rows = len(saved['lengths'])
+            index._lengths = saved['lengths'].astype(np.float32)
+            index._document_frequency = saved['document_frequency'].astype(np.int64)
+            index._ignored = np.array([len(word) <= 2 or word in STOPWORDS for word in index.vocabulary], dtype=bool)
+            index._terms = saved['terms']
+            index._postings = saved['postings']
+            index._counts = saved['counts']
+        index._indptr = np.searchsorted(index._terms, np.arange(len(index.vocabulary) + 1)).astype(np.int64)
+        logger.debug(f"Loaded BM25 index of {index.rows} rows from {Path(path).name}")
+        return index
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold the lock)
+    # ------------------------------------------------------------------
+
+    def _grow(self, rows: int, terms: int) -> None:
+        """Grow the per-row and per-term arrays by doubling"""
+        for name, needed in [('_lengths', rows), ('_document_frequency', terms), ('_ignored', terms)]:
+            current = getattr(self, name)
+            if len(current) < needed:
+                grown = np.zeros(max(needed, 2 * len(current), 1024), dtype=current.dtype)
+                grown[:len(current)] = current
+                setattr(self, name, grown)
+
+    def _merge(self) -> None:
+        """Fold buffered rows into the sorted postings"""
+        if not self._pending:
+            return
+        terms = np.concatenate([self._terms] + [p[0] for p in self._pending])
+        rows = np.concatenate([self._postings] + [p[1] for p in self._pending])
+        counts = np.concatenate([self._counts] + [p[2] for p in self._pending])
+        self._pending = []
+
+        # Existing postings are term-major and buffered ones row-major with
+        # higher rows, so a stable sort on term keeps rows ascending per term
+        order = np.argsort(terms, kind='stable')
+        self._terms, self._postings, self._counts = terms[order], rows[order], counts[order]
+        self._indptr = np.searchsorted(self._terms, np.arange(len(self.vocabulary) + 1)).astype(np.int64)
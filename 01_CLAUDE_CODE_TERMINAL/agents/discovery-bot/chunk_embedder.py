@@ -0,0 +1,194 @@
+"""
+Chunk Embedder - Embed document chunks in cross-document batches and store the vectors
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_backends import EmbeddingBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkEmbedder:
+    """
+    Embeds the chunks of many results together
+
+    Chunks are queued as results are added and handed to the backend
+    group_size at a time, regardless of which document they came from, so
+    short documents do not each pay for a mostly empty forward pass.
+
+    Output directory:
+        vectors.f32   - float32 rows, one per chunk, `dimensions` wide
+        chunks.jsonl  - one line per row, shaped like document_chunks
+        manifest.json - backend, model and dimensions of the vectors
+
+    Duplicates share their representative's chunks and are not embedded again.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        directory: str,
+        group_size: int = 1024,
+        on_embedded: Optional[Callable[[List[Dict[str, Any]], np.ndarray], None]] = None
+    ):
+        """
+        Args:
+            backend: Embedding backend
+            directory: Output directory (appended to if it exists)
+            group_size: Chunks embedded per backend call
+            on_embedded: Called with each group's rows and vectors (e.g. to
+                add them to a VectorIndex)
+        """
+        self.backend = backend
+        self.on_embedded = on_embedded
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.group_size = max(group_size, backend.batch_size)
+
+        self._lock = threading.Lock()
+        self._vectors = open(self.directory / 'vectors.f32', 'ab')
+        self._chunks = open(self.directory / 'chunks.jsonl', 'a', encoding='utf-8')
+        self._pending: List[Dict[str, Any]] = []
+        self.rows = (self.directory / 'vectors.f32').stat().st_size // (4 * backend.dimensions)
+        self.documents = 0
+        self.skipped = 0
+        self.seconds_embedding = 0.0
+
+    def add_result(self, result: Dict[str, Any]) -> None:
+        """Queue a result's chunks, embedding whenever a full group is waiting"""
+        if 'error' in result or 'duplicate_of' in result:
+            self.skipped += 1
+            return
+
+        source = result.get('source') or {}
+        metadata = {
+            'case_id': (source.get('discovery_metadata') or {}).get('case_number'),
+            'is_privileged': bool((result.get('privilege') or {}).get('is_privileged')),
+            'date': (source.get('file_metadata') or {}).get('created_date'),
+            'custodian': source.get('custodian'),
+            'document_type': (result.get('classification') or {}).get('document_type')
+        }
+        self.add_chunks(
+            result.get('document_id'),
+            (result.get('embeddings') or {}).get('chunks') or [],
+            metadata
+        )
+
+    def add_chunks(
+        self,
+        document_id: Optional[str],
+        chunks: Iterable[Dict[str, Any]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Queue one document's chunks
+
+        chunks may be a generator such as TextChunker.chunks(text); groups are
+        embedded as soon as they fill, so a long document never has all of
+        its chunks waiting at once.
+
+        Args:
+            document_id: Document the chunks belong to
+            chunks: Chunk dicts with text and start/end positions
+            metadata: Document fields stored with every chunk row
+        """
+        with self._lock:
+            self.documents += 1
+            for index, chunk in enumerate(chunks):
+                content = chunk.get('text') or ''
+                if content:
+                    row = self._chunk_row(document_id, index, chunk, content)
+                    row['metadata'] = metadata or {}
+                    self._pending.append(row)
+                if len(self._pending) >= self.group_size:
+                    self._flush(self.group_size)
+
+    def add_results(self, results: Iterable[Dict[str, Any]]) -> None:
+        for result in results:
+            self.add_result(result)
+
+    def close(self) -> None:
+        """Embed the remaining chunks and write the manifest"""
+        with self._lock:
+            if self._pending:
+                self._flush(len(self._pending))
+            self._vectors.close()
+            self._chunks.close()
+            (self.directory / 'manifest.json').write_text(json.dumps({
+                **self.backend.describe(),
+                'rows': self.rows,
+                'dtype': 'float32'
+            }, indent=2))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'directory': str(self.directory),
+            'model': self.backend.model_name,
+            'dimensions': self.backend.dimensions,
+            'documents_embedded': self.documents,
+            'documents_skipped': self.skipped,
+            'chunks_embedded': self.rows,
+            'seconds_embedding': round(self.seconds_embedding, 3)
+        }
+
+    def _chunk_row(self, document_id: Optional[str], index: int, chunk: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {
+            'document_id': document_id,
+            'chunk_index': index,
+            'content': content,
+            'content_hash': hashlib.sha256(content.encode()).hexdigest(),
+            'token_count': self.backend.count_tokens(content),
+            'word_count': len(content.split()),
+            'start_char': chunk.get('start_position'),
+            'end_char': chunk.get('end_position')
+        }
+
+    def _flush(self, count: int) -> None:
+        """Embed and append the first count pending chunks (lock held)"""
+        group, self._pending = self._pending[:count], self._pending[count:]
+
+        start = time.perf_counter()
+        vectors = self.backend.embed([row['content'] for row in group])
+        self.seconds_embedding += time.perf_counter() - start
+        if self.on_embedded is not None:
+            self.on_embedded(group, vectors)
+
+        self._vectors.write(vectors.tobytes())
+        self._vectors.flush()
+        for row in group:
+            row['row'] = self.rows
+            self._chunks.write(json.dumps(row) + '\n')
+            self.rows += 1
+        self._chunks.flush()
+
+
+def load(directory: str) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Chunk rows and their vectors from a ChunkEmbedder directory
+
+    Returns:
+        (rows, vectors) where vectors is a read-only memory map of shape
+        (len(rows), dimensions)
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / 'manifest.json').read_text())
+    with open(directory / 'chunks.jsonl', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+
+    if not rows:
+        return rows, np.zeros((0, manifest['dimensions']), dtype=np.float32)
+    vectors = np.memmap(
+        directory / 'vectors.f32', dtype=np.float32, mode='r',
+        shape=(len(rows), manifest['dimensions'])
+    )
+    return rows, vectors
+
@@ -29,6 +29,9 @@ class CostCalculator:
         }
     }
 
+    # Message Batches API requests are billed at 50% of standard prices
+    BATCH_DISCOUNT = 0.50
+
     def __init__(self):
         pass
 
@@ -74,11 +77,15 @@ class CostCalculator:
             embeddings = result.get('embeddings', {})
             self._add_tokens(total_tokens, embeddings.get('tokens_used', {}))
 
+            # Batch API results are billed at a discount on every token type
+            is_batch = result.get('processing_mode') == 'batch_api'
+            price_multiplier = (1 - self.BATCH_DISCOUNT) if is_batch else 1.0
+
             # Calculate costs
-            input_cost = (total_tokens['input'] / 1_000_000) * pricing['input']
-            output_cost = (total_tokens['output'] / 1_000_000) * pricing['output']
-            cache_write_cost = (total_tokens['cache_creation'] / 1_000_000) * pricing['cache_write']
-            cache_read_cost = (total_tokens['cache_read'] / 1_000_000) * pricing['cache_read']
+            input_cost = (total_tokens['input'] / 1_000_000) * pricing['input'] * price_multiplier
+            output_cost = (total_tokens['output'] / 1_000_000) * pricing['output'] * price_multiplier
+            cache_write_cost = (total_tokens['cache_creation'] / 1_000_000) * pricing['cache_write'] * price_multiplier
+            cache_read_cost = (total_tokens['cache_read'] / 1_000_000) * pricing['cache_read'] * price_multiplier
 
             total_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
 
@@ -86,10 +93,13 @@ class CostCalculator:
             cache_savings = 0
             if total_tokens['cache_read'] > 0:
                 # Savings = what we would have paid - what we actually paid
-                would_have_paid = (total_tokens['cache_read'] / 1_000_000) * pricing['input']
+                would_have_paid = (total_tokens['cache_read'] / 1_000_000) * pricing['input'] * price_multiplier
                 actually_paid = cache_read_cost
                 cache_savings = would_have_paid - actually_paid
 
+            # Savings from batch pricing relative to standard pricing
+            batch_savings = total_cost / price_multiplier - total_cost if is_batch else 0
+
             return {
                 'model': model,
                 'tokens': total_tokens,
@@ -102,6 +112,8 @@ class CostCalculator:
                 },
                 'total_cost': round(total_cost, 6),
                 'cache_savings': round(cache_savings, 6),
+                'batch_discount_applied': is_batch,
+                'batch_savings': round(batch_savings, 6),
                 'pricing_info': pricing,
                 'calculated_at': datetime.utcnow().isoformat()
             }
@@ -143,6 +155,7 @@ class CostCalculator:
         }
 
         total_savings = 0
+        total_batch_savings = 0
         doc_costs = []
 
         for result in results:
@@ -162,6 +175,7 @@ class CostCalculator:
                 total_tokens[key] += cost.get('tokens', {}).get(key, 0)
 
             total_savings += cost.get('cache_savings', 0)
+            total_batch_savings += cost.get('batch_savings', 0)
 
             doc_costs.append(cost.get('total_cost', 0))
 
@@ -189,6 +203,7 @@ class CostCalculator:
                 'min_cost': round(min_cost, 6),
                 'max_cost': round(max_cost, 6),
                 'total_cache_savings': round(total_savings, 4),
+                'total_batch_savings': round(total_batch_savings, 4),
                 'cache_hit_rate': round(cache_hit_rate * 100, 2),
                 'effective_cost_per_document': round(
                     (total_costs['total'] - total_savings) / num_docs if num_docs > 0 else 0,
@@ -204,7 +219,8 @@ class CostCalculator:
         avg_doc_length: int = 2000,
         model: str = 'claude-sonnet-4-5-20250929',
         cache_enabled: bool = True,
-        cache_hit_rate: float = 0.5
+        cache_hit_rate: float = 0.5,
+        batch_api: bool = False
     ) -> Dict[str, Any]:
         """
         Estimate costs for a project
@@ -215,11 +231,17 @@ class CostCalculator:
             model: Model to use
             cache_enabled: Whether caching is enabled
             cache_hit_rate: Expected cache hit rate (0.0 to 1.0)
+            batch_api: Whether documents go through the Message Batches API
 
         Returns:
             Cost estimate
         """
         pricing = self.PRICING.get(model, self.PRICING['claude-sonnet-4-5-20250929'])
+        if batch_api:
+            pricing = {
+                key: price * (1 - self.BATCH_DISCOUNT)
+                for key, price in pricing.items()
+            }
 
         # Estimate tokens per document
         # Input: document text + system prompts
@@ -258,7 +280,8 @@ class CostCalculator:
                 'avg_doc_length_tokens': avg_doc_length,
                 'model': model,
                 'cache_enabled': cache_enabled,
-                'cache_hit_rate': cache_hit_rate if cache_enabled else 0
+                'cache_hit_rate': cache_hit_rate if cache_enabled else 0,
+                'batch_api': batch_api
             },
             'estimated_tokens': {
                 'total_input': total_input_tokens,
@@ -0,0 +1,159 @@
+"""
+Deduplicator - Find exact and near-duplicate documents before LLM processing
+"""
+
+import hashlib
+import logging
+import re
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Deduplicator:
+    """
+    Cluster documents by normalized text hash and MinHash/LSH similarity
+
+    Every document is compared against cluster representatives only, so
+    clusters cannot drift through chains of pairwise-similar documents.
+    The first document seen in a cluster becomes its representative.
+
+    Signatures use one-permutation MinHash: each shingle is hashed once and
+    routed to one of num_perm bins, keeping the bin minimum. Empty bins are
+    filled from the next non-empty bin. This costs one hash per shingle
+    instead of num_perm, which keeps the pre-pass cheap next to the LLM stages.
+    """
+
+    def __init__(
+        self,
+        hash_text: Callable[[str], str],
+        threshold: Optional[float] = 0.9,
+        num_perm: int = 64,
+        bands: int = 8,
+        shingle_size: int = 5
+    ):
+        """
+        Initialize deduplicator
+
+        Args:
+            hash_text: Content hash for exact matching (e.g. EmbeddingGenerator._hash_text)
+            threshold: Minimum estimated Jaccard similarity for a near-duplicate
+                (None disables near-duplicate detection)
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm must be divisible by bands)
+            shingle_size: Words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.hash_text = hash_text
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+    def normalize(self, text: str) -> str:
+        """Case-fold and collapse whitespace"""
+        return ' '.join(text.casefold().split())
+
+    def signature(self, normalized_text: str) -> List[int]:
+        """MinHash signature over word shingles of normalized text"""
+        words = re.findall(r'\w+', normalized_text)
+        size = self.shingle_size
+
+        if len(words) <= size:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+        num_perm = self.num_perm
+        empty = 1 << 64
+        bins = [empty] * num_perm
+
+        for shingle in shingles:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+            index, value = h % num_perm, h // num_perm
+            if value < bins[index]:
+                bins[index] = value
+
+        # Densify: an empty bin borrows the value of the next non-empty bin
+        for i in range(num_perm):
+            if bins[i] == empty:
+                for offset in range(1, num_perm):
+                    value = bins[(i + offset) % num_perm]
+                    if value != empty:
+                        bins[i] = value + offset
+                        break
+
+        return bins
+
+    def similarity(self, sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / self.num_perm
+
+    def cluster(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Assign each text to a duplicate cluster
+
+        Args:
+            texts: Document texts in processing order
+
+        Returns:
+            One entry per text: None for representatives, otherwise a dict
+            with 'representative' (index), 'duplicate_type' ('exact' or
+            'near') and 'similarity'
+        """
+        assignments: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        exact: Dict[str, int] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        signatures: Dict[int, List[int]] = {}
+
+        for i, text in enumerate(texts):
+            normalized = self.normalize(text)
+            content_hash = self.hash_text(normalized)
+
+            if content_hash in exact:
+                assignments[i] = {
+                    'representative': exact[content_hash],
+                    'duplicate_type': 'exact',
+                    'similarity': 1.0
+                }
+                continue
+
+            if self.threshold is None or not normalized:
+                exact[content_hash] = i
+                continue
+
+            sig = self.signature(normalized)
+            band_keys = [
+                (band, tuple(sig[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)
+            ]
+
+            # Compare against representatives sharing at least one band
+            best, best_similarity = None, 0.0
+            candidates = {rep for key in band_keys for rep in buckets.get(key, ())}
+            for rep in candidates:
+                similarity = self.similarity(sig, signatures[rep])
+                if similarity > best_similarity:
+                    best, best_similarity = rep, similarity
+
+            if best is not None and best_similarity >= self.threshold:
+                assignments[i] = {
+                    'representative': best,
+                    'duplicate_type': 'near',
+                    'similarity': round(best_similarity, 4)
+                }
+                continue
+
+            exact[content_hash] = i
+            signatures[i] = sig
+            for key in band_keys:
+                buckets.setdefault(key, []).append(i)
+
+        duplicates = sum(1 for a in assignments if a is not None)
+        if duplicates:
+            logger.info(f"Deduplication: {duplicates} of {len(texts)} documents are duplicates")
+
+        return assignments
@@ -8,21 +8,40 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-import anthropic
+from typing import Dict, List, Optional, Any, AsyncIterable, AsyncIterator, Iterable, Union
 from concurrent.futures import ThreadPoolExecutor
 import hashlib
+import time
 
 from document_classifier import DocumentClassifier
 from entity_extractor import EntityExtractor
 from privilege_detector import PrivilegeDetector
+from privilege_triage import PrivilegeTriage
 from timeline_builder import TimelineBuilder
+from timeline_index import TimelineIndex
+from timeline_records import serialize
 from keyword_analyzer import KeywordAnalyzer
 from embedding_generator import EmbeddingGenerator
+from embedding_backends import create_backend
+from chunk_embedder import ChunkEmbedder
+from text_chunker import TextChunker
+from vector_index import VectorIndex
+from hybrid_retriever import HybridRetriever
+from email_threading import EmailThreader
+from fused_analyzer import FusedAnalyzer
 from source_tracker import SourceTracker
 from batch_processor import BatchProcessor
+from batch_api_processor import BatchAPIProcessor
 from validation import Validator
 from cost_calculator import CostCalculator
+from llm_client import create_async_client
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, DeadLetterQueue
+from run_journal import RunJournal
+from output_writer import BatchOutputWriter
+from parquet_exporter import ParquetExporter
+from result_cache import ResultCache, StageCache, prompt_template_hash
+from stage_scheduler import StageScheduler
 
 # Configure logging
 logging.basicConfig(
@@ -39,6 +58,15 @@ logger = logging.getLogger(__name__)
 class DiscoveryBot:
     """Main orchestration engine for document discovery processing"""
 
+    # Which stage outputs each stage's prompt consumes (see _build_pipeline)
+    STAGE_DEPENDENCIES = {
+        'classification': [],
+        'entities': ['classification'],
+        'keywords': ['classification'],
+        'privilege': ['entities'],
+        'embeddings': ['entities']
+    }
+
     def __init__(self, api_key: str, config: Optional[Dict] = None):
         """
         Initialize Discovery Bot with all components
@@ -48,21 +76,113 @@ class DiscoveryBot:
             config: Optional configuration overrides
         """
         self.api_key = api_key
-        self.client = anthropic.Anthropic(api_key=api_key)
         self.config = self._load_config(config)
 
+        # Up to two stages per document run concurrently (see _build_pipeline)
+        max_connections = self.config['max_connections'] or self.config['parallel_workers'] * 2
+
+        # Shared async client so parallel workers actually overlap API calls;
+        # the rate limiter owns retries, so the SDK does not retry on its own
+        self.client = create_async_client(
+            api_key,
+            max_connections=max_connections,
+            base_url=self.config['api_base_url'],
+            max_retries=0
+        )
+
+        # One governor for every messages.create call across all analyzers
+        self.rate_limiter = AdaptiveRateLimiter(
+            max_concurrency=max_connections,
+            requests_per_minute=self.config['rate_limit_rpm'],
+            input_tokens_per_minute=self.config['rate_limit_itpm'],
+            output_tokens_per_minute=self.config['rate_limit_otpm'],
+            max_retries=self.config['rate_limit_max_retries']
+        )
+
+        # Stage calls and whole documents retry with jittered backoff;
+        # documents that still fail are kept on disk for resubmission
+        self.retry_policy = RetryPolicy(
+            max_retries=self.config['max_retries'],
+            max_parse_retries=self.config['max_parse_retries'],
+            base_delay=self.config['retry_base_delay'],
+            max_delay=self.config['retry_max_delay']
+        )
+        self.dead_letters = DeadLetterQueue(
+            self.config['dead_letter_path'] or str(Path(self.config['output_dir']) / 'dead_letter.jsonl')
+        )
+
         # Initialize all components
-        self.classifier = DocumentClassifier(self.client)
-        self.entity_extractor = EntityExtractor(self.client)
-        self.privilege_detector = PrivilegeDetector(self.client)
-        self.timeline_builder = TimelineBuilder()
-        self.keyword_analyzer = KeywordAnalyzer(self.client)
-        self.embedding_generator = EmbeddingGenerator(self.client)
+        self.classifier = DocumentClassifier(self.client, self.rate_limiter, self.retry_policy)
+        self.entity_extractor = EntityExtractor(self.client, self.rate_limiter, self.retry_policy)
+        self.privilege_detector = PrivilegeDetector(self.client, self.rate_limiter, self.retry_policy)
+
+        # Trained triage model: clear non-privileged documents skip LLM privilege review
+        triage_model = self.config['privilege_triage_model']
+        if triage_model and Path(triage_model).exists():
+            self.privilege_detector.triage = PrivilegeTriage.load(
+                triage_model, audit_rate=self.config['privilege_triage_audit_rate']
+            )
+
+        # Optional persistent chronology, fed by the timeline builder
+        self.timeline_index = None
+        if self.config['timeline_index_path']:
+            self.timeline_index = TimelineIndex(self.config['timeline_index_path'], self.config['matter_id'])
+        self.timeline_builder = TimelineBuilder(self.timeline_index)
+
+        self.keyword_analyzer = KeywordAnalyzer(self.client, self.rate_limiter, self.retry_policy)
+
+        # Optional local model that turns chunks into vectors for document_embeddings;
+        # chunks are then budgeted in that model's tokens
+        self.embedding_backend = create_backend(self.config)
+        backend = self.embedding_backend
+        chunker = TextChunker(
+            self.config['chunk_tokens'],
+            self.config['chunk_overlap_tokens'],
+            token_spans=backend.token_spans if backend is not None else None,
+            tokenizer_name=backend.model_name if backend is not None else 'words'
+        )
+        self.embedding_generator = EmbeddingGenerator(self.client, self.rate_limiter, self.retry_policy, chunker)
+
+        # Per-case local ANN indexes fed with every embedded chunk, opened on first use
+        self.vector_indexes: Dict[str, VectorIndex] = {}
+        self.fused_analyzer = FusedAnalyzer(
+            self.client,
+            self.classifier,
+            self.entity_extractor,
+            self.privilege_detector,
+            self.keyword_analyzer,
+            self.embedding_generator,
+            self.rate_limiter,
+            self.retry_policy
+        )
         self.source_tracker = SourceTracker()
+        self.email_threader = EmailThreader()
         self.batch_processor = BatchProcessor(self)
+        self.batch_api_processor = BatchAPIProcessor(self)
         self.validator = Validator()
         self.cost_calculator = CostCalculator()
 
+        # Cached results are only valid for the prompts that produced them
+        self.prompt_version = self.config['prompt_version'] or self._prompt_version()
+        self.stage_prompt_hashes = self._stage_prompt_hashes()
+        cache_path = str(Path(self.config['cache_dir']) / 'results.sqlite')
+
+        self.result_cache = None
+        if self.config['cache_results']:
+            self.result_cache = ResultCache(
+                cache_path,
+                max_size_mb=self.config['cache_max_size_mb'],
+                max_age_days=self.config['cache_max_age_days']
+            )
+
+        self.stage_cache = None
+        if self.config['cache_stages']:
+            self.stage_cache = StageCache(
+                cache_path,
+                max_size_mb=self.config['cache_max_size_mb'],
+                max_age_days=self.config['cache_max_age_days']
+            )
+
         # Processing statistics
         self.stats = {
             'total_processed': 0,
@@ -70,6 +190,11 @@ class DiscoveryBot:
             'failed': 0,
             'privileged': 0,
             'total_cost': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'stage_cache_hits': 0,
+            'stage_cache_misses': 0,
+            'duplicates_suppressed': 0,
             'start_time': None,
             'end_time': None
         }
@@ -82,12 +207,52 @@ class DiscoveryBot:
             'temperature': 0.0,
             'batch_size': 100,
             'parallel_workers': 10,
+            'max_connections': None,  # Defaults to 2 x parallel_workers
+            'api_base_url': None,
+            'stream_queue_size': None,  # Defaults to 2 x parallel_workers
+            'rate_limit_rpm': None,  # Requests/min; None to learn from rate-limit headers
+            'rate_limit_itpm': None,  # Input tokens/min; None to learn from headers
+            'rate_limit_otpm': None,  # Output tokens/min; None to learn from headers
+            'rate_limit_max_retries': 5,  # Retries of 429/529 responses per call
+            'max_retries': 3,  # Retries of rate-limit and transient errors per stage and per document
+            'max_parse_retries': 1,  # Retries of malformed model output per stage
+            'retry_base_delay': 1.0,  # Backoff ceiling of the first retry (seconds, full jitter)
+            'retry_max_delay': 30.0,
+            'dead_letter_path': None,  # Defaults to output_dir/dead_letter.jsonl
+            'checkpoint_runs': True,  # Journal completed documents so process_batch can resume by run ID
+            'processing_mode': 'realtime',  # 'realtime' or 'batch_api'
+            'analysis_mode': 'staged',  # 'staged' (one call per stage) or 'fused' (one call per document)
+            'batch_poll_interval': 60.0,
+            'batch_max_wait': 24 * 3600,
             'cache_results': True,
             'cache_dir': './cache',
+            'cache_max_size_mb': 1024,
+            'cache_max_age_days': None,
+            'prompt_version': None,  # Defaults to a hash of the active prompt templates
+            'cache_stages': True,  # Cache each staged-pipeline stage output independently
+            'deduplicate': True,  # Process one representative per duplicate cluster
+            'near_duplicate_threshold': 0.9,  # MinHash Jaccard estimate; None for exact only
             'output_dir': './output',
+            'output_format': 'jsonl',  # 'jsonl' (streamed results + index + summary) or 'json' (single file)
+            'export_parquet': False,  # Also stream results into partitioned Parquet tables (requires pyarrow)
+            'parquet_flush_rows': 100_000,  # Buffered rows per Parquet table before a file is written
+            'timeline_index_path': None,  # SQLite file of a persistent, queryable timeline; None to disable
+            'matter_id': 'default',  # Matter the timeline index files events under
+            'privilege_triage_model': None,  # JSON triage model (see train_privilege_triage); None disables bypass
+            'privilege_triage_precision': 0.99,  # Minimum non-privileged share of bypassed documents when training
+            'privilege_triage_audit_rate': 0.02,  # Fraction of bypass candidates still sent for LLM review
+            'chunk_tokens': 200,  # Token budget per embedding chunk
+            'chunk_overlap_tokens': 20,  # Tokens shared by consecutive chunks
+            'embedding_backend': None,  # 'sentence-transformers' or 'onnx' to embed chunks locally; None to skip
+            'embedding_model': None,  # Model ID/path (sentence-transformers) or .onnx file (onnx)
+            'embedding_tokenizer': None,  # tokenizer.json for the onnx backend; defaults to the model's directory
+            'embedding_batch_size': 64,  # Chunks per forward pass
+            'embedding_threads': None,  # CPU threads for inference; None for the runtime default
+            'embedding_dimensions': 1536,  # Vectors are zero-padded to the document_embeddings column width
+            'vector_index_dir': None,  # Root of per-case local vector indexes fed with embedded chunks; None to disable
             'min_confidence': 0.85,
             'enable_validation': True,
-            'save_intermediate': True
+            'save_intermediate': False  # Per-document JSON files; the jsonl output already streams each result
         }
 
         if config:
@@ -112,118 +277,240 @@ class DiscoveryBot:
             document_id: Optional document identifier
 
         Returns:
-            Complete analysis results
+            Complete analysis results, or a failure record with 'error'
         """
         try:
             # Generate document ID if not provided
             if not document_id:
                 document_id = self._generate_doc_id(document)
 
-            logger.info(f"Processing document: {document_id}")
-
-            # Check cache first
-            if self.config['cache_results']:
-                cached = self._get_cached_result(document_id)
-                if cached:
-                    logger.info(f"Using cached result for {document_id}")
-                    return cached
-
-            # Extract document text and metadata
-            text = document.get('text', '')
-            metadata = document.get('metadata', {})
-
-            if not text or len(text.strip()) < 10:
-                raise ValueError(f"Document {document_id} has insufficient text")
-
-            # Track source information
-            source_info = self.source_tracker.track(document_id, metadata)
-
-            # Step 1: Classify document type
-            logger.info(f"Classifying document {document_id}")
-            classification = await self.classifier.classify(text, metadata)
-
-            # Step 2: Extract entities
-            logger.info(f"Extracting entities from {document_id}")
-            entities = await self.entity_extractor.extract(text, classification)
-
-            # Step 3: Detect privilege
-            logger.info(f"Checking privilege for {document_id}")
-            privilege = await self.privilege_detector.detect(text, metadata, entities)
-
-            if privilege['is_privileged']:
-                self.stats['privileged'] += 1
-
-            # Step 4: Analyze keywords and relevance
-            logger.info(f"Analyzing keywords in {document_id}")
-            keywords = await self.keyword_analyzer.analyze(text, classification)
-
-            # Step 5: Generate embeddings
-            logger.info(f"Generating embeddings for {document_id}")
-            embeddings = await self.embedding_generator.generate(text, entities)
-
-            # Compile results
-            results = {
-                'document_id': document_id,
-                'source': source_info,
-                'classification': classification,
-                'entities': entities,
-                'privilege': privilege,
-                'keywords': keywords,
-                'embeddings': embeddings,
-                'processed_at': datetime.utcnow().isoformat(),
-                'model_used': self.config['model']
-            }
+            return await self.analyze_document(document, document_id)
 
-            # Step 6: Validate results
-            if self.config['enable_validation']:
-                logger.info(f"Validating results for {document_id}")
-                validation = self.validator.validate(results)
-                results['validation'] = validation
+        except Exception as e:
+            return self._failed_result(document_id, document, e)
+        finally:
+            self.stats['total_processed'] += 1
 
-                if not validation['is_valid']:
-                    logger.warning(f"Validation failed for {document_id}: {validation['errors']}")
+    async def analyze_document(self, document: Dict[str, Any], document_id: str) -> Dict[str, Any]:
+        """
+        Run the pipeline for one document, raising on failure
 
-            # Calculate costs
-            cost = self.cost_calculator.calculate(results)
-            results['cost'] = cost
-            self.stats['total_cost'] += cost['total_cost']
+        Workers call this directly so they can classify and retry errors;
+        process_document turns errors into failure records.
 
-            # Cache results
-            if self.config['cache_results']:
-                self._cache_result(document_id, results)
+        Args:
+            document: Document dict with 'text', 'metadata', etc.
+            document_id: Document identifier
 
-            # Save intermediate results if configured
-            if self.config['save_intermediate']:
-                self._save_intermediate(document_id, results)
+        Returns:
+            Complete analysis results
+        """
+        logger.info(f"Processing document: {document_id}")
 
-            self.stats['successful'] += 1
-            logger.info(f"Successfully processed {document_id}")
+        # Check cache first
+        if self.config['cache_results']:
+            cached = self._get_cached_result(document_id)
+            if cached:
+                logger.info(f"Using cached result for {document_id}")
+                return cached
 
-            return results
+        # Extract document text and metadata
+        text = document.get('text', '')
+        metadata = document.get('metadata', {})
 
-        except Exception as e:
-            self.stats['failed'] += 1
-            logger.error(f"Error processing document {document_id}: {str(e)}", exc_info=True)
-            return {
-                'document_id': document_id,
-                'error': str(e),
-                'status': 'failed',
-                'processed_at': datetime.utcnow().isoformat()
+        if not text or len(text.strip()) < 10:
+            raise ValueError(f"Document {document_id} has insufficient text")
+
+        # Track source information
+        source_info = self.source_tracker.track(document_id, metadata)
+
+        pipeline_start = time.perf_counter()
+        if self.config['analysis_mode'] == 'fused':
+            # Steps 1-5 in a single combined prompt
+            stage_outputs = await self.fused_analyzer.analyze(text, metadata)
+            stage_timings = {}
+        else:
+            # Steps 1-5: Run analysis stages as a dependency graph so that
+            # keywords overlap entity extraction and embeddings overlap privilege
+            pipeline = self._build_pipeline(text, metadata, self._hash_text(text))
+            stage_outputs, stage_timings = await pipeline.run(label=document_id)
+        pipeline_ms = round((time.perf_counter() - pipeline_start) * 1000, 2)
+
+        return self._finalize_result(
+            document_id,
+            source_info,
+            stage_outputs,
+            processing_mode='realtime',
+            extra={
+                'analysis_mode': self.config['analysis_mode'],
+                'stage_timings': {
+                    'stages': stage_timings,
+                    'total_ms': pipeline_ms
+                }
             }
-        finally:
-            self.stats['total_processed'] += 1
+        )
+
+    def _failed_result(
+        self,
+        document_id: Optional[str],
+        document: Dict[str, Any],
+        error: BaseException,
+        attempts: int = 1
+    ) -> Dict[str, Any]:
+        """Count a failed document, dead-letter it and build its failure record"""
+        error_class = self.retry_policy.classify(error)
+        self.stats['failed'] += 1
+        logger.error(f"Error processing document {document_id}: {str(error)}", exc_info=error)
+        self.dead_letters.add(document_id, document, error, error_class, attempts)
+
+        return {
+            'document_id': document_id,
+            'error': str(error),
+            'error_class': error_class,
+            'attempts': attempts,
+            'status': 'failed',
+            'processed_at': datetime.utcnow().isoformat()
+        }
+
+    def _record_restored(self, result: Dict[str, Any]) -> None:
+        """Count a result restored from a run journal as if it had just been processed"""
+        self.stats['total_processed'] += 1
+        self.stats['successful'] += 1
+        self.stats['total_cost'] += result.get('cost', {}).get('total_cost', 0.0)
+        if result.get('privilege', {}).get('is_privileged'):
+            self.stats['privileged'] += 1
+
+    def _finalize_result(
+        self,
+        document_id: str,
+        source_info: Dict[str, Any],
+        stage_outputs: Dict[str, Any],
+        processing_mode: str,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compile stage outputs into a result, then validate, cost, and cache it
+
+        Args:
+            document_id: Document identifier
+            source_info: Source tracking information
+            stage_outputs: Outputs keyed by stage name
+            processing_mode: 'realtime' or 'batch_api' (affects pricing)
+            extra: Additional top-level fields for the result
+
+        Returns:
+            Complete analysis results
+        """
+        if stage_outputs['privilege']['is_privileged']:
+            self.stats['privileged'] += 1
+
+        # Compile results
+        results = {
+            'document_id': document_id,
+            'source': source_info,
+            'classification': stage_outputs['classification'],
+            'entities': stage_outputs['entities'],
+            'privilege': stage_outputs['privilege'],
+            'keywords': stage_outputs['keywords'],
+            'embeddings': stage_outputs['embeddings'],
+            **(extra or {}),
+            'processing_mode': processing_mode,
+            'processed_at': datetime.utcnow().isoformat(),
+            'model_used': self.config['model']
+        }
+
+        # Stages answered by heuristics after a parse or fatal error
+        degraded = [stage for stage in FusedAnalyzer.STAGES if stage_outputs[stage].get('degraded')]
+        if degraded:
+            results['degraded_stages'] = degraded
+
+        # Step 6: Validate results
+        if self.config['enable_validation']:
+            logger.info(f"Validating results for {document_id}")
+            validation = self.validator.validate(results)
+            results['validation'] = validation
+
+            if not validation['is_valid']:
+                logger.warning(f"Validation failed for {document_id}: {validation['errors']}")
+
+        # Calculate costs
+        cost = self.cost_calculator.calculate(results)
+        results['cost'] = cost
+        self.stats['total_cost'] += cost['total_cost']
+
+        # Cache results
+        if self.config['cache_results']:
+            self._cache_result(document_id, results)
+
+        # Save intermediate results if configured
+        if self.config['save_intermediate']:
+            self._save_intermediate(document_id, results)
+
+        self.stats['successful'] += 1
+        logger.info(f"Successfully processed {document_id}")
+
+        return results
+
+    def _build_pipeline(self, text: str, metadata: Dict, text_hash: str) -> StageScheduler:
+        """
+        Build the per-document stage graph
+
+        classification -> entities -> privilege
+                       |           -> embeddings
+                       -> keywords
+        """
+        pipeline = StageScheduler()
+
+        stage_funcs = {
+            'classification': lambda deps: self.classifier.classify(text, metadata),
+            'entities': lambda deps: self.entity_extractor.extract(text, deps['classification']),
+            'keywords': lambda deps: self.keyword_analyzer.analyze(text, deps['classification']),
+            'privilege': lambda deps: self.privilege_detector.detect(text, metadata, deps['entities']),
+            'embeddings': lambda deps: self.embedding_generator.generate(text, deps['entities'])
+        }
+
+        for stage, func in stage_funcs.items():
+            pipeline.add_stage(
+                stage,
+                self._with_stage_cache(stage, text_hash, func),
+                depends_on=self.STAGE_DEPENDENCIES[stage]
+            )
+
+        return pipeline
+
+    def _with_stage_cache(self, stage: str, text_hash: str, func):
+        """Wrap a stage function with a stage cache lookup and store"""
+        async def run(deps: Dict[str, Any]) -> Dict[str, Any]:
+            cached = self._get_cached_stage(stage, text_hash)
+            if cached is not None:
+                return cached
+
+            output = await func(deps)
+            self._cache_stage(stage, text_hash, output)
+            return output
+
+        return run
 
     async def process_batch(
         self,
         documents: List[Dict[str, Any]],
-        show_progress: bool = True
+        show_progress: bool = True,
+        extra_output: Optional[Dict[str, Any]] = None,
+        run_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process a batch of documents
 
+        With checkpoint_runs enabled (or a run_id given), every completed
+        result is journaled under output_dir/runs/<run_id>. Passing the same
+        documents with that run_id after a crash skips the completed
+        documents and produces the same final output.
+
         Args:
             documents: List of document dicts
             show_progress: Whether to show progress updates
+            extra_output: Additional top-level sections for the saved output
+            run_id: Run to resume (None starts a new run)
 
         Returns:
             Batch processing results with timeline and summary
@@ -231,19 +518,90 @@ class DiscoveryBot:
         logger.info(f"Starting batch processing of {len(documents)} documents")
         self.stats['start_time'] = datetime.utcnow()
 
-        # Process documents in parallel batches
-        results = await self.batch_processor.process(
-            documents,
-            batch_size=self.config['batch_size'],
-            parallel_workers=self.config['parallel_workers'],
-            show_progress=show_progress
-        )
+        journal, completed, writer, exporter = None, None, None, None
+
+        # Keyword TF-IDF is relative to the whole production, not just the
+        # documents that happen to finish first
+        self.keyword_analyzer.prime_corpus([doc.get('text') or '' for doc in documents])
+
+        # Timeline events are inserted as each document finishes
+        self.timeline_builder.reset()
+        callbacks = [self.timeline_builder.add_result]
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        if run_id or self.config['checkpoint_runs']:
+            journal = RunJournal(Path(self.config['output_dir']) / 'runs', run_id)
+            completed = journal.completed_results()
+            callbacks.append(journal.record)
+            logger.info(f"Run ID: {journal.run_id}")
+
+        if self.config['output_format'] == 'jsonl':
+            # Results are written as they finish rather than once at the end
+            writer = BatchOutputWriter(Path(self.config['output_dir']) / f"discovery_output_{timestamp}")
+            callbacks.append(writer.write_result)
+
+        if self.config['export_parquet']:
+            parquet_dir = (
+                writer.directory / 'parquet' if writer is not None
+                else Path(self.config['output_dir']) / f"discovery_parquet_{timestamp}"
+            )
+            exporter = ParquetExporter(parquet_dir, flush_rows=self.config['parquet_flush_rows'])
+            callbacks.append(exporter.write)
+
+        def on_result(result: Dict[str, Any]) -> None:
+            # Each output is independent: one failing writer leaves the others
+            # (and the document's result) intact
+            for callback in callbacks:
+                try:
+                    callback(result)
+                except Exception as e:
+                    logger.error(
+                        f"{getattr(callback, '__qualname__', callback)} failed for document "
+                        f"{result.get('document_id')}: {e}",
+                        exc_info=e
+                    )
+
+        try:
+            if self.config['processing_mode'] == 'batch_api':
+                # Submit all stage prompts through the Message Batches API
+                results = await self.batch_api_processor.process(
+                    documents,
+                    completed=completed,
+                    on_result=on_result
+                )
+            else:
+                # Process documents in parallel batches
+                results = await self.batch_processor.process(
+                    documents,
+                    batch_size=self.config['batch_size'],
+                    parallel_workers=self.config['parallel_workers'],
+                    show_progress=show_progress,
+                    completed=completed,
+                    on_result=on_result
+                )
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            if exporter is not None:
+                exporter.close()
+            raise
+        finally:
+            if journal is not None:
+                journal.close()
+
+        if writer is not None:
+            # Restored and duplicate documents never passed through on_result
+            writer.write_missing(results)
+            writer.close()
+
+        if exporter is not None:
+            exporter.write_missing(results)
+            exporter.close()
 
         self.stats['end_time'] = datetime.utcnow()
 
-        # Build timeline from all successful results
-        successful_results = [r for r in results if 'error' not in r]
-        timeline = self.timeline_builder.build(successful_results)
+        # Restored and duplicate results are merged in; the rest are already indexed
+        self.timeline_builder.add_results(results)
+        timeline = self.timeline_builder.timeline()
 
         # Generate summary statistics
         summary = self._generate_summary(results, timeline)
@@ -254,7 +612,10 @@ class DiscoveryBot:
             'timeline': timeline,
             'results': results,
             'statistics': self.stats,
-            'configuration': self.config
+            'rate_limiter': self.rate_limiter.metrics(),
+            'retry_statistics': self.retry_policy.statistics(),
+            'configuration': self.config,
+            **(extra_output or {})
         }
 
         # Validate entire batch
@@ -262,12 +623,220 @@ class DiscoveryBot:
             batch_validation = self.validator.validate_batch(output)
             output['batch_validation'] = batch_validation
 
+        if journal is not None:
+            output['run_id'] = journal.run_id
+
+        if exporter is not None:
+            output['parquet_export'] = exporter.summary()
+
+        if self.timeline_index is not None:
+            output['timeline_index'] = self.timeline_index.statistics()
+
+        if self.embedding_backend is not None:
+            embeddings_dir = (
+                writer.directory / 'embeddings' if writer is not None
+                else Path(self.config['output_dir']) / f"discovery_embeddings_{timestamp}"
+            )
+            output['chunk_embeddings'] = await asyncio.to_thread(self.embed_chunks, results, embeddings_dir)
+
+        # Bypass rate and audited precision of privilege triage in this batch
+        output['privilege_triage'] = (self.privilege_detector.triage or PrivilegeTriage()).batch_report(results)
+
         # Save final output
-        output_path = self._save_output(output)
+        if writer is not None:
+            writer.write_timeline(timeline)
+            output_path = writer.write_summary(output)
+        else:
+            output_path = self._save_output(output)
         logger.info(f"Batch processing complete. Output saved to {output_path}")
+        output['output_path'] = output_path
+
+        if journal is not None:
+            journal.mark_complete(output_path)
 
         return output
 
+    async def process_email_threads(
+        self,
+        messages: List[Dict[str, Any]],
+        show_progress: bool = True,
+        run_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Process email messages, analyzing only the inclusive message of each thread branch
+
+        Messages whose content is fully quoted in a later reply are not sent
+        through the pipeline. The output's 'email_threading' section maps
+        every message to the document whose analysis covers it.
+
+        Args:
+            messages: Messages in the Gmail Discovery MCP schema, e.g. from
+                GmailDiscoveryMCP.get_thread(thread_id, include_full_body=True)
+            show_progress: Whether to show progress updates
+            run_id: Run to resume (see process_batch)
+
+        Returns:
+            Batch output (see process_batch) plus 'email_threading'
+        """
+        thread_analysis = self.email_threader.analyze(messages)
+
+        documents = []
+        document_ids = {}
+        for message in thread_analysis['inclusive_messages']:
+            document = self.email_threader.to_document(message)
+            document['document_id'] = self._generate_doc_id(document)
+            document_ids[message.get('id')] = document['document_id']
+            documents.append(document)
+
+        for coverage in thread_analysis['threads'].values():
+            for record in coverage:
+                analyzed_message = record['message_id'] if record['inclusive'] else record['covered_by']
+                record['document_id'] = document_ids.get(analyzed_message)
+
+        return await self.process_batch(
+            documents,
+            show_progress=show_progress,
+            extra_output={
+                'email_threading': {
+                    'threads': thread_analysis['threads'],
+                    'statistics': thread_analysis['statistics']
+                }
+            },
+            run_id=run_id
+        )
+
+    async def process_stream(
+        self,
+        documents: Union[AsyncIterable[Dict[str, Any]], Iterable[Dict[str, Any]]],
+        show_progress: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a document stream, yielding results as they finish
+
+        Keeps parallel_workers documents in flight without materializing the
+        production as a list. Results arrive in completion order.
+
+        Args:
+            documents: Async or sync iterable of document dicts
+            show_progress: Whether to show progress updates
+
+        Yields:
+            Per-document results (same schema as process_document)
+        """
+        if self.stats['start_time'] is None:
+            self.stats['start_time'] = datetime.utcnow()
+
+        async for result in self.batch_processor.process_stream(
+            documents,
+            parallel_workers=self.config['parallel_workers'],
+            queue_size=self.config['stream_queue_size'],
+            show_progress=show_progress
+        ):
+            yield result
+
+        self.stats['end_time'] = datetime.utcnow()
+
+    def embed_chunks(self, results: List[Dict[str, Any]], directory: str) -> Dict[str, Any]:
+        """
+        Embed the chunks of every result with the local embedding backend
+
+        Chunks from all documents are batched together; see ChunkEmbedder
+        for the files written to directory.
+
+        Returns:
+            Embedding summary
+        """
+        if self.embedding_backend is None:
+            raise ValueError("No embedding_backend is configured")
+
+        # Documents embedded in this run replace the chunks they already have
+        for index in self.vector_indexes.values():
+            index.begin_session()
+
+        on_embedded = self._index_vectors if self.config['vector_index_dir'] else None
+        embedder = ChunkEmbedder(self.embedding_backend, directory, on_embedded=on_embedded)
+        try:
+            embedder.add_results(results)
+        finally:
+            embedder.close()
+            for index in self.vector_indexes.values():
+                index.flush()
+                # Index the new chunks for BM25 now rather than on the first query
+                HybridRetriever(index).refresh()
+        logger.info(f"Embedded {embedder.rows} chunks into {directory}")
+
+        summary = embedder.summary()
+        if self.vector_indexes:
+            summary['vector_indexes'] = {
+                case_id: index.statistics() for case_id, index in self.vector_indexes.items()
+            }
+        return summary
+
+    def vector_index(self, case_id: Optional[str] = None) -> VectorIndex:
+        """
+        Local vector index of a case (default: matter_id) under vector_index_dir
+
+        Raises:
+            ValueError: If vector_index_dir or embedding_backend is not configured
+        """
+        if not self.config['vector_index_dir'] or self.embedding_backend is None:
+            raise ValueError("vector_index_dir and embedding_backend must both be configured")
+
+        case_id = case_id or self.config['matter_id']
+        if case_id not in self.vector_indexes:
+            self.vector_indexes[case_id] = VectorIndex.for_case(
+                self.config['vector_index_dir'],
+                case_id,
+                dimensions=self.embedding_backend.native_dimensions,
+                embedding={
+                    key: self.config[key]
+                    for key in ['embedding_backend', 'embedding_model', 'embedding_tokenizer']
+                }
+            )
+        return self.vector_indexes[case_id]
+
+    def _index_vectors(self, rows: List[Dict[str, Any]], vectors: Any) -> None:
+        """Add an embedded group of chunks to the index of each chunk's case"""
+        by_case: Dict[Optional[str], List[int]] = {}
+        for i, row in enumerate(rows):
+            by_case.setdefault(row['metadata'].get('case_id'), []).append(i)
+
+        for case_id, positions in by_case.items():
+            self.vector_index(case_id).add([rows[i] for i in positions], vectors[positions])
+
+    def train_privilege_triage(
+        self,
+        results: Iterable[Dict[str, Any]],
+        save_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Train the privilege triage model on earlier results and start using it
+
+        Args:
+            results: Document results of earlier batches (e.g. a ResultReader
+                or a batch output's 'results'); only LLM-reviewed privilege
+                determinations are used
+            save_path: Where to write the model (default: privilege_triage_model)
+
+        Returns:
+            Calibration report: threshold, expected precision and bypass rate
+
+        Raises:
+            ValueError: With too few reviewed documents to train on
+        """
+        triage = PrivilegeTriage(
+            precision_target=self.config['privilege_triage_precision'],
+            audit_rate=self.config['privilege_triage_audit_rate']
+        )
+        report = triage.fit(PrivilegeTriage.examples_from_results(results))
+
+        path = save_path or self.config['privilege_triage_model']
+        if path:
+            triage.save(path)
+
+        self.privilege_detector.triage = triage
+        return report
+
     def _generate_summary(self, results: List[Dict], timeline: Dict) -> Dict:
         """Generate summary statistics for batch processing"""
         successful = [r for r in results if 'error' not in r]
@@ -312,6 +881,7 @@ class DiscoveryBot:
             'successful': len(successful),
             'failed': len(failed),
             'privileged_documents': privileged_count,
+            'duplicate_documents': sum(1 for r in results if 'duplicate_of' in r),
             'document_types': doc_types,
             'total_entities': total_entities,
             'timeline_events': len(timeline.get('events', [])),
@@ -331,23 +901,133 @@ class DiscoveryBot:
         content = f"{text}{metadata}"
         return hashlib.sha256(content.encode()).hexdigest()[:16]
 
+    def _prompt_version(self) -> str:
+        """Hash of the analysis mode and every prompt template it uses"""
+        if self.config['analysis_mode'] == 'fused':
+            analyzers = [self.fused_analyzer]
+        else:
+            analyzers = [
+                self.classifier,
+                self.entity_extractor,
+                self.keyword_analyzer,
+                self.privilege_detector,
+                self.embedding_generator
+            ]
+
+        parts = [self.config['analysis_mode']] + [prompt_template_hash(a) for a in analyzers]
+        parts.append(self.embedding_generator.chunker.fingerprint())
+        return hashlib.sha256(':'.join(parts).encode()).hexdigest()[:16]
+
+    def _stage_prompt_hashes(self) -> Dict[str, str]:
+        """
+        Prompt hash per stage, chained through the stages it consumes
+
+        A stage's hash covers its own template and those of its upstream
+        stages, so editing the entity prompt also invalidates privilege and
+        embeddings, while editing the privilege prompt invalidates only privilege.
+        """
+        analyzers = {
+            'classification': self.classifier,
+            'entities': self.entity_extractor,
+            'keywords': self.keyword_analyzer,
+            'privilege': self.privilege_detector,
+            'embeddings': self.embedding_generator
+        }
+
+        hashes = {}
+        for stage in ['classification', 'entities', 'keywords', 'privilege', 'embeddings']:
+            parts = [prompt_template_hash(analyzers[stage])]
+            if stage == 'embeddings':
+                parts.append(self.embedding_generator.chunker.fingerprint())
+            parts += [hashes[dep] for dep in self.STAGE_DEPENDENCIES[stage]]
+            hashes[stage] = hashlib.sha256(':'.join(parts).encode()).hexdigest()[:16]
+
+        return hashes
+
+    def _stage_version(self, stage: str) -> str:
+        """
+        Stage cache version: the stage's prompt hash, plus the keyword corpus
+
+        Keyword outputs embed TF-IDF scores relative to the production, so
+        they are only re-used against the same corpus.
+        """
+        version = self.stage_prompt_hashes[stage]
+        if stage == 'keywords':
+            version = f"{version}:{self.keyword_analyzer.corpus_id()}"
+        return version
+
+    def _hash_text(self, text: str) -> str:
+        """Content hash used to key stage outputs"""
+        return self.embedding_generator._hash_text(text)
+
+    def _get_cached_stage(self, stage: str, text_hash: str) -> Optional[Dict]:
+        """Retrieve a cached stage output if available"""
+        if self.stage_cache is None:
+            return None
+
+        try:
+            cached = self.stage_cache.get(
+                text_hash, stage, self._stage_version(stage), self.config['model']
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load cached {stage} output: {e}")
+            cached = None
+
+        if cached is None:
+            self.stats['stage_cache_misses'] += 1
+            return None
+
+        self.stats['stage_cache_hits'] += 1
+
+        # Re-used outputs cost nothing this run
+        cached['tokens_used'] = {
+            'input': 0,
+            'output': 0,
+            'cache_creation': 0,
+            'cache_read': 0
+        }
+        cached['stage_cache_hit'] = True
+        return cached
+
+    def _cache_stage(self, stage: str, text_hash: str, output: Dict) -> None:
+        """Cache a stage output produced by an API call"""
+        # Heuristic and fallback outputs made no API call; never pin them in the cache
+        if self.stage_cache is None or not output.get('tokens_used', {}).get('input'):
+            return
+
+        try:
+            self.stage_cache.put(
+                text_hash, stage, self._stage_version(stage), self.config['model'], output
+            )
+        except Exception as e:
+            logger.warning(f"Failed to cache {stage} output: {e}")
+
     def _get_cached_result(self, document_id: str) -> Optional[Dict]:
         """Retrieve cached result if available"""
-        cache_path = Path(self.config['cache_dir']) / f"{document_id}.json"
-        if cache_path.exists():
-            try:
-                with open(cache_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.warning(f"Failed to load cache for {document_id}: {e}")
-        return None
+        if self.result_cache is None:
+            return None
+
+        try:
+            cached = self.result_cache.get(document_id, self.config['model'], self.prompt_version)
+        except Exception as e:
+            logger.warning(f"Failed to load cache for {document_id}: {e}")
+            cached = None
+
+        if cached is None:
+            self.stats['cache_misses'] += 1
+        else:
+            self.stats['cache_hits'] += 1
+
+        return cached
 
     def _cache_result(self, document_id: str, result: Dict) -> None:
         """Cache processing result"""
+        # Results with heuristic fallbacks would be served on every rerun; recompute them instead
+        if self.result_cache is None or result.get('degraded_stages'):
+            return
+
         try:
-            cache_path = Path(self.config['cache_dir']) / f"{document_id}.json"
-            with open(cache_path, 'w') as f:
-                json.dump(result, f, indent=2, default=str)
+            self.result_cache.put(document_id, self.config['model'], self.prompt_version, result)
         except Exception as e:
             logger.warning(f"Failed to cache result for {document_id}: {e}")
 
@@ -369,10 +1049,23 @@ class DiscoveryBot:
         output_path = Path(self.config['output_dir']) / f"discovery_output_{timestamp}.json"
 
         with open(output_path, 'w') as f:
-            json.dump(output, f, indent=2, default=str)
+            json.dump(output, f, indent=2, default=serialize)
 
         return str(output_path)
 
+    async def close(self) -> None:
+        """Close the shared API client, its connection pool and the caches"""
+        await self.client.close()
+
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self.stage_cache is not None:
+            self.stage_cache.close()
+        if self.timeline_index is not None:
+            self.timeline_index.close()
+        for index in self.vector_indexes.values():
+            index.close()
+
     def reset_statistics(self) -> None:
         """Reset processing statistics"""
         self.stats = {
@@ -381,6 +1074,11 @@ class DiscoveryBot:
             'failed': 0,
             'privileged': 0,
             'total_cost': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'stage_cache_hits': 0,
+            'stage_cache_misses': 0,
+            'duplicates_suppressed': 0,
             'start_time': None,
             'end_time': None
         }
@@ -454,6 +1152,8 @@ async def main():
     # Process batch
     results = await bot.process_batch(documents, show_progress=True)
 
+    await bot.close()
+
     # Print summary
     print("\n" + "="*80)
     print("DISCOVERY BOT PROCESSING SUMMARY")
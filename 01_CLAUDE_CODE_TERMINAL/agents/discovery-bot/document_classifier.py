@@ -4,9 +4,13 @@ Document Classifier - Classify legal document types with high accuracy
 
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 import anthropic
 
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable, with_retry
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,8 +36,15 @@ class DocumentClassifier:
         'other'
     ]
 
-    def __init__(self, client: anthropic.Anthropic):
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
         self.model = 'claude-sonnet-4-5-20250929'
 
     async def classify(
@@ -52,55 +63,69 @@ class DocumentClassifier:
             Classification results with confidence scores
         """
         try:
-            # Prepare classification prompt
-            prompt = self._build_classification_prompt(text, metadata)
-
-            # Call Claude API with prompt caching for efficiency
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                temperature=0.0,
-                system=[
-                    {
-                        "type": "text",
-                        "text": "You are an expert legal document classifier with 20+ years experience in litigation and discovery. You classify documents with extremely high accuracy.",
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-
-            # Parse response
-            result_text = response.content[0].text
-            result = json.loads(result_text)
-
-            # Add usage statistics
-            result['tokens_used'] = {
-                'input': response.usage.input_tokens,
-                'output': response.usage.output_tokens,
-                'cache_creation': getattr(response.usage, 'cache_creation_input_tokens', 0),
-                'cache_read': getattr(response.usage, 'cache_read_input_tokens', 0)
-            }
+            request = self.build_request(text, metadata)
 
-            # Validate classification
-            if result['document_type'] not in self.DOCUMENT_TYPES:
-                logger.warning(f"Unexpected document type: {result['document_type']}")
-                result['document_type'] = 'other'
+            async def attempt():
+                # Call Claude API with prompt caching for efficiency
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response)
 
-            return result
+            return await with_retry(self.retry_policy, 'classification', attempt)
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse classification response: {e}")
             return self._fallback_classification(text, metadata)
         except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
             logger.error(f"Classification error: {e}")
             return self._fallback_classification(text, metadata)
 
+    def build_request(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for classification"""
+        return {
+            'model': self.model,
+            'max_tokens': 1024,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": "You are an expert legal document classifier with 20+ years experience in litigation and discovery. You classify documents with extremely high accuracy.",
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_classification_prompt(text, metadata)
+                }
+            ]
+        }
+
+    def parse_response(self, response: Any) -> Dict[str, Any]:
+        """
+        Parse a classification Message response
+
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
+
+        # Add usage statistics
+        result['tokens_used'] = usage_tokens(response)
+
+        # Validate classification
+        if result['document_type'] not in self.DOCUMENT_TYPES:
+            logger.warning(f"Unexpected document type: {result['document_type']}")
+            result['document_type'] = 'other'
+
+        return result
+
     def _build_classification_prompt(
         self,
         text: str,
@@ -208,6 +233,7 @@ Respond with ONLY the JSON object, no additional text."""
             'ocr_quality': None,
             'needs_review': True,
             'review_reason': 'Classification API failed, using fallback heuristics',
+            'degraded': True,
             'tokens_used': {
                 'input': 0,
                 'output': 0,
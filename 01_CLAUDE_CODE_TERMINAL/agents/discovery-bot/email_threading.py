@@ -0,0 +1,254 @@
+"""
+Email Threading - Find inclusive messages so quoted thread content is analyzed once
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EmailThreader:
+    """
+    Group messages into threads and identify inclusive messages
+
+    A message is inclusive when its own (non-quoted) content does not appear
+    in the quoted part of any later message of the same thread, when its own
+    content is too short to match reliably, or when it carries attachments,
+    which replies never reproduce. Every other message is covered by a later
+    inclusive message that quotes it, so analyzing only the inclusive
+    messages still reviews every line of the thread.
+
+    Messages use the Gmail Discovery MCP schema (get_thread with
+    include_full_body=True): 'id', 'thread_id', 'date', 'from', 'to', 'cc',
+    'subject', 'full_body' (or 'body'), 'has_attachments'.
+    """
+
+    # Lines that start the quoted part of a reply
+    QUOTE_HEADERS = [
+        re.compile(r'^\s*On .+wrote:\s*$', re.IGNORECASE),
+        re.compile(r'^\s*-{2,}\s*Original Message\s*-{2,}\s*$', re.IGNORECASE),
+        re.compile(r'^\s*-{2,}\s*Forwarded message\s*-{2,}\s*$', re.IGNORECASE),
+        re.compile(r'^\s*From:\s.+$', re.IGNORECASE)
+    ]
+
+    # Shorter own content ("Agreed", "Thanks") is never treated as quoted
+    MIN_COVERED_LENGTH = 20
+
+    def group_threads(self, messages: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Group messages by thread, each thread in chronological order
+
+        Messages without a thread_id form single-message threads.
+        """
+        threads: Dict[str, List[Dict[str, Any]]] = {}
+
+        for message in messages:
+            thread_id = message.get('thread_id') or f"message:{message.get('id')}"
+            threads.setdefault(thread_id, []).append(message)
+
+        for thread_messages in threads.values():
+            # Stable sort keeps the source order for undated messages
+            thread_messages.sort(key=self._message_time)
+
+        return threads
+
+    def analyze_thread(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Mark inclusive messages and map the others to the message covering them
+
+        Args:
+            messages: Messages of one thread in chronological order
+
+        Returns:
+            One coverage record per message: 'message_id', 'thread_id',
+            'inclusive', 'covered_by' (message ID or None) and 'reason'
+        """
+        own_content = [self._normalize(self.strip_quoted(self._body(message))) for message in messages]
+        quoted_content = [self._normalize(self.quoted_part(self._body(message))) for message in messages]
+
+        # Later messages whose quoted part contains each message's own content,
+        # matched on word boundaries
+        containers = []
+        for i, content in enumerate(own_content):
+            if len(content) < self.MIN_COVERED_LENGTH:
+                containers.append([])
+                continue
+            pattern = re.compile(r'(?<!\w)' + re.escape(content) + r'(?!\w)')
+            containers.append([
+                j for j in range(i + 1, len(messages)) if pattern.search(quoted_content[j])
+            ])
+
+        coverage = []
+        for i, message in enumerate(messages):
+            record = {
+                'message_id': message.get('id'),
+                'thread_id': message.get('thread_id'),
+                'inclusive': True,
+                'covered_by': None,
+                'reason': 'unique content'
+            }
+
+            if message.get('has_attachments'):
+                record['reason'] = 'has attachments'
+            elif containers[i]:
+                record['inclusive'] = False
+                record['reason'] = 'content quoted in a later message'
+            elif i == len(messages) - 1 and len(messages) > 1:
+                record['reason'] = 'last message in thread'
+
+            coverage.append(record)
+
+        # Point each covered message at an inclusive message that contains it,
+        # following chains (A quoted in B, B quoted in C) when needed
+        for i, record in enumerate(coverage):
+            if record['inclusive']:
+                continue
+
+            covering = self._covering_message(i, containers, coverage)
+            if covering is None:
+                # Defensive: never drop content that no inclusive message carries
+                record['inclusive'] = True
+                record['reason'] = 'unique content'
+            else:
+                record['covered_by'] = coverage[covering]['message_id']
+
+        return coverage
+
+    def analyze(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Thread and analyze a set of messages
+
+        Args:
+            messages: Messages from any number of threads
+
+        Returns:
+            Dict with 'threads' (thread ID -> coverage records),
+            'inclusive_messages' (message dicts, chronological per thread)
+            and 'statistics'
+        """
+        threads = self.group_threads(messages)
+        thread_coverage = {}
+        inclusive_messages = []
+
+        for thread_id, thread_messages in threads.items():
+            coverage = self.analyze_thread(thread_messages)
+            thread_coverage[thread_id] = coverage
+            inclusive_messages.extend(
+                message for message, record in zip(thread_messages, coverage)
+                if record['inclusive']
+            )
+
+        total = len(messages)
+        inclusive = len(inclusive_messages)
+        logger.info(f"Email threading: {inclusive} of {total} messages are inclusive ({len(threads)} threads)")
+
+        return {
+            'threads': thread_coverage,
+            'inclusive_messages': inclusive_messages,
+            'statistics': {
+                'total_messages': total,
+                'threads': len(threads),
+                'inclusive_messages': inclusive,
+                'suppressed_messages': total - inclusive,
+                'suppression_rate': round((total - inclusive) / total, 4) if total else 0.0
+            }
+        }
+
+    def strip_quoted(self, body: str) -> str:
+        """Remove quoted reply content, keeping only what the sender wrote"""
+        kept = []
+        for line in body.splitlines():
+            if any(pattern.match(line) for pattern in self.QUOTE_HEADERS):
+                break
+            if line.lstrip().startswith('>'):
+                continue
+            kept.append(line)
+        return '\n'.join(kept)
+
+    def quoted_part(self, body: str) -> str:
+        """Quoted reply content: everything strip_quoted removes"""
+        quoted = []
+        lines = body.splitlines()
+        for i, line in enumerate(lines):
+            if any(pattern.match(line) for pattern in self.QUOTE_HEADERS):
+                quoted.extend(lines[i:])
+                break
+            if line.lstrip().startswith('>'):
+                quoted.append(line)
+        return '\n'.join(quoted)
+
+    def to_document(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a DiscoveryBot document from an inclusive message"""
+        headers = [
+            f"{label}: {message[key]}"
+            for label, key in [
+                ('From', 'from'), ('To', 'to'), ('Cc', 'cc'),
+                ('Date', 'date'), ('Subject', 'subject')
+            ]
+            if message.get(key)
+        ]
+
+        return {
+            'text': '\n'.join(headers) + '\n\n' + self._body(message),
+            'metadata': {
+                'filename': f"{message.get('id')}.eml",
+                'source_system': 'gmail',
+                'file_type': 'email',
+                'message_id': message.get('id'),
+                'thread_id': message.get('thread_id'),
+                'date_received': message.get('date'),
+                'author': message.get('from'),
+                'subject': message.get('subject')
+            }
+        }
+
+    def _covering_message(
+        self,
+        index: int,
+        containers: List[List[int]],
+        coverage: List[Dict[str, Any]]
+    ) -> Optional[int]:
+        """Earliest inclusive message reachable through containment"""
+        seen = set()
+        frontier = list(containers[index])
+
+        while frontier:
+            candidate = min(frontier)
+            frontier.remove(candidate)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+
+            if coverage[candidate]['inclusive']:
+                return candidate
+            frontier.extend(containers[candidate])
+
+        return None
+
+    def _body(self, message: Dict[str, Any]) -> str:
+        return message.get('full_body') or message.get('body') or ''
+
+    def _normalize(self, text: str) -> str:
+        """Drop quote markers, case-fold and collapse whitespace"""
+        text = re.sub(r'^[ \t>]+', '', text, flags=re.MULTILINE)
+        return ' '.join(text.casefold().split())
+
+    def _message_time(self, message: Dict[str, Any]) -> datetime:
+        """Sort key from the Date header, falling back to Gmail's internalDate"""
+        try:
+            parsed = parsedate_to_datetime(message.get('date') or '')
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed
+        except (TypeError, ValueError):
+            pass
+
+        internal_date = message.get('internal_date')
+        if internal_date:
+            return datetime.fromtimestamp(int(internal_date) / 1000, tz=timezone.utc)
+
+        return datetime.min.replace(tzinfo=timezone.utc)
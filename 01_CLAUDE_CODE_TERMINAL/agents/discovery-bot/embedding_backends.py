@@ -0,0 +1,313 @@
+"""
+Embedding Backends - Local CPU embedding models producing float32 vectors
+"""
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+from text_chunker import word_spans
+
+logger = logging.getLogger(__name__)
+
+
+# Width of document_embeddings.embedding (vector(1536))
+SCHEMA_DIMENSIONS = 1536
+
+
+class EmbeddingBackend(ABC):
+    """
+    Base class for embedding models
+
+    embed() takes any number of texts (typically chunks from many documents)
+    and returns one L2-normalized float32 row per text, in input order.
+    Texts are sorted by length and encoded batch_size at a time, so each
+    batch pads to similar lengths. Models narrower than `dimensions` are
+    zero-padded: with normalized vectors that leaves cosine similarity and
+    inner products unchanged while fitting the vector(1536) column.
+
+    Subclasses implement _encode(), native_dimensions and model_name, and
+    count_tokens() and token_spans() when the model has a tokenizer.
+    """
+
+    name = 'base'
+
+    def __init__(self, batch_size: int = 64, dimensions: int = SCHEMA_DIMENSIONS):
+        """
+        Args:
+            batch_size: Texts per forward pass
+            dimensions: Width of the returned vectors
+        """
+        self.batch_size = batch_size
+        self.dimensions = dimensions
+
+    @property
+    @abstractmethod
+    def native_dimensions(self) -> int:
+        """Width of the model's own embeddings"""
+
+    @property
+    @abstractmethod
+    def model_name(self) -> str:
+        """Model identifier, recorded with the vectors"""
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts
+
+        Returns:
+            float32 array of shape (len(texts), dimensions)
+
+        Raises:
+            ValueError: If the model is wider than dimensions
+        """
+        if self.native_dimensions > self.dimensions:
+            raise ValueError(
+                f"{self.model_name} produces {self.native_dimensions}-dimensional vectors; "
+                f"the target is {self.dimensions}"
+            )
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            encoded = self._encode([texts[i] for i in rows])
+            vectors[rows, :encoded.shape[1]] = encoded
+        return vectors
+
+    def count_tokens(self, text: str) -> int:
+        """Model tokens in text (approximated as words when there is no tokenizer)"""
+        return len(text.split())
+
+    def token_spans(self, text: str) -> np.ndarray:
+        """(start, end) character offsets of each model token, for TextChunker"""
+        return word_spans(text)
+
+    def describe(self) -> Dict[str, Any]:
+        """Backend settings, recorded with the vectors it produced"""
+        return {
+            'backend': self.name,
+            'model': self.model_name,
+            'native_dimensions': self.native_dimensions,
+            'dimensions': self.dimensions,
+            'batch_size': self.batch_size
+        }
+
+    @abstractmethod
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """One batch -> float32 (len(texts), native_dimensions), L2-normalized"""
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """CPU inference with a sentence-transformers model"""
+
+    name = 'sentence-transformers'
+
+    def __init__(
+        self,
+        model_name: str = 'sentence-transformers/all-MiniLM-L6-v2',
+        batch_size: int = 64,
+        threads: Optional[int] = None,
+        dimensions: int = SCHEMA_DIMENSIONS,
+        device: str = 'cpu'
+    ):
+        """
+        Args:
+            model_name: Hugging Face model ID or local path
+            batch_size: Texts per forward pass
+            threads: Torch intra-op threads (None keeps torch's default)
+            dimensions: Width of the returned vectors
+            device: Torch device
+
+        Raises:
+            ImportError: If sentence-transformers is not installed
+        """
+        if SentenceTransformer is None:
+            raise ImportError(
+                "sentence-transformers is required for this backend. "
+                "Install with: pip install sentence-transformers"
+            )
+        super().__init__(batch_size, dimensions)
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        self._model_name = model_name
+        self.model = SentenceTransformer(model_name, device=device)
+
+    @property
+    def native_dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.model.tokenizer(text, add_special_tokens=False)['input_ids'])
+
+    def token_spans(self, text: str) -> np.ndarray:
+        encoded = self.model.tokenizer(
+            text, add_special_tokens=False, return_offsets_mapping=True, verbose=False
+        )
+        return np.array(encoded['offset_mapping'], dtype=np.int64).reshape(-1, 2)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ).astype(np.float32, copy=False)
+
+
+class ONNXBackend(EmbeddingBackend):
+    """
+    CPU inference with an exported transformer in ONNX Runtime
+
+    Expects a model taking input_ids and attention_mask (and token_type_ids
+    if it declares them) and returning token embeddings, which are mean-pooled
+    over the attention mask, or already-pooled sentence embeddings. The
+    tokenizer is a Hugging Face tokenizer.json.
+    """
+
+    name = 'onnx'
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: Optional[str] = None,
+        batch_size: int = 64,
+        threads: Optional[int] = None,
+        max_length: int = 256,
+        dimensions: int = SCHEMA_DIMENSIONS
+    ):
+        """
+        Args:
+            model_path: .onnx file
+            tokenizer_path: tokenizer.json (default: next to the model)
+            batch_size: Texts per forward pass
+            threads: ONNX Runtime intra-op threads (None lets it choose)
+            max_length: Tokens kept per text
+            dimensions: Width of the returned vectors
+
+        Raises:
+            ImportError: If onnxruntime or tokenizers is not installed
+        """
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError(
+                "onnxruntime and tokenizers are required for the ONNX backend. "
+                "Install with: pip install onnxruntime tokenizers"
+            )
+        super().__init__(batch_size, dimensions)
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._inputs = {item.name for item in self.session.get_inputs()}
+        self._model_name = os.path.basename(os.path.dirname(os.path.abspath(model_path))) or model_path
+
+        tokenizer_path = tokenizer_path or os.path.join(os.path.dirname(model_path), 'tokenizer.json')
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        # Chunking needs offsets for the whole text, so one copy stays untruncated
+        self._span_tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._span_tokenizer.no_truncation()
+        self._span_tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.max_length = max_length
+        self._native_dimensions: Optional[int] = None
+
+    @property
+    def native_dimensions(self) -> int:
+        if self._native_dimensions is None:
+            width = self.session.get_outputs()[0].shape[-1]
+            # Symbolic output shapes are resolved with a probe batch
+            self._native_dimensions = width if isinstance(width, int) else self._encode(['probe']).shape[1]
+        return self._native_dimensions
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    def count_tokens(self, text: str) -> int:
+        return len(self._span_tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def token_spans(self, text: str) -> np.ndarray:
+        offsets = self._span_tokenizer.encode(text, add_special_tokens=False).offsets
+        return np.array(offsets, dtype=np.int64).reshape(-1, 2)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._inputs:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        output = self.session.run(None, {name: value for name, value in feeds.items() if name in self._inputs})[0]
+
+        if output.ndim == 3:
+            # Mean of the token embeddings that are not padding
+            mask = attention_mask[:, :, None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return self._normalize(output)
+
+
+def create_backend(config: Dict[str, Any]) -> Optional[EmbeddingBackend]:
+    """
+    Embedding backend described by DiscoveryBot configuration
+
+    Returns:
+        None when config['embedding_backend'] is unset
+
+    Raises:
+        ValueError: For an unknown backend or a missing ONNX model path
+    """
+    kind = config.get('embedding_backend')
+    if not kind:
+        return None
+
+    common = {
+        'batch_size': config.get('embedding_batch_size', 64),
+        'threads': config.get('embedding_threads'),
+        'dimensions': config.get('embedding_dimensions', SCHEMA_DIMENSIONS)
+    }
+    if kind == 'sentence-transformers':
+        return SentenceTransformerBackend(config.get('embedding_model') or 'sentence-transformers/all-MiniLM-L6-v2', **common)
+    if kind == 'onnx':
+        if not config.get('embedding_model'):
+            raise ValueError("embedding_model must be the path of an .onnx model for the onnx backend")
+        return ONNXBackend(config['embedding_model'], config.get('embedding_tokenizer'), **common)
+    raise ValueError(f"Unknown embedding backend: {kind}")
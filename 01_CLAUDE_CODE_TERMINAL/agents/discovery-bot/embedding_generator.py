@@ -4,18 +4,32 @@ Embedding Generator - Create vector embeddings for semantic search
 
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 import anthropic
 import hashlib
 
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable, with_retry
+from text_chunker import TextChunker
+
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingGenerator:
     """Generate embeddings for semantic search and similarity"""
 
-    def __init__(self, client: anthropic.Anthropic):
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        chunker: Optional[TextChunker] = None
+    ):
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.chunker = chunker or TextChunker()
         self.model = 'claude-sonnet-4-5-20250929'
 
     async def generate(
@@ -38,73 +52,97 @@ class EmbeddingGenerator:
             Semantic summaries and chunked text for embedding
         """
         try:
-            # Generate semantic summary
-            prompt = self._build_summary_prompt(text, entities)
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                temperature=0.0,
-                system=[
-                    {
-                        "type": "text",
-                        "text": """You are an expert at creating concise, semantically rich summaries of legal documents for embedding and semantic search. You create summaries that capture the essence and key concepts while being optimized for vector similarity search.""",
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-
-            # Parse response
-            result_text = response.content[0].text
-            result = json.loads(result_text)
-
-            # Chunk text for embedding
-            chunks = self._chunk_text(text)
-
-            # Create embedding-ready output
-            embedding_data = {
-                'semantic_summary': result.get('summary', ''),
-                'key_concepts': result.get('key_concepts', []),
-                'semantic_tags': result.get('semantic_tags', []),
-                'chunks': chunks,
-                'chunk_count': len(chunks),
-                'metadata': {
-                    'doc_hash': self._hash_text(text),
-                    'text_length': len(text),
-                    'chunk_size': 512,
-                    'overlap': 50
-                },
-                'tokens_used': {
-                    'input': response.usage.input_tokens,
-                    'output': response.usage.output_tokens,
-                    'cache_creation': getattr(response.usage, 'cache_creation_input_tokens', 0),
-                    'cache_read': getattr(response.usage, 'cache_read_input_tokens', 0)
-                }
-            }
+            request = self.build_request(text, entities)
 
-            # Add instructions for downstream embedding
-            embedding_data['embedding_instructions'] = {
-                'recommended_service': 'voyage-law-2 or sentence-transformers/legal-bert-base-uncased',
-                'primary_text': embedding_data['semantic_summary'],
-                'chunk_texts': [chunk['text'] for chunk in chunks],
-                'use_case': 'semantic search and document similarity'
-            }
+            async def attempt():
+                # Generate semantic summary
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response, text)
 
-            return embedding_data
+            return await with_retry(self.retry_policy, 'embeddings', attempt)
 
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse embedding generation response: {e}")
             return self._fallback_embedding(text)
         except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
             logger.error(f"Embedding generation error: {e}")
             return self._fallback_embedding(text)
 
+    def build_request(
+        self,
+        text: str,
+        entities: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for the semantic summary"""
+        return {
+            'model': self.model,
+            'max_tokens': 1024,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": """You are an expert at creating concise, semantically rich summaries of legal documents for embedding and semantic search. You create summaries that capture the essence and key concepts while being optimized for vector similarity search.""",
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_summary_prompt(text, entities)
+                }
+            ]
+        }
+
+    def parse_response(self, response: Any, text: str) -> Dict[str, Any]:
+        """
+        Parse a semantic summary Message response
+
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
+
+        return self._build_embedding_data(text, result, usage_tokens(response))
+
+    def _build_embedding_data(
+        self,
+        text: str,
+        summary: Dict[str, Any],
+        tokens_used: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """Combine a parsed semantic summary with text chunks for embedding"""
+
+        # Chunk text for embedding
+        chunks = self._chunk_text(text)
+
+        # Create embedding-ready output
+        embedding_data = {
+            'semantic_summary': summary.get('summary', ''),
+            'key_concepts': summary.get('key_concepts', []),
+            'semantic_tags': summary.get('semantic_tags', []),
+            'chunks': chunks,
+            'chunk_count': len(chunks),
+            'metadata': {
+                'doc_hash': self._hash_text(text),
+                'text_length': len(text),
+                **self.chunker.describe()
+            },
+            'tokens_used': tokens_used
+        }
+
+        # Add instructions for downstream embedding
+        embedding_data['embedding_instructions'] = {
+            'recommended_service': 'voyage-law-2 or sentence-transformers/legal-bert-base-uncased',
+            'primary_text': embedding_data['semantic_summary'],
+            'chunk_texts': [chunk['text'] for chunk in chunks],
+            'use_case': 'semantic search and document similarity'
+        }
+
+        return embedding_data
+
     def _build_summary_prompt(
         self,
         text: str,
@@ -172,63 +210,17 @@ OUTPUT FORMAT (valid JSON only):
 
 Respond with ONLY the JSON object, no additional text."""
 
-    def _chunk_text(
-        self,
-        text: str,
-        chunk_size: int = 512,
-        overlap: int = 50
-    ) -> List[Dict[str, Any]]:
+    def _chunk_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Chunk text for embedding generation
 
         Args:
             text: Full text
-            chunk_size: Characters per chunk
-            overlap: Overlap between chunks
 
         Returns:
-            List of chunks with metadata
+            List of chunks with exact offsets into text (see TextChunker)
         """
-        chunks = []
-        text_length = len(text)
-
-        # Split by paragraphs first
-        paragraphs = text.split('\n\n')
-
-        current_chunk = ""
-        chunk_index = 0
-        start_pos = 0
-
-        for para in paragraphs:
-            # If adding this paragraph exceeds chunk size, save current chunk
-            if len(current_chunk) + len(para) > chunk_size and current_chunk:
-                chunks.append({
-                    'chunk_id': chunk_index,
-                    'text': current_chunk.strip(),
-                    'start_position': start_pos,
-                    'end_position': start_pos + len(current_chunk),
-                    'length': len(current_chunk)
-                })
-
-                # Start new chunk with overlap
-                overlap_text = current_chunk[-overlap:] if len(current_chunk) > overlap else current_chunk
-                current_chunk = overlap_text + "\n\n" + para
-                start_pos = start_pos + len(current_chunk) - overlap - len(para)
-                chunk_index += 1
-            else:
-                current_chunk += "\n\n" + para if current_chunk else para
-
-        # Add final chunk
-        if current_chunk:
-            chunks.append({
-                'chunk_id': chunk_index,
-                'text': current_chunk.strip(),
-                'start_position': start_pos,
-                'end_position': start_pos + len(current_chunk),
-                'length': len(current_chunk)
-            })
-
-        return chunks
+        return list(self.chunker.chunks(text))
 
     def _hash_text(self, text: str) -> str:
         """Generate hash of text for deduplication"""
@@ -251,8 +243,7 @@ Respond with ONLY the JSON object, no additional text."""
             'metadata': {
                 'doc_hash': self._hash_text(text),
                 'text_length': len(text),
-                'chunk_size': 512,
-                'overlap': 50,
+                **self.chunker.describe(),
                 'method': 'fallback'
             },
             'embedding_instructions': {
@@ -261,6 +252,7 @@ Respond with ONLY the JSON object, no additional text."""
                 'chunk_texts': [chunk['text'] for chunk in chunks],
                 'use_case': 'semantic search and document similarity'
             },
+            'degraded': True,
             'tokens_used': {
                 'input': 0,
                 'output': 0,
@@ -5,18 +5,29 @@ Entity Extractor - Extract people, organizations, dates, amounts, locations with
 import json
 import logging
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 import anthropic
 
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable, with_retry
+
 logger = logging.getLogger(__name__)
 
 
 class EntityExtractor:
     """Extract named entities from legal documents"""
 
-    def __init__(self, client: anthropic.Anthropic):
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
         self.model = 'claude-sonnet-4-5-20250929'
 
     async def extract(
@@ -35,18 +46,38 @@ class EntityExtractor:
             Extracted entities with confidence scores and context
         """
         try:
-            # Build extraction prompt
-            prompt = self._build_extraction_prompt(text, classification)
-
-            # Call Claude API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4096,
-                temperature=0.0,
-                system=[
-                    {
-                        "type": "text",
-                        "text": """You are an expert legal entity extraction specialist. You extract entities from legal documents with extremely high precision and recall. You understand:
+            request = self.build_request(text, classification)
+
+            async def attempt():
+                # Call Claude API
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response, text)
+
+            return await with_retry(self.retry_policy, 'entities', attempt)
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse entity extraction response: {e}")
+            return self._fallback_extraction(text)
+        except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
+            logger.error(f"Entity extraction error: {e}")
+            return self._fallback_extraction(text)
+
+    def build_request(
+        self,
+        text: str,
+        classification: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for entity extraction"""
+        return {
+            'model': self.model,
+            'max_tokens': 4096,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": """You are an expert legal entity extraction specialist. You extract entities from legal documents with extremely high precision and recall. You understand:
 
 - Legal naming conventions and titles
 - Corporate entity structures
@@ -57,40 +88,34 @@ class EntityExtractor:
 - Court and case identifiers
 
 You NEVER hallucinate entities. You only extract what is explicitly present in the text.""",
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-
-            # Parse response
-            result_text = response.content[0].text
-            result = json.loads(result_text)
-
-            # Post-process and validate entities
-            result = self._validate_and_enrich_entities(result, text)
-
-            # Add usage statistics
-            result['tokens_used'] = {
-                'input': response.usage.input_tokens,
-                'output': response.usage.output_tokens,
-                'cache_creation': getattr(response.usage, 'cache_creation_input_tokens', 0),
-                'cache_read': getattr(response.usage, 'cache_read_input_tokens', 0)
-            }
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_extraction_prompt(text, classification)
+                }
+            ]
+        }
 
-            return result
+    def parse_response(self, response: Any, text: str) -> Dict[str, Any]:
+        """
+        Parse an entity extraction Message response
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse entity extraction response: {e}")
-            return self._fallback_extraction(text)
-        except Exception as e:
-            logger.error(f"Entity extraction error: {e}")
-            return self._fallback_extraction(text)
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
+
+        # Post-process and validate entities
+        result = self._validate_and_enrich_entities(result, text)
+
+        # Add usage statistics
+        result['tokens_used'] = usage_tokens(response)
+
+        return result
 
     def _build_extraction_prompt(
         self,
@@ -315,6 +340,7 @@ Respond with ONLY the JSON object, no additional text."""
                 'needs_review': True,
                 'fallback_used': True
             },
+            'degraded': True,
             'tokens_used': {
                 'input': 0,
                 'output': 0,
@@ -0,0 +1,370 @@
+"""
+Fused Analyzer - Run every analysis stage in a single combined prompt
+"""
+
+import json
+import logging
+from typing import Dict, Any, Optional, Union
+import anthropic
+
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import ResponseParseError, RetryPolicy, is_retryable, with_retry
+
+logger = logging.getLogger(__name__)
+
+
+class FusedAnalysisError(ResponseParseError):
+    """Raised when a combined response does not match the expected structure"""
+
+
+class FusedAnalyzer:
+    """
+    Request classification, entities, privilege, keywords and the semantic
+    summary in one structured JSON response
+
+    The response is split into the same per-stage dicts the staged pipeline
+    produces, so Validator, CostCalculator and TimelineBuilder work unchanged.
+    Each section is validated on its own; a malformed section falls back to
+    that stage's heuristics without discarding the rest of the response.
+    """
+
+    STAGES = ['classification', 'entities', 'privilege', 'keywords', 'embeddings']
+
+    # Required fields and their types for each section of the combined response
+    SECTION_SCHEMA = {
+        'classification': {'document_type': str, 'confidence': (int, float)},
+        'entities': {
+            'people': list,
+            'organizations': list,
+            'dates': list,
+            'amounts': list,
+            'locations': list
+        },
+        'privilege': {'is_privileged': bool, 'confidence': (int, float)},
+        'keywords': {'primary_keywords': list, 'secondary_keywords': list, 'key_phrases': list},
+        'semantic_summary': {'summary': str, 'key_concepts': list, 'semantic_tags': list}
+    }
+
+    # Entity extraction reads the most text of any stage; keep its limit
+    MAX_TEXT_LENGTH = 50000
+
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        classifier,
+        entity_extractor,
+        privilege_detector,
+        keyword_analyzer,
+        embedding_generator,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.model = 'claude-sonnet-4-5-20250929'
+        self.classifier = classifier
+        self.entity_extractor = entity_extractor
+        self.privilege_detector = privilege_detector
+        self.keyword_analyzer = keyword_analyzer
+        self.embedding_generator = embedding_generator
+
+    async def analyze(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Analyze a document with one API call
+
+        Args:
+            text: Document text
+            metadata: Document metadata
+
+        Returns:
+            Stage outputs keyed by stage name (classification, entities,
+            privilege, keywords, embeddings)
+        """
+        try:
+            request = self.build_request(text, metadata)
+
+            async def attempt():
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response, text, metadata)
+
+            return await with_retry(self.retry_policy, 'fused', attempt)
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse fused analysis response: {e}")
+            return self.fallback(text, metadata)
+        except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
+            logger.error(f"Fused analysis error: {e}")
+            return self.fallback(text, metadata)
+
+    def build_request(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for the combined analysis"""
+        return {
+            'model': self.model,
+            # Sum of the per-stage output budgets
+            'max_tokens': 10240,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": """You are an expert legal discovery analyst with deep experience in document classification, entity extraction, privilege review and keyword analysis. You analyze each document once and report every finding in a single structured JSON object.
+
+You NEVER hallucinate entities. You only extract what is explicitly present in the text. Privilege determinations must be conservative - when in doubt, flag for attorney review.""",
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_fused_prompt(text, metadata)
+                }
+            ]
+        }
+
+    def parse_response(
+        self,
+        response: Any,
+        text: str,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Split a combined Message response into per-stage outputs
+
+        Token usage for the single call is reported on the classification
+        stage; the other stages report zero so that CostCalculator's sum
+        across stages stays correct.
+
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+            FusedAnalysisError: If the response is not a JSON object
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
+
+        if not isinstance(result, dict):
+            raise FusedAnalysisError('Fused analysis response is not a JSON object')
+
+        outputs = {}
+
+        outputs['classification'] = self._parse_section(
+            result, 'classification',
+            lambda section: self._parse_classification(section),
+            lambda: self.classifier._fallback_classification(text, metadata)
+        )
+        outputs['entities'] = self._parse_section(
+            result, 'entities',
+            lambda section: self.entity_extractor._validate_and_enrich_entities(section, text),
+            lambda: self.entity_extractor._fallback_extraction(text)
+        )
+        outputs['keywords'] = self._parse_section(
+            result, 'keywords',
+            lambda section: {**section, 'basic_keywords': self.keyword_analyzer._extract_basic_keywords(text)},
+            lambda: self.keyword_analyzer._fallback_keyword_analysis(text)
+        )
+        outputs['embeddings'] = self._parse_section(
+            result, 'semantic_summary',
+            lambda section: self.embedding_generator._build_embedding_data(text, section, self._no_tokens()),
+            lambda: self.embedding_generator._fallback_embedding(text)
+        )
+
+        # Cross-check privilege against the heuristic exactly as the staged detector does
+        # (the privilege section is already paid for, so triage never bypasses it)
+        heuristic_check, determination = self.privilege_detector.screen(
+            text, metadata, outputs['entities'], allow_bypass=False
+        )
+        if determination is not None:
+            outputs['privilege'] = determination
+        else:
+            outputs['privilege'] = self._parse_section(
+                result, 'privilege',
+                lambda section: self.privilege_detector._validate_privilege_determination(section, heuristic_check),
+                lambda: self.privilege_detector._conservative_privilege_response(text, metadata)
+            )
+
+        for stage in self.STAGES:
+            outputs[stage]['tokens_used'] = self._no_tokens()
+            outputs[stage]['analysis_mode'] = 'fused'
+        outputs['classification']['tokens_used'] = usage_tokens(response)
+
+        return outputs
+
+    def fallback(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Heuristic outputs for every stage when the combined call fails"""
+        return {
+            'classification': self.classifier._fallback_classification(text, metadata),
+            'entities': self.entity_extractor._fallback_extraction(text),
+            'privilege': self.privilege_detector._conservative_privilege_response(text, metadata),
+            'keywords': self.keyword_analyzer._fallback_keyword_analysis(text),
+            'embeddings': self.embedding_generator._fallback_embedding(text)
+        }
+
+    def _parse_section(
+        self,
+        result: Dict[str, Any],
+        section_name: str,
+        parse,
+        fallback
+    ) -> Dict[str, Any]:
+        """Validate one section of the combined response, falling back on errors"""
+        try:
+            section = result.get(section_name)
+            self._validate_section(section_name, section)
+            return parse(section)
+        except Exception as e:
+            logger.warning(f"Fused analysis section '{section_name}' invalid, using fallback: {e}")
+            return fallback()
+
+    def _validate_section(self, section_name: str, section: Any) -> None:
+        """
+        Check that a section has its required fields with the right types
+
+        Raises:
+            FusedAnalysisError: If the section is missing or malformed
+        """
+        if not isinstance(section, dict):
+            raise FusedAnalysisError(f"Section '{section_name}' missing or not an object")
+
+        for field, expected_type in self.SECTION_SCHEMA[section_name].items():
+            value = section.get(field)
+            # bool is an int subclass; don't accept it as a confidence score
+            if not isinstance(value, expected_type) or (
+                isinstance(value, bool) and expected_type is not bool
+            ):
+                raise FusedAnalysisError(
+                    f"Section '{section_name}' field '{field}' is missing or has the wrong type"
+                )
+
+    def _parse_classification(self, section: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the classifier's document type validation"""
+        if section['document_type'] not in self.classifier.DOCUMENT_TYPES:
+            logger.warning(f"Unexpected document type: {section['document_type']}")
+            section['document_type'] = 'other'
+        return section
+
+    def _no_tokens(self) -> Dict[str, int]:
+        """Zero token usage for stages that made no API call of their own"""
+        return {
+            'input': 0,
+            'output': 0,
+            'cache_creation': 0,
+            'cache_read': 0
+        }
+
+    def _build_fused_prompt(
+        self,
+        text: str,
+        metadata: Optional[Dict]
+    ) -> str:
+        """Build combined analysis prompt"""
+
+        # Truncate if needed
+        if len(text) > self.MAX_TEXT_LENGTH:
+            text = text[:self.MAX_TEXT_LENGTH] + "\n\n[Document truncated...]"
+
+        metadata_str = ""
+        if metadata:
+            metadata_str = f"\n\nMETADATA:\n{json.dumps(metadata, indent=2)}"
+
+        document_types = ', '.join(self.classifier.DOCUMENT_TYPES)
+
+        return f"""Perform a complete discovery analysis of this legal document.
+
+DOCUMENT TEXT:
+{text}
+{metadata_str}
+
+ANALYSIS REQUIREMENTS:
+
+1. CLASSIFICATION: Primary document type (one of: {document_types}),
+   confidence (0.0 to 1.0), sub-type, classification indicators, special
+   characteristics, and whether the document appears to be OCR'd.
+
+2. ENTITIES: Extract ALL people, organizations, dates (ISO format
+   YYYY-MM-DD), monetary amounts, locations, case identifiers and other
+   entities (emails, phone numbers, citations). Give each a confidence
+   score, a 20-50 character context snippet and its character position.
+
+3. PRIVILEGE: Determine whether the document is protected by
+   attorney-client privilege, work product or common interest privilege.
+   Require BOTH attorney participation AND legal advice for attorney-client
+   privilege. Identify third-party recipients, waiver and crime-fraud
+   concerns, and recommend attorney review when in doubt.
+
+4. KEYWORDS: Primary and secondary keywords with relevance scores, key
+   phrases, overall relevance and discovery value, and search suggestions.
+
+5. SEMANTIC SUMMARY: A 2-3 sentence summary optimized for embedding, key
+   concepts, and semantic tags (practice area, document function, content
+   type).
+
+OUTPUT FORMAT (valid JSON only):
+{{
+  "classification": {{
+    "document_type": "email",
+    "confidence": 0.98,
+    "sub_type": "attorney-client communication",
+    "indicators": ["Contains From/To/Subject headers"],
+    "characteristics": ["confidential"],
+    "is_ocr": false,
+    "ocr_quality": null,
+    "needs_review": false,
+    "review_reason": null
+  }},
+  "entities": {{
+    "people": [{{"name": "John Smith", "title": "Senior Counsel", "role": "attorney", "confidence": 0.99, "context": "John Smith, Senior Counsel at...", "first_mention_position": 145}}],
+    "organizations": [{{"name": "Acme Corporation", "entity_type": "corporation", "confidence": 0.98, "context": "Acme Corporation, a Delaware corporation", "first_mention_position": 89}}],
+    "dates": [{{"date": "2024-03-15", "original_format": "March 15, 2024", "context": "settlement deadline", "confidence": 1.0, "position": 234}}],
+    "amounts": [{{"amount": "$2,500,000.00", "normalized_usd": 2500000.00, "context": "settlement amount", "confidence": 1.0, "position": 456}}],
+    "locations": [{{"location": "San Francisco, California", "type": "city_state", "confidence": 0.95, "context": "venue for trial", "position": 678}}],
+    "case_identifiers": [{{"identifier": "CV-2024-001", "type": "case_number", "confidence": 1.0, "context": "Case No. CV-2024-001", "position": 23}}],
+    "other_entities": [{{"type": "email", "value": "jsmith@lawfirm.com", "confidence": 1.0, "position": 123}}]
+  }},
+  "privilege": {{
+    "is_privileged": true,
+    "privilege_types": ["attorney_client"],
+    "confidence": 0.95,
+    "privilege_indicators": [{{"indicator": "Explicit privilege claim", "evidence": "CONFIDENTIAL ATTORNEY-CLIENT COMMUNICATION", "weight": "strong"}}],
+    "privilege_concerns": [{{"concern": "None identified", "severity": "none"}}],
+    "participants": {{"attorneys": ["John Smith, Senior Counsel"], "clients": ["Sarah Johnson, CEO"], "third_parties": []}},
+    "reasoning": "Communication from attorney to client providing legal advice, marked confidential.",
+    "needs_attorney_review": false,
+    "review_reason": null,
+    "redaction_recommended": true,
+    "redaction_scope": "entire document"
+  }},
+  "keywords": {{
+    "primary_keywords": [{{"keyword": "settlement", "relevance": 0.95, "frequency": 5, "context": "settlement negotiations", "category": "legal_concept"}}],
+    "secondary_keywords": [{{"keyword": "payment terms", "relevance": 0.7, "frequency": 2, "context": "discussing payment terms", "category": "fact"}}],
+    "key_phrases": [{{"phrase": "material breach", "relevance": 0.85, "frequency": 2, "type": "legal_term"}}],
+    "relevance_analysis": {{"overall_relevance": 0.85, "relevance_factors": ["Contains settlement discussions"], "discovery_value": "high", "key_issues": ["settlement"]}},
+    "search_suggestions": {{"keyword_searches": ["settlement AND breach"], "concept_searches": ["contract disputes"], "related_terms": ["liquidated damages"]}},
+    "summary": "Document discusses settlement of contract breach claim."
+  }},
+  "semantic_summary": {{
+    "summary": "Email from attorney John Smith to client Sarah Johnson recommending a $2.5M settlement in Jones v. Acme Corp.",
+    "key_concepts": ["attorney-client communication", "settlement strategy"],
+    "semantic_tags": ["practice_area:litigation", "privilege:attorney_client"]
+  }}
+}}
+
+CRITICAL RULES:
+- Include all five top-level sections, even when a section has no findings
+- Extract ONLY entities explicitly present in the text
+- Be CONSERVATIVE on privilege - when in doubt, flag as potentially privileged
+
+Respond with ONLY the JSON object, no additional text."""
@@ -0,0 +1,187 @@
+"""
+Hybrid Retriever - BM25 and vector search over a case index, fused by reciprocal rank
+"""
+
+import logging
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+import numpy as np
+
+from bm25_index import BM25Index
+from embedding_backends import EmbeddingBackend
+from vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+
+class HybridRetriever:
+    """
+    Lexical and semantic retrieval over one VectorIndex
+
+    A BM25 index over the chunk contents is kept beside the vectors
+    (bm25.npz in the index directory) and brought up to date, before each
+    query, with any rows added since it was saved. A query takes the best `candidates` rows from
+    each source under the same filters and fuses the two rankings with
+    reciprocal rank fusion:
+
+        rrf(row) = sum over sources of weight / (rrf_k + rank)
+
+    RRF uses ranks only, so BM25 scores and cosine similarities never have
+    to be put on a common scale. Only the fused top k are reranked: their
+    missing per-source scores (a row found by one source but not the other)
+    are computed exactly, and only their row lines are read from disk.
+    """
+
+    BM25 = 'bm25.npz'
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        encoder: Optional[EmbeddingBackend] = None,
+        candidates: int = 100,
+        rrf_k: int = 60,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            index: Case vector index
+            encoder: Backend that embeds query text (the index's model);
+                without one, queries need a query_vector or are lexical only
+            candidates: Rows taken from each source before fusion
+            rrf_k: RRF rank offset; larger values flatten the rank weights
+            weights: Per-source RRF weights ({'bm25': 1.0, 'vector': 1.0})
+        """
+        self.index = index
+        self.encoder = encoder
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = {'bm25': 1.0, 'vector': 1.0, **(weights or {})}
+        self._lock = threading.Lock()
+
+        path = index.directory / self.BM25
+        self.bm25 = BM25Index.load(path) if path.exists() else BM25Index()
+        if len(self.bm25) > index.rows:
+            # The index was rebuilt under the saved BM25 rows
+            self.bm25 = BM25Index()
+
+    def refresh(self, batch_size: int = 10000) -> int:
+        """
+        Add index rows the BM25 index has not seen, saving it if any were added
+
+        A read-only index is refreshed first, so rows its writer appended
+        since the last query are searched; its BM25 rows stay in memory.
+
+        Returns:
+            Number of rows added
+        """
+        with self._lock:
+            if self.index.read_only:
+                self.index.refresh()
+
+            start = len(self.bm25)
+            if start >= self.index.rows:
+                return 0
+
+            texts: List[str] = []
+            for _, fields in self.index.iter_rows(start):
+                texts.append(fields.get('content') or '')
+                if len(texts) >= batch_size:
+                    self.bm25.add(texts)
+                    texts = []
+            if texts:
+                self.bm25.add(texts)
+
+            added = len(self.bm25) - start
+            if not self.index.read_only:
+                self.bm25.save(self.index.directory / self.BM25)
+            logger.info(f"Added {added} rows to the BM25 index in {self.index.directory}")
+            return added
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        query_vector: Optional[np.ndarray] = None,
+        is_privileged: Optional[bool] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        document_ids: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Best chunks for a query by reciprocal rank fusion
+
+        Args:
+            query: Query text (scored by BM25, and embedded by the encoder
+                when no query_vector is given)
+            k: Maximum hits
+            query_vector: Query embedding from the index's model
+            is_privileged: Only privileged (True) or non-privileged (False) chunks
+            start: Earliest document date (ISO)
+            end: Latest document date (ISO)
+            document_ids: Only chunks of these documents
+
+        Returns:
+            Row dicts, best first, each with 'row', 'score' (the fused RRF
+            score), 'scores' ({'bm25', 'vector', 'rrf'}) and 'ranks'
+            ({'bm25', 'vector'}: 1-based rank in each source's candidates,
+            None when the row was not among them)
+        """
+        self.refresh()
+        if query_vector is None and self.encoder is not None:
+            query_vector = self.encoder.embed([query])[0]
+
+        mask = self.index.filter_mask(is_privileged, start, end, document_ids)
+        lexical = self.bm25.scores(query)
+        depth = max(self.candidates, k)
+
+        # Rows added since the refresh are left to the vector side
+        shared = min(len(lexical), len(mask))
+        ranked = {}
+        candidates = np.flatnonzero((lexical[:shared] > 0) & mask[:shared])
+        if len(candidates) > depth:
+            candidates = candidates[np.argpartition(-lexical[candidates], depth - 1)[:depth]]
+        ranked['bm25'] = candidates[np.argsort(-lexical[candidates], kind='stable')].tolist()
+        if query_vector is not None:
+            ranked['vector'] = self.index.nearest(query_vector, depth, mask)[0].tolist()
+
+        ranks: Dict[str, Dict[int, int]] = {
+            source: {row: rank for rank, row in enumerate(rows, 1)} for source, rows in ranked.items()
+        }
+        fused: Dict[int, float] = {}
+        for source, source_ranks in ranks.items():
+            weight = self.weights.get(source, 1.0)
+            for row, rank in source_ranks.items():
+                fused[row] = fused.get(row, 0.0) + weight / (self.rrf_k + rank)
+        if not fused:
+            return []
+
+        # Ties keep the lower row, so results are deterministic
+        top = sorted(fused, key=lambda row: (-fused[row], row))[:k]
+
+        similarities = (
+            self.index.similarity(query_vector, top).tolist() if query_vector is not None else [None] * len(top)
+        )
+        hits = []
+        for row, similarity in zip(top, similarities):
+            hits.append({
+                **self.index.get(row),
+                'row': row,
+                'score': round(fused[row], 6),
+                'scores': {
+                    'bm25': round(float(lexical[row]), 6) if row < len(lexical) else None,
+                    'vector': None if similarity is None else round(float(similarity), 6),
+                    'rrf': round(fused[row], 6)
+                },
+                'ranks': {source: ranks[source].get(row) if source in ranks else None for source in ('bm25', 'vector')}
+            })
+        return hits
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            'bm25_rows': len(self.bm25),
+            'bm25_terms': len(self.bm25.vocabulary),
+            'candidates': self.candidates,
+            'rrf_k': self.rrf_k,
+            'weights': self.weights
+        }
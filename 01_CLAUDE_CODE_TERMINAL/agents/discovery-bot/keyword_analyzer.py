@@ -4,26 +4,39 @@ Keyword Analyzer - Extract keywords and calculate relevance scores
 
 import json
 import logging
-from typing import Dict, Any, List
-from collections import Counter
-import re
+from typing import Dict, Any, List, Optional, Union
 import anthropic
 
+from keyword_engine import KeywordEngine, LEGAL_STOPWORDS
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable, with_retry
+
 logger = logging.getLogger(__name__)
 
 
 class KeywordAnalyzer:
     """Analyze documents for keywords and relevance"""
 
-    def __init__(self, client: anthropic.Anthropic):
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        engine: Optional[KeywordEngine] = None
+    ):
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
         self.model = 'claude-sonnet-4-5-20250929'
 
         # Common legal stopwords to filter
-        self.legal_stopwords = set([
-            'hereby', 'whereas', 'therefore', 'aforementioned',
-            'pursuant', 'notwithstanding', 'thereof', 'herein'
-        ])
+        self.legal_stopwords = set(LEGAL_STOPWORDS)
+
+        # Corpus-level TF-IDF over the current production
+        self.engine = engine or KeywordEngine()
+        # Statistical keywords of the primed production by text fingerprint
+        self._primed: Dict[bytes, Dict[str, Any]] = {}
 
     async def analyze(
         self,
@@ -41,20 +54,38 @@ class KeywordAnalyzer:
             Keywords with relevance scores and context
         """
         try:
-            # Extract basic keywords first
-            basic_keywords = self._extract_basic_keywords(text)
+            request = self.build_request(text, classification)
 
-            # Use Claude for semantic keyword extraction
-            prompt = self._build_keyword_prompt(text, classification)
+            async def attempt():
+                # Use Claude for semantic keyword extraction
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response, text)
 
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                temperature=0.0,
-                system=[
-                    {
-                        "type": "text",
-                        "text": """You are an expert legal keyword analyst. You identify the most relevant and important keywords, phrases, and concepts in legal documents. You understand:
+            return await with_retry(self.retry_policy, 'keywords', attempt)
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse keyword analysis response: {e}")
+            return self._fallback_keyword_analysis(text)
+        except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
+            logger.error(f"Keyword analysis error: {e}")
+            return self._fallback_keyword_analysis(text)
+
+    def build_request(
+        self,
+        text: str,
+        classification: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for keyword analysis"""
+        return {
+            'model': self.model,
+            'max_tokens': 2048,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": """You are an expert legal keyword analyst. You identify the most relevant and important keywords, phrases, and concepts in legal documents. You understand:
 
 - Legal terminology and concepts
 - Issue spotting and legal theories
@@ -67,40 +98,34 @@ You extract keywords that would be most useful for:
 - Issue identification
 - Case theory development
 - Evidence organization""",
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-
-            # Parse response
-            result_text = response.content[0].text
-            result = json.loads(result_text)
-
-            # Combine with basic keywords
-            result['basic_keywords'] = basic_keywords
-
-            # Add usage statistics
-            result['tokens_used'] = {
-                'input': response.usage.input_tokens,
-                'output': response.usage.output_tokens,
-                'cache_creation': getattr(response.usage, 'cache_creation_input_tokens', 0),
-                'cache_read': getattr(response.usage, 'cache_read_input_tokens', 0)
-            }
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_keyword_prompt(text, classification)
+                }
+            ]
+        }
 
-            return result
+    def parse_response(self, response: Any, text: str) -> Dict[str, Any]:
+        """
+        Parse a keyword analysis Message response
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse keyword analysis response: {e}")
-            return self._fallback_keyword_analysis(text)
-        except Exception as e:
-            logger.error(f"Keyword analysis error: {e}")
-            return self._fallback_keyword_analysis(text)
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
+
+        # Combine with basic keywords
+        result['basic_keywords'] = self._extract_basic_keywords(text)
+
+        # Add usage statistics
+        result['tokens_used'] = usage_tokens(response)
+
+        return result
 
     def _build_keyword_prompt(
         self,
@@ -228,69 +253,39 @@ CRITICAL RULES:
 
 Respond with ONLY the JSON object, no additional text."""
 
-    def _extract_basic_keywords(self, text: str) -> Dict[str, Any]:
-        """Extract basic keywords using statistical methods"""
-
-        # Clean and tokenize
-        text_lower = text.lower()
-
-        # Remove punctuation except hyphens (for terms like "attorney-client")
-        text_clean = re.sub(r'[^\w\s-]', ' ', text_lower)
-
-        # Tokenize
-        words = text_clean.split()
-
-        # Filter stopwords and short words
-        common_stopwords = set([
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
-            'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
-            'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this',
-            'that', 'these', 'those', 'it', 'its'
-        ])
-
-        filtered_words = [
-            word for word in words
-            if len(word) > 2 and word not in common_stopwords and word not in self.legal_stopwords
-        ]
-
-        # Count frequencies
-        word_freq = Counter(filtered_words)
-
-        # Get top keywords
-        top_keywords = [
-            {
-                'keyword': word,
-                'frequency': count,
-                'relevance': min(1.0, count / 10)  # Simple relevance heuristic
-            }
-            for word, count in word_freq.most_common(30)
-        ]
-
-        # Extract bigrams (two-word phrases)
-        bigrams = [
-            f"{filtered_words[i]} {filtered_words[i+1]}"
-            for i in range(len(filtered_words) - 1)
-        ]
-        bigram_freq = Counter(bigrams)
-
-        top_bigrams = [
-            {
-                'phrase': phrase,
-                'frequency': count,
-                'relevance': min(1.0, count / 5)
-            }
-            for phrase, count in bigram_freq.most_common(20)
-            if count > 1  # Only include repeated phrases
-        ]
+    def prime_corpus(self, texts: List[str]) -> int:
+        """
+        Score a production's statistical keywords before its documents are analyzed
 
-        return {
-            'top_keywords': top_keywords,
-            'top_phrases': top_bigrams,
-            'total_words': len(words),
-            'unique_words': len(word_freq),
-            'method': 'statistical'
+        The engine is reset, so IDF is relative to this production only, and
+        the whole batch is tokenized and scored in one pass; documents then
+        look up their keywords instead of being tokenized again.
+
+        Args:
+            texts: Document texts of the batch
+
+        Returns:
+            Number of distinct texts in the corpus
+        """
+        self.engine.reset()
+        basics = self.engine.extract(texts)
+        self._primed = {
+            KeywordEngine.fingerprint(text): basic
+            for text, basic in zip(texts, basics)
         }
+        return self.engine.n_documents
+
+    def corpus_id(self) -> str:
+        """Identifier of the corpus the statistical keywords are scored against"""
+        return self.engine.corpus_id()
+
+    def _extract_basic_keywords(self, text: str) -> Dict[str, Any]:
+        """Extract basic keywords by TF-IDF against the corpus seen so far"""
+        basic = self._primed.get(KeywordEngine.fingerprint(text))
+        if basic is None:
+            # Documents outside a primed production join the running corpus
+            basic = self.engine.extract([text])[0]
+        return basic
 
     def _fallback_keyword_analysis(self, text: str) -> Dict[str, Any]:
         """Fallback keyword analysis"""
@@ -315,6 +310,7 @@ Respond with ONLY the JSON object, no additional text."""
             'summary': 'Fallback keyword extraction used (semantic analysis unavailable)',
             'basic_keywords': basic,
             'method': 'fallback',
+            'degraded': True,
             'tokens_used': {
                 'input': 0,
                 'output': 0,
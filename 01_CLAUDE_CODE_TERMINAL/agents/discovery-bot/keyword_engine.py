@@ -0,0 +1,317 @@
+"""
+Keyword Engine - Corpus-level TF-IDF keywords and phrases over a sparse term-document matrix
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+COMMON_STOPWORDS = frozenset([
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+    'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
+    'would', 'should', 'could', 'may', 'might', 'must', 'can', 'this',
+    'that', 'these', 'those', 'it', 'its'
+])
+
+# Common legal stopwords to filter
+LEGAL_STOPWORDS = frozenset([
+    'hereby', 'whereas', 'therefore', 'aforementioned',
+    'pursuant', 'notwithstanding', 'thereof', 'herein'
+])
+
+STOPWORDS = COMMON_STOPWORDS | LEGAL_STOPWORDS
+
+# Runs of word characters and hyphens (keeps terms like "attorney-client")
+TOKEN_PATTERN = re.compile(r'[\w-]+')
+
+
+class TermMatrix(NamedTuple):
+    """
+    Sparse term-document counts in CSR layout
+
+    Row i's terms are term_ids[indptr[i]:indptr[i + 1]] with the matching
+    counts; term IDs index the engine's vocabulary.
+    """
+    indptr: np.ndarray
+    term_ids: np.ndarray
+    counts: np.ndarray
+
+
+class KeywordEngine:
+    """
+    TF-IDF keyword and bigram extraction over a whole production
+
+    Documents are tokenized once and their terms (unigrams and bigrams of
+    non-stopword tokens) mapped to a shared vocabulary. Each batch becomes a
+    sparse term-document matrix built with a single np.unique over
+    (document, term) pairs; document frequencies are accumulated per unique
+    text, and the IDF vector is cached until the corpus changes.
+
+    Scores are term frequency times smoothed IDF, so a document's top
+    keywords are the terms that distinguish it within the production, not
+    just its most frequent words. With a single-document corpus the ranking
+    reduces to plain frequency.
+    """
+
+    def __init__(self, max_keywords: int = 30, max_phrases: int = 20):
+        """
+        Args:
+            max_keywords: Keywords returned per document
+            max_phrases: Bigram phrases returned per document
+        """
+        self.max_keywords = max_keywords
+        self.max_phrases = max_phrases
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop the corpus and vocabulary, e.g. before the next production"""
+        # Unigram -> term ID, and (left ID << 32 | right ID) -> bigram term ID
+        self.vocabulary: Dict[str, int] = {}
+        self._bigrams: Dict[int, int] = {}
+        # Term text by ID; a phrase keeps its bigram key until first reported
+        self._terms: List[Union[str, int]] = []
+
+        # Per-term arrays, grown by doubling
+        self._document_frequency = np.zeros(0, dtype=np.int64)
+        self._is_phrase = np.zeros(0, dtype=bool)
+
+        self._seen = set()
+        # Order-independent digest of the counted texts
+        self._corpus_digest = 0
+        self.n_documents = 0
+
+        self._idf: Optional[np.ndarray] = None
+
+    @staticmethod
+    def fingerprint(text: str) -> bytes:
+        """Content key used to count each distinct text once"""
+        return hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=12).digest()
+
+    def tokenize(self, text: str) -> List[str]:
+        """Lowercased tokens longer than two characters, stopwords removed"""
+        return [
+            word for word in TOKEN_PATTERN.findall(text.lower())
+            if len(word) > 2 and word not in STOPWORDS
+        ]
+
+    def add_documents(self, texts: Iterable[str]) -> int:
+        """
+        Count texts into the corpus document frequencies
+
+        Texts already counted (by content) are skipped, so priming a batch
+        and then extracting from the same texts counts each only once.
+
+        Returns:
+            Number of texts added
+        """
+        with self._lock:
+            _, _, added = self._matrix(list(texts), update=True)
+        return int(added.sum())
+
+    def extract(self, texts: List[str], update: bool = True) -> List[Dict[str, Any]]:
+        """
+        Top TF-IDF keywords and phrases of each text
+
+        Args:
+            texts: Documents to score
+            update: Count unseen texts into the corpus first
+
+        Returns:
+            One dict per text: top_keywords, top_phrases, total_words,
+            unique_words, corpus_documents and method
+        """
+        with self._lock:
+            matrix, total_words, added = self._matrix(texts, update)
+            if added.any():
+                # The corpus just changed; weigh only this matrix's terms
+                df = self._document_frequency[matrix.term_ids]
+                weights = np.log((1 + self.n_documents) / (1 + df)) + 1.0
+            else:
+                weights = self.idf()[matrix.term_ids]
+            is_phrase = self._is_phrase[matrix.term_ids]
+            n_documents = self.n_documents
+
+        scores = matrix.counts * weights
+        n = len(texts)
+        lengths = np.diff(matrix.indptr)
+        rows = np.repeat(np.arange(n), lengths)
+        unique_words = np.bincount(rows[~is_phrase], minlength=n).tolist()
+
+        # Relevance is a term's score relative to its document's best term
+        top = np.ones(n)
+        nonempty = lengths > 0
+        top[nonempty] = np.maximum.reduceat(scores, matrix.indptr[:-1][nonempty])
+
+        # Only repeated phrases are reported
+        keep = ~is_phrase | (matrix.counts > 1)
+        rows, scores, is_phrase = rows[keep], scores[keep], is_phrase[keep]
+        term_ids, counts = matrix.term_ids[keep], matrix.counts[keep]
+
+        # One sort groups each document's keywords, then its phrases, by descending score
+        order = np.lexsort((-scores, is_phrase, rows))
+        groups = rows[order] * 2 + is_phrase[order]
+        starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.append(starts, len(order))))
+        order = order[rank < np.where(is_phrase[order], self.max_phrases, self.max_keywords)]
+
+        results = [
+            {
+                'top_keywords': [],
+                'top_phrases': [],
+                'total_words': total_words[i],
+                'unique_words': unique_words[i],
+                'corpus_documents': n_documents,
+                'method': 'tfidf'
+            }
+            for i in range(n)
+        ]
+        for row, phrase, term_id, count, score, relevance in zip(
+            rows[order].tolist(),
+            is_phrase[order].tolist(),
+            term_ids[order].tolist(),
+            counts[order].tolist(),
+            np.round(scores[order], 4).tolist(),
+            np.round(scores[order] / top[rows[order]], 4).tolist()
+        ):
+            if phrase:
+                results[row]['top_phrases'].append({
+                    'phrase': self._term(term_id),
+                    'frequency': count,
+                    'relevance': relevance,
+                    'tfidf': score
+                })
+            else:
+                results[row]['top_keywords'].append({
+                    'keyword': self._term(term_id),
+                    'frequency': count,
+                    'relevance': relevance,
+                    'tfidf': score
+                })
+
+        return results
+
+    def idf(self) -> np.ndarray:
+        """Smoothed IDF per vocabulary term, cached until the corpus changes"""
+        if self._idf is None or len(self._idf) != len(self._terms):
+            df = self._document_frequency[:len(self._terms)]
+            self._idf = np.log((1 + self.n_documents) / (1 + df)) + 1.0
+        return self._idf
+
+    def corpus_id(self) -> str:
+        """Identifier of the set of counted texts; changes whenever the IDF does"""
+        return f"{self.n_documents}-{self._corpus_digest:024x}"
+
+    def statistics(self) -> Dict[str, Any]:
+        """Corpus size and vocabulary size"""
+        return {
+            'documents': self.n_documents,
+            'vocabulary': len(self._terms),
+            'phrases': len(self._bigrams)
+        }
+
+    def _term(self, term_id: int) -> str:
+        """Text of a term, building a phrase's text on first use"""
+        term = self._terms[term_id]
+        if isinstance(term, int):
+            term = f"{self._terms[term >> 32]} {self._terms[term & 0xFFFFFFFF]}"
+            self._terms[term_id] = term
+        return term
+
+    def _register(self, terms: List[Union[str, int]], phrase: bool) -> None:
+        """Append new terms to the per-term arrays (caller holds the lock)"""
+        self._terms.extend(terms)
+        needed = len(self._terms)
+        if len(self._document_frequency) < needed:
+            capacity = max(needed, 2 * len(self._document_frequency))
+            for name, dtype in [('_document_frequency', np.int64), ('_is_phrase', bool)]:
+                grown = np.zeros(capacity, dtype=dtype)
+                current = getattr(self, name)
+                grown[:len(current)] = current
+                setattr(self, name, grown)
+        self._is_phrase[needed - len(terms):needed] = phrase
+
+    def _matrix(self, texts: List[str], update: bool):
+        """
+        Build the term-document matrix of texts (caller holds the lock)
+
+        Returns:
+            (TermMatrix, total token count per text, mask of texts added to the corpus)
+        """
+        vocabulary = self.vocabulary
+        total_words = []
+        lengths = []
+        flat: List[str] = []
+        for text in texts:
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            words = [word for word in tokens if len(word) > 2 and word not in STOPWORDS]
+            total_words.append(len(tokens))
+            lengths.append(len(words))
+            flat.extend(words)
+
+        # New unigrams get IDs in first-occurrence order
+        new_words = [word for word in dict.fromkeys(flat) if word not in vocabulary]
+        if new_words:
+            vocabulary.update(zip(new_words, range(len(self._terms), len(self._terms) + len(new_words))))
+            self._register(new_words, phrase=False)
+
+        word_ids = np.fromiter(map(vocabulary.__getitem__, flat), dtype=np.int64, count=len(flat))
+        word_rows = np.repeat(np.arange(len(texts)), lengths)
+
+        # Bigrams are adjacent word pairs within one document, keyed by their word IDs
+        same_row = word_rows[1:] == word_rows[:-1]
+        bigram_rows = word_rows[1:][same_row]
+        keys, inverse = np.unique(
+            (word_ids[:-1][same_row] << 32) | word_ids[1:][same_row],
+            return_inverse=True
+        )
+        keys = keys.tolist()
+        new_bigrams = [key for key in keys if key not in self._bigrams]
+        if new_bigrams:
+            self._bigrams.update(zip(new_bigrams, range(len(self._terms), len(self._terms) + len(new_bigrams))))
+            # Phrases hold their key until their text is first needed
+            self._register(new_bigrams, phrase=True)
+        bigram_ids = np.fromiter(map(self._bigrams.__getitem__, keys), dtype=np.int64, count=len(keys))
+
+        # Unique (document, term) pairs with their counts, in row-major order
+        n_terms = max(len(self._terms), 1)
+        pairs, counts = np.unique(
+            np.concatenate((word_rows, bigram_rows)) * n_terms
+            + np.concatenate((word_ids, bigram_ids[inverse.ravel()])),
+            return_counts=True
+        )
+        pair_rows = pairs // n_terms
+        matrix = TermMatrix(
+            indptr=np.concatenate(([0], np.cumsum(np.bincount(pair_rows, minlength=len(texts))))),
+            term_ids=pairs % n_terms,
+            counts=counts
+        )
+
+        added = np.zeros(len(texts), dtype=bool)
+        if update:
+            for i, text in enumerate(texts):
+                if not text:
+                    continue
+                fingerprint = self.fingerprint(text)
+                if fingerprint not in self._seen:
+                    self._seen.add(fingerprint)
+                    self._corpus_digest ^= int.from_bytes(fingerprint, 'big')
+                    added[i] = True
+
+            if added.any():
+                self._document_frequency[:len(self._terms)] += np.bincount(
+                    matrix.term_ids[added[pair_rows]], minlength=len(self._terms)
+                )
+                self.n_documents += int(added.sum())
+                self._idf = None
+
+        return matrix, total_words, added
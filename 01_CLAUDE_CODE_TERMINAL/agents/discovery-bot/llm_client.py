@@ -0,0 +1,131 @@
+"""
+LLM Client - Shared async Anthropic client with a bounded connection pool
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, Dict, Optional
+import anthropic
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def create_async_client(
+    api_key: str,
+    max_connections: int = 10,
+    base_url: Optional[str] = None,
+    timeout: float = 120.0,
+    max_retries: int = 2
+) -> anthropic.AsyncAnthropic:
+    """
+    Create a shared AsyncAnthropic client backed by a bounded HTTP pool
+
+    Args:
+        api_key: Anthropic API key
+        max_connections: Maximum concurrent HTTP connections to the API
+        base_url: Optional API base URL override (e.g. a local stub server)
+        timeout: Request timeout in seconds
+        max_retries: SDK-level retries (0 when an AdaptiveRateLimiter owns retries)
+
+    Returns:
+        AsyncAnthropic client safe to share across all analyzers
+    """
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        ),
+        timeout=timeout
+    )
+
+    client_kwargs = {
+        'api_key': api_key,
+        'http_client': http_client,
+        'max_retries': max_retries
+    }
+    if base_url:
+        client_kwargs['base_url'] = base_url
+
+    logger.info(f"Created async Anthropic client (max_connections={max_connections})")
+
+    return anthropic.AsyncAnthropic(**client_kwargs)
+
+
+async def create_message(client: Any, rate_limiter: Optional[Any] = None, **kwargs) -> Any:
+    """
+    Call messages.create without blocking the event loop
+
+    Async clients are awaited directly. Synchronous clients are run in a
+    worker thread so that concurrent documents still overlap.
+
+    With a rate limiter, the call waits for a concurrency slot and token
+    budget, feeds the response's rate-limit headers back to the limiter,
+    and retries 429 (rate limited) and 529 (overloaded) responses after the
+    limiter's back-off.
+
+    Args:
+        client: anthropic.AsyncAnthropic or anthropic.Anthropic instance
+        rate_limiter: Optional AdaptiveRateLimiter shared by all analyzers
+        **kwargs: Arguments for messages.create
+
+    Returns:
+        Anthropic Message response
+    """
+    if rate_limiter is None:
+        return await _call(client.messages.create, client, kwargs)
+
+    raw_create = getattr(getattr(client.messages, 'with_raw_response', None), 'create', None)
+    input_estimate = rate_limiter.estimate_input_tokens(kwargs)
+    attempt = 0
+
+    while True:
+        try:
+            async with rate_limiter.slot(input_estimate):
+                if raw_create is None:
+                    response, headers = await _call(client.messages.create, client, kwargs), None
+                else:
+                    raw = await _call(raw_create, client, kwargs)
+                    response, headers = raw.parse(), raw.headers
+
+            rate_limiter.record_success(headers, usage_tokens(response), input_estimate)
+            return response
+
+        except anthropic.APIStatusError as e:
+            if e.status_code not in rate_limiter.RETRYABLE_STATUS or attempt >= rate_limiter.max_retries:
+                raise
+
+            attempt += 1
+            rate_limiter.counters['retries'] += 1
+            delay = rate_limiter.record_rate_limited(e.status_code, e.response.headers, attempt)
+            logger.warning(
+                f"API returned {e.status_code}; retry {attempt}/{rate_limiter.max_retries} in {delay:.1f}s"
+            )
+
+
+async def _call(create: Any, client: Any, kwargs: Dict[str, Any]) -> Any:
+    """Await create directly for async clients, in a worker thread otherwise"""
+    if isinstance(client, anthropic.AsyncAnthropic) or inspect.iscoroutinefunction(create):
+        return await create(**kwargs)
+
+    return await asyncio.to_thread(create, **kwargs)
+
+
+def usage_tokens(response: Any) -> Dict[str, int]:
+    """
+    Extract token usage from a Message response
+
+    Args:
+        response: Anthropic Message (or compatible object with .usage)
+
+    Returns:
+        Token counts in the tokens_used schema shared by all stages
+    """
+    usage = response.usage
+    return {
+        'input': usage.input_tokens,
+        'output': usage.output_tokens,
+        'cache_creation': getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+        'cache_read': getattr(usage, 'cache_read_input_tokens', 0) or 0
+    }
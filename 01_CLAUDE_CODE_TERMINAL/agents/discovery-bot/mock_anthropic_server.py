@@ -0,0 +1,275 @@
+"""
+Mock Anthropic Server - Local stand-in for the Messages and Message Batches APIs
+Used by benchmark.py and for running batch mode end-to-end without network access
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import deque
+from typing import Dict, Any, Deque, Optional
+
+
+# Single JSON body that satisfies every stage's parser
+STUB_RESULT = {
+    'document_type': 'email',
+    'confidence': 0.9,
+    'sub_type': 'correspondence',
+    'indicators': [],
+    'characteristics': [],
+    'people': [],
+    'organizations': [],
+    'dates': [],
+    'amounts': [],
+    'locations': [],
+    'is_privileged': False,
+    'privilege_types': [],
+    'primary_keywords': [],
+    'secondary_keywords': [],
+    'key_phrases': [],
+    'summary': 'Stub summary for benchmarking.',
+    'key_concepts': [],
+    'semantic_tags': []
+}
+
+# Combined response for FusedAnalyzer prompts
+FUSED_STUB_RESULT = {
+    'classification': {'document_type': 'email', 'confidence': 0.9, 'sub_type': 'correspondence'},
+    'entities': {'people': [], 'organizations': [], 'dates': [], 'amounts': [], 'locations': []},
+    'privilege': {'is_privileged': False, 'privilege_types': [], 'confidence': 0.9},
+    'keywords': {'primary_keywords': [], 'secondary_keywords': [], 'key_phrases': []},
+    'semantic_summary': {'summary': 'Stub summary for benchmarking.', 'key_concepts': [], 'semantic_tags': []}
+}
+
+BATCH_PATH = re.compile(r'^/v1/messages/batches/(?P<batch_id>[\w-]+)(?P<action>/results|/cancel)?$')
+
+
+def stub_message(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a Message response for messages.create params"""
+    fused = any('"semantic_summary"' in str(message.get('content')) for message in params.get('messages', []))
+    result = FUSED_STUB_RESULT if fused else STUB_RESULT
+
+    return {
+        'id': f"msg_{uuid.uuid4().hex[:24]}",
+        'type': 'message',
+        'role': 'assistant',
+        'model': params.get('model', 'stub'),
+        'content': [{'type': 'text', 'text': json.dumps(result)}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': {'input_tokens': 500, 'output_tokens': 100}
+    }
+
+
+def make_handler(
+    latency: float,
+    batch_latency: float,
+    rpm: Optional[int] = None,
+    error_rate: float = 0.0
+):
+    """
+    Build a request handler for the mock API
+
+    Args:
+        latency: Delay before answering each /v1/messages request (seconds)
+        batch_latency: Time a submitted batch stays in_progress (seconds)
+        rpm: Requests per minute before /v1/messages answers 429 (None for unlimited)
+        error_rate: Fraction of /v1/messages requests answered with a 500
+    """
+    batches: Dict[str, Dict[str, Any]] = {}
+    lock = threading.Lock()
+    request_times: Deque[float] = deque()
+
+    class MockAnthropicHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            request = self._read_json()
+
+            if self.path == '/v1/messages':
+                headers = self._rate_limit_headers()
+                if headers.get('retry-after'):
+                    return self._send_error(429, 'Number of requests has exceeded your rate limit', headers)
+                time.sleep(latency)
+                if random.random() < error_rate:
+                    return self._send_error(500, 'Internal server error', headers)
+                return self._send_json(stub_message(request), headers)
+
+            if self.path == '/v1/messages/batches':
+                batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+                with lock:
+                    batches[batch_id] = {
+                        'requests': request.get('requests', []),
+                        'created_at': datetime.now(timezone.utc),
+                        'canceled': False
+                    }
+                return self._send_json(self._batch_object(batch_id))
+
+            match = BATCH_PATH.match(self.path)
+            if match and match.group('action') == '/cancel' and match.group('batch_id') in batches:
+                with lock:
+                    batches[match.group('batch_id')]['canceled'] = True
+                return self._send_json(self._batch_object(match.group('batch_id')))
+
+            self._send_error(404, f"Unknown endpoint: {self.path}")
+
+        def do_GET(self):
+            match = BATCH_PATH.match(self.path)
+            if not match or match.group('batch_id') not in batches:
+                return self._send_error(404, f"Unknown endpoint: {self.path}")
+
+            batch_id = match.group('batch_id')
+
+            if match.group('action') == '/results':
+                if not self._is_ended(batch_id):
+                    return self._send_error(400, 'Batch is still processing')
+
+                lines = []
+                for req in batches[batch_id]['requests']:
+                    if batches[batch_id]['canceled']:
+                        result = {'type': 'canceled'}
+                    else:
+                        result = {'type': 'succeeded', 'message': stub_message(req.get('params', {}))}
+                    lines.append(json.dumps({'custom_id': req['custom_id'], 'result': result}))
+
+                return self._send_body('\n'.join(lines).encode(), 'application/binary')
+
+            return self._send_json(self._batch_object(batch_id))
+
+        def _rate_limit_headers(self) -> Dict[str, str]:
+            """Sliding one-minute request window; retry-after is set once it is full"""
+            if not rpm:
+                return {}
+
+            with lock:
+                now = time.monotonic()
+                while request_times and now - request_times[0] >= 60:
+                    request_times.popleft()
+
+                headers = {'anthropic-ratelimit-requests-limit': str(rpm)}
+                if len(request_times) >= rpm:
+                    headers['anthropic-ratelimit-requests-remaining'] = '0'
+                    headers['retry-after'] = str(max(1, int(60 - (now - request_times[0])) + 1))
+                else:
+                    request_times.append(now)
+                    headers['anthropic-ratelimit-requests-remaining'] = str(rpm - len(request_times))
+
+            return headers
+
+        def _is_ended(self, batch_id: str) -> bool:
+            batch = batches[batch_id]
+            elapsed = (datetime.now(timezone.utc) - batch['created_at']).total_seconds()
+            return batch['canceled'] or elapsed >= batch_latency
+
+        def _batch_object(self, batch_id: str) -> Dict[str, Any]:
+            batch = batches[batch_id]
+            ended = self._is_ended(batch_id)
+            count = len(batch['requests'])
+            host = self.headers.get('Host', 'localhost')
+
+            return {
+                'id': batch_id,
+                'type': 'message_batch',
+                'processing_status': 'ended' if ended else 'in_progress',
+                'request_counts': {
+                    'processing': 0 if ended else count,
+                    'succeeded': count if ended and not batch['canceled'] else 0,
+                    'errored': 0,
+                    'canceled': count if batch['canceled'] else 0,
+                    'expired': 0
+                },
+                'created_at': batch['created_at'].isoformat(),
+                'expires_at': (batch['created_at'] + timedelta(hours=24)).isoformat(),
+                'ended_at': datetime.now(timezone.utc).isoformat() if ended else None,
+                'archived_at': None,
+                'cancel_initiated_at': None,
+                'results_url': f"http://{host}/v1/messages/batches/{batch_id}/results" if ended else None
+            }
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _send_json(self, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            self._send_body(json.dumps(payload).encode(), 'application/json', headers=headers)
+
+        def _send_error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps({
+                'type': 'error',
+                'error': {
+                    'type': {429: 'rate_limit_error', 500: 'api_error'}.get(status, 'invalid_request_error'),
+                    'message': message
+                }
+            }).encode()
+            self._send_body(body, 'application/json', status, headers)
+
+        def _send_body(
+            self,
+            body: bytes,
+            content_type: str,
+            status: int = 200,
+            headers: Optional[Dict[str, str]] = None
+        ) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockAnthropicHandler
+
+
+def start_mock_server(
+    latency: float = 0.05,
+    batch_latency: float = 1.0,
+    port: int = 0,
+    rpm: Optional[int] = None,
+    error_rate: float = 0.0
+) -> ThreadingHTTPServer:
+    """
+    Start the mock API server in a background thread
+
+    Args:
+        latency: Delay per /v1/messages request (seconds)
+        batch_latency: Time a batch stays in_progress (seconds)
+        port: Port to bind (0 for an ephemeral port)
+        rpm: Requests per minute before answering 429 (None for unlimited)
+        error_rate: Fraction of Messages API requests answered with a 500
+
+    Returns:
+        Running server; base URL is http://127.0.0.1:{server.server_address[1]}
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency, batch_latency, rpm, error_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.05, help='Messages API latency in seconds')
+    parser.add_argument('--batch-latency', type=float, default=1.0, help='Seconds before a batch ends')
+    parser.add_argument('--rpm', type=int, default=None, help='Requests per minute before returning 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+    args = parser.parse_args()
+
+    server = start_mock_server(args.latency, args.batch_latency, args.port, args.rpm, args.error_rate)
+    print(f"Mock Anthropic API listening on http://127.0.0.1:{server.server_address[1]}")
+    print("Set config['api_base_url'] to this URL. Press Ctrl+C to stop.")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
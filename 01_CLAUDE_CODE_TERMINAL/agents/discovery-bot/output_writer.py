@@ -0,0 +1,201 @@
+"""
+Output Writer - Streaming JSONL output with an offset index for batch results
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from timeline_records import serialize
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    """One compact JSON line"""
+    return json.dumps(record, separators=(',', ':'), default=serialize).encode() + b'\n'
+
+
+class ResultWriter:
+    """
+    Append-only JSONL file of results plus an offset index
+
+    Every result is written as one compact line the moment it is handed
+    over. The index holds one line per result with its document ID, byte
+    offset and length, so readers can seek straight to any document without
+    parsing the rest of the file.
+    """
+
+    def __init__(self, path: str, index_path: str):
+        """
+        Args:
+            path: Results JSONL file (appended to if it exists)
+            index_path: Index JSONL file (appended to if it exists)
+        """
+        self.path = Path(path)
+        self.index_path = Path(index_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._results = open(self.path, 'ab')
+        self._index = open(self.index_path, 'ab')
+        self.written: Dict[str, Tuple[int, int]] = {}
+
+    def write(self, result: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Append a result and its index entry
+
+        Returns:
+            (offset, length) of the result line
+        """
+        line = _encode(result)
+        document_id = result.get('document_id')
+
+        with self._lock:
+            offset = self._results.tell()
+            self._results.write(line)
+            self._results.flush()
+
+            # The index line follows the result it points at
+            self._index.write(_encode({'document_id': document_id, 'offset': offset, 'length': len(line)}))
+            self._index.flush()
+
+            self.written[document_id] = (offset, len(line))
+
+        return offset, len(line)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.written
+
+    def close(self) -> None:
+        with self._lock:
+            self._results.close()
+            self._index.close()
+
+
+class ResultReader:
+    """Random and sequential access to a ResultWriter's output"""
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        """
+        Args:
+            path: Results JSONL file
+            index_path: Index file (default: results.index.jsonl next to path)
+        """
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else self.path.with_suffix('.index.jsonl')
+
+        # Later entries for the same document supersede earlier ones
+        self.index: Dict[str, Tuple[int, int]] = {}
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.index[entry['document_id']] = (entry['offset'], entry['length'])
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Read one document's result by seeking to its offset"""
+        if document_id not in self.index:
+            return None
+
+        offset, length = self.index[document_id]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream every result in file order"""
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class BatchOutputWriter:
+    """
+    Output directory of one batch run
+
+    - results.jsonl / results.index.jsonl: per-document results (ResultWriter)
+    - timeline.jsonl: one timeline event per line, chronological
+    - summary.json: summary, statistics and configuration, plus the
+      timeline without its events; the year and month groupings are
+      line ranges of timeline.jsonl
+    """
+
+    RESULTS = 'results.jsonl'
+    INDEX = 'results.index.jsonl'
+    TIMELINE = 'timeline.jsonl'
+    SUMMARY = 'summary.json'
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Output directory (created if needed)
+        """
+        self.directory = Path(directory)
+        self.results = ResultWriter(self.directory / self.RESULTS, self.directory / self.INDEX)
+
+    def write_result(self, result: Dict[str, Any]) -> None:
+        """Stream one result to results.jsonl"""
+        self.results.write(result)
+
+    def write_missing(self, results) -> int:
+        """
+        Write results not streamed yet (e.g. restored or duplicate documents)
+
+        Returns:
+            Number of results written
+        """
+        written = 0
+        for result in results:
+            if result.get('document_id') not in self.results:
+                self.results.write(result)
+                written += 1
+        return written
+
+    def write_timeline(self, timeline: Dict[str, Any]) -> None:
+        """Write timeline events, one per line"""
+        with open(self.directory / self.TIMELINE, 'wb') as f:
+            for event in timeline.get('events', []):
+                f.write(_encode(event))
+
+    def write_summary(self, output: Dict[str, Any]) -> str:
+        """
+        Write everything except the per-document results and timeline events
+
+        Args:
+            output: Batch output as returned by process_batch
+
+        Returns:
+            Path of the output directory
+        """
+        summary = {key: value for key, value in output.items() if key != 'results'}
+
+        timeline = output.get('timeline', {})
+        summary['timeline'] = {key: value for key, value in timeline.items() if key != 'events'}
+        # Type groupings list every event's index; their counts are enough here
+        summary['timeline']['events_by_type'] = {
+            event_type: {'count': view['count']}
+            for event_type, view in timeline.get('events_by_type', {}).items()
+        }
+
+        summary['files'] = {
+            'results': self.RESULTS,
+            'index': self.INDEX,
+            'timeline': self.TIMELINE
+        }
+
+        tmp_path = self.directory / f"{self.SUMMARY}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, indent=2, default=serialize)
+        tmp_path.replace(self.directory / self.SUMMARY)
+
+        return str(self.directory)
+
+    def close(self) -> None:
+        self.results.close()
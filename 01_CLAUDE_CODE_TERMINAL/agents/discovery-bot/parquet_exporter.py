@@ -0,0 +1,408 @@
+"""
+Parquet Exporter - Flatten discovery results into partitioned columnar tables
+"""
+
+import logging
+import threading
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+
+# Entity sections of the extraction output, their entity_type and value field
+# (dates are exported to their own table)
+ENTITY_SECTIONS = {
+    'people': ('person', 'name'),
+    'organizations': ('organization', 'name'),
+    'amounts': ('amount', 'amount'),
+    'locations': ('location', 'location'),
+    'case_identifiers': ('case_identifier', 'identifier'),
+    'other_entities': ('other', 'value')
+}
+
+
+def _schemas() -> Dict[str, 'pa.Schema']:
+    """Column types of every exported table"""
+    strings = pa.list_(pa.string())
+
+    return {
+        'documents': pa.schema([
+            ('document_id', pa.string()),
+            ('document_type', pa.string()),
+            ('classification_confidence', pa.float64()),
+            ('sub_type', pa.string()),
+            ('needs_review', pa.bool_()),
+            ('is_privileged', pa.bool_()),
+            ('privilege_types', strings),
+            ('privilege_confidence', pa.float64()),
+            ('needs_attorney_review', pa.bool_()),
+            ('redaction_recommended', pa.bool_()),
+            ('privilege_method', pa.string()),
+            ('custodian', pa.string()),
+            ('source_file', pa.string()),
+            ('source_system', pa.string()),
+            ('bates_number', pa.string()),
+            ('production_number', pa.string()),
+            ('overall_relevance', pa.float64()),
+            ('discovery_value', pa.string()),
+            ('key_issues', strings),
+            ('primary_keywords', strings),
+            ('secondary_keywords', strings),
+            ('key_phrases', strings),
+            ('total_entities', pa.int32()),
+            ('duplicate_of', pa.string()),
+            ('duplicate_type', pa.string()),
+            ('processing_mode', pa.string()),
+            ('model_used', pa.string()),
+            ('processed_at', pa.timestamp('us')),
+            ('total_cost', pa.float64()),
+            ('input_tokens', pa.int64()),
+            ('output_tokens', pa.int64()),
+            ('status', pa.string()),
+            ('error', pa.string())
+        ]),
+        'entities': pa.schema([
+            ('document_id', pa.string()),
+            ('entity_type', pa.string()),
+            ('value', pa.string()),
+            ('normalized_value', pa.string()),
+            ('subtype', pa.string()),
+            ('role', pa.string()),
+            ('confidence', pa.float64()),
+            ('position', pa.int64()),
+            ('normalized_usd', pa.float64()),
+            ('context', pa.string())
+        ]),
+        'dates': pa.schema([
+            ('document_id', pa.string()),
+            ('date', pa.date32()),
+            ('year', pa.int16()),
+            ('date_text', pa.string()),
+            ('original_format', pa.string()),
+            ('context', pa.string()),
+            ('confidence', pa.float64()),
+            ('position', pa.int64())
+        ]),
+        'privilege_indicators': pa.schema([
+            ('document_id', pa.string()),
+            ('indicator', pa.string()),
+            ('evidence', pa.string()),
+            ('weight', pa.string())
+        ])
+    }
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _bool(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in ('true', 'yes', 'y', '1'):
+        return True
+    if text in ('false', 'no', 'n', '0', ''):
+        return False
+    return None
+
+
+def _str(value: Any) -> Optional[str]:
+    return str(value) if value is not None else None
+
+
+def _date(value: Any) -> Optional[date]:
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _terms(items: Any, field: str) -> List[str]:
+    """Keyword or phrase strings from a list of dicts or plain strings"""
+    terms = []
+    for item in items or []:
+        term = item.get(field) if isinstance(item, dict) else item
+        if term:
+            terms.append(str(term))
+    return terms
+
+
+class ParquetExporter:
+    """
+    Partitioned Parquet dataset of one batch run
+
+    Results are flattened into four tables, each a hive-partitioned
+    directory that pandas, DuckDB and pyarrow.dataset read directly:
+    - documents/document_type=*/: one row per document (classification,
+      privilege, source, keywords, cost); failed documents have status 'failed'
+    - entities/entity_type=*/: one row per extracted entity
+    - dates/year=*/: one row per extracted date, typed as date32
+    - privilege_indicators/: one row per privilege indicator
+
+    Rows are buffered per table and written as a new file in each partition
+    every flush_rows rows, so the export keeps pace with the batch stream
+    and memory stays bounded regardless of matter size.
+    """
+
+    TABLES = ('documents', 'entities', 'dates', 'privilege_indicators')
+    PARTITIONS = {
+        'documents': ['document_type'],
+        'entities': ['entity_type'],
+        'dates': ['year'],
+        'privilege_indicators': []
+    }
+
+    def __init__(self, directory: str, flush_rows: int = 100_000):
+        """
+        Args:
+            directory: Dataset root (one subdirectory per table)
+            flush_rows: Buffered rows per table before a file is written
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if pa is None:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_rows = flush_rows
+        self.schemas = _schemas()
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {table: [] for table in self.TABLES}
+        self._flushes = {table: 0 for table in self.TABLES}
+        # Unique file prefix, so several exports can share a dataset root
+        self._token = uuid.uuid4().hex[:8]
+
+        self.exported = set()
+        self.row_counts = {table: 0 for table in self.TABLES}
+        self.dropped_rows = {table: 0 for table in self.TABLES}
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Flatten one result into the table buffers, flushing full buffers"""
+        document_id = result.get('document_id')
+
+        with self._lock:
+            if document_id in self.exported:
+                return
+            self.exported.add(document_id)
+
+            rows = {
+                'documents': [self._document_row(result)],
+                'entities': [],
+                'dates': [],
+                'privilege_indicators': []
+            }
+            if 'error' not in result:
+                rows['entities'] = self._entity_rows(document_id, result.get('entities') or {})
+                rows['dates'] = self._date_rows(document_id, (result.get('entities') or {}).get('dates'))
+                rows['privilege_indicators'] = self._indicator_rows(document_id, result.get('privilege') or {})
+
+            for table, table_rows in rows.items():
+                self._buffers[table].extend(table_rows)
+                if len(self._buffers[table]) >= self.flush_rows:
+                    self._flush(table)
+
+    def write_missing(self, results: Iterable[Dict[str, Any]]) -> int:
+        """
+        Export results not written yet (e.g. restored or duplicate documents)
+
+        Returns:
+            Number of results exported
+        """
+        written = 0
+        for result in results:
+            if result.get('document_id') not in self.exported:
+                self.write(result)
+                written += 1
+        return written
+
+    def close(self) -> None:
+        """Flush every remaining buffered row"""
+        with self._lock:
+            for table in self.TABLES:
+                self._flush(table)
+
+                # Readers of a table that never received rows still get its schema
+                table_dir = self.directory / table
+                if not table_dir.exists():
+                    table_dir.mkdir(parents=True)
+                    pq.write_table(self.schemas[table].empty_table(), table_dir / f"part-{self._token}-empty.parquet")
+
+    def summary(self) -> Dict[str, Any]:
+        """Dataset location and rows written per table"""
+        return {
+            'path': str(self.directory),
+            'tables': {table: str(self.directory / table) for table in self.TABLES},
+            'row_counts': dict(self.row_counts),
+            'dropped_rows': dict(self.dropped_rows)
+        }
+
+    def _flush(self, table: str) -> None:
+        """
+        Write a table's buffered rows as one new file per partition
+
+        Rows that cannot be converted or written are logged and dropped, so
+        one bad flush never blocks every later flush or close().
+        """
+        rows = self._buffers[table]
+        if not rows:
+            return
+
+        self._buffers[table] = []
+        basename = f"part-{self._token}-{self._flushes[table]:05d}-{{i}}.parquet"
+        partitions = self.PARTITIONS[table]
+
+        try:
+            arrow_table = pa.Table.from_pylist(rows, schema=self.schemas[table])
+
+            if partitions:
+                pq.write_to_dataset(
+                    arrow_table,
+                    self.directory / table,
+                    partition_cols=partitions,
+                    basename_template=basename,
+                    existing_data_behavior='overwrite_or_ignore'
+                )
+            else:
+                (self.directory / table).mkdir(parents=True, exist_ok=True)
+                pq.write_table(arrow_table, self.directory / table / basename.format(i=0))
+
+        except (pa.ArrowException, OSError) as e:
+            self.dropped_rows[table] += len(rows)
+            logger.error(f"Dropped {len(rows)} {table} rows that could not be exported: {e}")
+            return
+
+        self._flushes[table] += 1
+        self.row_counts[table] += len(rows)
+        logger.debug(f"Exported {len(rows)} {table} rows to {self.directory / table}")
+
+    def _document_row(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        classification = result.get('classification') or {}
+        privilege = result.get('privilege') or {}
+        source = result.get('source') or {}
+        keywords = result.get('keywords') or {}
+        relevance = keywords.get('relevance_analysis') or {}
+        summary = (result.get('entities') or {}).get('extraction_summary') or {}
+        cost = result.get('cost') or {}
+        tokens = cost.get('tokens') or {}
+
+        return {
+            'document_id': result.get('document_id'),
+            'document_type': _str(classification.get('document_type')),
+            'classification_confidence': _float(classification.get('confidence')),
+            'sub_type': _str(classification.get('sub_type')),
+            'needs_review': _bool(classification.get('needs_review')),
+            'is_privileged': _bool(privilege.get('is_privileged')),
+            'privilege_types': [str(t) for t in privilege.get('privilege_types') or []],
+            'privilege_confidence': _float(privilege.get('confidence')),
+            'needs_attorney_review': _bool(privilege.get('needs_attorney_review')),
+            'redaction_recommended': _bool(privilege.get('redaction_recommended')),
+            'privilege_method': _str(privilege.get('method')),
+            'custodian': _str(source.get('custodian')),
+            'source_file': _str(source.get('source_file')),
+            'source_system': _str(source.get('source_system')),
+            'bates_number': _str(source.get('bates_number')),
+            'production_number': _str(source.get('production_number')),
+            'overall_relevance': _float(relevance.get('overall_relevance')),
+            'discovery_value': _str(relevance.get('discovery_value')),
+            'key_issues': _terms(relevance.get('key_issues'), 'issue'),
+            'primary_keywords': _terms(keywords.get('primary_keywords'), 'keyword'),
+            'secondary_keywords': _terms(keywords.get('secondary_keywords'), 'keyword'),
+            'key_phrases': _terms(keywords.get('key_phrases'), 'phrase'),
+            'total_entities': _int(summary.get('total_entities')),
+            'duplicate_of': _str(result.get('duplicate_of')),
+            'duplicate_type': _str(result.get('duplicate_type')),
+            'processing_mode': _str(result.get('processing_mode')),
+            'model_used': _str(result.get('model_used')),
+            'processed_at': _timestamp(result.get('processed_at')),
+            'total_cost': _float(cost.get('total_cost')),
+            'input_tokens': _int(tokens.get('input')),
+            'output_tokens': _int(tokens.get('output')),
+            'status': result.get('status', 'failed' if 'error' in result else 'completed'),
+            'error': _str(result.get('error'))
+        }
+
+    def _entity_rows(self, document_id: str, entities: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = []
+        for section, (entity_type, value_field) in ENTITY_SECTIONS.items():
+            for entity in entities.get(section) or []:
+                if not isinstance(entity, dict):
+                    continue
+                value = _str(entity.get(value_field))
+                rows.append({
+                    'document_id': document_id,
+                    'entity_type': entity_type,
+                    'value': value,
+                    'normalized_value': ' '.join(value.lower().split()) if value else None,
+                    'subtype': _str(entity.get('entity_type') or entity.get('type') or entity.get('title')),
+                    'role': _str(entity.get('role')),
+                    'confidence': _float(entity.get('confidence')),
+                    'position': _int(entity.get('first_mention_position', entity.get('position'))),
+                    'normalized_usd': _float(entity.get('normalized_usd')),
+                    'context': _str(entity.get('context'))
+                })
+        return rows
+
+    def _date_rows(self, document_id: str, dates: Any) -> List[Dict[str, Any]]:
+        rows = []
+        for entity in dates or []:
+            if not isinstance(entity, dict):
+                continue
+            parsed = _date(entity.get('date'))
+            rows.append({
+                'document_id': document_id,
+                'date': parsed,
+                'year': parsed.year if parsed else None,
+                'date_text': _str(entity.get('date')),
+                'original_format': _str(entity.get('original_format')),
+                'context': _str(entity.get('context')),
+                'confidence': _float(entity.get('confidence')),
+                'position': _int(entity.get('position'))
+            })
+        return rows
+
+    def _indicator_rows(self, document_id: str, privilege: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = []
+        for indicator in privilege.get('privilege_indicators') or []:
+            if isinstance(indicator, dict):
+                rows.append({
+                    'document_id': document_id,
+                    'indicator': _str(indicator.get('indicator')),
+                    'evidence': _str(indicator.get('evidence')),
+                    'weight': _str(indicator.get('weight'))
+                })
+            else:
+                rows.append({'document_id': document_id, 'indicator': str(indicator), 'evidence': None, 'weight': None})
+        return rows
@@ -4,9 +4,15 @@ Privilege Detector - Detect attorney-client privilege and work product with high
 
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 import anthropic
 
+from llm_client import create_message, usage_tokens
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable, with_retry
+from privilege_triage import PrivilegeTriage, triage_features
+from term_matcher import TermMatcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,10 +35,45 @@ class PrivilegeDetector:
         'subject to privilege'
     ]
 
-    def __init__(self, client: anthropic.Anthropic):
+    LEGAL_ADVICE_TERMS = [
+        'legal advice', 'my recommendation', 'legal opinion',
+        'litigation strategy', 'settlement', 'legal analysis'
+    ]
+
+    CONFIDENTIALITY_TERMS = [
+        'confidential', 'privileged', 'do not forward',
+        'attorney eyes only', 'not for distribution'
+    ]
+
+    THIRD_PARTY_TERMS = ['cc:', 'bcc:']
+
+    BUSINESS_TERMS = ['sales', 'marketing', 'operational', 'business plan']
+
+    def __init__(
+        self,
+        client: Union[anthropic.Anthropic, anthropic.AsyncAnthropic],
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        triage: Optional[PrivilegeTriage] = None
+    ):
         self.client = client
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
         self.model = 'claude-sonnet-4-5-20250929'
 
+        # Calibrated screen that lets clear non-privileged documents skip review
+        self.triage = triage
+
+        # Every heuristic term list, matched in one call per document
+        self.term_matcher = TermMatcher({
+            'markers': self.PRIVILEGE_MARKERS,
+            'attorney_titles': self.ATTORNEY_TITLES,
+            'legal_advice': self.LEGAL_ADVICE_TERMS,
+            'confidentiality': self.CONFIDENTIALITY_TERMS,
+            'third_party': self.THIRD_PARTY_TERMS,
+            'business': self.BUSINESS_TERMS
+        })
+
     async def detect(
         self,
         text: str,
@@ -51,25 +92,97 @@ class PrivilegeDetector:
             Privilege determination with confidence and reasoning
         """
         try:
-            # Quick heuristic check first
-            heuristic_check = self._heuristic_privilege_check(text, metadata, entities)
+            # Quick heuristic check and triage first
+            heuristic_check, determination = self.screen(text, metadata, entities)
 
-            # If heuristic is very confident (either way), we can skip API call
-            if heuristic_check['confidence'] > 0.95 or heuristic_check['confidence'] < 0.05:
-                logger.info(f"Heuristic privilege check sufficient: {heuristic_check['is_privileged']} (confidence: {heuristic_check['confidence']})")
-                return heuristic_check
+            # Conclusive heuristics and triage bypasses skip the API call
+            if determination is not None:
+                logger.info(f"Privilege determined without review ({determination['method']}): {determination['is_privileged']} (confidence: {determination['confidence']})")
+                return determination
 
             # Use Claude for complex cases
-            prompt = self._build_privilege_prompt(text, metadata, entities)
+            request = self.build_request(text, metadata, entities)
 
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                temperature=0.0,
-                system=[
-                    {
-                        "type": "text",
-                        "text": """You are an expert legal privilege reviewer with deep knowledge of:
+            async def attempt():
+                response = await create_message(self.client, self.rate_limiter, **request)
+                return self.parse_response(response, heuristic_check)
+
+            return await with_retry(self.retry_policy, 'privilege', attempt)
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse privilege detection response: {e}")
+            return self._conservative_privilege_response(text, metadata)
+        except Exception as e:
+            if is_retryable(self.retry_policy, e):
+                raise
+            logger.error(f"Privilege detection error: {e}")
+            return self._conservative_privilege_response(text, metadata)
+
+    def screen(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None,
+        entities: Optional[Dict] = None,
+        allow_bypass: bool = True
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Heuristic check and triage ahead of LLM review
+
+        Documents the heuristic cannot settle get a 'triage' record (features,
+        model probability, whether they bypass review) that is carried into
+        the final determination, so reviewed outputs can train the model.
+
+        Args:
+            text: Document text
+            metadata: Document metadata
+            entities: Extracted entities
+            allow_bypass: Let the triage model settle documents (False when
+                an LLM determination is already available)
+
+        Returns:
+            (heuristic_check, determination): determination is the final
+            result when no LLM review is needed, otherwise None
+        """
+        matches = self.term_matcher.find(text)
+        heuristic_check = self._heuristic_privilege_check(text, metadata, entities, matches)
+
+        # If heuristic is very confident (either way), we can skip API call
+        if self.heuristic_is_sufficient(heuristic_check):
+            return heuristic_check, heuristic_check
+
+        features = triage_features(matches, heuristic_check, text)
+        if self.triage is not None:
+            # Documents the heuristic itself calls privileged are always reviewed
+            triage = self.triage.assess(
+                features, text, allow_bypass=allow_bypass and not heuristic_check['is_privileged']
+            )
+        else:
+            triage = {'features': features, 'probability': None, 'threshold': None, 'bypassed': False, 'audited': False}
+        heuristic_check['triage'] = triage
+
+        if triage['bypassed']:
+            return heuristic_check, self._triage_determination(heuristic_check, triage)
+        return heuristic_check, None
+
+    def heuristic_is_sufficient(self, heuristic_check: Dict[str, Any]) -> bool:
+        """Whether the heuristic result is confident enough to skip the API call"""
+        return heuristic_check['confidence'] > 0.95 or heuristic_check['confidence'] < 0.05
+
+    def build_request(
+        self,
+        text: str,
+        metadata: Optional[Dict] = None,
+        entities: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Build messages.create parameters for privilege review"""
+        return {
+            'model': self.model,
+            'max_tokens': 2048,
+            'temperature': 0.0,
+            'system': [
+                {
+                    "type": "text",
+                    "text": """You are an expert legal privilege reviewer with deep knowledge of:
 
 - Attorney-client privilege requirements and exceptions
 - Work product doctrine
@@ -81,40 +194,38 @@ class PrivilegeDetector:
 You analyze documents to determine if they are protected by privilege with extremely high accuracy. You understand that privilege determinations are critical and must be conservative - when in doubt, flag for attorney review.
 
 You NEVER make hasty privilege determinations. You provide detailed reasoning.""",
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ],
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            'messages': [
+                {
+                    "role": "user",
+                    "content": self._build_privilege_prompt(text, metadata, entities)
+                }
+            ]
+        }
 
-            # Parse response
-            result_text = response.content[0].text
-            result = json.loads(result_text)
+    def parse_response(
+        self,
+        response: Any,
+        heuristic_check: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Parse a privilege review Message response and cross-check the heuristic
 
-            # Validate and enrich result
-            result = self._validate_privilege_determination(result, heuristic_check)
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        result_text = response.content[0].text
+        result = json.loads(result_text)
 
-            # Add usage statistics
-            result['tokens_used'] = {
-                'input': response.usage.input_tokens,
-                'output': response.usage.output_tokens,
-                'cache_creation': getattr(response.usage, 'cache_creation_input_tokens', 0),
-                'cache_read': getattr(response.usage, 'cache_read_input_tokens', 0)
-            }
+        # Validate and enrich result
+        result = self._validate_privilege_determination(result, heuristic_check)
 
-            return result
+        # Add usage statistics
+        result['tokens_used'] = usage_tokens(response)
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse privilege detection response: {e}")
-            return self._conservative_privilege_response(text, metadata)
-        except Exception as e:
-            logger.error(f"Privilege detection error: {e}")
-            return self._conservative_privilege_response(text, metadata)
+        return result
 
     def _build_privilege_prompt(
         self,
@@ -233,24 +344,24 @@ Respond with ONLY the JSON object, no additional text."""
         self,
         text: str,
         metadata: Optional[Dict],
-        entities: Optional[Dict]
+        entities: Optional[Dict],
+        matches: Optional[Dict[str, List[str]]] = None
     ) -> Dict[str, Any]:
         """Fast heuristic privilege check"""
 
-        text_lower = text.lower()
+        found = matches if matches is not None else self.term_matcher.find(text)
         score = 0.0
         indicators = []
         concerns = []
 
         # Check for explicit privilege markers (very strong indicator)
-        for marker in self.PRIVILEGE_MARKERS:
-            if marker in text_lower:
-                score += 0.4
-                indicators.append({
-                    'indicator': f"Explicit privilege marker: '{marker}'",
-                    'evidence': marker,
-                    'weight': 'strong'
-                })
+        for marker in found['markers']:
+            score += 0.4
+            indicators.append({
+                'indicator': f"Explicit privilege marker: '{marker}'",
+                'evidence': marker,
+                'weight': 'strong'
+            })
 
         # Check for attorney participation
         has_attorney = False
@@ -269,59 +380,46 @@ Respond with ONLY the JSON object, no additional text."""
                     break
 
         # Check text for attorney indicators
-        if not has_attorney:
-            for title in self.ATTORNEY_TITLES:
-                if title in text_lower:
-                    has_attorney = True
-                    score += 0.15
-                    indicators.append({
-                        'indicator': f"Attorney title found: '{title}'",
-                        'evidence': title,
-                        'weight': 'moderate'
-                    })
-                    break
+        if not has_attorney and found['attorney_titles']:
+            title = found['attorney_titles'][0]
+            has_attorney = True
+            score += 0.15
+            indicators.append({
+                'indicator': f"Attorney title found: '{title}'",
+                'evidence': title,
+                'weight': 'moderate'
+            })
 
         # Check for legal advice language
-        legal_advice_terms = [
-            'legal advice', 'my recommendation', 'legal opinion',
-            'litigation strategy', 'settlement', 'legal analysis'
-        ]
-        for term in legal_advice_terms:
-            if term in text_lower:
-                score += 0.15
-                indicators.append({
-                    'indicator': f"Legal advice language: '{term}'",
-                    'evidence': term,
-                    'weight': 'moderate'
-                })
-                break
+        if found['legal_advice']:
+            term = found['legal_advice'][0]
+            score += 0.15
+            indicators.append({
+                'indicator': f"Legal advice language: '{term}'",
+                'evidence': term,
+                'weight': 'moderate'
+            })
 
         # Check for confidentiality markers
-        confidentiality_terms = [
-            'confidential', 'privileged', 'do not forward',
-            'attorney eyes only', 'not for distribution'
-        ]
-        for term in confidentiality_terms:
-            if term in text_lower:
-                score += 0.1
-                indicators.append({
-                    'indicator': f"Confidentiality marker: '{term}'",
-                    'evidence': term,
-                    'weight': 'weak'
-                })
-                break
+        if found['confidentiality']:
+            term = found['confidentiality'][0]
+            score += 0.1
+            indicators.append({
+                'indicator': f"Confidentiality marker: '{term}'",
+                'evidence': term,
+                'weight': 'weak'
+            })
 
         # Check for privilege concerns
         # Third party recipients
-        if 'cc:' in text_lower or 'bcc:' in text_lower:
+        if found['third_party']:
             concerns.append({
                 'concern': 'Document may have third-party recipients (check CC/BCC)',
                 'severity': 'moderate'
             })
 
         # Business vs legal
-        business_terms = ['sales', 'marketing', 'operational', 'business plan']
-        if any(term in text_lower for term in business_terms):
+        if found['business']:
             concerns.append({
                 'concern': 'Document may contain business advice rather than legal advice',
                 'severity': 'moderate'
@@ -382,8 +480,34 @@ Respond with ONLY the JSON object, no additional text."""
             result['needs_attorney_review'] = True
             result['review_reason'] = 'Heuristic analysis suggests privilege; AI disagreed'
 
+        # Keep the triage features with the reviewed determination
+        if 'triage' in heuristic:
+            result['triage'] = heuristic['triage']
+
         return result
 
+    def _triage_determination(
+        self,
+        heuristic_check: Dict[str, Any],
+        triage: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Non-privileged determination for a document the triage model bypassed"""
+        return {
+            **heuristic_check,
+            'is_privileged': False,
+            'privilege_types': [],
+            'confidence': triage['probability'],
+            'reasoning': (
+                f"Triage model estimated a {triage['probability']:.1%} probability of privilege, "
+                f"below the calibrated bypass threshold of {triage['threshold']:.1%}; not sent for LLM review."
+            ),
+            'needs_attorney_review': False,
+            'review_reason': None,
+            'redaction_recommended': False,
+            'method': 'triage',
+            'triage': triage
+        }
+
     def _conservative_privilege_response(
         self,
         text: str,
@@ -391,10 +515,8 @@ Respond with ONLY the JSON object, no additional text."""
     ) -> Dict[str, Any]:
         """Conservative response when analysis fails - assume potential privilege"""
 
-        text_lower = text.lower()
-
         # Check for any privilege markers
-        has_privilege_marker = any(marker in text_lower for marker in self.PRIVILEGE_MARKERS)
+        has_privilege_marker = bool(self.term_matcher.find(text)['markers'])
 
         return {
             'is_privileged': has_privilege_marker,
@@ -420,6 +542,7 @@ Respond with ONLY the JSON object, no additional text."""
             'redaction_recommended': has_privilege_marker,
             'redaction_scope': 'requires review',
             'error': True,
+            'degraded': True,
             'tokens_used': {
                 'input': 0,
                 'output': 0,
@@ -0,0 +1,388 @@
+"""
+Privilege Triage - Calibrated heuristic-first screen that lets clear non-privileged documents skip LLM review
+"""
+
+import hashlib
+import json
+import logging
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PrivilegeTriage:
+    """
+    Logistic regression over privilege heuristic features
+
+    Trained on earlier LLM privilege determinations: every document the LLM
+    reviews records its heuristic features under privilege['triage'], so any
+    previous batch output is training data (see examples_from_results).
+
+    The bypass threshold is calibrated on out-of-fold predictions so that,
+    among documents scored below it, the share the LLM found non-privileged
+    is at least precision_target. Documents below the threshold are reported
+    non-privileged without an API call; a deterministic audit_rate sample of
+    them is still sent to the LLM so every batch measures the precision the
+    bypass actually achieved.
+    """
+
+    FEATURES = (
+        'heuristic_score',
+        'privilege_markers',
+        'attorney_participant',
+        'attorney_title',
+        'legal_advice',
+        'confidentiality',
+        'third_party',
+        'business',
+        'log_length'
+    )
+
+    def __init__(
+        self,
+        precision_target: float = 0.99,
+        audit_rate: float = 0.02,
+        min_examples: int = 200,
+        l2: float = 1.0
+    ):
+        """
+        Args:
+            precision_target: Minimum share of bypassed documents that must be
+                non-privileged, estimated on held-out predictions
+            audit_rate: Fraction of bypass candidates still reviewed by the LLM
+            min_examples: Reviewed documents needed to fit; a tenth of that
+                many are needed of each class
+            l2: Ridge penalty on the standardized weights
+        """
+        self.precision_target = precision_target
+        self.audit_rate = audit_rate
+        self.min_examples = min_examples
+        self.l2 = l2
+
+        self.weights: Optional[np.ndarray] = None
+        self.bias = 0.0
+        self.mean = np.zeros(len(self.FEATURES))
+        self.scale = np.ones(len(self.FEATURES))
+        # No document is bypassed until a threshold has been calibrated
+        self.threshold = 0.0
+        self.calibration: Dict[str, Any] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.weights is not None
+
+    def probability(self, features: Dict[str, float]) -> float:
+        """Estimated probability that the LLM would find the document privileged"""
+        if not self.is_trained:
+            return 1.0
+        x = (self._vector(features) - self.mean) / self.scale
+        return float(self._sigmoid(x @ self.weights + self.bias))
+
+    def assess(self, features: Dict[str, float], text: str, allow_bypass: bool = True) -> Dict[str, Any]:
+        """
+        Triage record for one document
+
+        Args:
+            features: triage_features() of the document
+            text: Document text (seeds the audit sample)
+            allow_bypass: Whether the document may bypass review at all
+
+        Returns:
+            {'features', 'probability', 'threshold', 'bypassed', 'audited'};
+            probability is None while the model is untrained
+        """
+        triage = {
+            'features': features,
+            'probability': None,
+            'threshold': self.threshold,
+            'bypassed': False,
+            'audited': False
+        }
+        if not self.is_trained:
+            return triage
+
+        probability = self.probability(features)
+        triage['probability'] = round(probability, 6)
+        if allow_bypass and probability < self.threshold:
+            if self._audit_draw(text) < self.audit_rate:
+                triage['audited'] = True
+            else:
+                triage['bypassed'] = True
+        return triage
+
+    def fit(self, examples: List[Tuple[Dict[str, float], bool]], folds: int = 5) -> Dict[str, Any]:
+        """
+        Fit the model and calibrate the bypass threshold
+
+        Args:
+            examples: (features, LLM is_privileged) pairs
+            folds: Cross-validation folds used for calibration
+
+        Returns:
+            Calibration report (also kept as self.calibration)
+
+        Raises:
+            ValueError: With too few examples of either class
+        """
+        X = np.array([self._vector(features) for features, _ in examples], dtype=float).reshape(-1, len(self.FEATURES))
+        y = np.array([bool(label) for _, label in examples], dtype=float)
+
+        positives = int(y.sum())
+        negatives = len(y) - positives
+        if min(positives, negatives) < max(self.min_examples // 10, folds) or len(y) < self.min_examples:
+            raise ValueError(
+                f"Need at least {self.min_examples} reviewed documents including both privileged and "
+                f"non-privileged ones (have {negatives} non-privileged, {positives} privileged)"
+            )
+
+        # Out-of-fold probabilities: each document scored by a model that never saw it
+        order = np.random.default_rng(0).permutation(len(y))
+        held_out = np.empty(len(y))
+        for fold in np.array_split(order, folds):
+            train = np.setdiff1d(order, fold, assume_unique=True)
+            model = self._train(X[train], y[train])
+            held_out[fold] = self._predict(model, X[fold])
+
+        self.threshold, report = self._calibrate(held_out, y)
+
+        self.mean, self.scale, self.weights, self.bias = self._train(X, y)
+        report.update({
+            'examples': len(y),
+            'privileged': positives,
+            'weights': {name: round(float(w), 4) for name, w in zip(self.FEATURES, self.weights)},
+            'bias': round(float(self.bias), 4),
+            'trained_at': datetime.utcnow().isoformat()
+        })
+        self.calibration = report
+        logger.info(
+            f"Privilege triage threshold {self.threshold:.4f}: expected bypass rate "
+            f"{report['expected_bypass_rate']:.1%} at precision {report['expected_precision']:.3f}"
+        )
+        return report
+
+    def batch_report(self, results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Bypass rate and audited precision of one batch
+
+        Args:
+            results: Document results of the batch
+
+        Returns:
+            Counts by route, bypass rate, audit precision and the Brier score
+            of the model's probabilities on LLM-reviewed documents
+        """
+        screened = bypassed = audited = audited_privileged = heuristic = 0
+        squared_errors = []
+        for result in results:
+            privilege = result.get('privilege') or {}
+            if result.get('error') or not privilege:
+                continue
+            screened += 1
+            triage = privilege.get('triage')
+            if triage is None:
+                heuristic += int(privilege.get('method') == 'heuristic')
+                continue
+            if triage.get('bypassed'):
+                bypassed += 1
+                continue
+
+            is_privileged = bool(privilege.get('is_privileged'))
+            if triage.get('audited'):
+                audited += 1
+                audited_privileged += int(is_privileged)
+            if triage.get('probability') is not None and not privilege.get('error'):
+                squared_errors.append((triage['probability'] - is_privileged) ** 2)
+
+        return {
+            'model_trained': self.is_trained,
+            'threshold': self.threshold,
+            'precision_target': self.precision_target,
+            'documents_screened': screened,
+            'heuristic_sufficient': heuristic,
+            'bypassed': bypassed,
+            'llm_reviewed': screened - bypassed - heuristic,
+            'bypass_rate': round(bypassed / screened, 4) if screened else 0.0,
+            # Share of the documents the heuristic left for review (comparable to expected_bypass_rate)
+            'reviewable_bypass_rate': round(bypassed / (screened - heuristic), 4) if screened > heuristic else 0.0,
+            'audited': audited,
+            'audited_privileged': audited_privileged,
+            'audit_precision': round(1 - audited_privileged / audited, 4) if audited else None,
+            'brier_score': round(float(np.mean(squared_errors)), 4) if squared_errors else None,
+            'expected_precision': self.calibration.get('expected_precision'),
+            'expected_bypass_rate': self.calibration.get('expected_bypass_rate')
+        }
+
+    @classmethod
+    def examples_from_results(cls, results: Iterable[Dict[str, Any]]) -> List[Tuple[Dict[str, float], bool]]:
+        """
+        Training pairs from earlier document results
+
+        Only LLM determinations count: bypassed, heuristic-only and failed
+        privilege reviews are skipped.
+        """
+        examples = []
+        for result in results:
+            privilege = result.get('privilege') or {}
+            triage = privilege.get('triage')
+            if result.get('error') or privilege.get('error') or not triage or triage.get('bypassed'):
+                continue
+            if privilege.get('method') in ('heuristic', 'fallback'):
+                continue
+            examples.append((triage['features'], bool(privilege.get('is_privileged'))))
+        return examples
+
+    def save(self, path: str) -> None:
+        """Write the model as JSON"""
+        if not self.is_trained:
+            raise ValueError("Cannot save an untrained triage model")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'features': list(self.FEATURES),
+                'weights': self.weights.tolist(),
+                'bias': self.bias,
+                'mean': self.mean.tolist(),
+                'scale': self.scale.tolist(),
+                'threshold': self.threshold,
+                'precision_target': self.precision_target,
+                'audit_rate': self.audit_rate,
+                'calibration': self.calibration
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, audit_rate: Optional[float] = None) -> 'PrivilegeTriage':
+        """
+        Read a model written by save()
+
+        Raises:
+            ValueError: If the model was trained on a different feature set
+        """
+        with open(path) as f:
+            data = json.load(f)
+        if tuple(data['features']) != cls.FEATURES:
+            raise ValueError(f"Triage model {path} uses features {data['features']}, expected {list(cls.FEATURES)}")
+
+        triage = cls(
+            precision_target=data['precision_target'],
+            audit_rate=data['audit_rate'] if audit_rate is None else audit_rate
+        )
+        triage.weights = np.array(data['weights'])
+        triage.bias = data['bias']
+        triage.mean = np.array(data['mean'])
+        triage.scale = np.array(data['scale'])
+        triage.threshold = data['threshold']
+        triage.calibration = data['calibration']
+        return triage
+
+    def _calibrate(self, probabilities: np.ndarray, labels: np.ndarray) -> Tuple[float, Dict[str, Any]]:
+        """Highest threshold whose held-out bypass precision meets the target"""
+        order = np.argsort(probabilities, kind='stable')
+        p, y = probabilities[order], labels[order]
+
+        # Bypassing the k lowest-scored documents: precision = non-privileged share of them
+        k = np.arange(1, len(p) + 1)
+        precision = np.cumsum(1 - y) / k
+        # A threshold can only fall between distinct probabilities
+        boundary = np.append(p[1:] > p[:-1], True)
+        eligible = np.flatnonzero((precision >= self.precision_target) & boundary)
+
+        if len(eligible):
+            cut = eligible[-1]
+            threshold = float(p[cut + 1] + p[cut]) / 2 if cut + 1 < len(p) else float(np.nextafter(p[cut], 1))
+            bypassed = cut + 1
+            expected_precision = float(precision[cut])
+            missed = int(y[:bypassed].sum())
+        else:
+            threshold, bypassed, expected_precision, missed = 0.0, 0, 1.0, 0
+
+        # Reliability: mean predicted vs observed privilege rate per probability decile
+        bins = []
+        for chunk_p, chunk_y in zip(np.array_split(p, 10), np.array_split(y, 10)):
+            if len(chunk_p):
+                bins.append({
+                    'predicted': round(float(chunk_p.mean()), 4),
+                    'observed': round(float(chunk_y.mean()), 4),
+                    'documents': len(chunk_p)
+                })
+
+        return threshold, {
+            'threshold': threshold,
+            'precision_target': self.precision_target,
+            'expected_precision': round(expected_precision, 4),
+            'expected_bypass_rate': round(float(bypassed / len(p)), 4),
+            'missed_privileged': missed,
+            'brier_score': round(float(np.mean((probabilities - labels) ** 2)), 4),
+            'reliability': bins
+        }
+
+    def _train(self, X: np.ndarray, y: np.ndarray):
+        """Standardize and fit by Newton's method; returns (mean, scale, weights, bias)"""
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = np.hstack([(X - mean) / scale, np.ones((len(X), 1))])
+
+        penalty = np.full(Z.shape[1], self.l2)
+        penalty[-1] = 0.0  # the intercept is not penalized
+        beta = np.zeros(Z.shape[1])
+        for _ in range(50):
+            p = self._sigmoid(Z @ beta)
+            gradient = Z.T @ (p - y) + penalty * beta
+            hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty) + 1e-9 * np.eye(Z.shape[1])
+            step = np.linalg.solve(hessian, gradient)
+            beta -= step
+            if np.abs(step).max() < 1e-8:
+                break
+
+        return mean, scale, beta[:-1], float(beta[-1])
+
+    def _predict(self, model, X: np.ndarray) -> np.ndarray:
+        mean, scale, weights, bias = model
+        return self._sigmoid(((X - mean) / scale) @ weights + bias)
+
+    def _vector(self, features: Dict[str, float]) -> np.ndarray:
+        return np.array([float(features.get(name, 0.0)) for name in self.FEATURES])
+
+    @staticmethod
+    def _sigmoid(z):
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+    @staticmethod
+    def _audit_draw(text: str) -> float:
+        """Deterministic uniform draw per document, so re-runs audit the same documents"""
+        digest = hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def triage_features(
+    matches: Dict[str, List[str]],
+    heuristic_check: Dict[str, Any],
+    text: str
+) -> Dict[str, float]:
+    """
+    Triage features of one document
+
+    Args:
+        matches: PrivilegeDetector.term_matcher.find(text)
+        heuristic_check: The document's heuristic privilege result
+        text: Document text
+    """
+    indicators = heuristic_check.get('privilege_indicators') or []
+    return {
+        'heuristic_score': float(heuristic_check.get('confidence', 0.0)),
+        'privilege_markers': float(len(matches['markers'])),
+        'attorney_participant': float(any(
+            indicator.get('indicator') == 'Attorney participant identified' for indicator in indicators
+        )),
+        'attorney_title': float(bool(matches['attorney_titles'])),
+        'legal_advice': float(len(matches['legal_advice'])),
+        'confidentiality': float(len(matches['confidentiality'])),
+        'third_party': float(bool(matches['third_party'])),
+        'business': float(len(matches['business'])),
+        'log_length': math.log1p(len(text))
+    }
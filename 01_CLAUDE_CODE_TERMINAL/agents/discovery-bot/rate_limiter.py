@@ -0,0 +1,273 @@
+"""
+Rate Limiter - Adaptive request and token-budget governor for Anthropic API calls
+"""
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Per-minute budget that refills continuously"""
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.capacity = per_minute
+        self.level = per_minute or 0.0
+        self.updated = time.monotonic()
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.capacity)
+
+    def set_limit(self, per_minute: float) -> None:
+        """Adopt a (possibly new) per-minute limit"""
+        if not self.limited:
+            self.level = per_minute
+        self.capacity = per_minute
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        if self.limited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (amounts above capacity wait for a full bucket)"""
+        if not self.limited:
+            return 0.0
+        self.refill()
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit * 60 / self.capacity)
+
+    def consume(self, amount: float) -> None:
+        if self.limited:
+            self.level -= amount
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared governor for every messages.create call
+
+    Three mechanisms work together:
+    - Token buckets for requests, input tokens and output tokens per minute.
+      Limits come from config or are learned from the API's
+      anthropic-ratelimit-* response headers.
+    - AIMD concurrency control: the in-flight limit grows by 1/limit per
+      success and halves on a 429/529, at most once per decrease_cooldown.
+    - Retry-After pauses: a rate-limited response pauses all callers.
+
+    Callers that would have fallen back to heuristics under a 429 storm now
+    wait for capacity instead.
+    """
+
+    RETRYABLE_STATUS = {429, 529}
+
+    def __init__(
+        self,
+        max_concurrency: int = 20,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        input_tokens_per_minute: Optional[float] = None,
+        output_tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        decrease_cooldown: float = 1.0
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            max_concurrency: Upper bound on in-flight requests
+            min_concurrency: Lower bound after multiplicative decreases
+            initial_concurrency: Starting limit (default: max_concurrency)
+            requests_per_minute: RPM limit (None to learn from headers)
+            input_tokens_per_minute: ITPM limit (None to learn from headers)
+            output_tokens_per_minute: OTPM limit (None to learn from headers)
+            max_retries: Retries of rate-limited or overloaded calls before giving up
+            decrease_cooldown: Minimum seconds between multiplicative decreases
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(initial_concurrency or max_concurrency)
+        self.max_retries = max_retries
+        self.decrease_cooldown = decrease_cooldown
+
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self.output_tokens = TokenBucket(output_tokens_per_minute)
+
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._average_output_tokens = 512.0
+        self._condition: Optional[asyncio.Condition] = None
+
+        self.counters = {
+            'requests': 0,
+            'rate_limited': 0,
+            'overloaded': 0,
+            'retries': 0,
+            'concurrency_decreases': 0,
+            'wait_seconds': 0.0
+        }
+
+    @asynccontextmanager
+    async def slot(self, input_tokens: int) -> AsyncIterator[None]:
+        """
+        Wait for a concurrency slot and budget, then hold the slot
+
+        Args:
+            input_tokens: Estimated input tokens of the request
+        """
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        wait_start = time.monotonic()
+        self.queue_depth += 1
+        try:
+            async with self._condition:
+                await self._condition.wait_for(
+                    lambda: self.in_flight < int(self.concurrency_limit)
+                )
+                self.in_flight += 1
+        finally:
+            self.queue_depth -= 1
+
+        try:
+            await self._wait_for_budget(input_tokens)
+            self.counters['wait_seconds'] += time.monotonic() - wait_start
+            self.counters['requests'] += 1
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    async def _wait_for_budget(self, input_tokens: int) -> None:
+        """Sleep until any pause has passed and all three buckets can pay"""
+        output_estimate = self._average_output_tokens
+
+        while True:
+            wait = max(
+                self.paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.input_tokens.wait_time(input_tokens),
+                self.output_tokens.wait_time(output_estimate)
+            )
+            if wait <= 0:
+                break
+            await asyncio.sleep(min(wait, 1.0))
+
+        self.requests.consume(1)
+        self.input_tokens.consume(input_tokens)
+        self.output_tokens.consume(output_estimate)
+
+    def record_success(self, headers: Any, usage: Dict[str, int], input_estimate: int) -> None:
+        """
+        Account for a successful response and grow the concurrency limit
+
+        Args:
+            headers: Response headers (mapping)
+            usage: Token usage in the tokens_used schema
+            input_estimate: Input tokens reserved before the call
+        """
+        self._apply_headers(headers)
+
+        # Reconcile reservations with actual usage
+        self.input_tokens.consume(usage.get('input', 0) - input_estimate)
+        self.output_tokens.consume(usage.get('output', 0) - self._average_output_tokens)
+        self._average_output_tokens = 0.9 * self._average_output_tokens + 0.1 * usage.get('output', 0)
+
+        # Additive increase: about +1 per window of concurrency_limit successes
+        self.concurrency_limit = min(
+            self.max_concurrency,
+            self.concurrency_limit + 1 / self.concurrency_limit
+        )
+
+    def record_rate_limited(self, status_code: int, headers: Any, attempt: int = 1) -> float:
+        """
+        Back off after a 429/529: halve concurrency and pause for Retry-After
+
+        Args:
+            status_code: 429 or 529
+            headers: Response headers (mapping)
+            attempt: The call's retry number (1 for its first retry); without
+                Retry-After the pause doubles with it, up to 60 seconds
+
+        Returns:
+            Seconds callers are paused
+        """
+        self._apply_headers(headers)
+        now = time.monotonic()
+
+        if status_code == 429:
+            self.counters['rate_limited'] += 1
+        else:
+            self.counters['overloaded'] += 1
+
+        if now - self._last_decrease >= self.decrease_cooldown:
+            self._last_decrease = now
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            self.counters['concurrency_decreases'] += 1
+            logger.warning(
+                f"API returned {status_code}; concurrency limit reduced to {int(self.concurrency_limit)}"
+            )
+
+        retry_after = self._header_float(headers, 'retry-after')
+        if retry_after is None:
+            retry_after = min(60.0, 2 ** min(attempt, 6))
+        self.paused_until = max(self.paused_until, now + retry_after)
+
+        return retry_after
+
+    def _apply_headers(self, headers: Any) -> None:
+        """Learn limits and remaining budget from anthropic-ratelimit-* headers"""
+        if not headers:
+            return
+
+        for name, bucket in [
+            ('requests', self.requests),
+            ('input-tokens', self.input_tokens),
+            ('output-tokens', self.output_tokens)
+        ]:
+            limit = self._header_float(headers, f"anthropic-ratelimit-{name}-limit")
+            if limit:
+                bucket.set_limit(limit)
+
+            remaining = self._header_float(headers, f"anthropic-ratelimit-{name}-remaining")
+            if remaining is not None and bucket.limited:
+                bucket.refill()
+                bucket.level = min(bucket.level, remaining)
+
+    def _header_float(self, headers: Any, name: str) -> Optional[float]:
+        value = headers.get(name) if headers else None
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    def estimate_input_tokens(self, request: Dict[str, Any]) -> int:
+        """Rough input token estimate (~4 characters per token)"""
+        text = json.dumps(request.get('system', '')) + json.dumps(request.get('messages', []))
+        return max(1, len(text) // 4)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current limits, queue depth and counters"""
+        return {
+            'concurrency_limit': int(self.concurrency_limit),
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'requests_per_minute_limit': self.requests.capacity,
+            'input_tokens_per_minute_limit': self.input_tokens.capacity,
+            'output_tokens_per_minute_limit': self.output_tokens.capacity,
+            'paused_seconds_remaining': round(max(0.0, self.paused_until - time.monotonic()), 2),
+            **{key: round(value, 2) if isinstance(value, float) else value for key, value in self.counters.items()},
+            'timestamp': datetime.utcnow().isoformat()
+        }
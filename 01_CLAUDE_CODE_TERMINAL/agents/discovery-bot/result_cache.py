@@ -0,0 +1,280 @@
+"""
+Result Cache - Content-addressed SQLite store for document processing results
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Stands in for the document text when fingerprinting a prompt template
+PROMPT_PLACEHOLDER = '{document_text}'
+
+
+def prompt_template_hash(analyzer) -> str:
+    """
+    Fingerprint an analyzer's prompt template
+
+    Builds the analyzer's request for placeholder text, so any change to the
+    system prompt, the prompt template, the model or the sampling parameters
+    yields a new hash.
+
+    Args:
+        analyzer: Any analyzer exposing build_request(text)
+
+    Returns:
+        Short hex digest of the request template
+    """
+    template = analyzer.build_request(PROMPT_PLACEHOLDER)
+    encoded = json.dumps(template, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Single-file cache of processing results
+
+    Entries are keyed by (document_id, model, prompt_version) so that a model
+    or prompt change never serves stale results. Payloads are compact JSON,
+    zlib-compressed. Entries older than max_age_days are dropped, and the
+    least recently used entries are evicted once the payload total exceeds
+    max_size_mb.
+    """
+
+    TABLE = 'results'
+    KEY_COLUMNS = ('document_id', 'model', 'prompt_version')
+
+    # Evictions run on open and after this many writes
+    EVICTION_INTERVAL = 1000
+
+    def __init__(
+        self,
+        path: str,
+        max_size_mb: Optional[float] = None,
+        max_age_days: Optional[float] = None
+    ):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite database file
+            max_size_mb: Maximum total payload size (None for unbounded)
+            max_age_days: Maximum entry age (None for no expiry)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        key_columns = ', '.join(f"{column} TEXT NOT NULL" for column in self.KEY_COLUMNS)
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                {key_columns},
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY ({', '.join(self.KEY_COLUMNS)})
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_accessed ON {self.TABLE} (accessed_at)"
+        )
+        self.conn.commit()
+
+        self._key_match = ' AND '.join(f"{column} = ?" for column in self.KEY_COLUMNS)
+
+        self.evict()
+
+    def get(
+        self,
+        document_id: str,
+        model: str,
+        prompt_version: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+
+        Returns:
+            The cached result, or None on a miss or an expired entry
+        """
+        return self._get((document_id, model, prompt_version))
+
+    def put(
+        self,
+        document_id: str,
+        model: str,
+        prompt_version: str,
+        result: Dict[str, Any]
+    ) -> None:
+        """Store a result, replacing any entry under the same key"""
+        self._put((document_id, model, prompt_version), result)
+
+    def _get(self, key: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """Fetch and decode the entry under key, refreshing its access time"""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT payload, created_at FROM {self.TABLE} WHERE {self._key_match}",
+                key
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            payload, created_at = row
+            now = time.time()
+
+            if self.max_age_seconds and now - created_at > self.max_age_seconds:
+                self.conn.execute(f"DELETE FROM {self.TABLE} WHERE {self._key_match}", key)
+                self.conn.commit()
+                return None
+
+            self.conn.execute(
+                f"UPDATE {self.TABLE} SET accessed_at = ? WHERE {self._key_match}",
+                (now, *key)
+            )
+            self.conn.commit()
+
+        return json.loads(zlib.decompress(payload))
+
+    def _put(self, key: Tuple[str, ...], value: Dict[str, Any]) -> None:
+        """Encode and store value under key"""
+        encoded = json.dumps(value, separators=(',', ':'), default=str).encode()
+        payload = zlib.compress(encoded)
+        now = time.time()
+
+        columns = ', '.join(self.KEY_COLUMNS)
+        placeholders = ', '.join('?' * (len(self.KEY_COLUMNS) + 4))
+
+        with self._lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} "
+                f"({columns}, payload, size, created_at, accessed_at) VALUES ({placeholders})",
+                (*key, payload, len(payload), now, now)
+            )
+            self.conn.commit()
+            self._writes_since_eviction += 1
+            due = self._writes_since_eviction >= self.EVICTION_INTERVAL
+
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Apply age and size limits
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+
+        with self._lock:
+            self._writes_since_eviction = 0
+
+            if self.max_age_seconds:
+                cursor = self.conn.execute(
+                    f"DELETE FROM {self.TABLE} WHERE created_at < ?",
+                    (time.time() - self.max_age_seconds,)
+                )
+                removed += cursor.rowcount
+
+            if self.max_size_bytes:
+                total = self.conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}"
+                ).fetchone()[0]
+                if total > self.max_size_bytes:
+                    excess = total - self.max_size_bytes
+                    freed = 0
+                    victims = []
+                    for *key, size in self.conn.execute(
+                        f"SELECT {', '.join(self.KEY_COLUMNS)}, size FROM {self.TABLE} ORDER BY accessed_at"
+                    ):
+                        victims.append(tuple(key))
+                        freed += size
+                        if freed >= excess:
+                            break
+
+                    self.conn.executemany(
+                        f"DELETE FROM {self.TABLE} WHERE {self._key_match}",
+                        victims
+                    )
+                    removed += len(victims)
+
+            self.conn.commit()
+
+        if removed:
+            logger.info(f"Evicted {removed} cached results from {self.path}")
+
+        return removed
+
+    def statistics(self) -> Dict[str, Any]:
+        """Entry count and total payload size"""
+        with self._lock:
+            entries, total_size = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}"
+            ).fetchone()
+
+        return {
+            'entries': entries,
+            'size_bytes': total_size,
+            'path': str(self.path)
+        }
+
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
+
+
+class StageCache(ResultCache):
+    """
+    Cache of individual stage outputs
+
+    Entries are keyed by (text_hash, stage, prompt_hash, model), so editing
+    one stage's prompt only invalidates that stage (and the stages that
+    consume its output), and identical text in another production re-uses
+    prior stage outputs. Shares the database file with ResultCache.
+    """
+
+    TABLE = 'stage_results'
+    KEY_COLUMNS = ('text_hash', 'stage', 'prompt_hash', 'model')
+
+    def get(
+        self,
+        text_hash: str,
+        stage: str,
+        prompt_hash: str,
+        model: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached stage output
+
+        Returns:
+            The cached output, or None on a miss or an expired entry
+        """
+        return self._get((text_hash, stage, prompt_hash, model))
+
+    def put(
+        self,
+        text_hash: str,
+        stage: str,
+        prompt_hash: str,
+        model: str,
+        output: Dict[str, Any]
+    ) -> None:
+        """Store a stage output, replacing any entry under the same key"""
+        self._put((text_hash, stage, prompt_hash, model), output)
@@ -0,0 +1,246 @@
+"""
+Retry Policy - Error classification, jittered backoff and a dead-letter queue
+"""
+
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable, TypeVar
+import anthropic
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Error classes, in the order they are reported
+ERROR_CLASSES = ('rate_limit', 'transient', 'parse', 'fatal')
+
+# Error classes a later attempt at the whole document can recover from
+RETRYABLE_CLASSES = ('rate_limit', 'transient')
+
+
+class ResponseParseError(ValueError):
+    """A model response could not be turned into the expected structure"""
+
+
+class RetryPolicy:
+    """
+    Decide whether and when to retry a failed stage or document
+
+    Errors are classified as:
+    - rate_limit: 429/529 responses that outlasted the rate limiter's retries
+    - transient: connection errors, timeouts, 5xx responses, locked databases
+    - parse: malformed model output (a fresh sample usually parses)
+    - fatal: everything else (bad requests, missing text); never retried
+
+    Delays use full-jitter exponential backoff, so retries from parallel
+    workers spread out instead of arriving together. Statistics are kept per
+    stage ('classification', ..., 'fused', and 'document' for whole-document
+    retries in the workers).
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        max_parse_retries: int = 1,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0
+    ):
+        """
+        Initialize retry policy
+
+        Args:
+            max_retries: Retries of rate_limit and transient errors
+            max_parse_retries: Retries of parse errors
+            base_delay: Backoff ceiling for the first retry (seconds)
+            max_delay: Largest backoff ceiling (seconds)
+        """
+        self.retry_limits = {
+            'rate_limit': max_retries,
+            'transient': max_retries,
+            'parse': max_parse_retries,
+            'fatal': 0
+        }
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def classify(self, error: BaseException) -> str:
+        """Map an exception to one of ERROR_CLASSES"""
+        if isinstance(error, anthropic.RateLimitError):
+            return 'rate_limit'
+
+        if isinstance(error, anthropic.APIStatusError):
+            if error.status_code == 529:
+                return 'rate_limit'
+            if error.status_code >= 500 or error.status_code in (408, 409):
+                return 'transient'
+            return 'fatal'
+
+        if isinstance(error, (anthropic.APIConnectionError, asyncio.TimeoutError, ConnectionError, sqlite3.OperationalError)):
+            return 'transient'
+
+        if isinstance(error, (json.JSONDecodeError, ResponseParseError, KeyError, IndexError)):
+            return 'parse'
+
+        return 'fatal'
+
+    def should_retry(self, error_class: str, retries: int) -> bool:
+        """Whether another attempt is allowed after `retries` retries"""
+        return retries < self.retry_limits.get(error_class, 0)
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter delay before the given retry (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return random.uniform(0, ceiling)
+
+    async def run(self, stage: str, attempt: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call attempt() until it succeeds or its error may not be retried
+
+        Args:
+            stage: Stage name for statistics
+            attempt: Coroutine function performing one attempt
+
+        Returns:
+            The first successful result
+
+        Raises:
+            The last error once retries are exhausted (or on a fatal error)
+        """
+        retries = 0
+
+        while True:
+            try:
+                result = await attempt()
+            except Exception as e:
+                error_class = self.classify(e)
+                stats = self._stage(stage)
+                stats['errors'][error_class] += 1
+
+                if not self.should_retry(error_class, retries):
+                    stats['calls'] += 1
+                    stats['exhausted'] += 1
+                    raise
+
+                retries += 1
+                stats['retries'] += 1
+                delay = self.backoff(retries)
+                logger.warning(f"{stage} {error_class} error ({e}); retry {retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            stats = self._stage(stage)
+            stats['calls'] += 1
+            if retries:
+                stats['recovered'] += 1
+            return result
+
+    def statistics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage calls, retries, recovered and exhausted calls, and errors by class"""
+        return {stage: {**stats, 'errors': dict(stats['errors'])} for stage, stats in self.stages.items()}
+
+    def _stage(self, stage: str) -> Dict[str, Any]:
+        if stage not in self.stages:
+            self.stages[stage] = {
+                'calls': 0,
+                'retries': 0,
+                'recovered': 0,
+                'exhausted': 0,
+                'errors': {error_class: 0 for error_class in ERROR_CLASSES}
+            }
+        return self.stages[stage]
+
+
+async def with_retry(
+    policy: Optional[RetryPolicy],
+    stage: str,
+    attempt: Callable[[], Awaitable[T]]
+) -> T:
+    """Run attempt() under policy, or once when there is no policy"""
+    if policy is None:
+        return await attempt()
+    return await policy.run(stage, attempt)
+
+
+def is_retryable(policy: Optional[RetryPolicy], error: BaseException) -> bool:
+    """
+    Whether a stage should re-raise error instead of falling back to heuristics
+
+    Rate-limit and transient errors that outlast the stage retries go up to
+    the document-level retry and, failing that, the dead-letter queue; only
+    parse and fatal errors are answered with a degraded heuristic result.
+    """
+    return (policy or RetryPolicy()).classify(error) in RETRYABLE_CLASSES
+
+
+class DeadLetterQueue:
+    """
+    Append-only JSONL file of documents that failed every attempt
+
+    Each line holds the document itself, so a dead-lettered document can be
+    fixed and resubmitted without going back to the production source.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: JSONL file (created on first write)
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        document_id: str,
+        document: Dict[str, Any],
+        error: BaseException,
+        error_class: str,
+        attempts: int
+    ) -> None:
+        """Append a failed document"""
+        record = {
+            'document_id': document_id,
+            'error': str(error),
+            'error_type': type(error).__name__,
+            'error_class': error_class,
+            'attempts': attempts,
+            'failed_at': datetime.utcnow().isoformat(),
+            'document': document
+        }
+        line = json.dumps(record, separators=(',', ':'), default=str)
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+        logger.warning(f"Document {document_id} dead-lettered after {attempts} attempt(s): {error}")
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All dead-lettered records, oldest first"""
+        if not self.path.exists():
+            return []
+
+        with self._lock, open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Dead-lettered documents, ready to pass back to process_batch"""
+        return [
+            {**entry['document'], 'document_id': entry['document_id']}
+            for entry in self.entries()
+        ]
+
+    def clear(self) -> None:
+        """Remove the dead-letter file"""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.entries())
@@ -0,0 +1,153 @@
+"""
+Run Journal - Append-only checkpoint of completed documents for resumable runs
+"""
+
+import json
+import logging
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from output_writer import ResultWriter
+
+logger = logging.getLogger(__name__)
+
+
+class RunJournal:
+    """
+    Checkpoint of one batch run, resumable by run ID
+
+    Each run directory holds:
+    - results.jsonl: every successful result, appended as it completes
+    - manifest.jsonl: one line per result with its document ID, byte offset
+      and length in results.jsonl
+    - run.json: run status and the final output path
+
+    A result line is written and flushed before its manifest line, so a crash
+    can leave at most one torn line in either file; both are truncated back
+    to the last complete manifest entry when the journal is reopened.
+    Failed documents and results with degraded stages are not journaled and
+    are attempted again on resume.
+    """
+
+    MANIFEST = 'manifest.jsonl'
+    RESULTS = 'results.jsonl'
+    RUN_INFO = 'run.json'
+
+    def __init__(self, runs_dir: str, run_id: Optional[str] = None):
+        """
+        Open (or create) a run journal
+
+        Args:
+            runs_dir: Directory holding one subdirectory per run
+            run_id: Run to resume (None starts a new run)
+        """
+        self.run_id = run_id or self.new_run_id()
+        self.path = Path(runs_dir) / self.run_id
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.entries: Dict[str, Tuple[int, int]] = self._load_manifest()
+        self.resumed = bool(self.entries)
+
+        # The manifest is the writer's offset index
+        self._writer = ResultWriter(self.path / self.RESULTS, self.path / self.MANIFEST)
+
+        info = self._read_info()
+        self._write_info({
+            'run_id': self.run_id,
+            'created_at': info.get('created_at', datetime.utcnow().isoformat()),
+            'status': 'running',
+            'output_path': None
+        })
+
+        if self.resumed:
+            logger.info(f"Resuming run {self.run_id}: {len(self.entries)} documents already completed")
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Sortable, collision-resistant run ID"""
+        return f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    def is_completed(self, document_id: str) -> bool:
+        return document_id in self.entries
+
+    def completed_results(self) -> Dict[str, Dict[str, Any]]:
+        """Read every journaled result by its manifest offset"""
+        results = {}
+        with open(self.path / self.RESULTS, 'rb') as f:
+            for document_id, (offset, length) in self.entries.items():
+                f.seek(offset)
+                results[document_id] = json.loads(f.read(length))
+        return results
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """Append a completed result (failed and degraded results are skipped)"""
+        if 'error' in result or result.get('degraded_stages'):
+            return
+
+        self.entries[result['document_id']] = self._writer.write(result)
+
+    def mark_complete(self, output_path: str) -> None:
+        """Record that the run finished and where its output was saved"""
+        info = self._read_info()
+        info.update({
+            'status': 'complete',
+            'completed_at': datetime.utcnow().isoformat(),
+            'completed_documents': len(self.entries),
+            'output_path': output_path
+        })
+        self._write_info(info)
+
+    def close(self) -> None:
+        self._writer.close()
+
+    def _load_manifest(self) -> Dict[str, Tuple[int, int]]:
+        """Read complete manifest entries and drop any torn tail in both files"""
+        manifest_path = self.path / self.MANIFEST
+        results_path = self.path / self.RESULTS
+        entries: Dict[str, Tuple[int, int]] = {}
+
+        if not manifest_path.exists():
+            return entries
+
+        results_size = results_path.stat().st_size if results_path.exists() else 0
+        good_bytes = 0
+        results_end = 0
+
+        with open(manifest_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    offset, length = entry['offset'], entry['length']
+                except (ValueError, KeyError):
+                    break
+                if not line.endswith(b'\n') or offset + length > results_size:
+                    break
+
+                # Later entries for the same document supersede earlier ones
+                entries[entry['document_id']] = (offset, length)
+                good_bytes += len(line)
+                results_end = max(results_end, offset + length)
+
+        with open(manifest_path, 'r+b') as f:
+            f.truncate(good_bytes)
+        if results_path.exists():
+            with open(results_path, 'r+b') as f:
+                f.truncate(results_end)
+
+        return entries
+
+    def _read_info(self) -> Dict[str, Any]:
+        info_path = self.path / self.RUN_INFO
+        if not info_path.exists():
+            return {}
+        with open(info_path) as f:
+            return json.load(f)
+
+    def _write_info(self, info: Dict[str, Any]) -> None:
+        info['updated_at'] = datetime.utcnow().isoformat()
+        tmp_path = self.path / f"{self.RUN_INFO}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(info, f, indent=2)
+        tmp_path.replace(self.path / self.RUN_INFO)
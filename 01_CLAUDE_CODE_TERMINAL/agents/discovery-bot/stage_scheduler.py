@@ -0,0 +1,116 @@
+"""
+Stage Scheduler - Run per-document pipeline stages as a dependency graph
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class StageScheduler:
+    """Execute async pipeline stages as soon as their dependencies finish"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def add_stage(
+        self,
+        name: str,
+        func: StageFunc,
+        depends_on: Iterable[str] = ()
+    ) -> 'StageScheduler':
+        """
+        Register a pipeline stage
+
+        Args:
+            name: Unique stage name (also the key of its output)
+            func: Async callable receiving a dict of dependency outputs
+            depends_on: Names of stages whose outputs this stage needs
+
+        Returns:
+            The scheduler, for chaining
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage already registered: {name}")
+
+        self.stages[name] = {
+            'func': func,
+            'depends_on': list(depends_on)
+        }
+        return self
+
+    def execution_order(self) -> List[str]:
+        """Return stages in a valid topological order, rejecting cycles and unknown dependencies"""
+        for name, stage in self.stages.items():
+            for dep in stage['depends_on']:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+        remaining = {name: set(stage['depends_on']) for name, stage in self.stages.items()}
+        order = []
+
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+        return order
+
+    async def run(self, label: str = '') -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+        """
+        Run all stages, overlapping those without mutual dependencies
+
+        Args:
+            label: Optional identifier (e.g. document ID) for log messages
+
+        Returns:
+            Tuple of (stage outputs by name, stage timings by name). Timings
+            hold each stage's start offset from the pipeline start and its
+            duration, both in milliseconds.
+        """
+        order = self.execution_order()
+        pipeline_start = time.perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str) -> Any:
+            stage = self.stages[name]
+            dep_outputs = await asyncio.gather(*(tasks[dep] for dep in stage['depends_on']))
+            inputs = dict(zip(stage['depends_on'], dep_outputs))
+
+            logger.info(f"Running stage '{name}'{f' for {label}' if label else ''}")
+            started = time.perf_counter()
+            try:
+                return await stage['func'](inputs)
+            finally:
+                finished = time.perf_counter()
+                timings[name] = {
+                    'started_ms': round((started - pipeline_start) * 1000, 2),
+                    'duration_ms': round((finished - started) * 1000, 2)
+                }
+
+        # Dependencies are created first, so every task can await its inputs
+        for name in order:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            outputs = await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        return dict(zip(tasks.keys(), outputs)), timings
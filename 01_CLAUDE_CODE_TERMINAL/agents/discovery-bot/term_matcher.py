@@ -0,0 +1,84 @@
+"""
+Term Matcher - Precompiled multi-term matching for privilege and keyword heuristics
+"""
+
+from typing import Dict, Iterable, List, Optional, Set
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class TermMatcher:
+    """
+    Which terms of several named groups occur in a text
+
+    Terms are lowercased and compiled once; a text is lowercased once per
+    call and every group is answered from the same set of matches. Matching
+    is plain case-insensitive substring containment, so results are the same
+    as testing `term in text.lower()` for each term.
+
+    With pyahocorasick installed, matching is a single Aho-Corasick pass over
+    the text whose cost barely grows with the number of terms. Without it
+    each term is found with CPython's substring search, which keeps up with
+    the automaton for a few dozen terms but slows linearly beyond that (see
+    benchmark_matcher.py).
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], use_automaton: Optional[bool] = None):
+        """
+        Args:
+            groups: Group name -> terms, in the order results should list them
+            use_automaton: Require (True) or disable (False) the Aho-Corasick
+                backend; None uses it when pyahocorasick is installed
+
+        Raises:
+            ImportError: If use_automaton is True and pyahocorasick is missing
+        """
+        self.groups = {name: tuple(terms) for name, terms in groups.items()}
+        self._terms = tuple(dict.fromkeys(
+            term.lower() for terms in self.groups.values() for term in terms
+        ))
+
+        if use_automaton is None:
+            use_automaton = ahocorasick is not None
+        elif use_automaton and ahocorasick is None:
+            raise ImportError(
+                "pyahocorasick is required for the automaton backend. "
+                "Install with: pip install pyahocorasick"
+            )
+
+        self._automaton = None
+        if use_automaton and self._terms:
+            self._automaton = ahocorasick.Automaton()
+            for term in self._terms:
+                self._automaton.add_word(term, term)
+            self._automaton.make_automaton()
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @property
+    def backend(self) -> str:
+        return 'automaton' if self._automaton is not None else 'scan'
+
+    def matched_terms(self, text: str) -> Set[str]:
+        """Every distinct (lowercased) term occurring in text"""
+        text_lower = text.lower()
+        if self._automaton is not None:
+            return {term for _, term in self._automaton.iter(text_lower)}
+        return {term for term in self._terms if term in text_lower}
+
+    def find(self, text: str) -> Dict[str, List[str]]:
+        """
+        Terms of each group occurring in text
+
+        Returns:
+            Group name -> matched terms as given, in group order
+        """
+        found = self.matched_terms(text)
+        return {
+            name: [term for term in terms if term.lower() in found]
+            for name, terms in self.groups.items()
+        }
@@ -0,0 +1,230 @@
+"""
+Text Chunker - Token-budgeted, sentence-aware chunks with exact character offsets
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Any, Callable, Iterator, Optional
+
+import numpy as np
+
+
+# Approximate tokens: words (runs of \w) and individual punctuation marks
+WORD_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+# Words whose trailing period does not end a sentence
+ABBREVIATIONS = (
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'no', 'nos', 'inc', 'corp',
+    'co', 'ltd', 'llc', 'llp', 'v', 'vs', 'etc', 'e.g', 'i.e', 'u.s', 'esq', 'hon',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'sec', 'ex', 'p', 'pp', 'para', 'id', 'cf', 'fig', 'approx', 'dept', 'q', 'a'
+)
+
+# Boundaries are the character offset where the next unit starts
+PARAGRAPH_PATTERN = re.compile(r'\n[ \t]*\n\s*')
+SENTENCE_PATTERN = re.compile(
+    r'(?:[!?]|\.' + ''.join(rf'(?<!\b(?i:{re.escape(word)})\.)' for word in ABBREVIATIONS) + ')'
+    r'[.!?]*["\'”’)\]]*\s+(?=["\'“‘(\[]?[A-Z0-9])'
+)
+LINE_PATTERN = re.compile(r'\n\s*')
+
+TokenSpans = Callable[[str], np.ndarray]
+
+# Character classes of ASCII code points: 0 whitespace, 1 word, 2 punctuation
+_ASCII_CLASSES = np.array([
+    0 if chr(c).isspace() else 1 if re.match(r'\w', chr(c)) else 2 for c in range(128)
+], dtype=np.int8)
+
+
+def _character_classes(text: str) -> np.ndarray:
+    """Class of every character of text, with the same \\w and \\s as re"""
+    codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    classes = _ASCII_CLASSES[np.minimum(codes, 127)]
+    other = codes > 127
+    if other.any():
+        unique, inverse = np.unique(codes[other], return_inverse=True)
+        classes[other] = np.array([
+            0 if chr(c).isspace() else 1 if re.match(r'\w', chr(c)) else 2 for c in unique
+        ], dtype=np.int8)[inverse]
+    return classes
+
+
+def word_spans(text: str) -> np.ndarray:
+    """
+    (start, end) character offsets of each WORD_PATTERN token
+
+    Computed from character classes with array operations rather than by
+    iterating regex matches.
+    """
+    if not text:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    classes = _character_classes(text)
+    word = classes == 1
+    punctuation = classes == 2
+    previous_word = np.concatenate(([False], word[:-1]))
+    next_word = np.concatenate((word[1:], [False]))
+
+    starts = np.flatnonzero(punctuation | (word & ~previous_word))
+    ends = np.flatnonzero(punctuation | (word & ~next_word)) + 1
+    return np.stack((starts, ends), axis=1)
+
+
+class TextChunker:
+    """
+    Splits text into chunks of at most max_tokens tokens
+
+    Text is tokenized once into character spans, and paragraph, sentence and
+    line boundaries are found with one regex pass each and mapped to token
+    indices with a vectorized search. Each chunk then ends at the last
+    paragraph boundary that keeps it at least half full, else the last
+    sentence boundary, else the last line break; a sentence or paragraph
+    longer than max_tokens is cut at a word boundary. Consecutive chunks
+    share up to overlap_tokens tokens, starting at a sentence boundary when
+    one falls inside the overlap. The whole pass is linear in the length of
+    the text.
+
+    Chunk offsets index the original text exactly:
+    text[chunk['start_position']:chunk['end_position']] == chunk['text'].
+
+    Tokens default to words and punctuation marks (WORD_PATTERN); pass a
+    model tokenizer's token_spans (see embedding_backends) to budget in the
+    embedding model's own tokens.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 200,
+        overlap_tokens: int = 20,
+        token_spans: Optional[TokenSpans] = None,
+        tokenizer_name: str = 'words'
+    ):
+        """
+        Args:
+            max_tokens: Token budget per chunk
+            overlap_tokens: Tokens repeated from the end of the previous chunk
+            token_spans: text -> int array of (start, end) character offsets,
+                one row per token, in order
+            tokenizer_name: Recorded with the chunk settings
+
+        Raises:
+            ValueError: If overlap_tokens is not below half of max_tokens
+        """
+        if max_tokens < 1 or not 0 <= overlap_tokens < max(max_tokens // 2, 1):
+            raise ValueError("overlap_tokens must be non-negative and below half of max_tokens")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.token_spans = token_spans or word_spans
+        self.tokenizer_name = tokenizer_name
+
+    def describe(self) -> Dict[str, Any]:
+        """Chunk settings, recorded with the chunks they produced"""
+        return {
+            'chunk_tokens': self.max_tokens,
+            'overlap_tokens': self.overlap_tokens,
+            'tokenizer': self.tokenizer_name
+        }
+
+    def fingerprint(self) -> str:
+        """Short hash of the settings, for cache keys"""
+        return hashlib.sha256(json.dumps(self.describe(), sort_keys=True).encode()).hexdigest()[:16]
+
+    def chunks(self, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Chunks of text, in order
+
+        Yields:
+            {chunk_id, text, start_position, end_position, length, token_count}
+        """
+        spans = np.asarray(self.token_spans(text), dtype=np.int64).reshape(-1, 2)
+        n = len(spans)
+        if n == 0:
+            return
+
+        starts, ends = spans[:, 0], spans[:, 1]
+
+        # Token index each boundary falls before, coarsest level first; each
+        # level includes the coarser ones
+        paragraphs = self._token_boundaries(starts, self._paragraph_offsets(text))
+        sentences = np.union1d(paragraphs, self._token_boundaries(starts, self._sentence_offsets(text)))
+        lines = np.union1d(sentences, self._token_boundaries(starts, self._line_offsets(text)))
+
+        # Tokens that begin a new word (not a continuation of the previous one)
+        word_starts = np.flatnonzero(np.concatenate(([True], starts[1:] > ends[:-1])))
+
+        half = self.max_tokens // 2
+        start = 0
+        previous_end = 0
+        chunk_id = 0
+        while True:
+            limit = start + self.max_tokens
+            if limit >= n:
+                end = n
+            else:
+                # Every chunk reaches past the previous one, not just past its overlap
+                full = max(start + half, previous_end)
+                end = (
+                    self._last_boundary(paragraphs, full, limit)
+                    or self._last_boundary(sentences, full, limit)
+                    or self._last_boundary(lines, full, limit)
+                    or self._last_boundary(sentences, previous_end, limit)
+                    or self._last_boundary(word_starts, previous_end, limit)
+                    or limit
+                )
+
+            first, last = int(starts[start]), int(ends[end - 1])
+            yield {
+                'chunk_id': chunk_id,
+                'text': text[first:last],
+                'start_position': first,
+                'end_position': last,
+                'length': last - first,
+                'token_count': end - start
+            }
+            if end == n:
+                return
+            chunk_id += 1
+            previous_end = end
+
+            next_start = max(end - self.overlap_tokens, start + 1)
+            if next_start < end:
+                snapped = self._first_boundary(sentences, next_start, end)
+                if snapped is not None:
+                    next_start = snapped
+            start = next_start
+
+    @staticmethod
+    def _token_boundaries(starts: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """Token indices of boundary character offsets, excluding the ends"""
+        indices = np.unique(np.searchsorted(starts, offsets, side='left'))
+        return indices[(indices > 0) & (indices < len(starts))]
+
+    @staticmethod
+    def _last_boundary(boundaries: np.ndarray, low: int, high: int) -> Optional[int]:
+        """Largest boundary in (low, high], if any"""
+        i = np.searchsorted(boundaries, high, side='right') - 1
+        if i >= 0 and boundaries[i] > low:
+            return int(boundaries[i])
+        return None
+
+    @staticmethod
+    def _first_boundary(boundaries: np.ndarray, low: int, high: int) -> Optional[int]:
+        """Smallest boundary in [low, high), if any"""
+        i = np.searchsorted(boundaries, low, side='left')
+        if i < len(boundaries) and boundaries[i] < high:
+            return int(boundaries[i])
+        return None
+
+    @staticmethod
+    def _paragraph_offsets(text: str) -> np.ndarray:
+        return np.fromiter((match.end() for match in PARAGRAPH_PATTERN.finditer(text)), dtype=np.int64)
+
+    @staticmethod
+    def _sentence_offsets(text: str) -> np.ndarray:
+        return np.fromiter((match.end() for match in SENTENCE_PATTERN.finditer(text)), dtype=np.int64)
+
+    @staticmethod
+    def _line_offsets(text: str) -> np.ndarray:
+        return np.fromiter((match.end() for match in LINE_PATTERN.finditer(text)), dtype=np.int64)
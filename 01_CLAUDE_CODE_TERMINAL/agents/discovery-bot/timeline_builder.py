@@ -2,19 +2,69 @@
 Timeline Builder - Construct chronological timelines from extracted dates and events
 """
 
+import heapq
 import logging
-from typing import Dict, Any, List
-from datetime import datetime
-from collections import defaultdict
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from datetime import datetime, timezone
+from collections import Counter, defaultdict
+
+from timeline_index import TimelineIndex
+from timeline_records import DocumentContext, TimelineEvent
 
 logger = logging.getLogger(__name__)
 
 
 class TimelineBuilder:
-    """Build chronological timelines from document analysis"""
-
-    def __init__(self):
-        pass
+    """
+    Build chronological timelines from document analysis
+
+    Events are kept in a sorted index as results arrive: a sorted list of
+    distinct dates and, per date, that date's events ordered by source
+    document. Adding a result costs O(events * log dates) and the counts
+    behind the groupings and statistics are updated in place, so the
+    timeline is never rebuilt from all results.
+
+    timeline() returns one chronological event list; the year and month
+    groupings are index ranges into it and the type grouping lists indices,
+    so no event is copied into more than one list. Events are compact
+    TimelineEvent records sharing one DocumentContext per document; they
+    become dicts only when written out.
+
+    With a TimelineIndex, every added document's events are also written to
+    the persistent index, which outlives the batch.
+    """
+
+    KEY_INDICATORS = [
+        'filing', 'deadline', 'settlement', 'signed',
+        'agreement', 'trial', 'hearing', 'judgment'
+    ]
+
+    def __init__(self, index: Optional[TimelineIndex] = None):
+        """
+        Args:
+            index: Persistent index fed with every added document's events
+        """
+        self.index = index
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop every event (the persistent index is kept)"""
+        self._dates: List[str] = []
+        self._events_by_date: Dict[str, List[TimelineEvent]] = {}
+        self._documents = set()
+        self._documents_with_dates = set()
+        self._key_candidates: List[TimelineEvent] = []
+
+        self.total_events = 0
+        self._year_counts = Counter()
+        self._month_counts = Counter()
+        self._type_counts = Counter()
+        self._privileged = 0
+        self._high_confidence = 0
+        self._confidence_sum = 0.0
 
     def build(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -27,40 +77,9 @@ class TimelineBuilder:
             Timeline with events, statistics, and visualizations
         """
         try:
-            events = []
-
-            # Extract all dated events from documents
-            for result in results:
-                if 'error' in result:
-                    continue
-
-                doc_id = result.get('document_id', 'unknown')
-                doc_type = result.get('classification', {}).get('document_type', 'unknown')
-                entities = result.get('entities', {})
-                dates = entities.get('dates', [])
-
-                # Process each date as a potential event
-                for date_entity in dates:
-                    event = self._create_event(date_entity, result, doc_id, doc_type)
-                    if event:
-                        events.append(event)
-
-            # Sort events chronologically
-            events.sort(key=lambda x: x['date'])
-
-            # Build timeline structure
-            timeline = {
-                'total_events': len(events),
-                'date_range': self._get_date_range(events),
-                'events': events,
-                'events_by_year': self._group_by_year(events),
-                'events_by_month': self._group_by_month(events),
-                'events_by_type': self._group_by_type(events),
-                'key_dates': self._identify_key_dates(events),
-                'timeline_statistics': self._calculate_statistics(events)
-            }
-
-            return timeline
+            builder = TimelineBuilder()
+            builder.add_results(results)
+            return builder.timeline()
 
         except Exception as e:
             logger.error(f"Error building timeline: {e}")
@@ -76,13 +95,165 @@ class TimelineBuilder:
                 'error': str(e)
             }
 
+    def add_result(self, result: Dict[str, Any]) -> int:
+        """
+        Insert the dated events of one result
+
+        Failed results and documents already added are skipped.
+
+        Returns:
+            Number of events added
+        """
+        doc_id = result.get('document_id', 'unknown')
+        if 'error' in result or doc_id in self._documents:
+            return 0
+
+        dates = result.get('entities', {}).get('dates', [])
+        document = DocumentContext(result)
+
+        # Process each date as a potential event
+        events = []
+        for date_entity in dates:
+            event = self._create_event(date_entity, document, len(events))
+            if event:
+                events.append(event)
+
+        with self._lock:
+            if doc_id in self._documents:
+                return 0
+            self._documents.add(doc_id)
+
+            for event in events:
+                self._insert(event)
+
+            if events:
+                self._documents_with_dates.add(doc_id)
+
+        if self.index is not None:
+            self.index.add_document(doc_id, events)
+
+        return len(events)
+
+    def add_results(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Insert the events of several results; returns events added"""
+        return sum(self.add_result(result) for result in results)
+
+    def events(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[TimelineEvent]:
+        """
+        Iterate events chronologically, optionally within [start, end]
+
+        Args:
+            start: Earliest ISO date (inclusive)
+            end: Latest ISO date (inclusive; a date includes its times)
+        """
+        lo = bisect_left(self._dates, start) if start else 0
+        hi = bisect_left(self._dates, end + '\uffff') if end else len(self._dates)
+
+        for date in self._dates[lo:hi]:
+            yield from self._events_by_date[date]
+
+    def timeline(self) -> Dict[str, Any]:
+        """
+        Current timeline
+
+        'events' is the only event list; events_by_year and events_by_month
+        hold {'count', 'start', 'end'} slices of it and events_by_type holds
+        {'count', 'indices'} (see events_in).
+        """
+        with self._lock:
+            events = list(self.events())
+
+            return {
+                'total_events': self.total_events,
+                'date_range': self._get_date_range(),
+                'events': events,
+                'events_by_year': self._ranges(self._year_counts),
+                'events_by_month': self._ranges(self._month_counts),
+                'events_by_type': self._type_indices(events),
+                'key_dates': self._identify_key_dates(),
+                'timeline_statistics': self._calculate_statistics()
+            }
+
+    @staticmethod
+    def events_in(timeline: Dict[str, Any], section: str, group: str) -> List[TimelineEvent]:
+        """
+        Resolve one grouping of a timeline() result to its events
+
+        Args:
+            timeline: Timeline returned by timeline() or build()
+            section: 'events_by_year', 'events_by_month' or 'events_by_type'
+            group: Year ('2024'), month ('2024-03') or event type
+        """
+        view = timeline.get(section, {}).get(group)
+        if not view:
+            return []
+
+        events = timeline['events']
+        if 'indices' in view:
+            return [events[i] for i in view['indices']]
+        return events[view['start']:view['end']]
+
+    def _insert(self, event: TimelineEvent) -> None:
+        """Insert one event and update the counts (caller holds the lock)"""
+        date = event.date
+
+        bucket = self._events_by_date.get(date)
+        if bucket is None:
+            bucket = self._events_by_date[date] = []
+            insort(self._dates, date)
+
+        # Same-day events stay in document order whatever order results arrive in
+        key = event.sort_key
+        lo, hi = 0, len(bucket)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bucket[mid].sort_key <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        bucket.insert(lo, event)
+
+        self.total_events += 1
+        self._year_counts[date[:4]] += 1
+        self._month_counts[date[:7]] += 1
+        self._type_counts[event.event_type] += 1
+
+        confidence = event.confidence
+        self._confidence_sum += confidence
+        if confidence >= 0.85:
+            self._high_confidence += 1
+        if event.document.is_privileged:
+            self._privileged += 1
+
+        if confidence >= 0.8 and self._is_key_event(event):
+            self._key_candidates.append(event)
+
+    def _ranges(self, counts: Counter) -> Dict[str, Dict[str, int]]:
+        """Index ranges of date-prefix groups in the chronological event list"""
+        ranges = {}
+        start = 0
+        for group in sorted(counts):
+            ranges[group] = {'count': counts[group], 'start': start, 'end': start + counts[group]}
+            start += counts[group]
+        return ranges
+
+    def _type_indices(self, events: List[TimelineEvent]) -> Dict[str, Dict[str, Any]]:
+        """Positions of each event type in the chronological event list"""
+        indices = defaultdict(list)
+        for i, event in enumerate(events):
+            indices[event.event_type].append(i)
+
+        return {
+            event_type: {'count': len(indices[event_type]), 'indices': indices[event_type]}
+            for event_type in sorted(indices)
+        }
+
     def _create_event(
         self,
         date_entity: Dict,
-        result: Dict,
-        doc_id: str,
-        doc_type: str
-    ) -> Optional[Dict]:
+        document: DocumentContext,
+        seq: int = 0
+    ) -> Optional[TimelineEvent]:
         """Create timeline event from date entity"""
 
         try:
@@ -93,44 +264,37 @@ class TimelineBuilder:
 
             # Try to parse as datetime
             try:
-                date_obj = datetime.fromisoformat(date_str)
+                parsed = datetime.fromisoformat(date_str)
             except ValueError:
                 logger.warning(f"Could not parse date: {date_str}")
                 return None
 
+            # Keep every event date naive UTC so dates sort and subtract together
+            if parsed.tzinfo is not None:
+                date_str = parsed.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
             # Extract context and description
             context = date_entity.get('context', 'Date mentioned in document')
             original_format = date_entity.get('original_format', date_str)
 
-            # Determine event type based on context
-            event_type = self._categorize_event(context, doc_type)
-
-            # Get related entities from the same document
-            entities = result.get('entities', {})
-            related_people = [p['name'] for p in entities.get('people', [])[:5]]
-            related_orgs = [o['name'] for o in entities.get('organizations', [])[:5]]
-            related_amounts = [a['amount'] for a in entities.get('amounts', [])[:3]]
-
-            # Check if this event is from a privileged document
-            is_privileged = result.get('privilege', {}).get('is_privileged', False)
-
-            event = {
-                'date': date_str,
-                'date_object': date_obj.isoformat(),
-                'original_format': original_format,
-                'description': context,
-                'event_type': event_type,
-                'source_document': doc_id,
-                'document_type': doc_type,
-                'is_privileged': is_privileged,
-                'confidence': date_entity.get('confidence', 0.5),
-                'related_people': related_people,
-                'related_organizations': related_orgs,
-                'related_amounts': related_amounts,
-                'position_in_document': date_entity.get('position', 0)
-            }
+            confidence = date_entity.get('confidence', 0.5)
+            if not isinstance(confidence, (int, float)):
+                confidence = 0.5
 
-            return event
+            # Determine event type based on context
+            event_type = self._categorize_event(context, document.document_type)
+
+            # Related entities and privilege come from the shared document context
+            return TimelineEvent(
+                date=date_str,
+                original_format=original_format,
+                description=context,
+                event_type=event_type,
+                confidence=confidence,
+                position_in_document=date_entity.get('position', 0),
+                document=document,
+                seq=seq
+            )
 
         except Exception as e:
             logger.warning(f"Error creating event from date entity: {e}")
@@ -163,148 +327,66 @@ class TimelineBuilder:
         else:
             return 'other'
 
-    def _get_date_range(self, events: List[Dict]) -> Dict:
+    def _get_date_range(self) -> Dict:
         """Get date range of timeline"""
 
-        if not events:
-            return {}
-
-        dates = [e['date'] for e in events if e.get('date')]
-        if not dates:
+        if not self._dates:
             return {}
 
+        earliest, latest = self._dates[0], self._dates[-1]
         return {
-            'earliest': min(dates),
-            'latest': max(dates),
+            'earliest': earliest,
+            'latest': latest,
             'span_days': (
-                datetime.fromisoformat(max(dates)) -
-                datetime.fromisoformat(min(dates))
+                datetime.fromisoformat(latest) -
+                datetime.fromisoformat(earliest)
             ).days
         }
 
-    def _group_by_year(self, events: List[Dict]) -> Dict[str, List[Dict]]:
-        """Group events by year"""
-
-        by_year = defaultdict(list)
-
-        for event in events:
-            try:
-                year = event['date'][:4]  # Extract YYYY
-                by_year[year].append(event)
-            except (KeyError, IndexError):
-                continue
-
-        # Convert to regular dict with counts
-        return {
-            year: {
-                'count': len(year_events),
-                'events': year_events
-            }
-            for year, year_events in sorted(by_year.items())
-        }
-
-    def _group_by_month(self, events: List[Dict]) -> Dict[str, List[Dict]]:
-        """Group events by month"""
-
-        by_month = defaultdict(list)
-
-        for event in events:
-            try:
-                month = event['date'][:7]  # Extract YYYY-MM
-                by_month[month].append(event)
-            except (KeyError, IndexError):
-                continue
-
-        # Convert to regular dict with counts
-        return {
-            month: {
-                'count': len(month_events),
-                'events': month_events
-            }
-            for month, month_events in sorted(by_month.items())
-        }
-
-    def _group_by_type(self, events: List[Dict]) -> Dict[str, List[Dict]]:
-        """Group events by type"""
+    def _is_key_event(self, event: TimelineEvent) -> bool:
+        """Whether an event's description or amounts suggest an important date"""
 
-        by_type = defaultdict(list)
+        description = event.description.lower()
 
-        for event in events:
-            event_type = event.get('event_type', 'other')
-            by_type[event_type].append(event)
+        # Check if description contains key indicators
+        if any(indicator in description for indicator in self.KEY_INDICATORS):
+            return True
 
-        # Convert to regular dict with counts
-        return {
-            event_type: {
-                'count': len(type_events),
-                'events': type_events
-            }
-            for event_type, type_events in sorted(by_type.items())
-        }
+        # High-value amounts also indicate key dates
+        return bool(event.document.related_amounts)
 
-    def _identify_key_dates(self, events: List[Dict]) -> List[Dict]:
+    def _identify_key_dates(self) -> List[Dict]:
         """Identify key dates that are likely important"""
 
-        key_dates = []
-
-        # Key date indicators
-        key_indicators = [
-            'filing', 'deadline', 'settlement', 'signed',
-            'agreement', 'trial', 'hearing', 'judgment'
+        # Highest confidence first, earlier events first among equals
+        top = heapq.nsmallest(
+            20,
+            self._key_candidates,
+            key=lambda event: (-event.confidence, event.sort_key)
+        )
+
+        return [
+            {
+                'date': event.date,
+                'description': event.description,
+                'event_type': event.event_type,
+                'source_document': event.document.source_document,
+                'importance_score': event.confidence
+            }
+            for event in top
         ]
 
-        for event in events:
-            description = event.get('description', '').lower()
-
-            # Check if description contains key indicators
-            is_key = any(indicator in description for indicator in key_indicators)
-
-            # High-value amounts also indicate key dates
-            related_amounts = event.get('related_amounts', [])
-            if related_amounts:
-                is_key = True
-
-            # High confidence dates are more likely to be key
-            confidence = event.get('confidence', 0)
-            if is_key and confidence >= 0.8:
-                key_dates.append({
-                    'date': event['date'],
-                    'description': event['description'],
-                    'event_type': event['event_type'],
-                    'source_document': event['source_document'],
-                    'importance_score': confidence
-                })
-
-        # Sort by importance
-        key_dates.sort(key=lambda x: x['importance_score'], reverse=True)
-
-        return key_dates[:20]  # Top 20 key dates
-
-    def _calculate_statistics(self, events: List[Dict]) -> Dict:
+    def _calculate_statistics(self) -> Dict:
         """Calculate timeline statistics"""
 
-        if not events:
+        if not self.total_events:
             return {}
 
-        # Event type distribution
-        event_types = defaultdict(int)
-        for event in events:
-            event_types[event.get('event_type', 'other')] += 1
-
-        # Privileged events
-        privileged_count = sum(1 for e in events if e.get('is_privileged', False))
-
-        # High confidence events
-        high_confidence = sum(1 for e in events if e.get('confidence', 0) >= 0.85)
-
-        # Documents contributing to timeline
-        unique_docs = len(set(e.get('source_document') for e in events))
-
         return {
-            'total_events': len(events),
-            'event_type_distribution': dict(event_types),
-            'privileged_events': privileged_count,
-            'high_confidence_events': high_confidence,
-            'documents_with_dates': unique_docs,
-            'average_confidence': sum(e.get('confidence', 0) for e in events) / len(events)
+            'total_events': self.total_events,
+            'event_type_distribution': dict(self._type_counts),
+            'privileged_events': self._privileged,
+            'high_confidence_events': self._high_confidence,
+            'documents_with_dates': len(self._documents_with_dates),
+            'average_confidence': self._confidence_sum / self.total_events
         }
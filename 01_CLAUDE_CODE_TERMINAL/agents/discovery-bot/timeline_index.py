@@ -0,0 +1,286 @@
+"""
+Timeline Index - Persistent SQLite index of timeline events across batches and matters
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Sequence
+
+from timeline_records import serialize
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineIndex:
+    """
+    Queryable chronology of every event indexed for a matter
+
+    Events are keyed by (matter_id, source_document, seq), where seq is the
+    event's position within its document, so re-indexing a document (a
+    re-run, a later production) replaces its events instead of duplicating
+    them. Filterable fields are stored as columns and the full event as
+    compact JSON. Indexes on (matter, date), (matter, event_type, date) and
+    (matter, custodian, date) keep range queries and keyset pagination in
+    the millisecond range for millions of events.
+
+    Added documents are written in one transaction per commit_interval
+    documents; queries, statistics and close() write any pending documents
+    first.
+    """
+
+    TABLE = 'timeline_events'
+
+    def __init__(self, path: str, matter_id: str = 'default', commit_interval: int = 500):
+        """
+        Open (or create) the index database
+
+        Args:
+            path: SQLite database file (shared by every matter)
+            matter_id: Matter this instance reads and writes
+            commit_interval: Documents buffered per write transaction
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.matter_id = matter_id
+        self.commit_interval = commit_interval
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[tuple]] = {}
+
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        # Index pages of large matters stay in memory while events stream in
+        self.conn.execute('PRAGMA cache_size=-65536')
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                matter_id TEXT NOT NULL,
+                source_document TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                event_type TEXT,
+                custodian TEXT,
+                document_type TEXT,
+                is_privileged INTEGER NOT NULL,
+                confidence REAL,
+                payload TEXT NOT NULL,
+                indexed_at REAL NOT NULL,
+                PRIMARY KEY (matter_id, source_document, seq)
+            ) WITHOUT ROWID
+        """)
+        for name, columns in [
+            ('date', 'matter_id, date, source_document, seq'),
+            ('type', 'matter_id, event_type, date, source_document, seq'),
+            ('custodian', 'matter_id, custodian, date, source_document, seq')
+        ]:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_{name} ON {self.TABLE} ({columns})"
+            )
+        self.conn.commit()
+
+    def add_document(self, document_id: str, events: Sequence[Dict[str, Any]]) -> None:
+        """
+        Replace a document's events with events
+
+        Args:
+            document_id: Source document
+            events: The document's timeline events (dicts or TimelineEvent
+                records), in document order
+        """
+        now = time.time()
+        rows = [
+            (
+                self.matter_id,
+                document_id,
+                seq,
+                event.get('date'),
+                event.get('event_type'),
+                event.get('custodian'),
+                event.get('document_type'),
+                int(bool(event.get('is_privileged', False))),
+                event.get('confidence'),
+                json.dumps(event, separators=(',', ':'), default=serialize),
+                now
+            )
+            for seq, event in enumerate(events)
+        ]
+
+        with self._lock:
+            # A later add of the same document supersedes a pending one
+            self._pending[document_id] = rows
+            if len(self._pending) >= self.commit_interval:
+                self._write_pending()
+
+    def flush(self) -> None:
+        """Write pending documents"""
+        with self._lock:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """Replace every pending document's events in one transaction (caller holds the lock)"""
+        if not self._pending:
+            return
+
+        self.conn.executemany(
+            f"DELETE FROM {self.TABLE} WHERE matter_id = ? AND source_document = ?",
+            [(self.matter_id, document_id) for document_id in self._pending]
+        )
+        self.conn.executemany(
+            f"INSERT INTO {self.TABLE} VALUES ({', '.join('?' * 11)})",
+            [row for rows in self._pending.values() for row in rows]
+        )
+        self.conn.commit()
+        self._pending = {}
+
+    def remove_document(self, document_id: str) -> int:
+        """Drop a document's events; returns the number removed"""
+        with self._lock:
+            self._write_pending()
+            cursor = self.conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE matter_id = ? AND source_document = ?",
+                (self.matter_id, document_id)
+            )
+            self.conn.commit()
+        return cursor.rowcount
+
+    def query(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        event_types: Optional[Iterable[str]] = None,
+        custodians: Optional[Iterable[str]] = None,
+        is_privileged: Optional[bool] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of the matter's chronology
+
+        Args:
+            start: Earliest ISO date (inclusive)
+            end: Latest ISO date (inclusive; a date includes its times)
+            event_types: Only these event types
+            custodians: Only events from these custodians' documents
+            is_privileged: Only privileged (True) or non-privileged (False) events
+            limit: Page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            {'events': [...], 'next_cursor': str or None}
+        """
+        where, params = self._filters(start, end, event_types, custodians, is_privileged)
+
+        if cursor:
+            # Keyset pagination: resume after the last event of the previous page
+            where.append('(date, source_document, seq) > (?, ?, ?)')
+            params.extend(json.loads(cursor))
+
+        with self._lock:
+            self._write_pending()
+            rows = self.conn.execute(
+                f"SELECT date, source_document, seq, payload FROM {self.TABLE} "
+                f"WHERE {' AND '.join(where)} "
+                f"ORDER BY date, source_document, seq LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = json.dumps(list(rows[-1][:3]))
+
+        return {
+            'events': [json.loads(row[3]) for row in rows],
+            'next_cursor': next_cursor
+        }
+
+    def count(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        event_types: Optional[Iterable[str]] = None,
+        custodians: Optional[Iterable[str]] = None,
+        is_privileged: Optional[bool] = None
+    ) -> int:
+        """Number of events matching the query filters"""
+        where, params = self._filters(start, end, event_types, custodians, is_privileged)
+
+        with self._lock:
+            self._write_pending()
+            return self.conn.execute(
+                f"SELECT COUNT(*) FROM {self.TABLE} WHERE {' AND '.join(where)}",
+                params
+            ).fetchone()[0]
+
+    def statistics(self) -> Dict[str, Any]:
+        """Event and document counts, date range and event types of the matter"""
+        with self._lock:
+            self._write_pending()
+            events, documents, earliest, latest = self.conn.execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT source_document), MIN(date), MAX(date) "
+                f"FROM {self.TABLE} WHERE matter_id = ?",
+                (self.matter_id,)
+            ).fetchone()
+            event_types = dict(self.conn.execute(
+                f"SELECT COALESCE(event_type, 'other'), COUNT(*) FROM {self.TABLE} "
+                f"WHERE matter_id = ? GROUP BY 1 ORDER BY 1",
+                (self.matter_id,)
+            ).fetchall())
+
+        return {
+            'matter_id': self.matter_id,
+            'total_events': events,
+            'documents': documents,
+            'date_range': {'earliest': earliest, 'latest': latest} if events else {},
+            'event_type_distribution': event_types,
+            'path': str(self.path)
+        }
+
+    def matters(self) -> List[str]:
+        """Every matter with indexed events"""
+        with self._lock:
+            self._write_pending()
+            return [row[0] for row in self.conn.execute(
+                f"SELECT DISTINCT matter_id FROM {self.TABLE} ORDER BY matter_id"
+            )]
+
+    def close(self) -> None:
+        """Write pending documents and close the database connection"""
+        with self._lock:
+            self._write_pending()
+            self.conn.close()
+
+    def _filters(
+        self,
+        start: Optional[str],
+        end: Optional[str],
+        event_types: Optional[Iterable[str]],
+        custodians: Optional[Iterable[str]],
+        is_privileged: Optional[bool]
+    ):
+        """WHERE clauses and parameters shared by query and count"""
+        where = ['matter_id = ?']
+        params: List[Any] = [self.matter_id]
+
+        if start:
+            where.append('date >= ?')
+            params.append(start)
+        if end:
+            where.append('date <= ?')
+            params.append(end + '\uffff')
+
+        for column, values in [('event_type', event_types), ('custodian', custodians)]:
+            if values is not None:
+                values = list(values)
+                where.append(f"{column} IN ({', '.join('?' * len(values))})" if values else '0')
+                params.extend(values)
+
+        if is_privileged is not None:
+            where.append('is_privileged = ?')
+            params.append(int(is_privileged))
+
+        return where, params
@@ -0,0 +1,129 @@
+"""
+Timeline Records - Compact event records with per-document shared context
+"""
+
+import sys
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+
+def _intern(value: Any) -> Any:
+    """Intern strings so repeated values share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _names(entities: Iterable[Any], field: str, limit: int) -> Tuple[str, ...]:
+    """Interned names of the first `limit` entities"""
+    names = []
+    for entity in list(entities or [])[:limit]:
+        if isinstance(entity, dict) and entity.get(field) is not None:
+            names.append(_intern(str(entity[field])))
+    return tuple(names)
+
+
+class DocumentContext:
+    """
+    Fields every event of one document shares
+
+    Built once per result and referenced by each of its events, so the
+    related entity names are stored once per document rather than copied
+    into every event.
+    """
+
+    __slots__ = (
+        'source_document', 'document_type', 'custodian', 'is_privileged',
+        'related_people', 'related_organizations', 'related_amounts'
+    )
+
+    def __init__(self, result: Dict[str, Any]):
+        entities = result.get('entities') or {}
+
+        self.source_document = _intern(result.get('document_id', 'unknown'))
+        self.document_type = _intern((result.get('classification') or {}).get('document_type', 'unknown'))
+        self.custodian = _intern((result.get('source') or {}).get('custodian'))
+        self.is_privileged = bool((result.get('privilege') or {}).get('is_privileged', False))
+        self.related_people = _names(entities.get('people'), 'name', 5)
+        self.related_organizations = _names(entities.get('organizations'), 'name', 5)
+        self.related_amounts = _names(entities.get('amounts'), 'amount', 3)
+
+
+class TimelineEvent:
+    """
+    One dated event
+
+    Supports event['field'] and event.get('field') over the same fields as
+    to_dict(), which builds the serialized form (including the derived
+    date_object) only when an event is written out.
+    """
+
+    __slots__ = (
+        'date', 'original_format', 'description', 'event_type',
+        'confidence', 'position_in_document', 'document', 'seq'
+    )
+
+    # Serialized field order; fields not stored on the event come from its document
+    FIELDS = (
+        'date', 'date_object', 'original_format', 'description', 'event_type',
+        'source_document', 'document_type', 'custodian', 'is_privileged',
+        'confidence', 'related_people', 'related_organizations', 'related_amounts',
+        'position_in_document'
+    )
+
+    def __init__(
+        self,
+        date: str,
+        original_format: Optional[str],
+        description: str,
+        event_type: str,
+        confidence: float,
+        position_in_document: Any,
+        document: DocumentContext,
+        seq: int = 0
+    ):
+        self.date = _intern(date)
+        # original_format defaults to the date itself; keep one string
+        self.original_format = None if original_format == date else original_format
+        self.description = description
+        self.event_type = _intern(event_type)
+        self.confidence = confidence
+        self.position_in_document = position_in_document
+        self.document = document
+        # Position among the document's events; orders same-day events
+        self.seq = seq
+
+    @property
+    def sort_key(self) -> Tuple[str, str, int]:
+        """Chronological order, then document order"""
+        return self.date, self.document.source_document, self.seq
+
+    def __getitem__(self, field: str) -> Any:
+        if field == 'date_object':
+            return datetime.fromisoformat(self.date).isoformat()
+        if field == 'original_format':
+            return self.original_format if self.original_format is not None else self.date
+        if field in ('related_people', 'related_organizations', 'related_amounts'):
+            return list(getattr(self.document, field))
+        if field in TimelineEvent.FIELDS and field in TimelineEvent.__slots__:
+            return getattr(self, field)
+        if field in DocumentContext.__slots__:
+            return getattr(self.document, field)
+        raise KeyError(field)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialized event"""
+        return {field: self[field] for field in self.FIELDS}
+
+    def __repr__(self) -> str:
+        return f"TimelineEvent({self.date!r}, {self.event_type!r}, {self.document.source_document!r})"
+
+
+def serialize(value: Any) -> Any:
+    """json default hook: records become dicts, anything else a string"""
+    to_dict = getattr(value, 'to_dict', None)
+    return to_dict() if callable(to_dict) else str(value)
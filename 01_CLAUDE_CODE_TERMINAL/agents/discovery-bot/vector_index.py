@@ -0,0 +1,681 @@
+"""
+Vector Index - Persistent per-case approximate nearest-neighbor search over chunk vectors
+"""
+
+import json
+import logging
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = date(1970, 1, 1)
+MISSING_DAY = np.iinfo(np.int32).min
+
+
+def _day(value: Any) -> int:
+    """Days since 1970-01-01 of an ISO date or timestamp (MISSING_DAY if unparseable)"""
+    if not value:
+        return MISSING_DAY
+    try:
+        return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+    except ValueError:
+        return MISSING_DAY
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity search over one case's chunk vectors, on local disk
+
+    Directory layout:
+        vectors.f32   - float32 rows, appended as chunks are added and read
+                        through a memory map
+        rows.jsonl    - one line per row (document_id, chunk_index, content,
+                        offsets, is_privileged, date, custodian, ...), plus
+                        tombstone lines for replaced documents
+        ivf.npz       - IVF centroids and the list of every row
+        manifest.json - dimensions and the embedding model that produced them
+
+    Filter columns (document, privilege, date, deleted) live in NumPy arrays
+    and the byte offset of every row line is kept, so a search touches only
+    the vectors it scores and the lines of the hits it returns.
+
+    Up to ivf_min_rows candidate rows are searched exactly. Beyond that,
+    rows are partitioned into inverted lists by spherical k-means and a
+    query scores only the nprobe lists whose centroids are closest. Rows
+    added later join their nearest list immediately; the lists are retrained
+    once the index has grown fourfold since the last training.
+
+    The first time a session (see begin_session) adds chunks for a document
+    already in the index, the document's earlier rows are deleted, so
+    re-running a production replaces its chunks rather than duplicating them.
+
+    One process writes an index. Others open it with read_only=True, which
+    never modifies the files, and call refresh() to pick up rows the writer
+    has appended since.
+    """
+
+    VECTORS = 'vectors.f32'
+    ROWS = 'rows.jsonl'
+    IVF = 'ivf.npz'
+    MANIFEST = 'manifest.json'
+
+    def __init__(
+        self,
+        directory: str,
+        dimensions: Optional[int] = None,
+        embedding: Optional[Dict[str, Any]] = None,
+        ivf_min_rows: int = 20_000,
+        nprobe: Optional[int] = None,
+        read_only: bool = False
+    ):
+        """
+        Open (or create) an index
+
+        Args:
+            directory: Index directory
+            dimensions: Vector width (required for a new index); wider
+                vectors passed to add() and search() are truncated to it, which
+                drops the zero padding of narrower models
+            embedding: Embedding settings the vectors come from (DiscoveryBot
+                embedding_* config keys), stored so queries can be embedded
+                with the same model
+            ivf_min_rows: Candidate rows above which search uses the IVF lists
+            nprobe: Lists scored per query (None: about 1/16 of the lists)
+            read_only: Open an existing index without writing to it, e.g.
+                while another process is adding to it
+
+        Raises:
+            ValueError: If dimensions are missing for a new index, or
+                dimensions or embedding differ from an existing one
+            FileNotFoundError: If a read-only index does not exist
+        """
+        self.directory = Path(directory)
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.read_only = read_only
+        self._lock = threading.RLock()
+
+        manifest_path = self.directory / self.MANIFEST
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+        if read_only and not manifest:
+            raise FileNotFoundError(f"No vector index in {directory}")
+        if manifest:
+            if dimensions and dimensions != manifest['dimensions']:
+                raise ValueError(f"Index {directory} holds {manifest['dimensions']}-dimensional vectors, not {dimensions}")
+            if embedding and manifest.get('embedding') and embedding != manifest['embedding']:
+                raise ValueError(f"Index {directory} was built with {manifest['embedding']}, not {embedding}")
+        elif not dimensions:
+            raise ValueError("dimensions are required to create an index")
+
+        self.dimensions = int(manifest.get('dimensions') or dimensions)
+        self.embedding = manifest.get('embedding') or embedding
+
+        self.rows = 0
+        self._capacity = 0
+        self._document = np.zeros(0, dtype=np.int32)
+        self._privileged = np.zeros(0, dtype=bool)
+        self._day = np.zeros(0, dtype=np.int32)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._offset = np.zeros(0, dtype=np.int64)
+        self._list = np.zeros(0, dtype=np.int32)
+        self._documents: List[str] = []
+        self._document_ids: Dict[str, int] = {}
+        self._session_documents = set()
+        # Bytes of rows.jsonl read into the columns so far
+        self._rows_read = 0
+
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_rows = 0
+        self._ivf_mtime: Optional[float] = None
+        self._list_order: Optional[np.ndarray] = None
+        self._list_bounds: Optional[np.ndarray] = None
+        self._matrix: Optional[np.ndarray] = None
+
+        if read_only:
+            self._vectors_file = self._rows_file = None
+            self._load()
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+            self._vectors_file = open(self.directory / self.VECTORS, 'ab')
+            self._rows_file = open(self.directory / self.ROWS, 'ab')
+            self._write_manifest()
+        self._reader = open(self.directory / self.ROWS, 'rb') if (self.directory / self.ROWS).exists() else None
+
+    @staticmethod
+    def case_directory(root: str, case_id: Optional[str]) -> Path:
+        """Directory of one case's index under a shared root"""
+        return Path(root) / re.sub(r'[^\w.-]', '_', str(case_id or 'default'))
+
+    @classmethod
+    def for_case(cls, root: str, case_id: Optional[str], **kwargs) -> 'VectorIndex':
+        """Index of one case under a shared root directory"""
+        return cls(cls.case_directory(root, case_id), **kwargs)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return (Path(directory) / cls.MANIFEST).exists()
+
+    def __len__(self) -> int:
+        """Live (not deleted) rows"""
+        return int(self.rows - self._deleted[:self.rows].sum())
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def begin_session(self) -> None:
+        """
+        Start a replacement session
+
+        Within a session, the first rows added for a document replace the
+        rows it already has; later adds in the same session append to them.
+        Call this before each run that re-embeds documents.
+        """
+        with self._lock:
+            self._session_documents.clear()
+
+    def add(self, rows: Sequence[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """
+        Append chunk rows and their vectors
+
+        Args:
+            rows: One dict per vector with document_id and any of
+                chunk_index, content, start_char, end_char, is_privileged,
+                date, custodian (top-level or under 'metadata')
+            vectors: float32 array of shape (len(rows), >= dimensions)
+        """
+        if len(rows) != len(vectors):
+            raise ValueError(f"{len(rows)} rows but {len(vectors)} vectors")
+        if not len(rows):
+            return
+        self._check_writable()
+
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32)[:, :self.dimensions])
+
+        with self._lock:
+            for document_id in dict.fromkeys(row.get('document_id') for row in rows):
+                if document_id not in self._session_documents:
+                    self._session_documents.add(document_id)
+                    if document_id in self._document_ids:
+                        self._delete_document(document_id)
+
+            self._ensure_capacity(self.rows + len(rows))
+            start = self.rows
+            self._vectors_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self._vectors_file.flush()
+
+            offset = self._rows_file.tell()
+            for i, row in enumerate(rows):
+                fields = {**(row.get('metadata') or {}), **row}
+                fields.pop('metadata', None)
+                line = json.dumps(fields, separators=(',', ':'), default=str).encode() + b'\n'
+                self._rows_file.write(line)
+                self._set_columns(start + i, fields, offset)
+                offset += len(line)
+            self._rows_file.flush()
+
+            self.rows += len(rows)
+            self._matrix = None
+            if self._centroids is not None:
+                self._list[start:self.rows] = self._assign(vectors)
+                self._list_order = None
+            self._maybe_train()
+
+    def remove_document(self, document_id: str) -> int:
+        """Delete a document's rows; returns the number deleted"""
+        self._check_writable()
+        with self._lock:
+            return self._delete_document(document_id)
+
+    def build(self) -> None:
+        """Train the IVF lists now instead of waiting for ivf_min_rows"""
+        self._check_writable()
+        with self._lock:
+            self._train()
+
+    def flush(self) -> None:
+        """Write the IVF lists and manifest (nothing for a read-only index)"""
+        if self.read_only:
+            return
+        with self._lock:
+            self._vectors_file.flush()
+            self._rows_file.flush()
+            if self._centroids is not None:
+                np.savez(
+                    self.directory / self.IVF,
+                    centroids=self._centroids,
+                    lists=self._list[:self.rows],
+                    trained_rows=self._trained_rows
+                )
+            self._write_manifest()
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            for f in (self._vectors_file, self._rows_file, self._reader):
+                if f is not None:
+                    f.close()
+            self._matrix = None
+
+    def refresh(self) -> int:
+        """
+        Pick up rows and deletions the writer has appended since opening
+
+        Rows whose vectors are not on disk yet are left for a later
+        refresh. New rows join their nearest IVF list, and the lists are
+        reloaded when the writer has saved new ones.
+
+        Returns:
+            Number of rows added (always 0 for the writer, whose columns
+            are current)
+        """
+        if not self.read_only or not (self.directory / self.ROWS).exists():
+            return 0
+
+        with self._lock:
+            start = self.rows
+            self._read_rows()
+            if self._reader is None:
+                self._reader = open(self.directory / self.ROWS, 'rb')
+
+            reloaded = False
+            ivf_path = self.directory / self.IVF
+            if ivf_path.exists() and ivf_path.stat().st_mtime != self._ivf_mtime:
+                try:
+                    self._load_lists()
+                    reloaded = True
+                except Exception as e:
+                    # The writer may be saving the lists right now
+                    logger.warning(f"Could not reload IVF lists of {self.directory}: {e}")
+            if not reloaded and self._centroids is not None and self.rows > start:
+                self._list[start:self.rows] = self._assign(self._vectors()[start:self.rows])
+                self._list_order = None
+
+            if self.rows > start:
+                self._matrix = None
+            return self.rows - start
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        is_privileged: Optional[bool] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        document_ids: Optional[Iterable[str]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Most similar chunks to a query vector
+
+        Args:
+            query: Query embedding from the index's model
+            k: Maximum hits
+            is_privileged: Only privileged (True) or non-privileged (False) chunks
+            start: Earliest document date (ISO); undated chunks are excluded
+                when start or end is given
+            end: Latest document date (ISO)
+            document_ids: Only chunks of these documents
+            nprobe: Lists scored (overrides the index default)
+
+        Returns:
+            Row dicts with a 'score' (cosine similarity) and 'row', best first
+        """
+        with self._lock:
+            mask = self.filter_mask(is_privileged, start, end, document_ids)
+            rows, scores = self.nearest(query, k, mask, nprobe)
+            return [
+                {**self._read_row(int(row)), 'score': round(float(score), 6), 'row': int(row)}
+                for row, score in zip(rows, scores)
+            ]
+
+    def nearest(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        mask: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row numbers and cosine similarities of the k nearest rows, best first
+
+        Unlike search(), no row lines are read, so callers that only need
+        rankings (e.g. HybridRetriever) pay for the vectors alone.
+
+        Args:
+            query: Query embedding from the index's model
+            k: Maximum hits
+            mask: Boolean array over rows (see filter_mask); None searches
+                every live row
+            nprobe: Lists scored (overrides the index default)
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32).ravel()[:self.dimensions])
+
+        with self._lock:
+            empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            if not self.rows or k < 1:
+                return empty
+            if mask is None:
+                mask = self.filter_mask()
+            matrix = self._vectors()
+
+            if self._centroids is None or mask.sum() <= self.ivf_min_rows:
+                candidates = np.flatnonzero(mask)
+            else:
+                candidates = self._probe(query, nprobe or self.nprobe)
+                candidates = candidates[mask[candidates]]
+
+            if not len(candidates):
+                return empty
+            if len(candidates) == self.rows:
+                scores = matrix @ query
+            else:
+                scores = matrix[candidates] @ query
+
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return candidates[top].astype(np.int64), scores[top]
+
+    def similarity(self, query: np.ndarray, rows: Sequence[int]) -> np.ndarray:
+        """Exact cosine similarity of query to the given rows"""
+        query = _normalize(np.asarray(query, dtype=np.float32).ravel()[:self.dimensions])
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            if not len(rows):
+                return np.zeros(0, dtype=np.float32)
+            return self._vectors()[rows] @ query
+
+    def filter_mask(
+        self,
+        is_privileged: Optional[bool] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        document_ids: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """
+        Boolean array over rows: live rows matching every given filter
+
+        Args:
+            is_privileged: Only privileged (True) or non-privileged (False) chunks
+            start: Earliest document date (ISO); undated chunks are excluded
+                when start or end is given
+            end: Latest document date (ISO)
+            document_ids: Only chunks of these documents
+        """
+        with self._lock:
+            mask = ~self._deleted[:self.rows]
+            if is_privileged is not None:
+                mask &= self._privileged[:self.rows] == is_privileged
+            if start or end:
+                days = self._day[:self.rows]
+                mask &= days != MISSING_DAY
+                if start:
+                    mask &= days >= _day(start)
+                if end:
+                    mask &= days <= _day(end)
+            if document_ids is not None:
+                wanted = [self._document_ids[d] for d in document_ids if d in self._document_ids]
+                mask &= np.isin(self._document[:self.rows], wanted)
+            return mask
+
+    def get(self, row: int) -> Dict[str, Any]:
+        """Stored fields of one row"""
+        with self._lock:
+            return self._read_row(int(row))
+
+    def iter_rows(self, start: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        (row, fields) for every row from start on, deleted rows included
+
+        Reads rows.jsonl sequentially from the row's offset, skipping
+        tombstone lines.
+        """
+        with self._lock:
+            end = self.rows
+            offset = int(self._offset[start]) if start < end else 0
+        if start >= end:
+            return
+
+        row = start
+        with open(self.directory / self.ROWS, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                fields = json.loads(line)
+                if 'deleted_document' in fields:
+                    continue
+                yield row, fields
+                row += 1
+                if row >= end:
+                    return
+
+    def statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': str(self.directory),
+                'dimensions': self.dimensions,
+                'rows': self.rows,
+                'live_rows': len(self),
+                'documents': int(np.unique(self._document[:self.rows][~self._deleted[:self.rows]]).size),
+                'ivf_lists': 0 if self._centroids is None else len(self._centroids),
+                'embedding': self.embedding
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold the lock)
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """Rebuild the filter columns from rows.jsonl and the lists from ivf.npz"""
+        if not (self.directory / self.ROWS).exists():
+            return
+
+        vector_rows = self._read_rows()
+
+        # A crash between the two appends leaves vectors without rows. Only
+        # the writer may cut them: for a reader they are the writer's next rows.
+        if vector_rows > self.rows and not self.read_only:
+            with open(self.directory / self.VECTORS, 'r+b') as f:
+                f.truncate(self.rows * 4 * self.dimensions)
+
+        if (self.directory / self.IVF).exists():
+            self._load_lists()
+
+    def _read_rows(self) -> int:
+        """
+        Add the rows.jsonl lines after those already read
+
+        Returns:
+            Number of vectors on disk
+        """
+        vectors_path = self.directory / self.VECTORS
+        vector_rows = vectors_path.stat().st_size // (4 * self.dimensions) if vectors_path.exists() else 0
+
+        torn = False
+        with open(self.directory / self.ROWS, 'rb') as f:
+            f.seek(self._rows_read)
+            for line in f:
+                # A reader stops at a line still being written or whose vector
+                # is not flushed yet; for the writer it is a crash's torn tail
+                try:
+                    fields = json.loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    fields = None
+                if fields is None:
+                    torn = True
+                    break
+                if 'deleted_document' in fields:
+                    self._delete_document(fields['deleted_document'], record=False)
+                elif self.rows < vector_rows:
+                    self._ensure_capacity(self.rows + 1)
+                    self._set_columns(self.rows, fields, self._rows_read)
+                    self.rows += 1
+                elif self.read_only:
+                    break
+                self._rows_read += len(line)
+
+        # Only the writer may cut the tail, back to the last complete row
+        # (_load then drops the vectors past it)
+        if torn and not self.read_only:
+            logger.warning(f"Dropping a partial last row of {self.directory / self.ROWS} at byte {self._rows_read}")
+            with open(self.directory / self.ROWS, 'r+b') as f:
+                f.truncate(self._rows_read)
+
+        return vector_rows
+
+    def _load_lists(self) -> None:
+        """Load the IVF lists from ivf.npz, assigning rows it does not cover"""
+        ivf_path = self.directory / self.IVF
+        if not self.rows:
+            return
+
+        mtime = ivf_path.stat().st_mtime
+        saved = np.load(ivf_path)
+        self._centroids = saved['centroids']
+        self._trained_rows = int(saved['trained_rows'])
+        known = min(len(saved['lists']), self.rows)
+        self._list[:known] = saved['lists'][:known]
+        if known < self.rows:
+            self._list[known:self.rows] = self._assign(self._vectors()[known:self.rows])
+        self._list_order = None
+        self._ivf_mtime = mtime
+
+    def _ensure_capacity(self, rows: int) -> None:
+        """Grow the column arrays by doubling"""
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        for name, fill in [
+            ('_document', -1), ('_privileged', False), ('_day', MISSING_DAY),
+            ('_deleted', False), ('_offset', 0), ('_list', -1)
+        ]:
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def _set_columns(self, row: int, fields: Dict[str, Any], offset: int) -> None:
+        document_id = fields.get('document_id')
+        document = self._document_ids.get(document_id)
+        if document is None:
+            document = self._document_ids[document_id] = len(self._documents)
+            self._documents.append(document_id)
+
+        self._document[row] = document
+        self._privileged[row] = bool(fields.get('is_privileged'))
+        self._day[row] = _day(fields.get('date'))
+        self._offset[row] = offset
+
+    def _delete_document(self, document_id: str, record: bool = True) -> int:
+        document = self._document_ids.get(document_id)
+        if document is None:
+            return 0
+        rows = (self._document[:self.rows] == document) & ~self._deleted[:self.rows]
+        self._deleted[:self.rows] |= rows
+        if record:
+            self._rows_file.write(json.dumps({'deleted_document': document_id}).encode() + b'\n')
+            self._rows_file.flush()
+        return int(rows.sum())
+
+    def _vectors(self) -> np.ndarray:
+        """Memory map of every row's vector"""
+        if self._matrix is None or len(self._matrix) != self.rows:
+            # A plain ndarray view of the map avoids memmap's per-index overhead
+            self._matrix = np.memmap(
+                self.directory / self.VECTORS, dtype=np.float32, mode='r',
+                shape=(self.rows, self.dimensions)
+            ).view(np.ndarray)
+        return self._matrix
+
+    def _read_row(self, row: int) -> Dict[str, Any]:
+        self._reader.seek(int(self._offset[row]))
+        return json.loads(self._reader.readline())
+
+    def _probe(self, query: np.ndarray, nprobe: Optional[int]) -> np.ndarray:
+        """Rows of the nprobe lists closest to query, in row order"""
+        if self._list_order is None:
+            lists = self._list[:self.rows]
+            self._list_order = np.argsort(lists, kind='stable')
+            self._list_bounds = np.searchsorted(lists[self._list_order], np.arange(len(self._centroids) + 1))
+
+        nlist = len(self._centroids)
+        nprobe = min(nprobe or max(8, nlist // 16), nlist)
+        similarity = self._centroids @ query
+        probed = np.argpartition(-similarity, nprobe - 1)[:nprobe]
+        bounds = self._list_bounds
+        rows = np.concatenate([self._list_order[bounds[i]:bounds[i + 1]] for i in probed])
+        # Sorted rows read the memory map front to back
+        rows.sort()
+        return rows
+
+    def _assign(self, vectors: np.ndarray, block: int = 16384) -> np.ndarray:
+        """Nearest centroid of each vector"""
+        lists = np.empty(len(vectors), dtype=np.int32)
+        for i in range(0, len(vectors), block):
+            lists[i:i + block] = np.argmax(np.asarray(vectors[i:i + block]) @ self._centroids.T, axis=1)
+        return lists
+
+    def _maybe_train(self) -> None:
+        if self.rows < self.ivf_min_rows:
+            return
+        if self._centroids is None or self.rows >= 4 * self._trained_rows:
+            self._train()
+
+    def _train(self, iterations: int = 10, seed: int = 0) -> None:
+        """Spherical k-means on a sample of live rows, then assign every row"""
+        live = np.flatnonzero(~self._deleted[:self.rows])
+        if len(live) < 2:
+            return
+
+        nlist = int(min(max(np.sqrt(len(live)) * 2, 1), 4096, len(live)))
+        rng = np.random.default_rng(seed)
+        sample_size = min(len(live), nlist * 32)
+        sample = np.asarray(self._vectors()[np.sort(rng.choice(live, sample_size, replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind='stable')
+            bounds = np.searchsorted(assignment[order], np.arange(nlist))
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], bounds[~empty])
+            if empty.any():
+                # Empty lists restart from random sample vectors
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        self._centroids = centroids.astype(np.float32)
+        self._list[:self.rows] = self._assign(self._vectors())
+        self._trained_rows = self.rows
+        self._list_order = None
+        logger.info(f"Trained {nlist} IVF lists over {len(live)} rows in {self.directory}")
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"Index {self.directory} is open read-only")
+
+    def _write_manifest(self) -> None:
+        (self.directory / self.MANIFEST).write_text(json.dumps({
+            'dimensions': self.dimensions,
+            'metric': 'cosine',
+            'rows': self.rows,
+            'embedding': self.embedding
+        }, indent=2))
@@ -19,6 +19,9 @@ from dataclasses import dataclass, asdict
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+# Shared pgvector search client (pip install -e 05_SUPABASE_INTEGRATION)
+from vector_search import VectorSearchClient
+
 # Load environment variables
 load_dotenv()
 
@@ -109,6 +112,7 @@ class SupabaseClient:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
 
         self.client: Client = create_client(self.url, self.key)
+        self.vector_search = VectorSearchClient(self.client)
         logger.info(f"Connected to Supabase at {self.url}")
 
     # ========================================================================
@@ -540,41 +544,54 @@ class SupabaseClient:
             raise
 
     # ========================================================================
-    # FULL-TEXT SEARCH (RAG)
+    # SEMANTIC SEARCH (RAG)
     # ========================================================================
 
     def semantic_search(
         self,
         query: str,
         case_number: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        threshold: float = 0.7,
+        **filters
     ) -> List[Dict]:
         """
         Perform semantic search across case documents
 
-        Uses Supabase's pgvector extension for vector similarity search
+        With a case, a query embedder and a user configured (OPENAI_API_KEY,
+        SUPABASE_USER_ID), the query is embedded once (cached) and matched
+        against chunk embeddings by the search_by_embedding function on the
+        HNSW index. Otherwise falls back to full-text search of
+        case_documents.
 
         Args:
             query: Search query
             case_number: Optional case filter
             limit: Maximum results
+            threshold: Minimum cosine similarity (vector search)
+            **filters: include_privileged, start_date, end_date, author, tags
+                (vector search)
 
         Returns:
-            List of relevant documents
+            Chunk hits (with similarity) from vector search, else documents
         """
         try:
-            # This is a placeholder for actual vector search implementation
-            # Requires pgvector extension and embedding generation
+            if case_number and self.vector_search.available:
+                hits = self.vector_search.search(query, case_number, limit, threshold, **filters)
+                # document_text and case_number keep the shape of case_documents rows
+                return [
+                    {**hit, 'document_text': hit['content'], 'case_number': case_number}
+                    for hit in hits
+                ]
 
             query_obj = self.client.table('case_documents').select('*')
 
             if case_number:
                 query_obj = query_obj.eq('case_number', case_number)
 
-            # Text search as fallback (replace with vector search in production)
             result = query_obj.text_search('document_text', query).limit(limit).execute()
 
-            logger.info(f"Semantic search returned {len(result.data)} results for: {query}")
+            logger.info(f"Full-text search returned {len(result.data)} results for: {query}")
             return result.data
 
         except Exception as e:
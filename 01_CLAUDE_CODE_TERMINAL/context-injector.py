@@ -16,9 +16,21 @@ import logging
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from codered_sync import SupabaseClient
-import openai
 from dotenv import load_dotenv
 
+# Local indexes, retrieval and query embedding models come from the Discovery Bot
+# (pip install -e agents/discovery-bot)
+try:
+    from vector_index import VectorIndex
+    from embedding_backends import create_backend
+    from bm25_index import BM25Index
+    from hybrid_retriever import HybridRetriever
+except ImportError:
+    VectorIndex = None
+    create_backend = None
+    BM25Index = None
+    HybridRetriever = None
+
 # Load environment variables
 load_dotenv()
 
@@ -29,9 +41,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configure OpenAI for embeddings
-openai.api_key = os.getenv('OPENAI_API_KEY')
-
 
 # ============================================================================
 # CONTEXT INJECTOR
@@ -52,6 +61,12 @@ class ContextInjector:
     def __init__(self):
         """Initialize context injector"""
         self.db = SupabaseClient()
+
+        # Per-case indexes written by the Discovery Bot (its vector_index_dir)
+        self.vector_index_dir = os.getenv('VECTOR_INDEX_DIR')
+        self._retrievers: Dict[str, object] = {}
+        self._query_encoders: Dict[str, object] = {}
+
         logger.info("Context Injector initialized")
 
     # ========================================================================
@@ -314,58 +329,111 @@ class ContextInjector:
         self,
         query: str,
         case_number: Optional[str],
-        limit: int = 10
+        limit: int = 10,
+        include_privileged: bool = False
     ) -> List[Dict]:
         """
         Perform semantic search using embeddings
 
+        Privileged documents are returned only when asked for and the
+        user's role may see them, whichever source answers.
+
         Args:
             query: Search query
             case_number: Optional case filter
             limit: Maximum results
+            include_privileged: Include privileged documents (attorney and
+                admin roles only)
 
         Returns:
             List of relevant documents
         """
         try:
-            # Generate embedding for query
-            embedding = self._generate_embedding(query)
-
-            # Perform vector similarity search in Supabase
-            # NOTE: Requires pgvector extension configured in Supabase
-
-            # Fallback to text search for now
-            results = self.db.semantic_search(query, case_number, limit)
-
-            # Rank results by relevance
-            ranked_results = self._rank_results(results, query)
-
-            return ranked_results
+            # Local index of the case: no network round trip
+            local_results = self._local_search(query, case_number, limit, include_privileged)
+            if local_results is not None:
+                return local_results
+
+            # pgvector search of the case's chunks (full-text search without an embedder)
+            results = self.db.semantic_search(query, case_number, limit, include_privileged=include_privileged)
+
+            # Vector hits arrive ranked by similarity; text matches are ranked here
+            if any('similarity' in result for result in results):
+                for result in results:
+                    result['relevance_score'] = result['similarity']
+                    result['source'] = 'pgvector'
+                return results
+            # search_by_embedding checks the role itself; text matches are filtered here
+            if not (include_privileged and self.db.vector_search.may_view_privileged()):
+                results = [result for result in results if not result.get('is_privileged')]
+            return self._rank_results(results, query)
 
         except Exception as e:
             logger.error(f"Semantic search failed: {e}")
             return []
 
-    def _generate_embedding(self, text: str) -> List[float]:
+    def _local_search(
+        self,
+        query: str,
+        case_number: Optional[str],
+        limit: int,
+        include_privileged: bool = False
+    ) -> Optional[List[Dict]]:
         """
-        Generate OpenAI embedding for text
+        Hybrid search of the case's local index, if the Discovery Bot built one
+
+        Chunks are retrieved by BM25 and by vector similarity and fused by
+        reciprocal rank (see HybridRetriever). The query is embedded with
+        the model recorded in the index, so it is comparable with the
+        indexed chunks. Privileged chunks are left out unless asked for and
+        the user's role passes the check search_by_embedding applies.
 
         Args:
-            text: Text to embed
+            query: Search query
+            case_number: Case whose index to search
+            limit: Maximum results
+            include_privileged: Include privileged chunks (attorney and admin
+                roles only)
 
         Returns:
-            Embedding vector
+            Chunk results ranked by fused score, or None without a local index
         """
-        try:
-            response = openai.Embedding.create(
-                model="text-embedding-ada-002",
-                input=text
-            )
-            return response['data'][0]['embedding']
-
-        except Exception as e:
-            logger.error(f"Embedding generation failed: {e}")
-            return []
+        if HybridRetriever is None or not self.vector_index_dir or not case_number:
+            return None
+
+        retriever = self._retrievers.get(case_number)
+        if retriever is None:
+            directory = VectorIndex.case_directory(self.vector_index_dir, case_number)
+            if not VectorIndex.exists(directory):
+                return None
+            # The Discovery Bot may be adding to the index; never write to it from here
+            index = VectorIndex(directory, read_only=True)
+
+            encoder_key = json.dumps(index.embedding, sort_keys=True)
+            encoder = self._query_encoders.get(encoder_key)
+            if encoder is None:
+                encoder = self._query_encoders[encoder_key] = create_backend(index.embedding)
+            retriever = self._retrievers[case_number] = HybridRetriever(index, encoder)
+
+        # None: no privilege filter
+        is_privileged = None if include_privileged and self.db.vector_search.may_view_privileged() else False
+        hits = retriever.search(query, k=limit, is_privileged=is_privileged)
+        return [
+            {
+                "document_id": hit.get("document_id"),
+                "case_number": case_number,
+                "document_text": hit.get("content", ""),
+                "chunk_index": hit.get("chunk_index"),
+                "start_char": hit.get("start_char"),
+                "end_char": hit.get("end_char"),
+                "is_privileged": hit.get("is_privileged", False),
+                "date": hit.get("date"),
+                "relevance_score": hit["score"],
+                "scores": hit["scores"],
+                "source": "local_hybrid_index"
+            }
+            for hit in hits
+        ]
 
     def _rank_results(self, results: List[Dict], query: str) -> List[Dict]:
         """
@@ -378,13 +446,19 @@ class ContextInjector:
         Returns:
             Ranked results
         """
-        # Simple keyword-based ranking (replace with vector similarity in production)
-        query_terms = query.lower().split()
-
-        for result in results:
-            text = result.get('document_text', '').lower()
-            score = sum(1 for term in query_terms if term in text)
-            result['relevance_score'] = score
+        if BM25Index is None:
+            # Without the Discovery Bot modules, count the query terms present
+            query_terms = query.lower().split()
+            for result in results:
+                text = result.get('document_text', '').lower()
+                result['relevance_score'] = sum(1 for term in query_terms if term in text)
+        else:
+            # BM25 over the returned texts: each text is tokenized once, and
+            # rare query terms outweigh common ones
+            scores = BM25Index.from_texts(r.get('document_text') or '' for r in results).scores(query)
+            for result, score in zip(results, scores.tolist()):
+                result['relevance_score'] = round(score, 6)
+                result['scores'] = {'bm25': round(score, 6)}
 
         # Sort by relevance
         ranked = sorted(results, key=lambda r: r.get('relevance_score', 0), reverse=True)
@@ -28,11 +28,18 @@ ON codered.document_embeddings(document_chunk_id);
 
 -- Function: search_embeddings
 -- Performs semantic similarity search on document embeddings
--- Returns documents similar to the query embedding
+-- Returns documents similar to the query embedding, optionally limited to one
+-- case (documents.metadata->>'case_id') and to non-privileged documents.
+-- Filters are applied while walking the vector index in <=> order, so a
+-- narrow filter can return fewer than limit_results rows.
+DROP FUNCTION IF EXISTS codered.search_embeddings(vector, float, int);
+
 CREATE OR REPLACE FUNCTION codered.search_embeddings(
   query_embedding vector(1536),
   similarity_threshold float DEFAULT 0.5,
-  limit_results int DEFAULT 10
+  limit_results int DEFAULT 10,
+  case_filter TEXT DEFAULT NULL,
+  include_privileged boolean DEFAULT true
 )
 RETURNS TABLE(
   chunk_id BIGINT,
@@ -40,7 +47,10 @@ RETURNS TABLE(
   document_title TEXT,
   chunk_content TEXT,
   similarity float,
-  metadata JSONB
+  metadata JSONB,
+  case_id TEXT,
+  zone TEXT,
+  is_privileged boolean
 ) AS $$
   SELECT
     de.document_chunk_id,
@@ -48,11 +58,16 @@ RETURNS TABLE(
     d.title,
     dc.content,
     (1 - (de.embedding <=> query_embedding))::float as similarity,
-    dc.metadata
+    dc.metadata,
+    d.metadata->>'case_id',
+    d.metadata->>'zone',
+    COALESCE((d.metadata->>'is_privileged')::boolean, d.metadata->>'zone' = 'RED', false)
   FROM codered.document_embeddings de
   JOIN codered.document_chunks dc ON de.document_chunk_id = dc.id
   JOIN codered.documents d ON dc.document_id = d.id
   WHERE (1 - (de.embedding <=> query_embedding)) > similarity_threshold
+    AND (case_filter IS NULL OR d.metadata->>'case_id' = case_filter)
+    AND (include_privileged OR NOT COALESCE((d.metadata->>'is_privileged')::boolean, d.metadata->>'zone' = 'RED', false))
   ORDER BY de.embedding <=> query_embedding
   LIMIT limit_results;
 $$ LANGUAGE SQL STABLE;
@@ -176,6 +191,9 @@ ON codered.documents(title);
 CREATE INDEX IF NOT EXISTS idx_documents_organization_id 
 ON codered.documents(organization_id);
 
+CREATE INDEX IF NOT EXISTS idx_documents_case_id
+ON codered.documents((metadata->>'case_id'));
+
 CREATE INDEX IF NOT EXISTS idx_document_chunks_document_id 
 ON codered.document_chunks(document_id);
 
@@ -24,6 +24,9 @@ import json
 from supabase import create_client, Client
 import httpx
 
+# Shared pgvector search client (pip install -e 05_SUPABASE_INTEGRATION)
+from vector_search import VectorSearchClient, configured_model
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,6 +52,9 @@ class SupabaseBridge:
         self.key = self.supabase_config.get('key')
         self.client: Optional[Client] = None
         self.tables = self.supabase_config.get('tables', {})
+        # supabase.vector_search: case_id, user_id, embedding_model
+        self.vector_config = self.supabase_config.get('vector_search', {})
+        self.vector_search: Optional[VectorSearchClient] = None
 
         self._init_client()
 
@@ -58,6 +64,11 @@ class SupabaseBridge:
         """Initialize Supabase client"""
         try:
             self.client = create_client(self.url, self.key)
+            self.vector_search = VectorSearchClient(
+                self.client,
+                model=self.vector_config.get('embedding_model') or configured_model(),
+                user_id=self.vector_config.get('user_id')
+            )
             logger.info("Supabase client initialized")
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
@@ -300,36 +311,33 @@ class SupabaseBridge:
         self,
         query: str,
         limit: int = 10,
-        threshold: float = 0.75
+        threshold: float = 0.75,
+        case_id: Optional[str] = None,
+        **filters
     ) -> List[Dict[str, Any]]:
         """
-        Vector search for documents using Supabase pgvector
+        Vector search for document chunks using Supabase pgvector
+
+        The query is embedded once (and cached) and searched with the
+        search_by_embedding function on the HNSW index.
 
         Args:
             query: Search query text
             limit: Maximum number of results
             threshold: Similarity threshold (0-1)
+            case_id: Case UUID or case number (default: supabase.vector_search.case_id)
+            **filters: include_privileged, start_date, end_date, author, tags
 
         Returns:
-            List of matching documents with similarity scores
+            List of matching chunks with similarity scores
         """
         try:
-            # This would use Supabase's vector search capability
-            # Requires pgvector extension and embedding generation
-
-            # Generate embedding for query (pseudo-code)
-            # query_embedding = await self._generate_embedding(query)
+            case_id = case_id or self.vector_config.get('case_id')
+            if not case_id:
+                logger.warning("Vector search needs a case_id (argument or supabase.vector_search.case_id)")
+                return []
 
-            # Perform vector search
-            # result = self.client.rpc('match_documents', {
-            #     'query_embedding': query_embedding,
-            #     'match_threshold': threshold,
-            #     'match_count': limit
-            # }).execute()
-
-            # For now, return empty list (implement when vector store is set up)
-            logger.warning("Vector search not yet implemented")
-            return []
+            return self.vector_search.search(query, case_id, limit, threshold, **filters)
 
         except Exception as e:
             logger.error(f"Failed to search documents in Supabase: {e}")
@@ -10,6 +10,13 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+# Shared pgvector search client (pip install -e 05_SUPABASE_INTEGRATION)
+from vector_search import VectorSearchClient, configured_model
+
+# Model of the CodeRed chunk embeddings (shared_config.rag.embedding_model in agents.yaml)
+RAG_EMBEDDING_MODEL = 'text-embedding-3-small'
 
 class CodeRedClient:
     """Client for CodeRed Supabase database operations"""
@@ -26,6 +33,10 @@ class CodeRedClient:
             )
 
         self.client: Client = create_client(self.url, self.key)
+        # RAG functions live in the codered schema (01_DEPLOYMENT_SCRIPTS/setup-rag.sql)
+        self.rag: Client = create_client(self.url, self.key, options=ClientOptions(schema='codered'))
+        # Used only to embed (and cache) queries with the model of the stored chunks
+        self.vector_search = VectorSearchClient(self.client, model=configured_model(RAG_EMBEDDING_MODEL))
 
     def test_connection(self) -> bool:
         """Test Supabase connection"""
@@ -101,35 +112,58 @@ class CodeRedClient:
         query: str,
         case_id: str,
         top_k: int = 5,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        include_privileged: bool = True
     ) -> List[Dict[str, Any]]:
         """
-        Query RAG embeddings for relevant documents
+        Query RAG embeddings for relevant document chunks of one case
+
+        The query is embedded once (and cached) and ranked against the chunk
+        embeddings by codered.search_embeddings, filtered to the case's
+        documents in the database. Rows of any other case are dropped here
+        as well, so a database still on the unfiltered function never leaks
+        chunks across matters.
 
         Args:
             query: Search query
             case_id: Case to search within
             top_k: Number of results to return
             threshold: Similarity threshold (0.0-1.0)
+            include_privileged: Include chunks of privileged (RED zone) documents
 
         Returns:
-            List of relevant documents with similarity scores
+            List of relevant chunks with similarity scores, zone and
+            is_privileged
         """
         try:
-            # Call search_embeddings function
-            response = self.client.rpc(
+            response = self.rag.rpc(
                 'search_embeddings',
                 {
-                    'query_text': query,
+                    'query_embedding': self.vector_search.embed_query(query),
+                    'similarity_threshold': threshold,
+                    'limit_results': top_k,
                     'case_filter': case_id,
-                    'match_count': top_k,
-                    'similarity_threshold': threshold
+                    'include_privileged': include_privileged
                 }
             ).execute()
 
-            return response.data
+            return [
+                {
+                    'chunk_id': row.get('chunk_id'),
+                    'document_id': row.get('document_id'),
+                    'title': row.get('document_title'),
+                    'content': row.get('chunk_content') or '',
+                    'similarity': row.get('similarity', 0.0),
+                    'metadata': row.get('metadata') or {},
+                    'case_id': row.get('case_id'),
+                    'zone': row.get('zone'),
+                    'is_privileged': bool(row.get('is_privileged'))
+                }
+                for row in response.data or []
+                if row.get('case_id') == case_id
+            ]
         except Exception as e:
-            print(f"❌ Failed to query embeddings: {e}")
+            print(f"❌ Failed to query embeddings for case {case_id}: {e}")
             return []
 
     def ingest_document(
@@ -143,6 +177,9 @@ class CodeRedClient:
         """
         Ingest a document into the RAG database
 
+        The case and zone are stored in the document's metadata, which
+        codered.search_embeddings filters on.
+
         Args:
             title: Document title
             content: Full text content
@@ -154,19 +191,24 @@ class CodeRedClient:
             Dictionary with document_id and status
         """
         try:
-            response = self.client.rpc(
+            response = self.rag.rpc(
                 'ingest_document',
                 {
-                    'doc_title': title,
-                    'doc_content': content,
-                    'doc_source': source_path,
-                    'doc_case_id': case_id,
-                    'doc_zone': zone
+                    'p_title': title,
+                    'p_content': content,
+                    'p_source_url': source_path,
+                    'p_metadata': {
+                        'case_id': case_id,
+                        'zone': zone,
+                        'is_privileged': zone == 'RED'
+                    }
                 }
             ).execute()
 
+            rows = response.data or []
             return {
-                'document_id': response.data,
+                'document_id': rows[0]['document_id'] if rows else None,
+                'chunks_created': rows[0]['chunks_created'] if rows else 0,
                 'status': 'success'
             }
         except Exception as e:
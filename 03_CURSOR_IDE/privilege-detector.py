@@ -12,6 +12,9 @@ from typing import Dict, List, Optional
 from pathlib import Path
 from codered_client import CodeRedClient
 
+# Term matcher shared with the Discovery Bot (pip install -e 01_CLAUDE_CODE_TERMINAL/agents/discovery-bot)
+from term_matcher import TermMatcher
+
 
 class PrivilegeDetector:
     """Detect attorney-client privilege in documents"""
@@ -48,31 +51,36 @@ class PrivilegeDetector:
             'name': 'attorney_email',
             'regex': r'\b\w+@\w+law\.\w+\b',
             'weight': 0.3,
-            'description': 'Email from law firm domain'
+            'description': 'Email from law firm domain',
+            'requires': ['law.'],
         },
         {
             'name': 'attorney_header',
             'regex': r'(?i)(from|to):\s*.*\b(attorney|lawyer|counsel)\b',
             'weight': 0.4,
-            'description': 'Email header with attorney/lawyer/counsel'
+            'description': 'Email header with attorney/lawyer/counsel',
+            'requires': ['attorney', 'lawyer', 'counsel'],
         },
         {
             'name': 'privilege_header',
             'regex': r'(?i)subject:.*\b(privileged|confidential|attorney)\b',
             'weight': 0.3,
-            'description': 'Subject line with privilege keywords'
+            'description': 'Subject line with privilege keywords',
+            'requires': ['subject:'],
         },
         {
             'name': 'legal_letterhead',
             'regex': r'(?i)(law offices of|attorneys at law|legal counsel)',
             'weight': 0.4,
-            'description': 'Legal letterhead pattern'
+            'description': 'Legal letterhead pattern',
+            'requires': ['law offices of', 'attorneys at law', 'legal counsel'],
         },
         {
             'name': 'privilege_notice',
             'regex': r'(?i)this (email|communication|message) is (privileged|confidential)',
             'weight': 0.5,
-            'description': 'Explicit privilege notice'
+            'description': 'Explicit privilege notice',
+            'requires': ['is privileged', 'is confidential'],
         },
     ]
 
@@ -80,6 +88,17 @@ class PrivilegeDetector:
         """Initialize with CodeRed client"""
         self.codered = CodeRedClient()
 
+        # Keyword categories and each pattern's required literals, matched
+        # in one call; a pattern's regex only runs when a literal is present
+        groups = dict(self.KEYWORDS)
+        for pattern in self.PATTERNS:
+            groups[f"pattern:{pattern['name']}"] = pattern['requires']
+        self.term_matcher = TermMatcher(groups)
+        self._compiled = {
+            pattern['name']: re.compile(pattern['regex'], re.IGNORECASE)
+            for pattern in self.PATTERNS
+        }
+
     def detect(self, text: str) -> Dict[str, any]:
         """
         Detect privilege in text
@@ -90,28 +109,30 @@ class PrivilegeDetector:
         Returns:
             Dictionary with detection results
         """
-        text_lower = text.lower()
+        found = self.term_matcher.find(text)
 
         # Check keywords
         keywords_found = []
         keyword_score = 0.0
 
         for category, keywords in self.KEYWORDS.items():
-            for keyword, weight in keywords.items():
-                if keyword.lower() in text_lower:
-                    keywords_found.append({
-                        'keyword': keyword,
-                        'category': category,
-                        'weight': weight
-                    })
-                    keyword_score += weight
+            for keyword in found[category]:
+                weight = keywords[keyword]
+                keywords_found.append({
+                    'keyword': keyword,
+                    'category': category,
+                    'weight': weight
+                })
+                keyword_score += weight
 
         # Check patterns
         patterns_found = []
         pattern_score = 0.0
 
         for pattern in self.PATTERNS:
-            matches = re.findall(pattern['regex'], text, re.IGNORECASE)
+            if not found[f"pattern:{pattern['name']}"]:
+                continue
+            matches = self._compiled[pattern['name']].findall(text)
             if matches:
                 patterns_found.append({
                     'pattern': pattern['name'],
@@ -12,27 +12,14 @@ from typing import Dict, List, Optional
 from pathlib import Path
 from codered_client import CodeRedClient
 
-try:
-    from openai import OpenAI
-except ImportError:
-    print("Warning: OpenAI library not installed. Install with: pip install openai")
-    OpenAI = None
-
 
 class RAGContextFetcher:
     """Fetch relevant context from RAG database for agent queries"""
 
     def __init__(self):
-        """Initialize with CodeRed client and OpenAI"""
+        """Initialize with CodeRed client (queries are embedded by its vector search)"""
         self.codered = CodeRedClient()
 
-        # OpenAI for embeddings (if available)
-        if OpenAI:
-            api_key = os.environ.get('OPENAI_API_KEY')
-            self.openai = OpenAI(api_key=api_key) if api_key else None
-        else:
-            self.openai = None
-
     def detect_case_id(self, file_path: str) -> Optional[str]:
         """
         Detect case ID from file path
@@ -118,15 +105,20 @@ class RAGContextFetcher:
             threshold=0.7
         )
 
-        # Format results
+        # Format results (one per matching chunk)
         documents = []
         for result in results:
             documents.append({
-                'title': result.get('title', 'Untitled'),
+                'title': result.get('title') or 'Untitled',
                 'content': result.get('content', '')[:500],  # First 500 chars
-                'source': result.get('source_path', ''),
+                'source': result.get('file_name') or '',
                 'similarity': result.get('similarity', 0.0),
-                'zone': result.get('zone', 'UNKNOWN')
+                'zone': result.get('zone') or ('RED' if result.get('is_privileged') else 'UNKNOWN'),
+                'is_privileged': bool(result.get('is_privileged')),
+                'document_id': result.get('document_id'),
+                'chunk_id': result.get('chunk_id'),
+                'chunk_index': result.get('chunk_index'),
+                'page_number': result.get('page_number')
             })
 
         # Get case metadata
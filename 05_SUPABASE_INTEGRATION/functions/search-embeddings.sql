@@ -46,14 +46,16 @@ BEGIN
     );
   END IF;
 
-  -- Perform search using HNSW index (optimized)
+  -- Perform search using HNSW index (optimized): ordering by the <=>
+  -- operator itself, not a function wrapping it, lets the planner use
+  -- idx_document_embeddings_embedding_hnsw (vector_cosine_ops)
   RETURN QUERY
   SELECT
     d.id,
     dc.id,
     d.title,
     dc.content,
-    cosine_similarity(p_query_embedding, de.embedding) as similarity,
+    1 - (de.embedding <=> p_query_embedding) as similarity,
     d.document_date,
     d.author,
     d.is_privileged,
@@ -71,7 +73,7 @@ BEGIN
     AND de.status = 'completed'
     AND d.is_deleted = false
     AND (v_include_privileged OR d.is_privileged = false)
-    AND cosine_similarity(p_query_embedding, de.embedding) >= p_similarity_threshold
+    AND (de.embedding <=> p_query_embedding) <= 1 - p_similarity_threshold
     -- Apply date filters
     AND (
       (p_filters->>'start_date' IS NULL) OR
@@ -91,7 +93,7 @@ BEGIN
       (p_filters->>'tags' IS NULL) OR
       (d.tags && string_to_array(p_filters->>'tags', ','))
     )
-  ORDER BY similarity DESC
+  ORDER BY de.embedding <=> p_query_embedding
   LIMIT p_limit;
 
   -- Get result count
@@ -139,8 +139,15 @@ class GmailDiscoveryMCP:
             self.logger.log_error('gmail', 'search_error', str(e), query=gmail_query)
             return {'error': str(e), 'query': query}
 
-    def _get_email_details(self, message_id: str) -> Optional[Dict[str, Any]]:
-        """Get full email details with privilege detection"""
+    def _get_email_details(self, message_id: str, include_full_body: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get full email details with privilege detection
+
+        Args:
+            message_id: Gmail message ID
+            include_full_body: Add the complete, unredacted body as 'full_body'
+                (for internal analysis such as thread inclusivity; never export it)
+        """
         try:
             message = self.service.users().messages().get(
                 userId='me',
@@ -164,6 +171,10 @@ class GmailDiscoveryMCP:
             email_data = {
                 'id': message_id,
                 'thread_id': message.get('threadId'),
+                'message_id_header': headers.get('Message-ID') or headers.get('Message-Id'),
+                'in_reply_to': headers.get('In-Reply-To'),
+                'references': headers.get('References'),
+                'internal_date': message.get('internalDate'),
                 'date': headers.get('Date'),
                 'from': headers.get('From'),
                 'to': headers.get('To'),
@@ -178,6 +189,9 @@ class GmailDiscoveryMCP:
                 'has_attachments': self._has_attachments(message['payload'])
             }
 
+            if include_full_body:
+                email_data['full_body'] = body
+
             # Log privilege detection if flagged
             if privilege_result['flagged']:
                 self.logger.log_privilege_detection(
@@ -355,12 +369,14 @@ class GmailDiscoveryMCP:
 
         return export_data
 
-    def get_thread(self, thread_id: str) -> Dict[str, Any]:
+    def get_thread(self, thread_id: str, include_full_body: bool = False) -> Dict[str, Any]:
         """
         Get complete email thread
 
         Args:
             thread_id: Gmail thread ID
+            include_full_body: Add each message's unredacted body as 'full_body'
+                (required for thread inclusivity analysis)
 
         Returns:
             All emails in thread
@@ -373,7 +389,7 @@ class GmailDiscoveryMCP:
 
             messages = []
             for msg in thread.get('messages', []):
-                email_data = self._get_email_details(msg['id'])
+                email_data = self._get_email_details(msg['id'], include_full_body)
                 if email_data:
                     messages.append(email_data)
 
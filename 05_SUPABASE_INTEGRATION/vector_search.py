@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Vector Search Client
+Purpose: Chunk-level semantic search through the search_by_embedding function
+Version: 1.0.0
+
+One search path for every Python client of the legal discovery database
+(the Claude Code Terminal's SupabaseClient, the Cursor IDE's
+RAGContextFetcher and Antigravity's SupabaseBridge): embed the query once,
+keep the embedding in a cache, and let search_by_embedding rank chunk
+embeddings on the HNSW index with the case, privilege and date filters
+applied in the database.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+logger = logging.getLogger(__name__)
+
+
+# Width of document_embeddings.embedding (vector(1536))
+EMBEDDING_DIMENSIONS = 1536
+
+# Model of the default embedding config ('openai-ada-002')
+DEFAULT_MODEL = 'text-embedding-ada-002'
+
+# Environment variables naming the query embedding model, first set wins
+MODEL_ENV_VARS = ('EMBEDDING_MODEL', 'RAG_EMBEDDING_MODEL', 'OPENAI_EMBEDDING_MODEL')
+
+# Roles search_by_embedding returns privileged chunks to
+PRIVILEGED_ROLES = ('super_admin', 'firm_admin', 'lead_attorney', 'associate_attorney')
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+
+# texts -> one embedding per text
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings
+
+    Keys are the model and the query with case and whitespace normalized,
+    so a repeated or re-typed query costs no embedding call.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Args:
+            max_entries: Embeddings kept before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(model: str, query: str) -> str:
+        normalized = ' '.join(query.lower().split())
+        return hashlib.sha256(f"{model}\n{normalized}".encode()).hexdigest()
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        key = self.key(model, query)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, model: str, query: str, embedding: List[float]) -> None:
+        key = self.key(model, query)
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def configured_model(default: str = DEFAULT_MODEL) -> str:
+    """
+    Query embedding model from the environment (see MODEL_ENV_VARS)
+
+    The query must be embedded with the model of the stored embeddings, so
+    every client takes it from its deployment's configuration.
+
+    Args:
+        default: Model of the client's configured embeddings
+    """
+    for name in MODEL_ENV_VARS:
+        if os.environ.get(name):
+            return os.environ[name]
+    return default
+
+
+def openai_embedder(model: str = DEFAULT_MODEL, api_key: Optional[str] = None) -> Optional[Embedder]:
+    """
+    Embedder using the OpenAI embeddings API
+
+    Returns:
+        None if the openai library is not installed or no API key is set
+    """
+    api_key = api_key or os.environ.get('OPENAI_API_KEY')
+    if OpenAI is None or not api_key:
+        return None
+
+    client = OpenAI(api_key=api_key)
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        response = client.embeddings.create(model=model, input=texts)
+        return [item.embedding for item in response.data]
+
+    return embed
+
+
+class VectorSearchClient:
+    """
+    Semantic search over chunk embeddings with search_by_embedding
+
+    Hits are chunks, not whole documents: each carries the chunk's content,
+    its document's ID, title, date, author and privilege flag, the chunk
+    index and page, and its cosine similarity to the query.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        embedder: Optional[Embedder] = None,
+        model: Optional[str] = None,
+        user_id: Optional[str] = None,
+        cache: Optional[QueryEmbeddingCache] = None,
+        dimensions: int = EMBEDDING_DIMENSIONS
+    ):
+        """
+        Args:
+            client: Supabase client
+            embedder: Query embedding function (default: OpenAI with model);
+                must match the model of the stored chunk embeddings
+            model: Embedding model name, part of the cache key
+                (default: configured_model())
+            user_id: User the searches run as (default: SUPABASE_USER_ID);
+                search_by_embedding checks their role before returning
+                privileged chunks and logs the search under them
+            cache: Query embedding cache (default: a new 1024-entry cache)
+            dimensions: Width of the stored embeddings
+        """
+        self.client = client
+        self.model = model or configured_model()
+        self.embedder = embedder if embedder is not None else openai_embedder(self.model)
+        self.user_id = user_id or os.environ.get('SUPABASE_USER_ID')
+        self.cache = cache if cache is not None else QueryEmbeddingCache()
+        self.dimensions = dimensions
+        self._case_ids: Dict[str, str] = {}
+        self._may_view_privileged: Optional[bool] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether queries can be embedded and run as a user"""
+        return self.embedder is not None and bool(self.user_id)
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embedding of a query, from the cache when it has been embedded before
+
+        Embeddings narrower than the column are zero-padded, which leaves
+        cosine similarity unchanged.
+
+        Raises:
+            ValueError: If no embedder is configured or the model is wider
+                than the column
+        """
+        embedding = self.cache.get(self.model, query)
+        if embedding is not None:
+            return embedding
+        if self.embedder is None:
+            raise ValueError("No query embedder configured (set OPENAI_API_KEY or pass embedder)")
+
+        embedding = [float(value) for value in self.embedder([query])[0]]
+        if len(embedding) > self.dimensions:
+            raise ValueError(f"{self.model} produces {len(embedding)}-dimensional vectors; the column holds {self.dimensions}")
+        embedding.extend([0.0] * (self.dimensions - len(embedding)))
+
+        self.cache.put(self.model, query, embedding)
+        return embedding
+
+    def may_view_privileged(self) -> bool:
+        """
+        Whether the user's role may see privileged chunks
+
+        The same role check search_by_embedding applies, for callers that
+        search other copies of the chunks (e.g. a local index). The role is
+        looked up once; without a user, or when the lookup fails, the
+        answer is no.
+        """
+        if self._may_view_privileged is None:
+            if not self.user_id:
+                return False
+            try:
+                response = self.client.table('users').select('role').eq('id', self.user_id).limit(1).execute()
+            except Exception as e:
+                logger.warning(f"Could not look up the role of user {self.user_id}: {e}")
+                return False
+            self._may_view_privileged = bool(response.data) and response.data[0].get('role') in PRIVILEGED_ROLES
+        return self._may_view_privileged
+
+    def resolve_case_id(self, case: str) -> str:
+        """
+        UUID of a case given its UUID or case number
+
+        Raises:
+            ValueError: If no case has that case number
+        """
+        if UUID_PATTERN.match(case):
+            return case
+        if case not in self._case_ids:
+            response = self.client.table('legal_cases').select('id').eq('case_number', case).limit(1).execute()
+            if not response.data:
+                raise ValueError(f"Unknown case: {case}")
+            self._case_ids[case] = response.data[0]['id']
+        return self._case_ids[case]
+
+    def search(
+        self,
+        query: str,
+        case: str,
+        limit: int = 10,
+        threshold: float = 0.7,
+        include_privileged: bool = False,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        author: Optional[str] = None,
+        tags: Optional[Sequence[str]] = None,
+        query_embedding: Optional[Sequence[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunks most similar to a query, best first
+
+        Args:
+            query: Search query (embedded unless query_embedding is given)
+            case: Case UUID or case number
+            limit: Maximum hits
+            threshold: Minimum cosine similarity
+            include_privileged: Include privileged chunks (only honored for
+                attorney and admin roles)
+            start_date: Earliest document date (ISO)
+            end_date: Latest document date (ISO)
+            author: Author substring
+            tags: Documents with any of these tags
+            query_embedding: Precomputed query embedding
+
+        Returns:
+            Chunk hits: document_id, chunk_id, title, content, similarity,
+            document_date, author, is_privileged, page_number, chunk_index,
+            file_name, word_count
+
+        Raises:
+            ValueError: If no user is configured or the case is unknown
+        """
+        if not self.user_id:
+            raise ValueError("No user configured for vector search (set SUPABASE_USER_ID or pass user_id)")
+
+        filters: Dict[str, Any] = {'include_privileged': include_privileged}
+        if start_date:
+            filters['start_date'] = start_date
+        if end_date:
+            filters['end_date'] = end_date
+        if author:
+            filters['author'] = author
+        if tags:
+            filters['tags'] = ','.join(tags)
+
+        embedding = list(query_embedding) if query_embedding is not None else self.embed_query(query)
+        response = self.client.rpc('search_by_embedding', {
+            'p_query_embedding': embedding,
+            'p_case_id': self.resolve_case_id(case),
+            'p_user_id': self.user_id,
+            'p_limit': limit,
+            'p_similarity_threshold': threshold,
+            'p_filters': filters
+        }).execute()
+
+        hits = [self._hit(row) for row in response.data or []]
+        logger.info(f"Vector search returned {len(hits)} chunks for: {query}")
+        return hits
+
+    @staticmethod
+    def _hit(row: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = row.get('metadata') or {}
+        return {
+            'document_id': row.get('document_id'),
+            'chunk_id': row.get('chunk_id'),
+            'title': row.get('title'),
+            'content': row.get('content') or '',
+            'similarity': row.get('similarity', 0.0),
+            'document_date': row.get('document_date'),
+            'author': row.get('author'),
+            'is_privileged': bool(row.get('is_privileged')),
+            'page_number': row.get('page_number'),
+            'chunk_index': metadata.get('chunk_index'),
+            'file_name': metadata.get('file_name'),
+            'word_count': metadata.get('word_count')
+        }
@@ -97,6 +97,10 @@ class IntegrationTestRunner:
         test_suites = [
             # Core Agent Tests
             ('Discovery Bot', 'tests/test-discovery-bot.py'),
+            ('Discovery Bot Pipeline', 'tests/test-discovery-pipeline.py'),
+            ('Discovery Bot Retrieval', 'tests/test-discovery-retrieval.py'),
+            ('Discovery Bot Analysis', 'tests/test-discovery-analysis.py'),
+            ('Discovery Bot Output', 'tests/test-discovery-output.py'),
             ('Coordinator Bot', 'tests/test-coordinator-bot.py'),
             ('Strategy Bot', 'tests/test-strategy-bot.py'),
             ('Evidence Bot', 'tests/test-evidence-bot.py'),
@@ -110,6 +114,7 @@ class IntegrationTestRunner:
             # Infrastructure Tests
             ('MCP Connections', 'tests/test-mcps.py'),
             ('Supabase Database', 'tests/test-supabase.py'),
+            ('Vector Search Client', 'tests/test-vector-search.py'),
             ('GitHub Actions CI/CD', 'tests/test-github-actions.py'),
 
             # Compliance Tests
@@ -5,12 +5,23 @@ Provides test data, mock clients, and reusable components
 
 import pytest
 import os
+import sys
 import asyncio
+import importlib.util
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, Any, List
 from unittest.mock import MagicMock, AsyncMock, patch
 import json
 
+# Discovery Bot modules import each other by flat module name
+DISCOVERY_BOT_DIR = Path(__file__).parent.parent / '01_CLAUDE_CODE_TERMINAL' / 'agents' / 'discovery-bot'
+sys.path.insert(0, str(DISCOVERY_BOT_DIR))
+
+# Shared Supabase clients (vector_search)
+SUPABASE_INTEGRATION_DIR = Path(__file__).parent.parent / '05_SUPABASE_INTEGRATION'
+sys.path.insert(0, str(SUPABASE_INTEGRATION_DIR))
+
 # Test Configuration
 TEST_CONFIG = {
     'supabase_url': 'https://test.supabase.co',
@@ -461,3 +472,60 @@ async def wait_for_sync(check_func, timeout: float = 10.0, interval: float = 0.5
         await asyncio.sleep(interval)
         elapsed += interval
     return False
+
+
+# Discovery Bot Fixtures
+
+def load_discovery_bot_main():
+    """Import discovery-bot-main.py (not a valid module name) as discovery_bot_main"""
+    if 'discovery_bot_main' not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            'discovery_bot_main', DISCOVERY_BOT_DIR / 'discovery-bot-main.py'
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['discovery_bot_main'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['discovery_bot_main']
+
+
+@pytest.fixture
+def discovery_bot_main():
+    """The discovery-bot-main module (DiscoveryBot, BatchOutputWriter, ...)"""
+    return load_discovery_bot_main()
+
+
+@pytest.fixture
+def mock_anthropic_api():
+    """Start local mock Messages APIs; call with error_rate to get a base URL"""
+    from mock_anthropic_server import start_mock_server
+
+    servers = []
+
+    def start(error_rate: float = 0.0) -> str:
+        server = start_mock_server(0.001, 0.2, error_rate=error_rate)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def make_discovery_bot(tmp_path, mock_anthropic_api):
+    """Build DiscoveryBots against the mock API with fast retries and a shared tmp cache/output"""
+    DiscoveryBot = load_discovery_bot_main().DiscoveryBot
+
+    def make(error_rate: float = 0.0, **config) -> Any:
+        return DiscoveryBot('test-key', config={
+            'api_base_url': mock_anthropic_api(error_rate),
+            'parallel_workers': 4,
+            'retry_base_delay': 0.001,
+            'retry_max_delay': 0.01,
+            'cache_dir': str(tmp_path / 'cache'),
+            'output_dir': str(tmp_path / 'output'),
+            **config
+        })
+
+    return make
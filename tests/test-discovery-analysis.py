@@ -0,0 +1,367 @@
+"""
+Discovery Bot Analysis Tests
+Tests the local analysis helpers: email threading, timelines and the
+timeline index, term matching, privilege triage and keyword scoring
+"""
+
+import pytest
+import asyncio
+import re
+
+import numpy as np
+
+from email_threading import EmailThreader
+from keyword_analyzer import KeywordAnalyzer
+from keyword_engine import KeywordEngine
+from privilege_detector import PrivilegeDetector
+from privilege_triage import PrivilegeTriage
+from term_matcher import TermMatcher, ahocorasick
+from timeline_index import TimelineIndex
+from timeline_builder import TimelineBuilder
+
+
+def message(message_id: str, body: str, minute: int, **fields):
+    return {
+        'id': message_id,
+        'thread_id': 'T1',
+        'date': f"Mon, 04 Mar 2024 10:{minute:02d}:00 +0000",
+        'full_body': body,
+        **fields
+    }
+
+
+# Email threading
+
+def test_quoted_messages_are_covered_by_the_reply():
+    """A message quoted in full by a later reply is suppressed and mapped to that reply"""
+    original = message('m1', 'Please send the signed shipping contract by Friday.', 0)
+    reply = message('m2', (
+        'Attached is the draft, not yet signed.\n\n'
+        'On Mon, Mar 4, 2024 at 10:00 AM Counsel <c@example.com> wrote:\n'
+        '> Please send the signed shipping\n'
+        '> contract by Friday.'
+    ), 5)
+
+    coverage = EmailThreader().analyze_thread([original, reply])
+
+    assert coverage[0]['inclusive'] is False
+    assert coverage[0]['covered_by'] == 'm2'
+    assert coverage[1]['inclusive'] is True
+
+
+def test_own_text_of_later_messages_never_covers():
+    """Content matching only a later message's own text is not treated as quoted"""
+    original = message('m1', 'We will deliver the pricing schedule next week.', 0)
+    later = message('m2', 'As I said, we will deliver the pricing schedule next week.', 5)
+
+    coverage = EmailThreader().analyze_thread([original, later])
+
+    assert all(record['inclusive'] for record in coverage)
+
+
+def test_short_replies_are_never_suppressed():
+    """Counsel's "Agreed" stays inclusive next to a later "I have not agreed to anything yet" """
+    agreed = message('m1', 'Agreed', 0)
+    later = message('m2', (
+        'I have not agreed to anything yet.\n\n'
+        '> Agreed'
+    ), 5)
+
+    coverage = EmailThreader().analyze_thread([agreed, later])
+
+    assert coverage[0]['inclusive'] is True
+    assert coverage[0]['covered_by'] is None
+
+
+def test_quoted_content_matches_on_word_boundaries():
+    """Own content found only inside longer words of a later quote is not covered"""
+    original = message('m1', 'the shipment arrives on the dock at noon', 0)
+    later = message('m2', (
+        'Noted.\n\n'
+        '> Confirm: the shipment arrives on the dock at noontime tomorrow'
+    ), 5)
+
+    coverage = EmailThreader().analyze_thread([original, later])
+
+    assert coverage[0]['inclusive'] is True
+
+
+def test_attachments_keep_messages_inclusive():
+    """Replies never reproduce attachments, so a quoted message with attachments is analyzed"""
+    original = message('m1', 'Please find the signed agreement attached.', 0, has_attachments=True)
+    reply = message('m2', 'Thanks, received.\n\n> Please find the signed agreement attached.', 5)
+
+    threads = EmailThreader().analyze([original, reply])
+
+    assert threads['statistics']['inclusive_messages'] == 2
+    assert threads['threads']['T1'][0]['reason'] == 'has attachments'
+
+
+# Timelines
+
+def dated_result(document_id: str, *dates: str):
+    return {
+        'document_id': document_id,
+        'classification': {'document_type': 'email'},
+        'entities': {'dates': [{'date': date, 'context': 'Meeting scheduled', 'confidence': 0.9} for date in dates]}
+    }
+
+
+def test_timeline_mixes_aware_and_naive_dates():
+    """Timezone-aware dates are stored as naive UTC and sort alongside naive dates"""
+    builder = TimelineBuilder()
+    builder.add_result(dated_result('d1', '2024-03-01', '2024-03-05T23:30:00-05:00'))
+    builder.add_result(dated_result('d2', '2024-03-06T01:00:00'))
+
+    timeline = builder.timeline()
+
+    assert [event['date'] for event in timeline['events']] == [
+        '2024-03-01', '2024-03-06T01:00:00', '2024-03-06T04:30:00'
+    ]
+    assert timeline['date_range']['span_days'] == 5
+    assert 'error' not in timeline
+
+
+def indexed_event(date: str, event_type: str = 'meeting', custodian: str = 'jsmith', **fields):
+    return {'date': date, 'event_type': event_type, 'custodian': custodian, 'description': date, **fields}
+
+
+def test_timeline_index_pages_through_ties_without_gaps(tmp_path):
+    """Keyset pages cover every event exactly once, in order, even when dates repeat"""
+    index = TimelineIndex(str(tmp_path / 'timeline.db'), 'matter-1')
+    for d in range(5):
+        index.add_document(f"doc-{d}", [
+            indexed_event('2024-03-01'),
+            indexed_event(f"2024-03-0{d + 1}T09:00:00", 'deadline' if d % 2 else 'meeting')
+        ])
+
+    pages, cursor = [], None
+    while True:
+        page = index.query(limit=3, cursor=cursor)
+        pages.append(page['events'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    paged = [event for page in pages for event in page]
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert paged == index.query(limit=100)['events']
+    assert [event['date'] for event in paged] == sorted(event['date'] for event in paged)
+    assert index.count() == 10
+
+    # An end date includes that day's timed events
+    assert index.count(start='2024-03-02', end='2024-03-03') == 2
+    assert index.count(event_types=['deadline']) == 2
+    assert index.count(event_types=[]) == 0
+    index.close()
+
+
+def test_timeline_index_replaces_documents_per_matter(tmp_path):
+    """Re-indexing a document replaces its events; matters sharing a file stay separate"""
+    path = str(tmp_path / 'timeline.db')
+    first = TimelineIndex(path, 'matter-1', commit_interval=100)
+    first.add_document('doc-1', [indexed_event('2024-01-01'), indexed_event('2024-01-02')])
+    first.add_document('doc-1', [indexed_event('2024-02-01', is_privileged=True)])
+    assert first.count() == 1
+    first.close()
+
+    second = TimelineIndex(path, 'matter-2')
+    second.add_document('doc-1', [indexed_event('2023-12-31')])
+    assert second.matters() == ['matter-1', 'matter-2']
+    assert second.statistics()['date_range'] == {'earliest': '2023-12-31', 'latest': '2023-12-31'}
+    second.close()
+
+    reopened = TimelineIndex(path, 'matter-1')
+    assert reopened.query(is_privileged=True)['events'][0]['date'] == '2024-02-01'
+    assert reopened.remove_document('doc-1') == 1
+    assert reopened.count() == 0
+    reopened.close()
+
+
+# Term matching
+
+TERM_TEXTS = [
+    'PRIVILEGED & CONFIDENTIAL - Attorney-Client Communication. Please advise on the lawsuit.',
+    'Our General Counsel, acting as in-house counsel, forwarded the memo to the vendor.',
+    'Quarterly revenue forecast and marketing budget for the sales team.',
+    'Work-product of counsel: draft legal opinion prepared in anticipation of litigation.',
+    'Attorneys\' eyes only. cc: outside auditors; the attorneyclient header is a typo.',
+    ''
+]
+
+
+def regex_find(groups, text):
+    return {
+        name: [term for term in terms if re.search(re.escape(term), text, re.IGNORECASE)]
+        for name, terms in groups.items()
+    }
+
+
+def test_term_matcher_agrees_with_per_term_regex():
+    """One matcher call finds exactly the terms a case-insensitive regex per term finds"""
+    matcher = PrivilegeDetector(client=None).term_matcher
+
+    assert matcher.backend == ('automaton' if ahocorasick is not None else 'scan')
+    for text in TERM_TEXTS:
+        assert matcher.find(text) == regex_find(matcher.groups, text)
+
+
+@pytest.mark.skipif(ahocorasick is None, reason='pyahocorasick not installed')
+def test_automaton_and_scan_backends_agree():
+    """Overlapping and nested terms are reported the same by both backends"""
+    groups = {'nested': ['counsel', 'general counsel', 'in-house counsel'], 'overlap': ['attorney', 'attorney-client']}
+    automaton = TermMatcher(groups, use_automaton=True)
+    scan = TermMatcher(groups, use_automaton=False)
+
+    for text in TERM_TEXTS:
+        assert automaton.find(text) == scan.find(text) == regex_find(groups, text)
+
+
+def test_automaton_backend_requires_pyahocorasick(monkeypatch):
+    """Requiring the automaton without pyahocorasick fails loudly instead of scanning"""
+    import term_matcher
+
+    monkeypatch.setattr(term_matcher, 'ahocorasick', None)
+    with pytest.raises(ImportError):
+        TermMatcher({'markers': ['privileged']}, use_automaton=True)
+    assert TermMatcher({'markers': ['privileged']}).backend == 'scan'
+
+
+# Privilege triage
+
+def triage_examples(count: int, seed: int):
+    """Reviewed documents whose privilege follows legal-advice and marker terms, with label noise"""
+    rng = np.random.default_rng(seed)
+    examples = []
+    for _ in range(count):
+        features = {
+            'heuristic_score': float(rng.uniform(0.3, 0.7)),
+            'privilege_markers': float(rng.poisson(0.3)),
+            'attorney_title': float(rng.random() < 0.3),
+            'legal_advice': float(rng.poisson(0.5)),
+            'business': float(rng.poisson(2)),
+            'log_length': float(rng.uniform(5, 9))
+        }
+        logit = -5.0 + 3.0 * features['legal_advice'] + 4.0 * features['privilege_markers'] + 1.5 * features['attorney_title']
+        examples.append((features, bool(rng.random() < 1 / (1 + np.exp(-logit)))))
+    return examples
+
+
+def test_triage_threshold_meets_the_precision_target_on_new_documents():
+    """The calibrated bypass keeps its held-out precision on documents it was not fit on"""
+    triage = PrivilegeTriage(precision_target=0.95, audit_rate=0.0, min_examples=200)
+    report = triage.fit(triage_examples(1500, seed=1))
+
+    assert report['expected_precision'] >= 0.95
+    assert 0 < report['expected_bypass_rate'] < 1
+    assert report['weights']['legal_advice'] > 0 and report['weights']['privilege_markers'] > 0
+
+    bypassed = [
+        privileged for features, privileged in triage_examples(3000, seed=101)
+        if triage.assess(features, str(features))['bypassed']
+    ]
+    # Within sampling error of the target
+    assert len(bypassed) > 1000
+    assert 1 - sum(bypassed) / len(bypassed) >= 0.93
+
+
+def test_untrained_triage_never_bypasses(tmp_path):
+    """No document skips review until enough reviewed documents of both classes are fit"""
+    triage = PrivilegeTriage(min_examples=200)
+    features = triage_examples(1, seed=3)[0][0]
+
+    assert triage.assess(features, 'memo') == {
+        'features': features, 'probability': None, 'threshold': 0.0, 'bypassed': False, 'audited': False
+    }
+    with pytest.raises(ValueError):
+        triage.fit(triage_examples(100, seed=3))
+    with pytest.raises(ValueError):
+        triage.save(str(tmp_path / 'triage.json'))
+
+
+def test_triage_model_round_trips_and_audits_deterministically(tmp_path):
+    """A saved model scores identically; audited documents are chosen by text, not at random"""
+    triage = PrivilegeTriage(precision_target=0.95, audit_rate=0.0)
+    triage.fit(triage_examples(600, seed=4))
+    triage.save(str(tmp_path / 'triage.json'))
+
+    always_audit = PrivilegeTriage.load(str(tmp_path / 'triage.json'), audit_rate=1.0)
+    clear = {'business': 3.0, 'log_length': 6.0}
+
+    assert always_audit.probability(clear) == pytest.approx(triage.probability(clear))
+    assert triage.assess(clear, 'memo')['bypassed']
+    assert always_audit.assess(clear, 'memo')['audited']
+    assert not always_audit.assess(clear, 'memo')['bypassed']
+    assert PrivilegeTriage._audit_draw('memo') == PrivilegeTriage._audit_draw('memo')
+
+
+def test_triage_trains_only_on_llm_determinations():
+    """Bypassed, heuristic-only and failed privilege reviews are not training examples"""
+    def reviewed(method='llm', error=None, **triage):
+        privilege = {'is_privileged': True, 'method': method, 'triage': {'features': {'business': 1.0}, **triage}}
+        if error:
+            privilege['error'] = error
+        return {'privilege': privilege}
+
+    results = [
+        reviewed(), reviewed(bypassed=True), reviewed(method='heuristic'),
+        reviewed(error='timeout'), {'error': 'failed'}, {'privilege': {'is_privileged': False}}
+    ]
+
+    assert PrivilegeTriage.examples_from_results(results) == [({'business': 1.0}, True)]
+
+
+# Corpus keyword scoring
+
+PRODUCTION = [
+    'Shipment delayed at the port; the shipment pricing dispute continues.',
+    'Pricing schedule attached for the shipment contract renewal.',
+    'Board meeting minutes: pricing committee approved the renewal.'
+]
+
+
+def test_primed_keywords_match_batch_extraction_without_retokenizing():
+    """prime_corpus scores the batch once; per-document lookups equal a batch extract"""
+    analyzer = KeywordAnalyzer(None)
+    analyzer.prime_corpus(PRODUCTION)
+
+    expected = KeywordEngine().extract(PRODUCTION)
+
+    def no_extract(texts, update=True):
+        raise AssertionError('primed documents must not be tokenized again')
+
+    analyzer.engine.extract = no_extract
+    assert [analyzer._extract_basic_keywords(text) for text in PRODUCTION] == expected
+
+
+def test_each_production_starts_a_new_corpus():
+    """IDF and vocabulary are scoped to the latest primed production"""
+    analyzer = KeywordAnalyzer(None)
+    analyzer.prime_corpus(PRODUCTION)
+    first_corpus = analyzer.corpus_id()
+
+    analyzer.prime_corpus(['Deposition transcript of the warehouse manager.'])
+    basic = analyzer._extract_basic_keywords('Deposition transcript of the warehouse manager.')
+
+    assert analyzer.engine.n_documents == 1
+    assert basic['corpus_documents'] == 1
+    assert 'shipment' not in analyzer.engine.vocabulary
+    assert analyzer.corpus_id() != first_corpus
+
+    analyzer.prime_corpus(list(reversed(PRODUCTION)))
+    assert analyzer.corpus_id() == first_corpus
+
+
+def test_keyword_stage_cache_is_scoped_to_the_corpus(make_discovery_bot):
+    """Keyword outputs are cached per corpus; the other stages are shared across productions"""
+    bot = make_discovery_bot()
+    bot.keyword_analyzer.prime_corpus(PRODUCTION)
+    keywords, classification = bot._stage_version('keywords'), bot._stage_version('classification')
+
+    bot.keyword_analyzer.prime_corpus(PRODUCTION[:1])
+    assert bot._stage_version('keywords') != keywords
+    assert bot._stage_version('classification') == classification
+
+    bot.keyword_analyzer.prime_corpus(PRODUCTION)
+    assert bot._stage_version('keywords') == keywords
+    asyncio.run(bot.close())
@@ -0,0 +1,204 @@
+"""
+Discovery Bot Output Tests
+Tests run journals, the JSONL result writer and reader, and the Parquet export
+"""
+
+import pytest
+import asyncio
+
+from output_writer import BatchOutputWriter, ResultReader, ResultWriter
+from parquet_exporter import ParquetExporter
+from run_journal import RunJournal
+
+
+@pytest.fixture
+def ds():
+    return pytest.importorskip('pyarrow.dataset')
+
+
+def analysis_result(document_id: str, **privilege):
+    return {
+        'document_id': document_id,
+        'classification': {'document_type': 'email', 'confidence': 0.9, 'needs_review': False},
+        'privilege': {'is_privileged': False, 'privilege_types': [], **privilege},
+        'entities': {
+            'people': [{'name': 'John Smith', 'role': 'sender', 'confidence': 0.9}],
+            'dates': [{'date': '2024-03-01', 'context': 'Meeting', 'confidence': 0.8}]
+        },
+        'keywords': {'primary_keywords': [{'keyword': 'shipment'}]},
+        'processed_at': '2024-03-02T10:00:00'
+    }
+
+
+# Run journals
+
+def test_journal_resume_skips_only_completed_documents(tmp_path):
+    """Failed and degraded results are not journaled, so a resumed run retries them"""
+    journal = RunJournal(str(tmp_path / 'runs'))
+    journal.record(analysis_result('done'))
+    journal.record({'document_id': 'failed', 'error': 'timeout'})
+    journal.record({**analysis_result('degraded'), 'degraded_stages': ['classification']})
+    journal.close()
+
+    resumed = RunJournal(str(tmp_path / 'runs'), journal.run_id)
+
+    assert resumed.resumed
+    assert [resumed.is_completed(d) for d in ('done', 'failed', 'degraded')] == [True, False, False]
+    assert resumed.completed_results()['done'] == analysis_result('done')
+    resumed.close()
+
+
+def test_journal_truncates_a_torn_tail(tmp_path):
+    """A result written without its manifest line is dropped when the run is reopened"""
+    journal = RunJournal(str(tmp_path / 'runs'))
+    journal.record(analysis_result('d1'))
+    journal.close()
+
+    results_path = journal.path / RunJournal.RESULTS
+    size = results_path.stat().st_size
+    with open(results_path, 'ab') as f:
+        f.write(b'{"document_id": "d2", "classif')
+
+    resumed = RunJournal(str(tmp_path / 'runs'), journal.run_id)
+    assert list(resumed.completed_results()) == ['d1']
+    assert results_path.stat().st_size == size
+
+    resumed.record(analysis_result('d2'))
+    resumed.close()
+    assert set(RunJournal(str(tmp_path / 'runs'), journal.run_id).completed_results()) == {'d1', 'd2'}
+
+
+def test_resumed_batch_reprocesses_only_unjournaled_documents(make_discovery_bot):
+    """Re-running a batch under its run ID restores journaled results instead of analyzing them"""
+    bot = make_discovery_bot(cache_results=False, cache_stages=False)
+    documents = [
+        {'text': f"Memo {i} about the shipment schedule under contract {i}.", 'metadata': {}}
+        for i in range(3)
+    ]
+
+    analyzed = []
+    analyze_document = bot.analyze_document
+
+    async def counting_analyze(doc, doc_id):
+        analyzed.append(doc_id)
+        return await analyze_document(doc, doc_id)
+
+    bot.analyze_document = counting_analyze
+
+    async def scenario():
+        try:
+            first = await bot.process_batch(documents[:2], show_progress=False)
+            analyzed.clear()
+            second = await bot.process_batch(documents, show_progress=False, run_id=first['run_id'])
+            return first, second
+        finally:
+            await bot.close()
+
+    first, second = asyncio.run(scenario())
+
+    assert second['run_id'] == first['run_id']
+    assert [r['document_id'] for r in second['results']] == [r['document_id'] for r in first['results']] + analyzed
+    assert len(analyzed) == 1
+    assert second['results'][:2] == first['results']
+
+
+# JSONL results
+
+def test_result_reader_seeks_to_byte_offsets(tmp_path):
+    """Offsets are byte positions, so results with multi-byte text read back exactly"""
+    writer = ResultWriter(tmp_path / 'results.jsonl', tmp_path / 'results.index.jsonl')
+    results = [
+        analysis_result('d1'),
+        {**analysis_result('d2'), 'summary': 'Réunion à Zürich — 会议纪要'},
+        analysis_result('d3')
+    ]
+    offsets = [writer.write(result) for result in results]
+    writer.close()
+
+    data = (tmp_path / 'results.jsonl').read_bytes()
+    assert [offset for offset, _ in offsets] == [0, offsets[0][1], offsets[0][1] + offsets[1][1]]
+    assert sum(length for _, length in offsets) == len(data)
+
+    reader = ResultReader(tmp_path / 'results.jsonl')
+    assert len(reader) == 3
+    assert reader.get('d2') == results[1]
+    assert reader.get('d3') == results[2]
+    assert reader.get('missing') is None
+    assert [r['document_id'] for r in reader] == ['d1', 'd2', 'd3']
+
+
+def test_reopened_writer_appends_and_later_entries_win(tmp_path):
+    """A second run appends after the first; a rewritten document reads back its latest result"""
+    paths = (tmp_path / 'results.jsonl', tmp_path / 'results.index.jsonl')
+    first = ResultWriter(*paths)
+    first.write(analysis_result('d1'))
+    first.write(analysis_result('d2'))
+    first.close()
+
+    second = ResultWriter(*paths)
+    offset, length = second.write({**analysis_result('d1'), 'processed_at': '2024-03-09T08:00:00'})
+    second.close()
+
+    assert offset + length == paths[0].stat().st_size
+    reader = ResultReader(*paths)
+    assert len(reader) == 2
+    assert reader.get('d1')['processed_at'] == '2024-03-09T08:00:00'
+    assert reader.get('d2') == analysis_result('d2')
+
+
+def test_batch_output_writes_only_missing_results(tmp_path):
+    """Results already streamed are not written again when restored results are merged in"""
+    output = BatchOutputWriter(str(tmp_path / 'run'))
+    output.write_result(analysis_result('d1'))
+
+    assert output.write_missing([analysis_result('d1'), analysis_result('d2')]) == 1
+    output.close()
+
+    reader = ResultReader(tmp_path / 'run' / BatchOutputWriter.RESULTS)
+    assert [r['document_id'] for r in reader] == ['d1', 'd2']
+
+
+# Parquet export
+
+def test_parquet_export_matches_the_table_schemas(tmp_path, ds):
+    """Every table is readable with its declared schema, including tables without rows"""
+    exporter = ParquetExporter(str(tmp_path / 'parquet'))
+    exporter.write(analysis_result('d1'))
+    exporter.write({'document_id': 'd2', 'error': 'boom', 'status': 'failed'})
+    exporter.close()
+
+    for table in ParquetExporter.TABLES:
+        dataset = ds.dataset(tmp_path / 'parquet' / table, format='parquet', partitioning='hive')
+        columns = set(dataset.schema.names)
+        assert set(exporter.schemas[table].names) <= columns
+
+    documents = ds.dataset(tmp_path / 'parquet' / 'documents', partitioning='hive').to_table().to_pylist()
+    assert {(d['document_id'], d['status']) for d in documents} == {('d1', 'completed'), ('d2', 'failed')}
+    assert exporter.summary()['row_counts'] == {'documents': 2, 'entities': 1, 'dates': 1, 'privilege_indicators': 0}
+
+
+def test_parquet_export_coerces_string_booleans(tmp_path, ds):
+    """Model output such as "false" is exported as a boolean instead of failing the flush"""
+    exporter = ParquetExporter(str(tmp_path / 'parquet'))
+    exporter.write(analysis_result('d1', is_privileged='false', needs_attorney_review='yes', redaction_recommended=1))
+    exporter.close()
+
+    row = ds.dataset(tmp_path / 'parquet' / 'documents', partitioning='hive').to_table().to_pylist()[0]
+    assert row['is_privileged'] is False
+    assert row['needs_attorney_review'] is True
+    assert row['redaction_recommended'] is True
+    assert exporter.summary()['dropped_rows']['documents'] == 0
+
+
+def test_parquet_flush_failure_drops_only_the_failed_rows(tmp_path, ds):
+    """A flush that cannot be converted is dropped; later flushes and close() still write"""
+    exporter = ParquetExporter(str(tmp_path / 'parquet'), flush_rows=1)
+    exporter.write(analysis_result('d1'))
+    exporter._buffers['documents'].append({'document_id': 'bad', 'total_cost': 'not a number'})
+    exporter._flush('documents')
+    exporter.write(analysis_result('d2'))
+    exporter.close()
+
+    documents = ds.dataset(tmp_path / 'parquet' / 'documents', partitioning='hive').to_table().to_pylist()
+    assert {d['document_id'] for d in documents} == {'d1', 'd2'}
+    assert exporter.summary()['dropped_rows']['documents'] == 1
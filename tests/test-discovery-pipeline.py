@@ -0,0 +1,441 @@
+"""
+Discovery Bot Pipeline Tests
+Runs the real Discovery Bot pipeline against the local mock Messages API:
+stage scheduling, error handling and retries, deduplication, caching, run
+journals and result callbacks
+"""
+
+import pytest
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from deduplicator import Deduplicator
+from document_classifier import DocumentClassifier
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, is_retryable
+from run_journal import RunJournal
+from stage_scheduler import StageScheduler
+
+
+class FakeMessages:
+    """messages.create stand-in returning fixed text or raising an error"""
+
+    def __init__(self, text: str = '{}', error: Exception = None):
+        self.text = text
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.text)],
+            usage=SimpleNamespace(input_tokens=10, output_tokens=5)
+        )
+
+
+def fake_client(**kwargs):
+    return SimpleNamespace(messages=FakeMessages(**kwargs))
+
+
+def fast_policy() -> RetryPolicy:
+    return RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.001)
+
+
+def make_documents(count: int):
+    return [
+        {
+            'text': f"Memo {i} regarding shipment {i * 13} pricing on 2024-03-{i % 28 + 1:02d} under contract {i}.",
+            'metadata': {'filename': f"memo_{i}.txt"}
+        }
+        for i in range(count)
+    ]
+
+
+# Stage scheduling
+
+def test_scheduler_overlaps_independent_stages_and_passes_outputs():
+    """Stages start once their dependencies finish and receive their outputs by name"""
+    events = []
+
+    def stage(name, delay, value):
+        async def run(inputs):
+            events.append(('start', name))
+            await asyncio.sleep(delay)
+            events.append(('end', name))
+            return value(inputs)
+        return run
+
+    scheduler = StageScheduler()
+    scheduler.add_stage('classification', stage('classification', 0.02, lambda inputs: 'email'))
+    scheduler.add_stage('entities', stage('entities', 0.02, lambda inputs: ['Acme']))
+    scheduler.add_stage(
+        'privilege', stage('privilege', 0, lambda inputs: (inputs['classification'], inputs['entities'])),
+        depends_on=['classification', 'entities']
+    )
+
+    outputs, timings = asyncio.run(scheduler.run('doc-1'))
+
+    assert outputs['privilege'] == ('email', ['Acme'])
+    # Both independent stages start before either ends; the dependent stage starts last
+    assert events[:2] == [('start', 'classification'), ('start', 'entities')]
+    assert events.index(('start', 'privilege')) > events.index(('end', 'entities'))
+    assert timings['privilege']['started_ms'] >= timings['entities']['duration_ms']
+
+
+def test_scheduler_rejects_cycles_and_unknown_dependencies():
+    """Invalid graphs are refused before any stage runs"""
+    async def noop(inputs):
+        return None
+
+    cyclic = StageScheduler().add_stage('a', noop, ['b']).add_stage('b', noop, ['a']).add_stage('c', noop)
+    with pytest.raises(ValueError, match='cycle'):
+        cyclic.execution_order()
+
+    with pytest.raises(ValueError, match='unknown'):
+        StageScheduler().add_stage('a', noop, ['missing']).execution_order()
+
+    with pytest.raises(ValueError):
+        StageScheduler().add_stage('a', noop).add_stage('a', noop)
+
+
+def test_scheduler_failure_cancels_running_stages():
+    """A failing stage raises from run() and cancels the stages still in flight"""
+    cancelled = []
+
+    async def slow(inputs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append('slow')
+            raise
+
+    async def broken(inputs):
+        raise RuntimeError('stage failed')
+
+    async def dependent(inputs):
+        return 'never'
+
+    scheduler = StageScheduler()
+    scheduler.add_stage('slow', slow).add_stage('broken', broken).add_stage('dependent', dependent, ['broken'])
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(asyncio.wait_for(scheduler.run(), timeout=5))
+    assert cancelled == ['slow']
+
+
+# Retries and degraded results
+
+def test_retryable_errors_are_rate_limit_and_transient():
+    """Only rate-limit and transient errors go back up to the document retry"""
+    assert is_retryable(None, ConnectionError('reset'))
+    assert is_retryable(None, asyncio.TimeoutError())
+    assert not is_retryable(None, json.JSONDecodeError('bad', '', 0))
+    assert not is_retryable(None, ValueError('fatal'))
+
+
+def test_rate_limit_backoff_follows_the_calls_attempt():
+    """Without Retry-After the pause doubles per retry of one call, not with the run's total retries"""
+    limiter = AdaptiveRateLimiter()
+    limiter.counters['retries'] = 40
+
+    assert limiter.record_rate_limited(429, {}, attempt=1) == 2
+    assert limiter.record_rate_limited(429, {}, attempt=3) == 8
+    assert limiter.record_rate_limited(529, {}, attempt=9) == 60
+    assert limiter.record_rate_limited(429, {'retry-after': '0.5'}, attempt=4) == 0.5
+
+
+def test_stage_reraises_transient_errors_after_stage_retries():
+    """A transient error outlasting the stage retries is raised, not answered with heuristics"""
+    client = fake_client(error=ConnectionError('connection reset'))
+    classifier = DocumentClassifier(client, retry_policy=fast_policy())
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(classifier.classify('From: a@example.com\nSubject: contract'))
+
+    # One first attempt plus two retries
+    assert client.messages.calls == 3
+
+
+def test_stage_falls_back_on_parse_errors_and_marks_degraded():
+    """Malformed output falls back to heuristics, flagged as degraded"""
+    client = fake_client(text='not json')
+    classifier = DocumentClassifier(client, retry_policy=fast_policy())
+
+    result = asyncio.run(classifier.classify('From: a@example.com\nSubject: contract'))
+
+    assert result['degraded'] is True
+    assert result['document_type'] == 'email'
+    assert result['tokens_used']['input'] == 0
+
+
+def test_outage_fails_and_dead_letters_documents(make_discovery_bot):
+    """With every API call failing, documents fail and are dead-lettered instead of falling back"""
+    bot = make_discovery_bot(error_rate=1.0, max_retries=1)
+
+    async def scenario():
+        try:
+            return await bot.batch_processor.process(make_documents(3), show_progress=False)
+        finally:
+            await bot.close()
+
+    results = asyncio.run(scenario())
+
+    assert all(r['status'] == 'failed' and r['error_class'] == 'transient' for r in results)
+    assert not any(r.get('degraded_stages') for r in results)
+    assert len(bot.dead_letters) == 3
+    # Two attempts per document: the first plus one document-level retry
+    assert all(entry['attempts'] == 2 for entry in bot.dead_letters.entries())
+
+
+def test_healthy_run_has_no_degraded_stages(make_discovery_bot):
+    """Staged and fused runs against a healthy API report no degraded stages"""
+    for analysis_mode in ('staged', 'fused'):
+        bot = make_discovery_bot(analysis_mode=analysis_mode, cache_results=False, cache_stages=False)
+
+        async def scenario(bot):
+            try:
+                return await bot.batch_processor.process(make_documents(3), show_progress=False)
+            finally:
+                await bot.close()
+
+        results = asyncio.run(scenario(bot))
+
+        assert all('error' not in r for r in results)
+        assert not any(r.get('degraded_stages') for r in results)
+
+
+# Deduplication
+
+def long_memo(seed: int, words: int = 300) -> str:
+    return ' '.join(f"term{(seed * 7919 + i * 104729) % 100003}" for i in range(words))
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def test_deduplicator_clusters_exact_and_near_duplicates():
+    """Case and whitespace variants are exact duplicates; a one-word edit is a near duplicate"""
+    memo = long_memo(1)
+    edited = memo.replace(memo.split()[150], 'amended', 1)
+    texts = [memo, '  ' + memo.upper().replace(' ', '\n'), edited, long_memo(2), '']
+
+    assignments = Deduplicator(sha256_text, threshold=0.8).cluster(texts)
+
+    assert assignments[0] is None and assignments[3] is None and assignments[4] is None
+    assert assignments[1] == {'representative': 0, 'duplicate_type': 'exact', 'similarity': 1.0}
+    assert assignments[2]['representative'] == 0
+    assert assignments[2]['duplicate_type'] == 'near'
+    assert 0.8 <= assignments[2]['similarity'] < 1.0
+
+    exact_only = Deduplicator(sha256_text, threshold=None).cluster(texts)
+    assert [a and a['duplicate_type'] for a in exact_only] == [None, 'exact', None, None, None]
+
+
+def test_deduplicator_compares_against_representatives_only():
+    """A document similar only to a duplicate is not chained into the representative's cluster"""
+    deduplicator = Deduplicator(sha256_text, threshold=0.55, num_perm=256, bands=64, shingle_size=1)
+    base = [f"w{i}" for i in range(200)]
+    extra = [f"x{i}" for i in range(40)]
+    # Jaccard: 1 vs 0 is 0.67, 2 vs 1 is 0.67, 2 vs 0 only 0.43
+    texts = [
+        ' '.join(base),
+        ' '.join(base[:160] + extra),
+        ' '.join(base[:120] + extra + [f"y{i}" for i in range(40)])
+    ]
+
+    assignments = deduplicator.cluster(texts)
+
+    assert assignments[1]['representative'] == 0
+    assert assignments[2] is None
+
+
+def test_duplicates_share_the_representatives_analysis(make_discovery_bot):
+    """Only representatives are analyzed; duplicates get a zero-cost copy under their own ID"""
+    bot = make_discovery_bot(cache_results=False, cache_stages=False)
+    documents = make_documents(2)
+    documents.append({'text': documents[0]['text'].upper(), 'metadata': {'filename': 'copy.txt'}})
+    analyzed = []
+    analyze_document = bot.analyze_document
+
+    async def counting_analyze(*args, **kwargs):
+        analyzed.append(args)
+        return await analyze_document(*args, **kwargs)
+
+    bot.analyze_document = counting_analyze
+
+    async def scenario():
+        try:
+            return await bot.batch_processor.process(documents, show_progress=False)
+        finally:
+            await bot.close()
+
+    results = asyncio.run(scenario())
+
+    assert len(analyzed) == 2
+    assert len(results) == 3
+    duplicate = results[2]
+    assert duplicate['duplicate_of'] == results[0]['document_id'] != duplicate['document_id']
+    assert duplicate['duplicate_type'] == 'exact'
+    assert duplicate['cost']['total_cost'] == 0
+    assert duplicate['classification'] == results[0]['classification']
+    assert bot.stats['duplicates_suppressed'] == 1
+    assert bot.stats['total_processed'] == 3
+
+
+# Result callbacks
+
+def test_near_duplicates_are_rescreened_for_privilege(make_discovery_bot):
+    """A near-duplicate adding privilege language is sent to review; exact and benign copies inherit as is"""
+    bot = make_discovery_bot(cache_results=False, cache_stages=False)
+    memo = long_memo(3)
+    documents = [
+        {'text': memo, 'metadata': {'filename': 'memo.txt'}},
+        {'text': memo.upper(), 'metadata': {'filename': 'copy.txt'}},
+        {'text': memo.replace(memo.split()[150], 'amended', 1), 'metadata': {'filename': 'edited.txt'}},
+        {'text': memo + ' Privileged and confidential: my recommendation is to settle.', 'metadata': {'filename': 'annotated.txt'}}
+    ]
+
+    async def scenario():
+        try:
+            return await bot.batch_processor.process(documents, show_progress=False)
+        finally:
+            await bot.close()
+
+    original, exact, benign, annotated = asyncio.run(scenario())
+
+    assert not original['privilege']['is_privileged']
+    assert [r['duplicate_type'] for r in (exact, benign, annotated)] == ['exact', 'near', 'near']
+    assert exact['privilege'] == original['privilege']
+    assert benign['privilege'] == original['privilege']
+    assert annotated['privilege']['needs_attorney_review'] is True
+    assert 'privileged and confidential' in annotated['privilege']['review_reason']
+
+
+def test_failing_result_callback_does_not_fail_the_document(make_discovery_bot):
+    """An exception from on_result is logged; the analyzed result is kept"""
+    bot = make_discovery_bot()
+
+    def broken_output(result):
+        raise OSError('disk full')
+
+    async def scenario():
+        try:
+            return await bot.batch_processor.process(make_documents(3), show_progress=False, on_result=broken_output)
+        finally:
+            await bot.close()
+
+    results = asyncio.run(scenario())
+
+    assert all('error' not in r for r in results)
+    assert bot.stats['failed'] == 0
+    assert len(bot.dead_letters) == 0
+
+
+def test_failing_output_leaves_other_outputs_intact(make_discovery_bot, discovery_bot_main, monkeypatch, tmp_path):
+    """A JSONL writer error neither fails documents nor keeps them out of the journal"""
+    bot = make_discovery_bot()
+
+    def broken_write_result(self, result):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(discovery_bot_main.BatchOutputWriter, 'write_result', broken_write_result)
+
+    async def scenario():
+        try:
+            return await bot.process_batch(make_documents(3), show_progress=False)
+        finally:
+            await bot.close()
+
+    output = asyncio.run(scenario())
+
+    assert all('error' not in r for r in output['results'])
+    assert bot.stats['failed'] == 0
+    journal = RunJournal(str(tmp_path / 'output' / 'runs'), output['run_id'])
+    assert len(journal.completed_results()) == 3
+    journal.close()
+
+
+# Streaming
+
+def test_stream_fails_unidentifiable_documents_and_terminates(make_discovery_bot):
+    """A document whose ID cannot be generated fails on its own; the stream still ends"""
+    bot = make_discovery_bot(parallel_workers=2)
+    documents = make_documents(4)
+    documents[1] = {**documents[1], 'metadata': {'date_received': datetime(2024, 3, 1)}}
+
+    async def scenario():
+        try:
+            return [result async for result in bot.process_stream(documents, show_progress=False)]
+        finally:
+            await bot.close()
+
+    results = asyncio.run(asyncio.wait_for(scenario(), timeout=60))
+
+    assert len(results) == 4
+    failed = [r for r in results if 'error' in r]
+    assert len(failed) == 1 and failed[0]['document_id'] is None
+    assert bot.stats['total_processed'] == 4
+    assert len(bot.dead_letters) == 1
+
+
+# Result and stage caches
+
+def test_degraded_results_are_not_cached(make_discovery_bot):
+    """A result with heuristic fallbacks is recomputed on the next run, not served from cache"""
+    bot = make_discovery_bot(cache_stages=False)
+    document = make_documents(1)[0]
+    parse_response = bot.classifier.parse_response
+
+    def malformed(response):
+        raise json.JSONDecodeError('Expecting value', 'not json', 0)
+
+    async def scenario():
+        try:
+            bot.classifier.parse_response = malformed
+            degraded = await bot.process_document(document)
+
+            bot.classifier.parse_response = parse_response
+            recovered = await bot.process_document(document)
+            repeated = await bot.process_document(document)
+            return degraded, recovered, repeated
+        finally:
+            await bot.close()
+
+    degraded, recovered, repeated = asyncio.run(scenario())
+
+    assert degraded['degraded_stages'] == ['classification']
+    assert 'degraded_stages' not in recovered
+    assert recovered['classification']['tokens_used']['input'] > 0
+    assert repeated == recovered
+    assert bot.stats['cache_hits'] == 1
+
+
+def test_stage_cache_reuses_outputs_across_documents(make_discovery_bot):
+    """Identical text under different metadata re-uses every stage output at no cost"""
+    bot = make_discovery_bot(cache_results=False)
+    first, second = make_documents(1) * 2
+    second = {**second, 'metadata': {'filename': 'copy.txt'}}
+
+    async def scenario():
+        try:
+            return await bot.process_document(first), await bot.process_document(second)
+        finally:
+            await bot.close()
+
+    original, reused = asyncio.run(scenario())
+
+    assert original['document_id'] != reused['document_id']
+    # Stages settled without an API call (e.g. a conclusive privilege heuristic) are never cached
+    api_stages = [
+        stage for stage in ('classification', 'entities', 'keywords', 'privilege', 'embeddings')
+        if original[stage]['tokens_used']['input']
+    ]
+    assert bot.stats['stage_cache_hits'] == len(api_stages) > 0
+    assert all(reused[stage].get('stage_cache_hit') for stage in api_stages)
+    assert reused['cost']['total_cost'] == 0
@@ -0,0 +1,392 @@
+"""
+Discovery Bot Retrieval Tests
+Tests the local per-case vector index, BM25 and hybrid retrieval, and chunking
+"""
+
+import pytest
+import asyncio
+import hashlib
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from bm25_index import BM25Index
+from embedding_backends import EmbeddingBackend
+from hybrid_retriever import HybridRetriever
+from text_chunker import WORD_PATTERN, TextChunker, word_spans
+from vector_index import VectorIndex
+
+
+class HashBackend(EmbeddingBackend):
+    """Deterministic embedding backend: each text maps to a fixed random unit vector"""
+
+    name = 'hash'
+
+    @property
+    def native_dimensions(self) -> int:
+        return 16
+
+    @property
+    def model_name(self) -> str:
+        return 'hash-16'
+
+    def _encode(self, texts):
+        vectors = [
+            np.random.default_rng(int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)).standard_normal(16)
+            for text in texts
+        ]
+        return self._normalize(np.array(vectors))
+
+
+def unit_vectors(count: int, dimensions: int = 8, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunk_rows(document_id: str, count: int, **fields):
+    return [
+        {'document_id': document_id, 'chunk_index': i, 'content': f"{document_id} chunk {i}", **fields}
+        for i in range(count)
+    ]
+
+
+# Embedding backends
+
+def test_backends_must_implement_the_model_interface():
+    """A backend missing _encode, native_dimensions or model_name cannot be created"""
+    class Incomplete(EmbeddingBackend):
+        @property
+        def native_dimensions(self) -> int:
+            return 16
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+    vectors = HashBackend(dimensions=24).embed(['b text', 'a'])
+    assert vectors.shape == (2, 24)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert not vectors[:, 16:].any()
+
+
+# Chunking
+
+CHUNK_TEXT = (
+    "Mr. Smith met Dr. Jones at 10 a.m. on Jan. 5 regarding the Acme Corp. supply agreement. "
+    "Pricing was disputed; the parties agreed to revisit it.\n\n"
+    "Zürich office: café invoices (€1.200,50) were 'approved' — see Ex. 4.\n"
+    "会议纪要 attached 📎. Next steps? Counsel will advise!\n\n"
+) * 12
+
+
+def subword_spans(text: str) -> np.ndarray:
+    """Stand-in model tokenizer: words split into pieces of at most three characters"""
+    return np.array([
+        (start, min(start + 3, match.end()))
+        for match in WORD_PATTERN.finditer(text)
+        for start in range(match.start(), match.end(), 3)
+    ], dtype=np.int64).reshape(-1, 2)
+
+
+def test_word_spans_match_the_word_pattern():
+    """Vectorized spans agree with the regex on accented, CJK and astral characters"""
+    expected = [match.span() for match in WORD_PATTERN.finditer(CHUNK_TEXT)]
+    assert word_spans(CHUNK_TEXT).tolist() == [list(span) for span in expected]
+    assert word_spans('').shape == (0, 2)
+
+
+@pytest.mark.parametrize('token_spans', [None, subword_spans])
+def test_chunks_index_the_original_text_exactly(token_spans):
+    """Offsets slice out each chunk's text, budgets hold, and every token lands in a chunk"""
+    chunker = TextChunker(max_tokens=40, overlap_tokens=8, token_spans=token_spans)
+    spans = (token_spans or word_spans)(CHUNK_TEXT)
+    chunks = list(chunker.chunks(CHUNK_TEXT))
+
+    assert len(chunks) > 5
+    covered = set()
+    for previous, chunk in zip([None] + chunks, chunks):
+        assert CHUNK_TEXT[chunk['start_position']:chunk['end_position']] == chunk['text']
+        assert chunk['length'] == len(chunk['text'])
+        assert 0 < chunk['token_count'] <= 40
+        if previous is not None:
+            assert previous['start_position'] < chunk['start_position'] < previous['end_position']
+            assert chunk['end_position'] > previous['end_position']
+        covered.update(
+            i for i, (start, end) in enumerate(spans)
+            if chunk['start_position'] <= start and end <= chunk['end_position']
+        )
+    assert covered == set(range(len(spans)))
+    assert [chunk['chunk_id'] for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_chunks_end_at_sentences_not_abbreviations():
+    """Chunks close at sentence ends, never after Mr., Dr. or Corp."""
+    text = ' '.join(f"Mr. Smith of Acme Corp. signed contract {i} with Dr. Jones today." for i in range(20))
+    chunks = list(TextChunker(max_tokens=30, overlap_tokens=0).chunks(text))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk['text'].startswith('Mr. Smith')
+        assert chunk['text'].endswith('today.')
+
+
+def test_runaway_sentences_are_cut_between_words():
+    """Without any boundary, a subword-budgeted chunk still ends at a word boundary"""
+    text = ' '.join(f"unpunctuated{i}" for i in range(200))
+    chunks = list(TextChunker(max_tokens=25, overlap_tokens=0, token_spans=subword_spans).chunks(text))
+
+    assert len(chunks) > 1
+    assert all(re.fullmatch(r'unpunctuated\d+( unpunctuated\d+)*', chunk['text']) for chunk in chunks)
+    with pytest.raises(ValueError):
+        TextChunker(max_tokens=10, overlap_tokens=5)
+
+
+# Vector index persistence and replacement
+
+def test_vector_index_persists_across_reopen(tmp_path):
+    """Rows, filters and search results survive closing and reopening the index"""
+    vectors = unit_vectors(6)
+    index = VectorIndex(tmp_path / 'case', dimensions=8)
+    index.add(chunk_rows('A', 3, is_privileged=True, date='2024-01-05'), vectors[:3])
+    index.add(chunk_rows('B', 3, date='2024-03-01'), vectors[3:])
+    index.close()
+
+    reopened = VectorIndex(tmp_path / 'case')
+    assert len(reopened) == 6
+
+    hit = reopened.search(vectors[4], k=1)[0]
+    assert (hit['document_id'], hit['chunk_index']) == ('B', 1)
+    assert hit['score'] == pytest.approx(1.0, abs=1e-5)
+
+    privileged = reopened.search(vectors[4], k=10, is_privileged=True)
+    assert {h['document_id'] for h in privileged} == {'A'}
+    assert {h['document_id'] for h in reopened.search(vectors[0], k=10, start='2024-02-01')} == {'B'}
+    reopened.close()
+
+
+def test_vector_index_replaces_documents_once_per_session(tmp_path):
+    """Re-adding a document in a new session replaces its rows; within a session rows accumulate"""
+    vectors = unit_vectors(9)
+    index = VectorIndex(tmp_path / 'case', dimensions=8)
+    index.add(chunk_rows('A', 3), vectors[:3])
+    index.add(chunk_rows('A', 3), vectors[3:6])
+    assert len(index) == 6
+
+    index.begin_session()
+    index.add(chunk_rows('A', 3), vectors[6:])
+    assert len(index) == 3
+    assert index.search(vectors[0], k=1, document_ids=['A'])[0]['row'] >= 6
+    index.close()
+
+    # Tombstones are replayed on reopen
+    assert len(VectorIndex(tmp_path / 'case')) == 3
+
+
+def test_reprocessing_on_the_same_bot_replaces_chunks(make_discovery_bot, tmp_path):
+    """A document embedded again in a later process_batch replaces its indexed chunks"""
+    bot = make_discovery_bot(vector_index_dir=str(tmp_path / 'indexes'))
+    bot.embedding_backend = HashBackend()
+    documents = [
+        {'text': f"Memo {i} about the shipment schedule and the pricing terms of contract {i}.", 'metadata': {}}
+        for i in range(3)
+    ]
+
+    async def scenario():
+        try:
+            await bot.process_batch(documents, show_progress=False)
+            first = len(bot.vector_index())
+            await bot.process_batch(documents, show_progress=False)
+            return first, len(bot.vector_index())
+        finally:
+            await bot.close()
+
+    first, second = asyncio.run(scenario())
+
+    assert first > 0
+    assert second == first
+
+
+def test_read_only_index_never_cuts_the_writers_vectors(tmp_path):
+    """A reader opened between the writer's vector and row appends leaves both files alone"""
+    directory = tmp_path / 'case'
+    vectors = unit_vectors(3)
+    writer = VectorIndex(directory, dimensions=8)
+    writer.add(chunk_rows('A', 1) + chunk_rows('B', 1), vectors[:2])
+    writer.flush()
+
+    # The writer has appended C's vector but not yet its row line
+    with open(directory / VectorIndex.VECTORS, 'ab') as f:
+        f.write(vectors[2].tobytes())
+    manifest = (directory / VectorIndex.MANIFEST).read_bytes()
+
+    reader = VectorIndex(directory, read_only=True)
+    assert reader.rows == 2
+    assert (directory / VectorIndex.VECTORS).stat().st_size == 3 * 8 * 4
+    assert (directory / VectorIndex.MANIFEST).read_bytes() == manifest
+    with pytest.raises(ValueError):
+        reader.add(chunk_rows('D', 1), vectors[:1])
+
+    with open(directory / VectorIndex.ROWS, 'ab') as f:
+        f.write(b'{"document_id":"C","chunk_index":0,"content":"C chunk 0"}\n')
+
+    assert reader.refresh() == 1
+    assert reader.search(vectors[2], k=1)[0]['document_id'] == 'C'
+    reader.close()
+    writer.close()
+
+
+def test_read_only_reader_skips_partial_lines(tmp_path):
+    """A row line still being written is read on the next refresh, not parsed half-way"""
+    directory = tmp_path / 'case'
+    vectors = unit_vectors(2)
+    writer = VectorIndex(directory, dimensions=8)
+    writer.add(chunk_rows('A', 1), vectors[:1])
+    writer.flush()
+
+    with open(directory / VectorIndex.VECTORS, 'ab') as f:
+        f.write(vectors[1].tobytes())
+    with open(directory / VectorIndex.ROWS, 'ab') as f:
+        f.write(b'{"document_id":"B","chunk_')
+
+    reader = VectorIndex(directory, read_only=True)
+    assert reader.rows == 1
+
+    with open(directory / VectorIndex.ROWS, 'ab') as f:
+        f.write(b'index":0}\n')
+    assert reader.refresh() == 1
+    assert reader.get(1)['document_id'] == 'B'
+    reader.close()
+    writer.close()
+
+
+def test_writer_recovers_from_a_torn_row(tmp_path, caplog):
+    """A crash mid-way through a row line leaves an index the writer reopens, without the torn row or its vector"""
+    directory = tmp_path / 'case'
+    vectors = unit_vectors(3)
+    writer = VectorIndex(directory, dimensions=8)
+    writer.add(chunk_rows('A', 1), vectors[:1])
+    writer.close()
+    rows_size = (directory / VectorIndex.ROWS).stat().st_size
+
+    # Crash after B's vector and part of its row line
+    with open(directory / VectorIndex.VECTORS, 'ab') as f:
+        f.write(vectors[1].tobytes())
+    with open(directory / VectorIndex.ROWS, 'ab') as f:
+        f.write(b'{"document_id":"B","chunk_')
+
+    with caplog.at_level('WARNING', logger='vector_index'):
+        writer = VectorIndex(directory, dimensions=8)
+    assert 'partial last row' in caplog.text
+    assert writer.rows == 1
+    assert (directory / VectorIndex.ROWS).stat().st_size == rows_size
+    assert (directory / VectorIndex.VECTORS).stat().st_size == 8 * 4
+
+    writer.add(chunk_rows('C', 1), vectors[2:])
+    writer.close()
+    reopened = VectorIndex(directory, read_only=True)
+    assert [reopened.get(row)['document_id'] for row in range(reopened.rows)] == ['A', 'C']
+    assert reopened.search(vectors[2], k=1)[0]['document_id'] == 'C'
+    reopened.close()
+
+
+# BM25 and hybrid retrieval
+
+BM25_TEXTS = [
+    'Shipment delayed at the port of Oakland; shipment pricing under dispute.',
+    'The pricing schedule for the supply contract renewal is attached.',
+    'Board minutes: the committee approved the contract renewal.',
+    'Lunch order for the team offsite.',
+    'Counsel advised on the shipment contract dispute and the delayed shipment.'
+]
+
+
+def reference_bm25(texts, query, k1=1.2, b=0.75):
+    """Textbook Okapi BM25 over BM25Index's tokens"""
+    documents = [Counter(BM25Index.tokenize(text)) for text in texts]
+    lengths = [sum(document.values()) for document in documents]
+    average = sum(lengths) / len(lengths)
+    scores = []
+    for document, length in zip(documents, lengths):
+        score = 0.0
+        for term, query_count in Counter(BM25Index.tokenize(query)).items():
+            df = sum(1 for d in documents if term in d)
+            if not document[term]:
+                continue
+            idf = math.log1p((len(documents) - df + 0.5) / (df + 0.5))
+            tf = document[term]
+            score += query_count * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+        scores.append(score)
+    return scores
+
+
+def test_bm25_matches_the_reference_formula_across_adds_and_reloads(tmp_path):
+    """Scores equal textbook BM25 whether rows arrive in one add, several, or from disk"""
+    query = 'delayed shipment contract'
+    expected = reference_bm25(BM25_TEXTS, query)
+
+    index = BM25Index()
+    index.add(BM25_TEXTS[:2])
+    index.scores('warm up')  # merges the first rows before the rest are buffered
+    index.add(BM25_TEXTS[2:])
+    assert index.scores(query) == pytest.approx(expected, rel=1e-5)
+
+    index.save(str(tmp_path / 'bm25.npz'))
+    reloaded = BM25Index.load(str(tmp_path / 'bm25.npz'))
+    assert reloaded.scores(query) == pytest.approx(expected, rel=1e-5)
+    assert BM25Index.from_texts(BM25_TEXTS).scores(query) == pytest.approx(expected, rel=1e-5)
+
+    rows, scores = index.top(query, k=2)
+    assert rows.tolist() == sorted(range(5), key=lambda row: -expected[row])[:2]
+    masked, _ = index.top(query, k=5, mask=np.array([True, False, True]))
+    assert set(masked.tolist()) <= {0, 2}
+    assert index.top('the and for', k=5)[0].size == 0
+
+
+def test_hybrid_search_fuses_ranks_and_fills_missing_scores(tmp_path):
+    """Fused scores are the weighted RRF sums; rows found by one source get the other's exact score"""
+    vectors = unit_vectors(len(BM25_TEXTS))
+    index = VectorIndex(tmp_path / 'case', dimensions=8)
+    index.add([
+        {'document_id': f"D{i}", 'chunk_index': 0, 'content': text, 'is_privileged': i == 4}
+        for i, text in enumerate(BM25_TEXTS)
+    ], vectors)
+
+    retriever = HybridRetriever(index, rrf_k=10, weights={'vector': 2.0})
+    hits = retriever.search('delayed shipment', k=5, query_vector=vectors[3])
+
+    for hit in hits:
+        expected = sum(
+            weight / (10 + hit['ranks'][source])
+            for source, weight in (('bm25', 1.0), ('vector', 2.0)) if hit['ranks'][source] is not None
+        )
+        assert hit['score'] == pytest.approx(expected, abs=1e-6)
+        assert hit['scores']['vector'] == pytest.approx(float(vectors[hit['row']] @ vectors[3]), abs=1e-5)
+    # D3 shares no term with the query: it is ranked by the vector side only
+    vector_only = {hit['document_id']: hit for hit in hits if hit['ranks']['bm25'] is None}
+    assert vector_only['D3']['ranks']['vector'] == 1
+    assert vector_only['D3']['scores']['bm25'] == 0
+    assert [hit['score'] for hit in hits] == sorted((hit['score'] for hit in hits), reverse=True)
+
+    filtered = retriever.search('delayed shipment', k=5, query_vector=vectors[3], is_privileged=False)
+    assert 'D4' not in {hit['document_id'] for hit in filtered}
+    index.close()
+
+
+def test_hybrid_retriever_indexes_rows_added_later(tmp_path):
+    """Rows appended after the BM25 index was saved are searched, and the saved index is reused"""
+    vectors = unit_vectors(len(BM25_TEXTS))
+    index = VectorIndex(tmp_path / 'case', dimensions=8)
+    index.add([{'document_id': 'D0', 'chunk_index': 0, 'content': BM25_TEXTS[0]}], vectors[:1])
+
+    retriever = HybridRetriever(index)
+    assert [hit['document_id'] for hit in retriever.search('pricing')] == ['D0']
+
+    index.add([{'document_id': 'D1', 'chunk_index': 0, 'content': BM25_TEXTS[1]}], vectors[1:2])
+    assert {hit['document_id'] for hit in retriever.search('pricing schedule')} == {'D0', 'D1'}
+    assert retriever.search('pricing schedule')[0]['document_id'] == 'D1'
+
+    reopened = HybridRetriever(index)
+    assert len(reopened.bm25) == 2
+    assert reopened.refresh() == 0
+    index.close()
@@ -0,0 +1,172 @@
+"""
+Vector Search Client Tests
+Tests the shared pgvector search client with a recording Supabase stand-in
+"""
+
+import pytest
+from types import SimpleNamespace
+
+from vector_search import MODEL_ENV_VARS, VectorSearchClient, configured_model
+
+
+class RecordingSupabase:
+    """Supabase client stand-in recording rpc and table calls"""
+
+    def __init__(self, rows=None, case_id='3f0c8a52-1d2e-4b7a-9c61-0a1b2c3d4e5f', role=None):
+        self.rows = rows or []
+        self.case_id = case_id
+        self.role = role
+        self.rpc_calls = []
+        self.case_lookups = 0
+        self.role_lookups = 0
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=self.rows))
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def select(self, *args):
+                return self
+
+            def eq(self, *args):
+                return self
+
+            def limit(self, *args):
+                return self
+
+            def execute(self):
+                if name == 'users':
+                    client.role_lookups += 1
+                    return SimpleNamespace(data=[{'role': client.role}] if client.role else [])
+                client.case_lookups += 1
+                return SimpleNamespace(data=[{'id': client.case_id}])
+
+        assert name in ('legal_cases', 'users')
+        return Query()
+
+
+class CountingEmbedder:
+    def __init__(self, dimensions: int = 8):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        return [[0.5] * self.dimensions for _ in texts]
+
+
+@pytest.fixture
+def clean_model_env(monkeypatch):
+    for name in MODEL_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def test_model_comes_from_the_environment(clean_model_env):
+    """The query model follows the deployment's configuration, falling back to the client default"""
+    assert configured_model() == 'text-embedding-ada-002'
+    assert configured_model('text-embedding-3-small') == 'text-embedding-3-small'
+
+    clean_model_env.setenv('RAG_EMBEDDING_MODEL', 'text-embedding-3-large')
+    assert configured_model('text-embedding-3-small') == 'text-embedding-3-large'
+    assert VectorSearchClient(RecordingSupabase(), embedder=CountingEmbedder(), user_id='u').model == 'text-embedding-3-large'
+
+
+def test_queries_are_embedded_once_and_padded(clean_model_env):
+    """Repeated and re-typed queries re-use the cached, zero-padded embedding"""
+    embedder = CountingEmbedder(dimensions=8)
+    client = VectorSearchClient(RecordingSupabase(), embedder=embedder, user_id='u', dimensions=12)
+
+    first = client.embed_query('Settlement  Authority')
+    second = client.embed_query('settlement authority')
+
+    assert embedder.calls == 1
+    assert first == second and len(first) == 12 and first[8:] == [0.0] * 4
+    assert client.cache.stats()['hits'] == 1
+
+
+def test_search_calls_search_by_embedding_with_filters(clean_model_env):
+    """A case-number search resolves the case once and passes filters to the database"""
+    rows = [{
+        'document_id': 'd1', 'chunk_id': 'c1', 'title': 'Memo', 'content': 'Settlement terms',
+        'similarity': 0.91, 'is_privileged': False, 'page_number': 2,
+        'metadata': {'chunk_index': 3, 'file_name': 'memo.pdf', 'word_count': 120}
+    }]
+    supabase = RecordingSupabase(rows)
+    client = VectorSearchClient(supabase, embedder=CountingEmbedder(), user_id='user-1', dimensions=8)
+
+    hits = client.search('settlement', '2024-CV-00123', limit=5, start_date='2024-01-01', tags=['contract', 'email'])
+    client.search('settlement', '2024-CV-00123')
+
+    name, params = supabase.rpc_calls[0]
+    assert name == 'search_by_embedding'
+    assert params['p_case_id'] == supabase.case_id
+    assert params['p_user_id'] == 'user-1'
+    assert params['p_limit'] == 5
+    assert params['p_filters'] == {'include_privileged': False, 'start_date': '2024-01-01', 'tags': 'contract,email'}
+    assert supabase.case_lookups == 1
+    assert hits[0]['chunk_index'] == 3 and hits[0]['file_name'] == 'memo.pdf'
+
+
+def test_search_requires_a_user(clean_model_env):
+    """Searches run as a user, whose role decides access to privileged chunks"""
+    client = VectorSearchClient(RecordingSupabase(), embedder=CountingEmbedder(), user_id=None)
+    clean_model_env.delenv('SUPABASE_USER_ID', raising=False)
+    client.user_id = None
+
+    with pytest.raises(ValueError):
+        client.search('settlement', '2024-CV-00123')
+
+
+def test_privileged_chunks_are_role_gated(clean_model_env):
+    """Only attorney and admin roles may see privileged chunks; the role is looked up once"""
+    attorney = RecordingSupabase(role='lead_attorney')
+    client = VectorSearchClient(attorney, embedder=CountingEmbedder(), user_id='u')
+    assert client.may_view_privileged()
+    assert client.may_view_privileged()
+    assert attorney.role_lookups == 1
+
+    assert not VectorSearchClient(RecordingSupabase(role='paralegal'), embedder=CountingEmbedder(), user_id='u').may_view_privileged()
+    assert not VectorSearchClient(RecordingSupabase(), embedder=CountingEmbedder(), user_id='u').may_view_privileged()
+
+    clean_model_env.delenv('SUPABASE_USER_ID', raising=False)
+    anonymous = RecordingSupabase(role='super_admin')
+    assert not VectorSearchClient(anonymous, embedder=CountingEmbedder()).may_view_privileged()
+    assert anonymous.role_lookups == 0
+
+
+def test_codered_search_is_scoped_to_the_case(clean_model_env, monkeypatch):
+    """CodeRed searches pass the case to the database and never return another matter's chunks"""
+    pytest.importorskip('supabase.lib.client_options')
+    import importlib.util
+    from pathlib import Path
+
+    spec = importlib.util.spec_from_file_location(
+        'codered_client', Path(__file__).parent.parent / '03_CURSOR_IDE' / 'codered-client.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    rows = [
+        {'chunk_id': 1, 'document_id': 10, 'document_title': 'Memo', 'chunk_content': 'Custody terms',
+         'similarity': 0.9, 'metadata': {}, 'case_id': 'CUSTODY-2024-001', 'zone': 'RED', 'is_privileged': True},
+        {'chunk_id': 2, 'document_id': 11, 'document_title': 'Other', 'chunk_content': 'Other matter',
+         'similarity': 0.8, 'metadata': {}, 'case_id': 'FEDS-2024-002', 'zone': 'GREEN', 'is_privileged': False}
+    ]
+    supabase = RecordingSupabase(rows)
+    monkeypatch.setattr(module, 'create_client', lambda *args, **kwargs: supabase)
+    monkeypatch.setenv('SUPABASE_URL', 'https://test.supabase.co')
+    monkeypatch.setenv('SUPABASE_SERVICE_KEY', 'test_key')
+
+    client = module.CodeRedClient()
+    client.vector_search = VectorSearchClient(supabase, embedder=CountingEmbedder(), user_id='u', dimensions=8)
+    hits = client.query_embeddings('custody', 'CUSTODY-2024-001', include_privileged=False)
+
+    name, params = supabase.rpc_calls[0]
+    assert name == 'search_embeddings'
+    assert params['case_filter'] == 'CUSTODY-2024-001'
+    assert params['include_privileged'] is False
+    assert [(hit['chunk_id'], hit['is_privileged'], hit['zone']) for hit in hits] == [(1, True, 'RED')]